@@ -0,0 +1,217 @@
+"""
+COWORK.ARMY — Agent Admission Controller
+spawn_agent önünde duran eşzamanlılık valfi.
+- Global max-in-flight limiti
+- Departman ve LLM provider başına slot limiti
+- Öncelik + FIFO bekleme kuyruğu (düşük değer = yüksek öncelik)
+- Kuyruk derinliği ve bekleme süresi metrikleri
+Burst yükleri provider 429'ları yerine gecikmeye dönüşür.
+"""
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+from ..config import (
+    AGENT_MAX_IN_FLIGHT, AGENT_DEPT_SLOTS, AGENT_PROVIDER_SLOTS, AGENT_ADMISSION_QUEUE_SIZE,
+)
+from ..specs import parse_overrides
+
+logger = logging.getLogger("cowork.admission")
+
+DEFAULT_PRIORITY = 2  # TaskPriority.MEDIUM
+_WAIT_SAMPLES = 500
+
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    agent_id: str = field(compare=False)
+    department: str = field(compare=False)
+    provider: str = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class AdmissionController:
+    """
+    Work-conserving admission queue.
+    Waiters are admitted in (priority, arrival) order; a waiter whose
+    department/provider is full keeps its place while later waiters that
+    fit are admitted.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = AGENT_MAX_IN_FLIGHT,
+        dept_slots: str = AGENT_DEPT_SLOTS,
+        provider_slots: str = AGENT_PROVIDER_SLOTS,
+        max_queue: int = AGENT_ADMISSION_QUEUE_SIZE,
+    ):
+        self.max_in_flight = max_in_flight
+        self._dept_default, self._dept_slots = parse_overrides(dept_slots, max_in_flight)
+        self._prov_default, self._prov_slots = parse_overrides(provider_slots, max_in_flight)
+        self.max_queue = max_queue
+
+        self._waiters: list[_Waiter] = []  # sorted by (priority, seq)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._dept_in_flight: Counter = Counter()
+        self._prov_in_flight: Counter = Counter()
+
+        self._admitted_total = 0
+        self._rejected_total = 0
+        self._peak_queue_depth = 0
+        self._wait_times: deque = deque(maxlen=_WAIT_SAMPLES)
+
+    # ── Capacity ──
+
+    def _dept_limit(self, department: str) -> int:
+        return self._dept_slots.get(department, self._dept_default)
+
+    def _prov_limit(self, provider: str) -> int:
+        return self._prov_slots.get(provider, self._prov_default)
+
+    def _fits(self, department: str, provider: str) -> bool:
+        return (
+            self._in_flight < self.max_in_flight
+            and self._dept_in_flight[department] < self._dept_limit(department)
+            and self._prov_in_flight[provider] < self._prov_limit(provider)
+        )
+
+    def _take(self, department: str, provider: str) -> None:
+        self._in_flight += 1
+        self._dept_in_flight[department] += 1
+        self._prov_in_flight[provider] += 1
+
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def is_saturated(self) -> bool:
+        """True when the wait queue is full and new spawns should be rejected."""
+        return len(self._waiters) >= self.max_queue
+
+    # ── Acquire / release ──
+
+    def _dispatch(self) -> None:
+        """Admit every waiter that currently fits, in priority/FIFO order."""
+        if not self._waiters or self._in_flight >= self.max_in_flight:
+            return
+        remaining = []
+        now = time.monotonic()
+        for w in self._waiters:
+            if w.future.done():
+                continue  # cancelled while waiting
+            if self._fits(w.department, w.provider):
+                self._take(w.department, w.provider)
+                self._admitted_total += 1
+                self._wait_times.append(now - w.enqueued_at)
+                w.future.set_result(now - w.enqueued_at)
+            else:
+                remaining.append(w)
+        self._waiters = remaining
+
+    async def acquire(
+        self,
+        agent_id: str,
+        department: str = "",
+        provider: str = "",
+        priority: int = DEFAULT_PRIORITY,
+    ) -> float:
+        """Wait for a slot. Returns the time spent in the queue (seconds)."""
+        if self.is_saturated():
+            self._rejected_total += 1
+            raise RuntimeError(f"Admission queue full ({self.max_queue})")
+
+        waiter = _Waiter(
+            priority=int(priority),
+            seq=next(self._seq),
+            agent_id=agent_id,
+            department=department,
+            provider=provider,
+            enqueued_at=time.monotonic(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        bisect.insort(self._waiters, waiter)
+        self._peak_queue_depth = max(self._peak_queue_depth, len(self._waiters))
+        self._dispatch()
+
+        if not waiter.future.done():
+            logger.info(
+                f"[ADMISSION] {agent_id} queued (depth={len(self._waiters)}, "
+                f"in_flight={self._in_flight}/{self.max_in_flight})"
+            )
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Slot was granted just before cancellation — give it back
+                self.release(department, provider)
+            else:
+                self._waiters = [w for w in self._waiters if w is not waiter]
+            raise
+
+    def release(self, department: str = "", provider: str = "") -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        if self._dept_in_flight[department] > 0:
+            self._dept_in_flight[department] -= 1
+        if self._prov_in_flight[provider] > 0:
+            self._prov_in_flight[provider] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        agent_id: str,
+        department: str = "",
+        provider: str = "",
+        priority: int = DEFAULT_PRIORITY,
+    ):
+        """Async context manager: hold an admission slot for the duration of a run."""
+        waited = await self.acquire(agent_id, department, provider, priority)
+        try:
+            yield waited
+        finally:
+            self.release(department, provider)
+
+    # ── Metrics ──
+
+    def get_stats(self) -> dict:
+        waits = sorted(self._wait_times)
+        p95 = waits[int(len(waits) * 0.95) - 1] if len(waits) >= 20 else (waits[-1] if waits else 0.0)
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": len(self._waiters),
+            "peak_queue_depth": self._peak_queue_depth,
+            "max_queue": self.max_queue,
+            "admitted_total": self._admitted_total,
+            "rejected_total": self._rejected_total,
+            "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "wait_ms_p95": round(p95 * 1000, 1),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            "by_department": {k: v for k, v in self._dept_in_flight.items() if v},
+            "by_provider": {k: v for k, v in self._prov_in_flight.items() if v},
+            "queued_agents": [w.agent_id for w in self._waiters],
+        }
+
+
+# Global singleton
+_admission: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController()
+    return _admission
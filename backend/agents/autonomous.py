@@ -10,6 +10,9 @@ from datetime import datetime
 from ..config import WORKSPACE, AUTONOMOUS_TICK_SECONDS
 from ..database import get_db
 from .runner import PROCS, spawn_agent
+from .scheduler import ScheduledTask, TaskPriority
+from .admission import get_admission_controller
+from .dispatcher import get_dispatcher
 from ..departments.ceo.tools_v2 import generate_continuous_tasks
 
 logger = logging.getLogger("autonomous")
@@ -79,8 +82,8 @@ class AutonomousLoop:
             if not tasks:
                 continue
 
-            # Agent idle and has tasks -> spawn
-            if aid not in PROCS or not PROCS[aid].alive:
+            # Agent idle and has tasks -> schedule
+            if not self._is_busy(aid):
                 try:
                     t = json.loads(tasks[0].read_text())
                     dept_id = agent.get("department_id")
@@ -90,7 +93,9 @@ class AutonomousLoop:
                         "inbox_check",
                         department_id=dept_id,
                     )
-                    await spawn_agent(aid, f"{t['title']}: {t.get('description', '')}")
+                    await self._dispatch(
+                        aid, f"{t['title']}: {t.get('description', '')}", TaskPriority.LOW,
+                    )
                 except Exception as e:
                     logger.error(f"Error spawning agent {aid} from inbox: {e}")
                     try:
@@ -105,7 +110,7 @@ class AutonomousLoop:
         2. CEO agent spawn edilir (LLM seviyesinde stratejik analiz)
         """
         ceo_id = "ceo"
-        if ceo_id in PROCS and PROCS[ceo_id].alive:
+        if self._is_busy(ceo_id):
             logger.info("CEO agent is already running, skipping trigger.")
             return
 
@@ -124,7 +129,7 @@ class AutonomousLoop:
                 "ceo_trigger",
                 department_id="management",
             )
-            await spawn_agent(
+            await self._dispatch(
                 ceo_id,
                 (
                     f"Saatlik stratejik analiz tamamlandi. "
@@ -133,10 +138,28 @@ class AutonomousLoop:
                     "Simdi her departmanin durumunu gozden gecir, kritik riskleri tespit et ve "
                     "gerekirse ek gorevler olustur."
                 ),
+                TaskPriority.HIGH,
             )
         except Exception as e:
             logger.error(f"Error triggering CEO agent: {e}")
 
+    @staticmethod
+    def _is_busy(agent_id: str) -> bool:
+        """Running, dispatched or already waiting in the scheduler queue."""
+        dispatcher = get_dispatcher()
+        if agent_id in PROCS and PROCS[agent_id].alive:
+            return True
+        return dispatcher.is_busy(agent_id) or dispatcher.scheduler.has_pending(agent_id)
+
+    @staticmethod
+    async def _dispatch(agent_id: str, task: str, priority: TaskPriority) -> None:
+        """Queue through the scheduler when the dispatcher runs, else spawn directly."""
+        dispatcher = get_dispatcher()
+        if dispatcher.running:
+            await dispatcher.submit(ScheduledTask(agent_id, task, priority))
+        else:
+            await spawn_agent(agent_id, task, priority=priority)
+
     async def status(self) -> dict:
         db = get_db()
         total_events = await db.get_event_count()
@@ -147,6 +170,8 @@ class AutonomousLoop:
             "total_events": total_events,
             "agents_tracked": len(agents),
             "last_tick": datetime.now().isoformat() if self._tick_count > 0 else None,
+            "admission": get_admission_controller().get_stats(),
+            "scheduler": get_dispatcher().get_stats(),
         }
 
 
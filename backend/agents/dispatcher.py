@@ -0,0 +1,193 @@
+"""
+COWORK.ARMY — Agent Dispatcher
+AgentScheduler kuyruğunu tüketen N worker coroutine.
+- Görevleri öncelik sırasıyla (CRITICAL → LOW, aynı öncelikte FIFO) çeker
+- Meşgul agent'ın görevini kısa bir gecikmeyle kuyruğa geri koyar
+- Görevi runner.spawn_agent üzerinden çalıştırır ve bitmesini bekler
+- Message bus'taki ESCALATION / TASK_ASSIGN mesajlarını kuyruğa alır
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from ..config import SCHEDULER_WORKERS, SCHEDULER_REQUEUE_DELAY
+from .message_bus import AgentMessage, MessageType, Priority, get_message_bus
+from .runner import PROCS, spawn_agent
+from .scheduler import AgentScheduler, ScheduledTask, TaskPriority, get_scheduler
+
+logger = logging.getLogger("cowork.dispatcher")
+
+_BUS_PRIORITY = {
+    Priority.CRITICAL: TaskPriority.CRITICAL,
+    Priority.HIGH: TaskPriority.HIGH,
+    Priority.MEDIUM: TaskPriority.MEDIUM,
+    Priority.LOW: TaskPriority.LOW,
+}
+
+
+def task_from_message(msg: AgentMessage) -> Optional[ScheduledTask]:
+    """Convert a bus message into a ScheduledTask (None if it is not actionable)."""
+    p = msg.payload or {}
+    if msg.message_type == MessageType.ESCALATION:
+        text = f"[ESKALASYON] {msg.from_agent}: {p.get('reason', '')}"
+        if p.get("context"):
+            text += f"\nBaglam: {p['context']}"
+        priority = TaskPriority.CRITICAL
+    elif msg.message_type == MessageType.TASK_ASSIGN:
+        text = str(p.get("task") or p.get("description") or "")
+        if not text:
+            return None
+        priority = _BUS_PRIORITY.get(msg.priority, TaskPriority.MEDIUM)
+    else:
+        return None
+
+    depth = get_message_bus().cascade_depth(msg.cascade_id)
+    task = ScheduledTask(
+        agent_id=msg.to_agent,
+        task=text,
+        priority=priority,
+        cascade_id=msg.cascade_id,
+        cascade_depth=depth,
+    )
+    if msg.thread_id:
+        task.thread_id = msg.thread_id
+    return task
+
+
+class AgentDispatcher:
+    """Worker pool that makes AgentScheduler the dispatch path for agent runs."""
+
+    def __init__(
+        self,
+        scheduler: Optional[AgentScheduler] = None,
+        workers: int = SCHEDULER_WORKERS,
+        requeue_delay: float = SCHEDULER_REQUEUE_DELAY,
+    ):
+        self.scheduler = scheduler or get_scheduler()
+        self.workers = max(1, workers)
+        self.requeue_delay = requeue_delay
+        self._running = False
+        self._workers: list[asyncio.Task] = []
+        self._pending: set[asyncio.Task] = set()  # delayed requeues / bus enqueues
+        self._failed_total = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"dispatcher:{i}")
+            for i in range(self.workers)
+        ]
+        get_message_bus().subscribe("*", self._on_message)
+        logger.info(f"[DISPATCHER] Started {self.workers} workers")
+
+    async def stop(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        get_message_bus().unsubscribe("*", self._on_message)
+        tasks = self._workers + list(self._pending)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._pending.clear()
+        logger.info("[DISPATCHER] Stopped")
+
+    async def submit(self, task: ScheduledTask) -> None:
+        """Enqueue a task for dispatch (raises ValueError on cascade overflow)."""
+        await self.scheduler.enqueue(task)
+
+    def is_busy(self, agent_id: str) -> bool:
+        proc = PROCS.get(agent_id)
+        return self.scheduler.is_agent_busy(agent_id) or bool(proc and proc.alive)
+
+    # ── Internals ──
+
+    def _spawn_background(self, coro) -> None:
+        t = asyncio.create_task(coro)
+        self._pending.add(t)
+        t.add_done_callback(self._pending.discard)
+
+    def _on_message(self, msg: AgentMessage) -> None:
+        """Message bus subscriber (sync callback) — queue actionable messages."""
+        if not self._running:
+            return
+        task = task_from_message(msg)
+        if task is None:
+            return
+        self._spawn_background(self._submit_logged(task))
+
+    async def _submit_logged(self, task: ScheduledTask) -> None:
+        try:
+            await self.submit(task)
+        except ValueError as e:
+            logger.warning(f"[DISPATCHER] Rejected task for {task.agent_id}: {e}")
+
+    def _requeue_later(self, task: ScheduledTask) -> None:
+        """Requeue after requeue_delay; the task stays pending for the whole delay."""
+        self.scheduler.hold(task.agent_id)
+        self._spawn_background(self._delayed_requeue(task))
+
+    async def _delayed_requeue(self, task: ScheduledTask) -> None:
+        try:
+            await asyncio.sleep(self.requeue_delay)
+        except asyncio.CancelledError:
+            self.scheduler.release_hold(task.agent_id)
+            raise
+        await self.scheduler.requeue(task, held=True)
+
+    async def _worker(self, n: int) -> None:
+        while self._running:
+            task = await self.scheduler.dequeue()
+            if self.is_busy(task.agent_id):
+                self._requeue_later(task)
+                continue
+
+            self.scheduler.mark_active(task.agent_id, task)
+            try:
+                result = await spawn_agent(task.agent_id, task.task, priority=int(task.priority))
+                if "error" in result:
+                    if result["error"] == "Already running":
+                        self._requeue_later(task)
+                    else:
+                        self._failed_total += 1
+                        logger.warning(
+                            f"[DISPATCHER] {task.agent_id} not started: {result['error']}"
+                        )
+                    continue
+                proc = PROCS.get(task.agent_id)
+                if proc is not None and proc.task is not None:
+                    await asyncio.shield(proc.task)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed_total += 1
+                logger.error(f"[DISPATCHER] worker {n} failed on {task.agent_id}: {e}")
+            finally:
+                self.scheduler.mark_done(task.agent_id)
+
+    def get_stats(self) -> dict:
+        stats = self.scheduler.get_stats()
+        stats.update({
+            "running": self._running,
+            "workers": self.workers,
+            "failed_total": self._failed_total,
+        })
+        return stats
+
+
+# Global singleton
+_dispatcher: Optional[AgentDispatcher] = None
+
+
+def get_dispatcher() -> AgentDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = AgentDispatcher()
+    return _dispatcher
@@ -3,15 +3,25 @@ COWORK.ARMY — ExternalDataWatcher
 5 katman dış veri izleme: piyasa, haber, sosyal, operasyonel, sistem.
 Her katman bağımsız asyncio task olarak çalışır.
 Hata yönetimi: exponential backoff retry, stream degradation bildirimi.
+HTTP: tüm katmanlar tek paylaşımlı aiohttp oturumu kullanır (keep-alive,
+host başına bağlantı limiti, DNS cache, RSS için ETag/If-Modified-Since).
 """
 import asyncio
+import hashlib
+import json
 import logging
 import os
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional
+
+from ..config import (
+    MARKET_STREAM_SYMBOLS, MARKET_STREAM_TIMEFRAME,
+    WATCHER_COALESCE_SECONDS, WATCHER_DEDUP_WINDOW, WATCHER_DNS_TTL, WATCHER_HTTP_LIMIT, WATCHER_HTTP_LIMIT_PER_HOST, WATCHER_KEEPALIVE,
+)
 
 logger = logging.getLogger("cowork.external_watcher")
 
@@ -43,13 +53,299 @@ async def broadcast_external_trigger(event: dict) -> None:
         logger.error(f"[WATCHER] Broadcast failed: {e}")
 
 
+class StreamHttpStats:
+    """Per-stream request metrics: count, errors, 304s, bytes and latency."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes = 0
+        self.latency_ms_avg = 0.0
+        self.latency_ms_max = 0.0
+        self.last_status: Optional[int] = None
+
+    def record(self, latency_s: float, status: Optional[int], size: int = 0) -> None:
+        self.requests += 1
+        latency_ms = latency_s * 1000
+        self.latency_ms_avg = latency_ms if self.requests == 1 else 0.8 * self.latency_ms_avg + 0.2 * latency_ms
+        self.latency_ms_max = max(self.latency_ms_max, latency_ms)
+        self.last_status = status
+        self.bytes += size
+        if status is None or status >= 400:
+            self.errors += 1
+        elif status == 304:
+            self.not_modified += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "not_modified": self.not_modified,
+            "bytes": self.bytes,
+            "latency_ms_avg": round(self.latency_ms_avg, 1),
+            "latency_ms_max": round(self.latency_ms_max, 1),
+            "last_status": self.last_status,
+        }
+
+
+class WatcherHttp:
+    """
+    One pooled aiohttp session shared by every stream: keep-alive, per-host
+    connection limits and a DNS cache instead of a new connector per fetch.
+    Conditional GETs remember ETag / Last-Modified per URL and report an
+    unchanged resource as None.
+    """
+
+    def __init__(self):
+        self._session = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._validators: dict[str, dict] = {}
+        self.stats: dict[str, StreamHttpStats] = {}
+
+    def _get_session(self):
+        import aiohttp
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=WATCHER_HTTP_LIMIT,
+                limit_per_host=WATCHER_HTTP_LIMIT_PER_HOST,
+                ttl_dns_cache=WATCHER_DNS_TTL,
+                keepalive_timeout=WATCHER_KEEPALIVE,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._loop = loop
+        return self._session
+
+    async def _request(self, stream: str, url: str, *, params: Optional[dict] = None,
+                       headers: Optional[dict] = None, timeout: float = 10,
+                       conditional: bool = False, as_json: bool = False) -> tuple[int, Any]:
+        import aiohttp
+        stats = self.stats.setdefault(stream, StreamHttpStats())
+        headers = dict(headers or {})
+        if conditional:
+            headers.update(self._validators.get(url, {}))
+        start = time.monotonic()
+        try:
+            async with self._get_session().get(
+                url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                if resp.status == 304:
+                    stats.record(time.monotonic() - start, 304)
+                    return 304, None
+                body = await resp.read()
+                if conditional and resp.status == 200:
+                    validators = {}
+                    if resp.headers.get("ETag"):
+                        validators["If-None-Match"] = resp.headers["ETag"]
+                    if resp.headers.get("Last-Modified"):
+                        validators["If-Modified-Since"] = resp.headers["Last-Modified"]
+                    self._validators[url] = validators
+                stats.record(time.monotonic() - start, resp.status, len(body))
+                if as_json:
+                    return resp.status, json.loads(body)
+                return resp.status, body.decode(resp.get_encoding(), errors="replace")
+        except Exception:
+            stats.record(time.monotonic() - start, None)
+            raise
+
+    async def get_json(self, stream: str, url: str, **kwargs) -> Any:
+        return (await self._request(stream, url, as_json=True, **kwargs))[1]
+
+    async def get_text(self, stream: str, url: str, **kwargs) -> Optional[str]:
+        """Body text, or None when a conditional request found the resource unchanged."""
+        return (await self._request(stream, url, **kwargs))[1]
+
+    async def get_status(self, stream: str, url: str, **kwargs) -> int:
+        return (await self._request(stream, url, **kwargs))[0]
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def get_stats(self) -> dict:
+        return {name: s.to_dict() for name, s in self.stats.items()}
+
+
+_http: Optional[WatcherHttp] = None
+
+
+def get_watcher_http() -> WatcherHttp:
+    global _http
+    if _http is None:
+        _http = WatcherHttp()
+    return _http
+
+
+_SEVERITY_RANK = {Severity.LOW: 0, Severity.MEDIUM: 1, Severity.HIGH: 2, Severity.CRITICAL: 3}
+
+
+def event_fingerprint(event: ExternalEvent) -> str:
+    """
+    Identity of an event: source, category, its descriptive fields and the
+    direction (sign) of its numeric readings. Magnitudes (price, change, RSI)
+    are left out so the same ongoing condition keeps one fingerprint while the
+    numbers drift, but a reversal (+2% → -2%) is a new event.
+    """
+    identity = {}
+    for k, v in sorted(event.raw_data.items()):
+        if isinstance(v, str):
+            identity[k] = v
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            identity[k] = (v > 0) - (v < 0)
+    key = json.dumps([event.source, event.category, identity], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class EventCoalescer:
+    """
+    Dedup + coalescing stage in front of the watcher's event handler.
+    - A fingerprint already emitted within `window` seconds is suppressed,
+      unless its severity is above the one it was last emitted with
+      (escalation); a condition flapping HIGH → MEDIUM → HIGH stays suppressed
+    - Events that pass are buffered per target-department set for `delay`
+      seconds and delivered as one trigger; a burst becomes a single merged
+      summary. CRITICAL events flush their group immediately.
+    """
+
+    def __init__(self, sink: Callable[[ExternalEvent], Awaitable[None]],
+                 window: float = WATCHER_DEDUP_WINDOW, delay: float = WATCHER_COALESCE_SECONDS):
+        self.sink = sink
+        self.window = window
+        self.delay = delay
+        self._seen: dict[str, tuple[float, Severity]] = {}   # fingerprint → (emitted_at, emitted severity)
+        self._pending: dict[tuple, list[ExternalEvent]] = {}
+        self._timers: dict[tuple, asyncio.Task] = {}
+        self.stats = {"received": 0, "suppressed": 0, "escalated": 0, "merged": 0, "delivered": 0}
+
+    def _admit(self, event: ExternalEvent, now: float) -> bool:
+        fp = event_fingerprint(event)
+        seen = self._seen.get(fp)
+        if seen is not None and now - seen[0] < self.window:
+            if _SEVERITY_RANK[event.severity] <= _SEVERITY_RANK[seen[1]]:
+                return False
+            self.stats["escalated"] += 1
+        self._seen[fp] = (now, event.severity)
+        return True
+
+    def _prune(self, now: float) -> None:
+        if len(self._seen) > 1024:
+            self._seen = {fp: v for fp, v in self._seen.items() if now - v[0] < self.window}
+
+    async def submit(self, event: ExternalEvent) -> bool:
+        """Queue an event for delivery; returns False when it was suppressed as a repeat."""
+        now = time.monotonic()
+        self.stats["received"] += 1
+        self._prune(now)
+        if not self._admit(event, now):
+            self.stats["suppressed"] += 1
+            return False
+        key = tuple(sorted(event.target_departments))
+        self._pending.setdefault(key, []).append(event)
+        if event.severity == Severity.CRITICAL or self.delay <= 0:
+            await self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+        return True
+
+    async def _flush_later(self, key: tuple) -> None:
+        await asyncio.sleep(self.delay)
+        self._timers.pop(key, None)
+        await self._flush(key)
+
+    async def _flush(self, key: tuple) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        events = self._pending.pop(key, [])
+        if not events:
+            return
+        if len(events) > 1:
+            self.stats["merged"] += len(events) - 1
+        self.stats["delivered"] += 1
+        await self.sink(events[0] if len(events) == 1 else self._merge(events))
+
+    @staticmethod
+    def _merge(events: list[ExternalEvent]) -> ExternalEvent:
+        top = max(events, key=lambda e: _SEVERITY_RANK[e.severity])
+        categories = sorted({e.category for e in events})
+        return ExternalEvent(
+            source="coalesced",
+            category=categories[0] if len(categories) == 1 else "mixed",
+            raw_data={"count": len(events), "events": [
+                {"source": e.source, "category": e.category, "severity": e.severity.value, "summary": e.summary}
+                for e in events
+            ]},
+            severity=top.severity,
+            summary=f"{len(events)} olay: " + " | ".join(e.summary[:60] for e in events[:5]),
+            target_departments=list(events[0].target_departments),
+        )
+
+    async def flush_all(self) -> None:
+        for key in list(self._pending):
+            await self._flush(key)
+
+
+class AdaptiveInterval:
+    """
+    Effective polling interval of one stream, between a floor and a ceiling
+    around its base interval.
+    - Any HIGH/CRITICAL event in a poll halves the interval (volatile)
+    - A poll that delivers nothing new stretches it by 1.5x (calm)
+    - New, milder events bring it back towards the base
+    The floor also honours the source's request budget per hour.
+    """
+
+    SHRINK = 0.5
+    GROW = 1.5
+
+    def __init__(self, base: float, floor: float, ceiling: float):
+        self.base = base
+        self.floor = min(floor, base)
+        self.ceiling = max(ceiling, base)
+        self.current = base
+
+    def update(self, events: list[ExternalEvent], new_events: int) -> float:
+        if any(_SEVERITY_RANK[e.severity] >= _SEVERITY_RANK[Severity.HIGH] for e in events):
+            self.current = max(self.floor, self.current * self.SHRINK)
+        elif new_events == 0:
+            self.current = min(self.ceiling, self.current * self.GROW)
+        elif self.current > self.base:
+            self.current = self.base
+        else:
+            self.current = min(self.base, self.current * self.GROW)
+        return self.current
+
+
 class DataStream(ABC):
     name: str
     interval_seconds: int
+    # Adaptive bounds (default base/4 .. base*4); the floor never exceeds the request budget
+    min_interval_seconds: Optional[float] = None
+    max_interval_seconds: Optional[float] = None
+    max_requests_per_hour: Optional[int] = None
     max_retries: int = 3
     retry_backoff_seconds: int = 30
     _retry_count: int = 0
     _degraded: bool = False
+    _schedule: Optional[AdaptiveInterval] = None
+    http: Optional[WatcherHttp] = None
+
+    @property
+    def client(self) -> WatcherHttp:
+        return self.http or get_watcher_http()
+
+    @property
+    def schedule(self) -> AdaptiveInterval:
+        if self._schedule is None:
+            base = self.interval_seconds
+            floor = self.min_interval_seconds if self.min_interval_seconds is not None else base / 4
+            if self.max_requests_per_hour:
+                floor = max(floor, 3600 / self.max_requests_per_hour)
+            ceiling = self.max_interval_seconds if self.max_interval_seconds is not None else base * 4
+            self._schedule = AdaptiveInterval(base, floor, ceiling)
+        return self._schedule
 
     @abstractmethod
     async def fetch(self) -> list[ExternalEvent]: ...
@@ -89,8 +385,16 @@ class DataStream(ABC):
 class MarketDataStream(DataStream):
     name = "market"
     interval_seconds = 30
+    max_requests_per_hour = 360  # CoinGecko free tier, shared with other users of the key-less API
     _last_prices: dict = {}
 
+    def __init__(self, symbols: Optional[list[str]] = None, timeframe: str = MARKET_STREAM_TIMEFRAME):
+        self.symbols = symbols if symbols is not None else [
+            s.strip() for s in MARKET_STREAM_SYMBOLS.split(",") if s.strip()
+        ]
+        self.timeframe = timeframe
+        self._rsi_zones: dict[str, str] = {}
+
     def _change_to_severity(self, abs_change: float) -> Optional[Severity]:
         """Convert absolute price change percentage to severity level."""
         if abs_change >= 5.0:
@@ -103,7 +407,6 @@ class MarketDataStream(DataStream):
 
     async def fetch(self) -> list[ExternalEvent]:
         """Fetch BTC, ETH, SOL prices from CoinGecko (free, no key needed)."""
-        import aiohttp
         events = []
         url = "https://api.coingecko.com/api/v3/simple/price"
         params = {
@@ -111,9 +414,7 @@ class MarketDataStream(DataStream):
             "vs_currencies": "usd",
             "include_24hr_change": "true"
         }
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                data = await resp.json()
+        data = await self.client.get_json(self.name, url, params=params, timeout=10)
 
         symbol_map = {"bitcoin": "BTC", "ethereum": "ETH", "solana": "SOL"}
         for coin_id, symbol in symbol_map.items():
@@ -131,6 +432,67 @@ class MarketDataStream(DataStream):
                     summary=f"{symbol} {'📈' if change_pct > 0 else '📉'} {change_pct:+.1f}% (${price:,.0f})",
                     target_departments=["trade"],
                 ))
+        events.extend(await self._indicator_events())
+        return events
+
+    def _refresh_indicators(self) -> list[dict]:
+        """
+        Keep live indicator state per symbol: seed once from the shared
+        market-data cache, then pull only the newest candles (more if the
+        stream fell behind). Runs in a worker thread (ccxt is blocking).
+        """
+        from ..departments.trade.exchanges import get_exchange_pool
+        from ..departments.trade.market_data import fetch_ohlcv, timeframe_seconds
+        from ..departments.trade.streaming import get_indicator_registry
+
+        registry = get_indicator_registry()
+        pool = get_exchange_pool()
+        tf_ms = timeframe_seconds(self.timeframe) * 1000
+        snapshots = []
+        for symbol in self.symbols:
+            try:
+                state = registry.peek(symbol, self.timeframe)
+                if state is None or state.forming is None:
+                    ohlcv = fetch_ohlcv(pool.get, "binance", symbol, self.timeframe)
+                else:
+                    behind = int((time.time() * 1000 - state.forming[0]) // tf_ms)
+                    ohlcv = pool.get("binance").fetch_ohlcv(
+                        symbol, self.timeframe, limit=min(max(behind + 1, 2), 100),
+                    )
+                snapshots.append(registry.ingest(symbol, self.timeframe, ohlcv))
+            except Exception as e:
+                logger.warning(f"[market] Indicator update failed for {symbol}: {e}")
+        return snapshots
+
+    async def _indicator_events(self) -> list[ExternalEvent]:
+        """RSI entering overbought / oversold on the live candles → MEDIUM event."""
+        try:
+            snapshots = await asyncio.to_thread(self._refresh_indicators)
+        except Exception as e:
+            logger.warning(f"[market] Indicator refresh failed: {e}")
+            return []
+
+        events = []
+        for snap in snapshots:
+            rsi = snap.get("rsi")
+            if rsi is None or not snap.get("ready"):
+                continue
+            zone = "overbought" if rsi >= 70 else "oversold" if rsi <= 30 else "neutral"
+            previous = self._rsi_zones.get(snap["symbol"])
+            self._rsi_zones[snap["symbol"]] = zone
+            if previous is None or zone == previous or zone == "neutral":
+                continue
+            events.append(ExternalEvent(
+                source="ccxt",
+                category="market",
+                raw_data={
+                    "symbol": snap["symbol"], "timeframe": snap["timeframe"],
+                    "rsi": round(rsi, 2), "price": snap["close"],
+                },
+                severity=Severity.MEDIUM,
+                summary=f"{snap['symbol']} {snap['timeframe']} RSI {rsi:.1f} ({zone})",
+                target_departments=["trade"],
+            ))
         return events
 
     def evaluate_trigger(self, event: ExternalEvent) -> bool:
@@ -140,37 +502,43 @@ class MarketDataStream(DataStream):
 class NewsDataStream(DataStream):
     name = "news"
     interval_seconds = 600  # 10 dakika
+    max_requests_per_hour = 30
 
     async def fetch(self) -> list[ExternalEvent]:
-        """Fetch financial news via RSS (no API key needed)."""
-        import aiohttp
-        from xml.etree import ElementTree as ET
-        events = []
+        """
+        Fetch financial news via RSS (no API key needed). Feeds are requested
+        concurrently and conditionally: an unchanged feed (304) yields nothing.
+        """
         feeds = [
             ("https://feeds.bbci.co.uk/news/business/rss.xml", "trade", "finance"),
             ("https://rss.nytimes.com/services/xml/rss/nyt/Technology.xml", "engineering", "tech"),
         ]
-        async with aiohttp.ClientSession() as session:
-            for url, dept, category in feeds:
-                try:
-                    headers = {"User-Agent": "Mozilla/5.0 (compatible; COWORK-Bot/1.0)"}
-                    async with session.get(url, timeout=aiohttp.ClientTimeout(total=15), headers=headers) as resp:
-                        text = await resp.text()
-                    root = ET.fromstring(text)
-                    items = root.findall(".//item")[:3]  # Son 3 haber
-                    for item in items:
-                        title = item.findtext("title", "")
-                        if title:
-                            events.append(ExternalEvent(
-                                source=url,
-                                category=category,
-                                raw_data={"title": title},
-                                severity=Severity.LOW,
-                                summary=f"📰 {title[:100]}",
-                                target_departments=[dept],
-                            ))
-                except Exception as e:
-                    logger.warning(f"[news] Feed {url} failed: {e}")
+        results = await asyncio.gather(*(self._fetch_feed(*feed) for feed in feeds))
+        return [event for events in results for event in events]
+
+    async def _fetch_feed(self, url: str, dept: str, category: str) -> list[ExternalEvent]:
+        from xml.etree import ElementTree as ET
+        events = []
+        try:
+            headers = {"User-Agent": "Mozilla/5.0 (compatible; COWORK-Bot/1.0)"}
+            text = await self.client.get_text(self.name, url, headers=headers, timeout=15, conditional=True)
+            if text is None:
+                return events
+            root = ET.fromstring(text)
+            items = root.findall(".//item")[:3]  # Son 3 haber
+            for item in items:
+                title = item.findtext("title", "")
+                if title:
+                    events.append(ExternalEvent(
+                        source=url,
+                        category=category,
+                        raw_data={"title": title},
+                        severity=Severity.LOW,
+                        summary=f"📰 {title[:100]}",
+                        target_departments=[dept],
+                    ))
+        except Exception as e:
+            logger.warning(f"[news] Feed {url} failed: {e}")
         return events
 
     def evaluate_trigger(self, event: ExternalEvent) -> bool:
@@ -199,17 +567,12 @@ class SocialDataStream(DataStream):
 class OperationalDataStream(DataStream):
     name = "operational"
     interval_seconds = 1800  # 30 dakika
+    max_requests_per_hour = 6
 
     async def fetch(self) -> list[ExternalEvent]:
         """Weather data for hotel/travel operations."""
-        import aiohttp
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://wttr.in/Istanbul?format=j1",
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    data = await resp.json()
+            data = await self.client.get_json(self.name, "https://wttr.in/Istanbul?format=j1", timeout=10)
             temp = data["current_condition"][0]["temp_C"]
             desc = data["current_condition"][0]["weatherDesc"][0]["value"]
             return [ExternalEvent(
@@ -234,24 +597,22 @@ class SystemDataStream(DataStream):
 
     async def fetch(self) -> list[ExternalEvent]:
         """Monitor backend API health."""
-        import aiohttp
         port = os.environ.get("PORT", "8888")
         backend_url = os.environ.get(
             "BACKEND_HEALTH_URL",
             f"http://0.0.0.0:{port}/api/info"
         )
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(backend_url, timeout=aiohttp.ClientTimeout(total=5)) as resp:
-                    if resp.status != 200:
-                        return [ExternalEvent(
-                            source="system_health",
-                            category="system",
-                            raw_data={"status": resp.status},
-                            severity=Severity.HIGH,
-                            summary=f"⚠️ Backend API sağlık kontrolü başarısız: HTTP {resp.status}",
-                            target_departments=["software"],
-                        )]
+            status = await self.client.get_status(self.name, backend_url, timeout=5)
+            if status != 200:
+                return [ExternalEvent(
+                    source="system_health",
+                    category="system",
+                    raw_data={"status": status},
+                    severity=Severity.HIGH,
+                    summary=f"⚠️ Backend API sağlık kontrolü başarısız: HTTP {status}",
+                    target_departments=["software"],
+                )]
             return []
         except Exception as e:
             return [ExternalEvent(
@@ -281,6 +642,10 @@ class ExternalDataWatcher:
             OperationalDataStream(),
             SystemDataStream(),
         ]
+        self.http = get_watcher_http()
+        for stream in self.streams:
+            stream.http = self.http
+        self.coalescer = EventCoalescer(self._handle_event)
         self._running = False
         self._tasks: list[asyncio.Task] = []
 
@@ -301,16 +666,37 @@ class ExternalDataWatcher:
         if self._tasks:
             await asyncio.gather(*self._tasks, return_exceptions=True)
         self._tasks.clear()
+        await self.coalescer.flush_all()
+        await self.http.close()
         logger.info("[WATCHER] Stopped")
 
+    def get_stats(self) -> dict:
+        http = self.http.get_stats()
+        return {
+            "running": self._running,
+            "events": dict(self.coalescer.stats),
+            "streams": {
+                s.name: {
+                    "interval_seconds": s.interval_seconds,
+                    "effective_interval_seconds": round(s.schedule.current, 1),
+                    "interval_bounds": [round(s.schedule.floor, 1), round(s.schedule.ceiling, 1)],
+                    "degraded": s._degraded,
+                    "retry_count": s._retry_count,
+                    "http": http.get(s.name),
+                }
+                for s in self.streams
+            },
+        }
+
     async def _stream_loop(self, stream: DataStream) -> None:
         """Main loop for a single data stream."""
         while self._running:
             events = await stream.run_once()
+            new_events = 0
             for event in events:
-                if stream.evaluate_trigger(event):
-                    await self._handle_event(event)
-            await asyncio.sleep(stream.interval_seconds)
+                if stream.evaluate_trigger(event) and await self.coalescer.submit(event):
+                    new_events += 1
+            await asyncio.sleep(stream.schedule.update(events, new_events))
 
     async def _handle_event(self, event: ExternalEvent) -> None:
         """Handle a triggered external event — broadcast to WebSocket."""
@@ -0,0 +1,210 @@
+"""
+COWORK.ARMY — Tool-loop History Manager
+_run içindeki messages listesi her turda tamamen yeniden gönderilir.
+- Son N turun tool sonuçları aynen korunur
+- Daha eski sonuçlar kısa özet / kırpılmış digest ile değiştirilir
+- Agent başına token bütçesi aşılırsa en eski turdan başlayarak stub'a indirilir
+- Her sıkıştırmanın kazandırdığı token sayısı raporlanır
+Normalize mesaj formatında çalışır (runner'ın ürettiği Anthropic-benzeri bloklar +
+tool_name); Anthropic ve Gemini provider'ları bu formatı kendi API'lerine çevirir.
+"""
+from __future__ import annotations
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+
+from ..config import (
+    AGENT_HISTORY_TOKEN_BUDGET, AGENT_HISTORY_BUDGETS, AGENT_HISTORY_KEEP_ROUNDS,
+)
+from ..specs import parse_overrides
+
+logger = logging.getLogger("cowork.history")
+
+CHARS_PER_TOKEN = 4
+DIGEST_HEAD_CHARS = 600
+DIGEST_TAIL_CHARS = 200
+INPUT_MAX_CHARS = 300          # eski tool_use input string'leri (ör. write_file content)
+_DIGEST_MARK = "[ozet]"
+_STUB_MARK = "[kaldirildi]"
+
+_default_budget, _budget_overrides = parse_overrides(AGENT_HISTORY_BUDGETS, AGENT_HISTORY_TOKEN_BUDGET)
+
+
+def budget_for(agent_id: str) -> int:
+    return _budget_overrides.get(agent_id, _default_budget)
+
+
+def estimate_tokens(value) -> int:
+    """Rough token estimate (chars / 4) for a message, block list or string."""
+    if isinstance(value, str):
+        return len(value) // CHARS_PER_TOKEN + 1
+    if isinstance(value, list):
+        return sum(estimate_tokens(v) for v in value)
+    if isinstance(value, dict):
+        if "role" in value:
+            return estimate_tokens(value.get("content", ""))
+        if value.get("type") == "tool_result":
+            return estimate_tokens(str(value.get("content", ""))) + 8
+        if value.get("type") == "text":
+            return estimate_tokens(value.get("text", ""))
+        return len(json.dumps(value, ensure_ascii=False, default=str)) // CHARS_PER_TOKEN + 1
+    return len(str(value)) // CHARS_PER_TOKEN + 1
+
+
+def _truncate(text: str, head: int, tail: int) -> str:
+    if len(text) <= head + tail + 40:
+        return text
+    cut = len(text) - head - tail
+    return f"{text[:head]}\n... [{cut} karakter kirpildi] ...\n{text[len(text) - tail:]}"
+
+
+def digest_tool_result(tool_name: str, content: str) -> str:
+    """Compact summary of a tool result: JSON → scalar fields, text → head/tail digest."""
+    try:
+        data = json.loads(content)
+    except (ValueError, TypeError):
+        data = None
+
+    if isinstance(data, dict):
+        summary = {}
+        for k, v in data.items():
+            if isinstance(v, (str, int, float, bool)) or v is None:
+                summary[k] = v[:120] if isinstance(v, str) else v
+            elif isinstance(v, list):
+                summary[k] = f"<{len(v)} oge>"
+            elif isinstance(v, dict):
+                summary[k] = f"<{len(v)} alan>"
+        body = json.dumps(summary, ensure_ascii=False)
+        body = _truncate(body, DIGEST_HEAD_CHARS, DIGEST_TAIL_CHARS)
+    elif isinstance(data, list):
+        body = f"<{len(data)} ogeli liste> " + _truncate(content, 200, 0)
+    else:
+        body = _truncate(content, DIGEST_HEAD_CHARS, DIGEST_TAIL_CHARS)
+    return f"{_DIGEST_MARK} {tool_name} ({len(content)} karakter): {body}"
+
+
+@dataclass
+class CompactionResult:
+    tokens_before: int
+    tokens_after: int
+    results_digested: int = 0
+    results_dropped: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class HistoryManager:
+    """
+    Compacts a tool-loop message list in place.
+    messages[0] is the task prompt and is never touched. A "round" is an
+    assistant message followed by the user message with its tool results.
+    """
+
+    def __init__(self, agent_id: str, budget_tokens: int | None = None,
+                 keep_recent_rounds: int = AGENT_HISTORY_KEEP_ROUNDS):
+        self.agent_id = agent_id
+        self.budget_tokens = budget_tokens if budget_tokens is not None else budget_for(agent_id)
+        self.keep_recent_rounds = max(1, keep_recent_rounds)
+
+    @staticmethod
+    def _tool_result_messages(messages: list) -> list[int]:
+        return [
+            i for i, m in enumerate(messages)
+            if i > 0 and m.get("role") == "user" and isinstance(m.get("content"), list)
+            and any(isinstance(b, dict) and b.get("type") == "tool_result" for b in m["content"])
+        ]
+
+    @staticmethod
+    def _shrink_inputs(message: dict) -> None:
+        """Truncate long string arguments of old tool_use blocks (ids/names stay intact)."""
+        content = message.get("content")
+        if message.get("role") != "assistant" or not isinstance(content, list):
+            return
+        for block in content:
+            if isinstance(block, dict) and block.get("type") == "tool_use":
+                block["input"] = {
+                    k: (_truncate(v, INPUT_MAX_CHARS, 0) if isinstance(v, str) else v)
+                    for k, v in (block.get("input") or {}).items()
+                }
+
+    def compact(self, messages: list) -> CompactionResult:
+        before = estimate_tokens(messages)
+        result = CompactionResult(tokens_before=before, tokens_after=before)
+        rounds = self._tool_result_messages(messages)
+        if not rounds:
+            return result
+
+        # 1) Rounds older than keep_recent → digests
+        old_rounds = rounds[:-self.keep_recent_rounds]
+        for idx in old_rounds:
+            if idx - 1 > 0:
+                self._shrink_inputs(messages[idx - 1])
+            for block in messages[idx]["content"]:
+                if block.get("type") != "tool_result":
+                    continue
+                content = str(block.get("content", ""))
+                if content.startswith((_DIGEST_MARK, _STUB_MARK)):
+                    continue
+                digest = digest_tool_result(block.get("tool_name", "tool"), content)
+                if len(digest) < len(content):
+                    block["content"] = digest
+                    result.results_digested += 1
+
+        # 2) Still over budget → stub results oldest first (latest round always verbatim)
+        total = estimate_tokens(messages)
+        for idx in rounds[:-1]:
+            if total <= self.budget_tokens:
+                break
+            for block in messages[idx]["content"]:
+                if block.get("type") != "tool_result":
+                    continue
+                content = str(block.get("content", ""))
+                if content.startswith(_STUB_MARK):
+                    continue
+                stub = f"{_STUB_MARK} {block.get('tool_name', 'tool')} sonucu token butcesi icin cikarildi"
+                if len(stub) >= len(content):
+                    continue
+                total -= estimate_tokens(content) - estimate_tokens(stub)
+                block["content"] = stub
+                result.results_dropped += 1
+            if idx - 1 > 0:
+                self._shrink_inputs(messages[idx - 1])
+
+        result.tokens_after = estimate_tokens(messages)
+        if result.tokens_saved > 0:
+            _record(self.agent_id, result)
+            logger.debug(
+                f"[HISTORY] {self.agent_id}: {before} → {result.tokens_after} token "
+                f"(-{result.tokens_saved})"
+            )
+        return result
+
+
+# ── Metrics ──
+
+_stats: dict[str, dict] = defaultdict(lambda: {
+    "compactions": 0, "tokens_saved": 0, "last_saved": 0,
+    "results_digested": 0, "results_dropped": 0,
+})
+
+
+def _record(agent_id: str, result: CompactionResult) -> None:
+    s = _stats[agent_id]
+    s["compactions"] += 1
+    s["tokens_saved"] += result.tokens_saved
+    s["last_saved"] = result.tokens_saved
+    s["results_digested"] += result.results_digested
+    s["results_dropped"] += result.results_dropped
+
+
+def get_compaction_stats() -> dict:
+    """Per-agent compaction counters plus totals."""
+    agents = {aid: dict(s) for aid, s in _stats.items()}
+    return {
+        "tokens_saved_total": sum(s["tokens_saved"] for s in agents.values()),
+        "compactions_total": sum(s["compactions"] for s in agents.values()),
+        "agents": agents,
+    }
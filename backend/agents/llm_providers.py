@@ -2,15 +2,29 @@
 COWORK.ARMY v8.1 — Multi-LLM Provider Abstraction
 Supports Anthropic Claude and Google Gemini with tool-calling.
 Gemini 429 RESOURCE_EXHAUSTED → automatic Anthropic fallback.
+Stable prefix (system prompt + tool schemas) is cached provider-side:
+Anthropic cache_control breakpoints, Gemini cached contents.
 """
 from __future__ import annotations
 import os
+import json
+import time
+import hashlib
 import logging
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Optional
+
+# Streaming callback: on_delta(kind, text) with kind "text" | "tool_start" | "tool_input"
+DeltaCallback = Callable[[str, str], None]
 
 logger = logging.getLogger("cowork.llm")
 
+# Provider-side prompt-prefix caching
+PROMPT_CACHE_ENABLED = os.environ.get("PROMPT_CACHE_ENABLED", "1") != "0"
+GEMINI_CACHE_TTL_SECONDS = int(os.environ.get("GEMINI_CACHE_TTL_SECONDS", 900))
+# Gemini rejects cached contents below a model-specific minimum (1024–4096 tokens)
+GEMINI_CACHE_MIN_TOKENS = int(os.environ.get("GEMINI_CACHE_MIN_TOKENS", 2048))
+
 
 def _read_env_value(key: str) -> str:
     """Read a value from environment or .env file."""
@@ -37,6 +51,28 @@ def is_rate_limit_error(exc: Exception) -> bool:
     )
 
 
+def is_cache_miss_error(exc: Exception) -> bool:
+    """Return True if a Gemini request failed because its cached content is gone."""
+    msg = str(exc).lower()
+    not_found = (
+        "404" in msg or "not_found" in msg or "not found" in msg
+        or getattr(exc, "status_code", None) == 404 or getattr(exc, "code", None) == 404
+    )
+    return (not_found and ("cache" in msg or "cachedcontent" in msg)) or (
+        "cache" in msg and "expired" in msg
+    )
+
+
+def _usage_int(obj, name: str) -> int:
+    """Read an integer usage counter; missing / non-int (mocks, None) → 0."""
+    v = getattr(obj, name, 0)
+    return v if isinstance(v, int) else 0
+
+
+def _empty_usage() -> dict:
+    return {"input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0}
+
+
 class LLMResponse:
     """Normalized response from any LLM provider."""
     def __init__(self, stop_reason: str, content: list, raw=None):
@@ -61,19 +97,33 @@ class TextBlock:
         self.text = text
 
 
+# Shared async Anthropic clients (one connection pool per API key, reused by all agents)
+_async_anthropic_clients: dict[str, Any] = {}
+
+
+def _get_async_anthropic(api_key: str):
+    client = _async_anthropic_clients.get(api_key)
+    if client is None:
+        from anthropic import AsyncAnthropic
+        client = AsyncAnthropic(api_key=api_key)
+        _async_anthropic_clients[api_key] = client
+    return client
+
+
 class AnthropicProvider:
     """Anthropic Claude provider with tool-calling support."""
 
     def __init__(self, api_key: str, model: str):
         from anthropic import Anthropic
         self.client = Anthropic(api_key=api_key)
+        self.api_key = api_key
         self.model = model or "claude-3-haiku-20240307"
-        self._last_usage: dict = {"input_tokens": 0, "output_tokens": 0}
+        self._last_usage: dict = _empty_usage()
 
     def get_last_usage(self) -> dict:
         return self._last_usage
 
-    def get_response(self, system_prompt: str, messages: list, tools: list) -> LLMResponse:
+    def _build_request(self, system_prompt: str, messages: list, tools: list) -> dict:
         # Anthropic API tool_result içinde 'tool_name' alanını kabul etmez
         # (Gemini için runner.py'de saklanır, buraya gelince filtrelenir)
         def _clean_messages(msgs: list) -> list:
@@ -90,10 +140,16 @@ class AnthropicProvider:
                     cleaned.append(m)
             return cleaned
 
+        # Prefix order is tools → system → messages; a breakpoint on the system
+        # block caches tools + system, which stay identical across tool rounds.
+        system: Any = system_prompt
+        if PROMPT_CACHE_ENABLED and system_prompt:
+            system = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
         kwargs: dict[str, Any] = {
             "model": self.model,
             "max_tokens": 4096,
-            "system": system_prompt,
+            "system": system,
             "messages": _clean_messages(messages),
         }
         if tools:
@@ -112,16 +168,21 @@ class AnthropicProvider:
                         "required": t.get("required", []),
                     },
                 })
+            if PROMPT_CACHE_ENABLED:
+                # Separate breakpoint so the tool block is reused even if the system prompt changes
+                anthropic_tools[-1]["cache_control"] = {"type": "ephemeral"}
             kwargs["tools"] = anthropic_tools
             kwargs["tool_choice"] = {"type": "auto"}
+        return kwargs
 
-        response = self.client.messages.create(**kwargs)
-
+    def _parse_response(self, response) -> LLMResponse:
         # Track usage
         if hasattr(response, "usage") and response.usage:
             self._last_usage = {
                 "input_tokens": getattr(response.usage, "input_tokens", 0),
                 "output_tokens": getattr(response.usage, "output_tokens", 0),
+                "cache_read_tokens": _usage_int(response.usage, "cache_read_input_tokens"),
+                "cache_write_tokens": _usage_int(response.usage, "cache_creation_input_tokens"),
             }
 
         # Normalize response
@@ -135,6 +196,64 @@ class AnthropicProvider:
         stop_reason = "tool_use" if response.stop_reason == "tool_use" else "end_turn"
         return LLMResponse(stop_reason=stop_reason, content=content, raw=response)
 
+    def get_response(self, system_prompt: str, messages: list, tools: list) -> LLMResponse:
+        kwargs = self._build_request(system_prompt, messages, tools)
+        response = self.client.messages.create(**kwargs)
+        return self._parse_response(response)
+
+    async def aget_response(
+        self,
+        system_prompt: str,
+        messages: list,
+        tools: list,
+        on_delta: Optional[DeltaCallback] = None,
+    ) -> LLMResponse:
+        """Async variant of get_response — does not block the event loop.
+
+        With ``on_delta`` the completion is streamed: text tokens and partial
+        tool-call JSON are passed to the callback as they arrive.
+        """
+        kwargs = self._build_request(system_prompt, messages, tools)
+        client = _get_async_anthropic(self.api_key)
+        if on_delta is None:
+            response = await client.messages.create(**kwargs)
+            return self._parse_response(response)
+
+        async with client.messages.stream(**kwargs) as stream:
+            async for event in stream:
+                if event.type == "content_block_start" and event.content_block.type == "tool_use":
+                    on_delta("tool_start", event.content_block.name)
+                elif event.type == "content_block_delta":
+                    if event.delta.type == "text_delta":
+                        on_delta("text", event.delta.text)
+                    elif event.delta.type == "input_json_delta":
+                        on_delta("tool_input", event.delta.partial_json)
+            response = await stream.get_final_message()
+        return self._parse_response(response)
+
+
+class _TextPart:
+    """Merged text of consecutive streamed Gemini chunks."""
+    function_call = None
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StreamedResponse:
+    """Shape of a Gemini GenerateContentResponse rebuilt from stream chunks."""
+
+    def __init__(self, parts: list, usage_metadata):
+        content = type("Content", (), {"parts": parts})()
+        self.candidates = [type("Candidate", (), {"content": content})()]
+        self.usage_metadata = usage_metadata
+
+
+# Gemini cached contents shared by all providers: prefix key → (cache name | None, expires_at)
+# None marks a prefix the API refused to cache, so we don't retry it every round.
+_gemini_caches: dict[str, tuple[str | None, float]] = {}
+_GEMINI_CACHE_MARGIN = 60  # stop using a cache this many seconds before its TTL ends
+
 
 class GeminiProvider:
     """Google Gemini provider with tool-calling support (using google-genai SDK).
@@ -147,23 +266,100 @@ class GeminiProvider:
         from google import genai
         self.client = genai.Client(api_key=api_key)
         self.model_name = model or "gemini-2.5-flash"
-        self._last_usage: dict = {"input_tokens": 0, "output_tokens": 0}
+        self._last_usage: dict = _empty_usage()
+        self._pending_cache_write = 0
+        # Built-in 429 → Claude fallback; the resilience layer turns this off and fails over itself
+        self.auto_fallback = True
 
     def get_last_usage(self) -> dict:
         return self._last_usage
 
-    def get_response(
-        self,
-        system_prompt: str,
-        messages: list,
-        tools: list,
-        anthropic_fallback_key: str | None = None,
-    ) -> LLMResponse:
-        from google import genai as genai_sdk
+    # ── Cached contents (system prompt + tools) ──
+
+    def _prefix_cache_key(self, system_prompt: str, tools: list) -> str | None:
+        """Cache key for the stable prefix, or None if caching doesn't apply."""
+        if not PROMPT_CACHE_ENABLED or not system_prompt:
+            return None
+        tools_json = json.dumps(tools or [], sort_keys=True, ensure_ascii=False)
+        if (len(system_prompt) + len(tools_json)) // 4 < GEMINI_CACHE_MIN_TOKENS:
+            return None
+        raw = f"{self.model_name}\0{system_prompt}\0{tools_json}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _lookup_cache(key: str) -> tuple[bool, str | None]:
+        entry = _gemini_caches.get(key)
+        if entry and entry[1] > time.monotonic():
+            return True, entry[0]
+        return False, None
+
+    def _cache_config(self, key: str, system_prompt: str, tools: list):
+        from google.genai import types as genai_types
+        declarations = self._tool_declarations(tools)
+        return genai_types.CreateCachedContentConfig(
+            display_name=f"cowork-{key[:16]}",
+            system_instruction=system_prompt,
+            tools=[genai_types.Tool(function_declarations=declarations)] if declarations else None,
+            ttl=f"{GEMINI_CACHE_TTL_SECONDS}s",
+        )
+
+    def _store_cache(self, key: str, cache) -> str | None:
+        name = getattr(cache, "name", None)
+        if not isinstance(name, str):
+            name = None
+        ttl = GEMINI_CACHE_TTL_SECONDS - _GEMINI_CACHE_MARGIN if name else GEMINI_CACHE_TTL_SECONDS
+        _gemini_caches[key] = (name, time.monotonic() + max(ttl, 1))
+        if name:
+            self._pending_cache_write = _usage_int(getattr(cache, "usage_metadata", None), "total_token_count")
+            logger.info(f"[llm] Gemini cached content created: {name}")
+        return name
+
+    def _cache_failed(self, key: str, exc: Exception) -> None:
+        logger.debug(f"[llm] Gemini cached content unavailable, sending full prefix: {exc}")
+        _gemini_caches[key] = (None, time.monotonic() + GEMINI_CACHE_TTL_SECONDS)
+
+    def _get_cached_content(self, system_prompt: str, tools: list) -> str | None:
+        key = self._prefix_cache_key(system_prompt, tools)
+        if key is None:
+            return None
+        found, name = self._lookup_cache(key)
+        if found:
+            return name
+        try:
+            cache = self.client.caches.create(
+                model=self.model_name, config=self._cache_config(key, system_prompt, tools),
+            )
+        except Exception as exc:
+            self._cache_failed(key, exc)
+            return None
+        return self._store_cache(key, cache)
+
+    async def _aget_cached_content(self, system_prompt: str, tools: list) -> str | None:
+        key = self._prefix_cache_key(system_prompt, tools)
+        if key is None:
+            return None
+        found, name = self._lookup_cache(key)
+        if found:
+            return name
+        try:
+            cache = await self.client.aio.caches.create(
+                model=self.model_name, config=self._cache_config(key, system_prompt, tools),
+            )
+        except Exception as exc:
+            self._cache_failed(key, exc)
+            return None
+        return self._store_cache(key, cache)
+
+    @staticmethod
+    def _drop_cached_content(name: str) -> None:
+        for key, (cached_name, _) in list(_gemini_caches.items()):
+            if cached_name == name:
+                _gemini_caches.pop(key, None)
+
+    @staticmethod
+    def _tool_declarations(tools: list) -> list:
         from google.genai import types as genai_types
-        import uuid
 
-        # Build Gemini tool declarations
         tool_declarations = []
         if tools:
             for t in tools:
@@ -182,6 +378,13 @@ class GeminiProvider:
                         required=t.get("required", []),
                     ),
                 ))
+        return tool_declarations
+
+    def _build_request(
+        self, system_prompt: str, messages: list, tools: list, cached_content: str | None = None,
+    ) -> tuple[list, Any]:
+        """Translate the normalized messages/tools into Gemini (contents, config)."""
+        from google.genai import types as genai_types
 
         # Build contents from messages
         contents = []
@@ -199,47 +402,64 @@ class GeminiProvider:
                                 response={"result": item.get("content", "")},
                             )
                         ))
+                    elif isinstance(item, dict) and item.get("type") == "tool_use":
+                        # Assistant tool calls (also those produced by Claude before a failover)
+                        parts.append(genai_types.Part(
+                            function_call=genai_types.FunctionCall(
+                                name=item.get("name", ""), args=item.get("input") or {},
+                            )
+                        ))
+                    elif isinstance(item, dict) and item.get("type") == "text":
+                        parts.append(genai_types.Part(text=item.get("text", "")))
                     else:
                         parts.append(genai_types.Part(text=str(item)))
                 contents.append(genai_types.Content(role=role, parts=parts))
 
+        if cached_content:
+            # System instruction and tools live in the cached content
+            return contents, genai_types.GenerateContentConfig(cached_content=cached_content)
+
+        tool_declarations = self._tool_declarations(tools)
         config = genai_types.GenerateContentConfig(
             system_instruction=system_prompt,
             tools=[genai_types.Tool(function_declarations=tool_declarations)] if tool_declarations else None,
         )
-
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=contents,
-                config=config,
+        return contents, config
+
+    def _fallback_provider(self, exc: Exception, anthropic_fallback_key: str | None) -> AnthropicProvider | None:
+        """Return an Anthropic fallback for a Gemini 429, or None if unavailable."""
+        if not self.auto_fallback or not is_rate_limit_error(exc):
+            return None
+        fallback_key = anthropic_fallback_key or _read_env_value("ANTHROPIC_API_KEY")
+        if not fallback_key:
+            logger.error(
+                f"[llm] Gemini 429 rate limit and no ANTHROPIC_API_KEY for fallback. "
+                f"Original error: {exc}"
             )
-        except Exception as exc:
-            if is_rate_limit_error(exc):
-                # Try Anthropic fallback
-                fallback_key = anthropic_fallback_key or _read_env_value("ANTHROPIC_API_KEY")
-                if fallback_key:
-                    logger.warning(
-                        f"[llm] Gemini 429 rate limit — falling back to Anthropic Claude. "
-                        f"Original error: {exc}"
-                    )
-                    fallback_model = _read_env_value("ANTHROPIC_MODEL") or "claude-3-haiku-20240307"
-                    fallback = AnthropicProvider(api_key=fallback_key, model=fallback_model)
-                    return fallback.get_response(system_prompt, messages, tools)
-                else:
-                    logger.error(
-                        f"[llm] Gemini 429 rate limit and no ANTHROPIC_API_KEY for fallback. "
-                        f"Original error: {exc}"
-                    )
-            raise
+            return None
+        logger.warning(
+            f"[llm] Gemini 429 rate limit — falling back to Anthropic Claude. "
+            f"Original error: {exc}"
+        )
+        fallback_model = _read_env_value("ANTHROPIC_MODEL") or "claude-3-haiku-20240307"
+        return AnthropicProvider(api_key=fallback_key, model=fallback_model)
+
+    def _parse_response(self, response) -> LLMResponse:
+        import uuid
 
         # Track usage
         if hasattr(response, "usage_metadata") and response.usage_metadata:
             um = response.usage_metadata
+            cached = _usage_int(um, "cached_content_token_count")
+            prompt = getattr(um, "prompt_token_count", 0) or 0
+            # prompt_token_count includes cached tokens; report uncached input like Anthropic does
             self._last_usage = {
-                "input_tokens": getattr(um, "prompt_token_count", 0) or 0,
+                "input_tokens": max(prompt - cached, 0) if isinstance(prompt, int) else prompt,
                 "output_tokens": getattr(um, "candidates_token_count", 0) or 0,
+                "cache_read_tokens": cached,
+                "cache_write_tokens": self._pending_cache_write,
             }
+            self._pending_cache_write = 0
 
         # Normalize response
         content = []
@@ -258,6 +478,101 @@ class GeminiProvider:
 
         return LLMResponse(stop_reason=stop_reason, content=content, raw=response)
 
+    def get_response(
+        self,
+        system_prompt: str,
+        messages: list,
+        tools: list,
+        anthropic_fallback_key: str | None = None,
+        use_cache: bool = True,
+    ) -> LLMResponse:
+        cached = self._get_cached_content(system_prompt, tools) if use_cache else None
+        contents, config = self._build_request(system_prompt, messages, tools, cached)
+        try:
+            response = self.client.models.generate_content(
+                model=self.model_name,
+                contents=contents,
+                config=config,
+            )
+        except Exception as exc:
+            if cached and is_cache_miss_error(exc):
+                # Cache expired or evicted server-side → retry once with the full prefix
+                self._drop_cached_content(cached)
+                return self.get_response(
+                    system_prompt, messages, tools, anthropic_fallback_key, use_cache=False,
+                )
+            fallback = self._fallback_provider(exc, anthropic_fallback_key)
+            if fallback is not None:
+                return fallback.get_response(system_prompt, messages, tools)
+            raise
+        return self._parse_response(response)
+
+    async def aget_response(
+        self,
+        system_prompt: str,
+        messages: list,
+        tools: list,
+        anthropic_fallback_key: str | None = None,
+        on_delta: Optional[DeltaCallback] = None,
+        use_cache: bool = True,
+    ) -> LLMResponse:
+        """Async variant of get_response using the SDK's aio client.
+
+        With ``on_delta`` the completion is streamed (generate_content_stream).
+        Gemini emits function calls whole, so each one arrives as a
+        tool_start + a single tool_input delta.
+        """
+        cached = await self._aget_cached_content(system_prompt, tools) if use_cache else None
+        contents, config = self._build_request(system_prompt, messages, tools, cached)
+        streamed = False
+        try:
+            if on_delta is None:
+                response = await self.client.aio.models.generate_content(
+                    model=self.model_name,
+                    contents=contents,
+                    config=config,
+                )
+            else:
+                parts: list = []
+                usage = None
+                stream = await self.client.aio.models.generate_content_stream(
+                    model=self.model_name,
+                    contents=contents,
+                    config=config,
+                )
+                async for chunk in stream:
+                    streamed = True
+                    if getattr(chunk, "usage_metadata", None):
+                        usage = chunk.usage_metadata
+                    if not chunk.candidates or not chunk.candidates[0].content:
+                        continue
+                    for part in chunk.candidates[0].content.parts or []:
+                        fc = getattr(part, "function_call", None)
+                        if fc:
+                            on_delta("tool_start", fc.name)
+                            on_delta("tool_input", json.dumps(dict(fc.args or {}), ensure_ascii=False))
+                            parts.append(part)
+                        elif getattr(part, "text", None):
+                            on_delta("text", part.text)
+                            if parts and isinstance(parts[-1], _TextPart):
+                                parts[-1] = _TextPart(parts[-1].text + part.text)
+                            else:
+                                parts.append(_TextPart(part.text))
+                response = _StreamedResponse(parts, usage)
+        except Exception as exc:
+            if streamed:
+                raise  # partial output already emitted — don't replay it through a fallback
+            if cached and is_cache_miss_error(exc):
+                self._drop_cached_content(cached)
+                return await self.aget_response(
+                    system_prompt, messages, tools, anthropic_fallback_key, on_delta, use_cache=False,
+                )
+            fallback = self._fallback_provider(exc, anthropic_fallback_key)
+            if fallback is not None:
+                return await fallback.aget_response(system_prompt, messages, tools, on_delta=on_delta)
+            raise
+        return self._parse_response(response)
+
 
 # Keywords that signal a heavy / complex task → Claude
 _HEAVY_KEYWORDS = [
@@ -282,13 +597,10 @@ def _is_heavy_task(task: str) -> bool:
     return any(kw in t for kw in _HEAVY_KEYWORDS)
 
 
-def get_llm_provider(
-    task: str = "",
-    force_anthropic: bool = False,
-) -> AnthropicProvider | GeminiProvider:
+def _select_provider(task: str = "", force_anthropic: bool = False) -> tuple[str, str, str]:
     """
-    Smart LLM factory:
-      - force_anthropic=True → always return AnthropicProvider (used after Gemini 429).
+    Smart LLM selection → (provider, api_key, model):
+      - force_anthropic=True → always Anthropic (used after Gemini 429).
       - Explicit LLM_PROVIDER env var overrides everything.
       - Heavy / complex tasks (plan, project, analysis, long text) → Claude (if key available).
       - Light / quick tasks → Gemini (if key available).
@@ -299,18 +611,18 @@ def get_llm_provider(
         api_key = _read_env_value("ANTHROPIC_API_KEY")
         if api_key:
             model = _read_env_value("ANTHROPIC_MODEL") or "claude-3-haiku-20240307"
-            return AnthropicProvider(api_key=api_key, model=model)
+            return "anthropic", api_key, model
 
     # --- Explicit override ---
     override = _read_env_value("LLM_PROVIDER")
     if override == "gemini":
         api_key = _read_env_value("GEMINI_API_KEY")
         model = _read_env_value("GEMINI_MODEL") or "gemini-2.5-flash"
-        return GeminiProvider(api_key=api_key, model=model)
+        return "gemini", api_key, model
     if override == "anthropic":
         api_key = _read_env_value("ANTHROPIC_API_KEY")
         model = _read_env_value("ANTHROPIC_MODEL") or "claude-3-haiku-20240307"
-        return AnthropicProvider(api_key=api_key, model=model)
+        return "anthropic", api_key, model
 
     # --- Auto-select based on task complexity ---
     gemini_key = _read_env_value("GEMINI_API_KEY")
@@ -320,24 +632,52 @@ def get_llm_provider(
     if heavy and anthropic_key:
         # Complex task → Claude
         model = _read_env_value("ANTHROPIC_MODEL") or "claude-3-haiku-20240307"
-        return AnthropicProvider(api_key=anthropic_key, model=model)
+        return "anthropic", anthropic_key, model
     elif gemini_key:
         # Default / light task → Gemini
         model = _read_env_value("GEMINI_MODEL") or "gemini-2.5-flash"
-        return GeminiProvider(api_key=gemini_key, model=model)
+        return "gemini", gemini_key, model
     elif anthropic_key:
         # Gemini unavailable → fall back to Claude
         model = _read_env_value("ANTHROPIC_MODEL") or "claude-3-haiku-20240307"
-        return AnthropicProvider(api_key=anthropic_key, model=model)
+        return "anthropic", anthropic_key, model
     else:
         raise RuntimeError("No LLM API key configured. Set GEMINI_API_KEY or ANTHROPIC_API_KEY.")
 
 
+def get_llm_provider_name(task: str = "", force_anthropic: bool = False) -> str:
+    """Return "anthropic" | "gemini" for a task without constructing a client."""
+    return _select_provider(task, force_anthropic)[0]
+
+
+def get_llm_provider(
+    task: str = "",
+    force_anthropic: bool = False,
+) -> AnthropicProvider | GeminiProvider:
+    """Smart LLM factory — see _select_provider for the selection rules."""
+    provider, api_key, model = _select_provider(task, force_anthropic)
+    if provider == "gemini":
+        return GeminiProvider(api_key=api_key, model=model)
+    return AnthropicProvider(api_key=api_key, model=model)
+
+
+def get_alternate_provider(current: str) -> AnthropicProvider | GeminiProvider | None:
+    """The other configured provider (failover target), or None if its key is missing."""
+    if current == "gemini":
+        api_key = _read_env_value("ANTHROPIC_API_KEY")
+        model = _read_env_value("ANTHROPIC_MODEL") or "claude-3-haiku-20240307"
+        return AnthropicProvider(api_key=api_key, model=model) if api_key else None
+    api_key = _read_env_value("GEMINI_API_KEY")
+    model = _read_env_value("GEMINI_MODEL") or "gemini-2.5-flash"
+    return GeminiProvider(api_key=api_key, model=model) if api_key else None
+
+
 # Unified tool definitions used by all agents
 TOOL_DEFS = [
     {
         "name": "read_file",
         "description": "Read a file from workspace or project directory",
+        "parallel_safe": True,
         "parameters": {
             "path": {"type": "string", "description": "File path (relative to workspace or absolute)"},
         },
@@ -355,6 +695,7 @@ TOOL_DEFS = [
     {
         "name": "list_dir",
         "description": "List files in a directory",
+        "parallel_safe": True,
         "parameters": {
             "path": {"type": "string", "description": "Directory path (empty = workspace root)"},
         },
@@ -363,6 +704,7 @@ TOOL_DEFS = [
     {
         "name": "search_files",
         "description": "Search for files matching a glob pattern",
+        "parallel_safe": True,
         "parameters": {
             "pattern": {"type": "string", "description": "Glob pattern like *.py"},
             "directory": {"type": "string", "description": "Search directory"},
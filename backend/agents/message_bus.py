@@ -81,6 +81,10 @@ class AgentMessageBus:
         self._subscribers: dict[str, list[Callable]] = {}  # agent_id → callbacks
         self._cascade_depths: dict[str, int] = {}  # cascade_id → depth
 
+    def cascade_depth(self, cascade_id: Optional[str]) -> int:
+        """Current depth of a cascade chain (0 if unknown or no cascade)."""
+        return self._cascade_depths.get(cascade_id, 0) if cascade_id else 0
+
     async def send(
         self,
         from_agent: str,
@@ -181,7 +185,7 @@ class AgentMessageBus:
         return str(p)[:100]
 
     def subscribe(self, agent_id: str, callback: Callable) -> None:
-        """Subscribe to messages for a specific agent."""
+        """Subscribe to messages for a specific agent ("*" = all messages)."""
         if agent_id not in self._subscribers:
             self._subscribers[agent_id] = []
         self._subscribers[agent_id].append(callback)
@@ -195,7 +199,7 @@ class AgentMessageBus:
 
     def _notify_subscribers(self, msg: AgentMessage) -> None:
         """Notify local subscribers (scheduler, etc.)."""
-        callbacks = self._subscribers.get(msg.to_agent, [])
+        callbacks = self._subscribers.get(msg.to_agent, []) + self._subscribers.get("*", [])
         for cb in callbacks:
             try:
                 cb(msg)
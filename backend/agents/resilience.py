@@ -0,0 +1,347 @@
+"""
+COWORK.ARMY — LLM Resilience Layer
+Provider çağrılarının önünde:
+- (provider, model) başına token bucket ile istek hızı
+- retry-after'a uyan, jitter'lı exponential backoff
+- Art arda hatalarda açılan circuit breaker
+- Devre açıkken görevin ortasında diğer provider'a failover
+Mesaj geçmişi normalize formatta tutulduğu için (tool_use / tool_result +
+tool_name) failover sonrası her provider geçmişi kendi formatına çevirir.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from ..config import (
+    LLM_RATE_LIMITS, LLM_RATE_BURST, LLM_MAX_ATTEMPTS, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX,
+    LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET_SECONDS,
+)
+from ..specs import parse_overrides
+from .llm_providers import GeminiProvider, get_alternate_provider, is_rate_limit_error
+
+logger = logging.getLogger("cowork.llm")
+
+_DEFAULT_RPM, _RPM_OVERRIDES = parse_overrides(LLM_RATE_LIMITS, 60)
+_RETRY_HINT = re.compile(
+    r"(?:retryDelay['\"]?\s*:\s*['\"]?|retry in\s+|retry[- ]after[:\s]+)([\d.]+)\s*s?", re.I,
+)
+_TRANSIENT_MARKERS = ("overloaded", "unavailable", "503", "502", "504", "529", "timeout", "timed out")
+
+
+class CircuitOpenError(RuntimeError):
+    """All candidate providers have an open circuit."""
+
+
+def provider_name(provider) -> str:
+    return "gemini" if isinstance(provider, GeminiProvider) else "anthropic"
+
+
+def provider_model(provider) -> str:
+    return getattr(provider, "model", None) or getattr(provider, "model_name", None) or "unknown"
+
+
+# ── Error classification ──
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    """Server-requested delay from a retry-after header, attribute or Gemini retryDelay."""
+    value = getattr(exc, "retry_after", None)
+    if isinstance(value, (int, float)):
+        return float(value)
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    raw = None
+    if headers is not None:
+        try:
+            raw = headers.get("retry-after")
+        except Exception:
+            raw = None
+    if isinstance(raw, str) and raw:
+        try:
+            return max(float(raw), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(raw).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    m = _RETRY_HINT.search(str(exc))
+    return float(m.group(1)) if m else None
+
+
+def is_retryable_error(exc: Exception) -> bool:
+    """429s, 5xx / overloaded and connection errors are retried; 4xx request errors are not."""
+    if is_rate_limit_error(exc):
+        return True
+    if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int):
+        return status >= 500 or status in (408, 409)
+    if type(exc).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return True
+    msg = str(exc).lower()
+    return any(marker in msg for marker in _TRANSIENT_MARKERS)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None,
+                  base: float = LLM_BACKOFF_BASE, cap: float = LLM_BACKOFF_MAX) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's retry-after."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap * 4))
+    return delay
+
+
+# ── Token bucket ──
+
+class TokenBucket:
+    """Async request pacer: `rpm` requests/minute with a small burst."""
+
+    def __init__(self, rpm: int, burst: int = LLM_RATE_BURST):
+        self.rate = max(rpm, 1) / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waited_total = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Hold all callers (e.g. after a 429 with retry-after)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> float:
+        start = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        waited = time.monotonic() - start
+        self.waited_total += waited
+        return waited
+
+
+# ── Circuit breaker ──
+
+class CircuitBreaker:
+    """
+    closed → open after `threshold` consecutive failures → half_open after
+    `reset_seconds`. Half-open lets a single probe call through; the other
+    callers fail fast until it reports back (or is abandoned for another
+    `reset_seconds`).
+    """
+
+    def __init__(self, name: str, threshold: int = LLM_BREAKER_THRESHOLD,
+                 reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.opens_total = 0
+        self._probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state != "half_open":
+            return state == "closed"
+        now = time.monotonic()
+        if self._probe_started is not None and now - self._probe_started < self.reset_seconds:
+            return False  # another caller is probing
+        self._probe_started = now
+        return True
+
+    def release_probe(self) -> None:
+        """The probe ended without a verdict (e.g. a request error): let the next caller probe."""
+        self._probe_started = None
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info(f"[llm] Circuit {self.name} closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_started = None
+        if self.state == "half_open" or (self.opened_at is None and self.failures >= self.threshold):
+            self.opened_at = time.monotonic()
+            self.opens_total += 1
+            logger.warning(f"[llm] Circuit {self.name} OPEN after {self.failures} failures")
+
+
+_buckets: dict[str, TokenBucket] = {}
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def _key(provider) -> str:
+    return f"{provider_name(provider)}:{provider_model(provider)}"
+
+
+def get_bucket(provider) -> TokenBucket:
+    key = _key(provider)
+    if key not in _buckets:
+        rpm = _RPM_OVERRIDES.get(key, _RPM_OVERRIDES.get(provider_name(provider), _DEFAULT_RPM))
+        _buckets[key] = TokenBucket(rpm)
+    return _buckets[key]
+
+
+def get_breaker(provider) -> CircuitBreaker:
+    key = _key(provider)
+    if key not in _breakers:
+        _breakers[key] = CircuitBreaker(key)
+    return _breakers[key]
+
+
+# ── Resilient provider wrapper ──
+
+class ResilientLLM:
+    """
+    Wraps a provider for one agent task: paces, retries, and fails over to the
+    other configured provider when this one's circuit opens. After a failover
+    the task stays on the new provider.
+    """
+
+    def __init__(self, primary, max_attempts: int = LLM_MAX_ATTEMPTS, alternate_factory=get_alternate_provider):
+        self.active = primary
+        self.max_attempts = max(1, max_attempts)
+        self._pool = [primary]
+        self._alternate_factory = alternate_factory
+        self._alternate_loaded = False
+        self._failover_from: Optional[str] = None
+        self.retries = 0
+        self._own_failover(primary)
+
+    @staticmethod
+    def _own_failover(provider) -> None:
+        if isinstance(provider, GeminiProvider):
+            provider.auto_fallback = False
+
+    @property
+    def name(self) -> str:
+        return provider_name(self.active)
+
+    @property
+    def model(self) -> str:
+        return provider_model(self.active)
+
+    def get_last_usage(self) -> dict:
+        if hasattr(self.active, "get_last_usage"):
+            return self.active.get_last_usage()
+        return {"input_tokens": 0, "output_tokens": 0}
+
+    def take_failover(self) -> Optional[str]:
+        """"provider:model" this task failed over from since the last call, if any."""
+        value, self._failover_from = self._failover_from, None
+        return value
+
+    def _candidates(self):
+        yield self.active
+        if not self._alternate_loaded:
+            self._alternate_loaded = True
+            try:
+                alt = self._alternate_factory(self.name)
+            except Exception as e:
+                logger.warning(f"[llm] Alternate provider unavailable: {e}")
+                alt = None
+            if alt is not None:
+                self._own_failover(alt)
+                self._pool.append(alt)
+        for provider in self._pool:
+            if provider is not self.active:
+                yield provider
+
+    async def aget_response(self, system_prompt: str, messages: list, tools: list, on_delta=None):
+        """
+        Once a streamed attempt has emitted any delta it is neither retried nor
+        failed over: the caller's log / agent_token output would be replayed.
+        """
+        extra = {}
+        emitted = False
+        if on_delta is not None:
+            def _tracked(kind: str, text: str) -> None:
+                nonlocal emitted
+                emitted = True
+                on_delta(kind, text)
+            extra["on_delta"] = _tracked
+        last_exc: Optional[Exception] = None
+
+        for provider in self._candidates():
+            breaker = get_breaker(provider)
+            if not breaker.allow():
+                logger.warning(f"[llm] Circuit {breaker.name} open — trying next provider")
+                continue
+            bucket = get_bucket(provider)
+
+            for attempt in range(self.max_attempts):
+                await bucket.acquire()
+                try:
+                    response = await provider.aget_response(system_prompt, messages, tools, **extra)
+                except Exception as exc:
+                    if not is_retryable_error(exc):
+                        breaker.release_probe()
+                        raise
+                    breaker.record_failure()
+                    if emitted:
+                        raise  # partial output already streamed to clients
+                    last_exc = exc
+                    retry_after = retry_after_seconds(exc)
+                    if retry_after and is_rate_limit_error(exc):
+                        bucket.pause(retry_after)
+                    if not breaker.allow() or attempt == self.max_attempts - 1:
+                        break
+                    delay = backoff_delay(attempt, retry_after)
+                    self.retries += 1
+                    logger.warning(
+                        f"[llm] {breaker.name} attempt {attempt + 1} failed ({exc}); "
+                        f"retrying in {delay:.1f}s"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+
+                breaker.record_success()
+                if provider is not self.active:
+                    self._failover_from = _key(self.active)
+                    logger.warning(f"[llm] Failover {_key(self.active)} → {_key(provider)}")
+                    self.active = provider
+                return response
+
+        if last_exc is None:
+            raise CircuitOpenError("All LLM provider circuits are open")
+        raise last_exc
+
+
+def get_resilience_stats() -> dict:
+    return {
+        "breakers": {
+            k: {"state": b.state, "failures": b.failures, "opens_total": b.opens_total}
+            for k, b in _breakers.items()
+        },
+        "buckets": {
+            k: {"rpm": round(b.rate * 60), "waited_s_total": round(b.waited_total, 1)}
+            for k, b in _buckets.items()
+        },
+    }
@@ -3,20 +3,27 @@ COWORK.ARMY v8.0 — Agent Runner (Multi-LLM Tool-Calling Lifecycle)
 spawn → read workspace → LLM API (real tool_use loop) → write output → done/error
 
 Supports: Anthropic Claude, Google Gemini
-DB calls from threads use _sync_db() to bridge async→sync via the main event loop.
+Each agent runs as an asyncio task on the main event loop (async LLM clients,
+awaited DB calls). Blocking tools are offloaded to a bounded thread pool.
 """
 from __future__ import annotations
 import os
 import json
 import asyncio
-import threading
+import inspect
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
 from ..database import get_db
-from ..database.connection import get_event_loop
-from ..config import WORKSPACE, AGENT_MAX_TOKENS, AGENT_OUTPUT_MAX_LINES
-from .llm_providers import get_llm_provider, TOOL_DEFS
+from ..config import (
+    WORKSPACE, AGENT_MAX_TOKENS, AGENT_OUTPUT_MAX_LINES, TOOL_EXECUTOR_WORKERS,
+    TOOL_TURN_TIMEOUT_SECONDS, LLM_STREAMING, AGENT_STREAM_FLUSH_MS,
+)
+from .llm_providers import get_llm_provider, get_llm_provider_name, TOOL_DEFS
+from .admission import get_admission_controller, DEFAULT_PRIORITY
+from .history import HistoryManager
+from .resilience import ResilientLLM
 from ..cost_tracking import calculate_cost
 from .tools import read_file, write_file, list_dir, search_files, run_command
 from ..departments.trade.tools_impl import TRADE_TOOLS_IMPL, TRADE_TOOL_DEFINITIONS
@@ -59,6 +66,14 @@ _DEPT_TOOL_DEFS: dict[str, list] = {
 }
 
 
+# Tool calls run one at a time (in model order) within a turn unless the tool
+# declares "parallel_safe": True — only pure reads opt in, so tools with side
+# effects (writes, bookings, scheduled posts) never duplicate or reorder.
+_PARALLEL_SAFE: dict[str, bool] = {
+    t["name"]: t.get("parallel_safe", False) for t in ALL_TOOL_DEFS
+}
+
+
 def get_tools_for_dept(dept_id: str) -> list:
     """Return base tools + department-specific tools for the given department.
     Keeps token count low by not sending irrelevant tool schemas to the LLM.
@@ -67,31 +82,45 @@ def get_tools_for_dept(dept_id: str) -> list:
     return TOOL_DEFS + dept_tools
 
 
-def _sync_db(coro):
-    """Run an async DB coroutine from a sync thread context."""
-    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
-    return future.result(timeout=30)
+# Bounded pool for blocking tools (ccxt HTTP, subprocess, file IO).
+# Agents themselves are coroutines; only tool calls occupy a thread.
+_TOOL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=TOOL_EXECUTOR_WORKERS, thread_name_prefix="agent-tool",
+)
 
 
 class AgentProc:
-    __slots__ = ("agent_id", "status", "lines", "started_at", "thread", "task_text")
+    __slots__ = ("agent_id", "status", "lines", "started_at", "task", "task_text", "_streaming")
 
     def __init__(self, agent_id: str):
         self.agent_id = agent_id
         self.status = "idle"
         self.lines: list[str] = []
         self.started_at = ""
-        self.thread: threading.Thread | None = None
+        self.task: asyncio.Task | None = None
         self.task_text = ""
+        self._streaming = False
 
     def log(self, msg: str):
+        self._streaming = False
         ts = datetime.now().strftime("%H:%M:%S")
         self.lines.append(f"[{ts}] {msg}")
         self.lines = self.lines[-AGENT_OUTPUT_MAX_LINES:]
 
+    def stream(self, text: str):
+        """Append streamed tokens to the current log line (new line on newline)."""
+        first, *rest = text.split("\n")
+        if self._streaming and self.lines:
+            self.lines[-1] += first
+        else:
+            self.log(f"  ▸ {first}")
+        for segment in rest:
+            self.log(f"  ▸ {segment}")
+        self._streaming = True
+
     @property
     def alive(self):
-        return self.thread is not None and self.thread.is_alive()
+        return self.task is not None and not self.task.done()
 
     def to_dict(self):
         return {
@@ -104,6 +133,68 @@ class AgentProc:
         }
 
 
+class _TokenStream:
+    """
+    on_delta sink for one LLM round: writes into AgentProc.log immediately and
+    batches deltas into agent_token WebSocket events every AGENT_STREAM_FLUSH_MS.
+    """
+
+    def __init__(self, proc: AgentProc, round_num: int):
+        self.proc = proc
+        self.round_num = round_num
+        self.seq = 0
+        self._kind = ""
+        self._buf: list[str] = []
+        self._last_flush = 0.0
+        self._sending: asyncio.Task | None = None
+
+    def __call__(self, kind: str, text: str) -> None:
+        if kind == "tool_start":
+            self.proc.log(f"  🔧 {text} ")
+            self.proc._streaming = True  # argument JSON continues on this line
+        else:
+            self.proc.stream(text)
+        if kind != self._kind:
+            self._flush()
+            self._kind = kind
+        self._buf.append(text)
+        now = asyncio.get_running_loop().time()
+        if kind == "tool_start" or (now - self._last_flush) * 1000 >= AGENT_STREAM_FLUSH_MS:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buf:
+            return
+        self.seq += 1
+        event = {
+            "type": "agent_token",
+            "agent_id": self.proc.agent_id,
+            "round": self.round_num,
+            "seq": self.seq,
+            "kind": self._kind,
+            "delta": "".join(self._buf),
+        }
+        self._buf = []
+        self._last_flush = asyncio.get_running_loop().time()
+        self._sending = asyncio.create_task(self._send(self._sending, event))
+
+    @staticmethod
+    async def _send(previous: asyncio.Task | None, event: dict) -> None:
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)  # keep event order
+        try:
+            from ..api.websocket import broadcast
+            await broadcast(event)
+        except Exception:
+            pass
+
+    async def close(self) -> None:
+        self._flush()
+        if self._sending is not None:
+            await asyncio.gather(self._sending, return_exceptions=True)
+        self.proc._streaming = False
+
+
 PROCS: dict[str, AgentProc] = {}
 
 
@@ -158,6 +249,88 @@ def _execute_tool(agent_id: str, tool_name: str, tool_input: dict) -> str:
         return json.dumps({"error": str(e)})
 
 
+async def _execute_tool_async(agent_id: str, tool_name: str, tool_input: dict) -> str:
+    """Async tool dispatch.
+
+    Coroutine tools (e.g. CEO v2) are awaited on the event loop; a ``db``
+    parameter is injected when the tool declares one. Everything else is
+    blocking and runs on the bounded tool executor.
+    """
+    fn = ALL_TOOLS_IMPL.get(tool_name)
+    if fn is not None and inspect.iscoroutinefunction(fn):
+        try:
+            kwargs = dict(tool_input)
+            if "db" in inspect.signature(fn).parameters and "db" not in kwargs:
+                kwargs["db"] = get_db()
+            result = await fn(**kwargs)
+            return json.dumps(result, ensure_ascii=False, default=str)
+        except TypeError as e:
+            return json.dumps({"error": f"Invalid parameters: {e}"})
+        except Exception as e:
+            return json.dumps({"error": str(e)})
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _TOOL_EXECUTOR, _execute_tool, agent_id, tool_name, tool_input,
+    )
+
+
+def _serial_key(tool_name: str, tool_input: dict) -> str | None:
+    """Calls sharing a key run sequentially; None = free to run concurrently."""
+    if tool_name == "write_file":
+        return f"write_file:{os.path.normpath(str(tool_input.get('path', '')))}"
+    if not _PARALLEL_SAFE.get(tool_name, False):
+        return "serial"
+    return None
+
+
+async def _execute_tool_calls(
+    agent_id: str,
+    calls: list[tuple[str, dict]],
+    timeout: float = TOOL_TURN_TIMEOUT_SECONDS,
+) -> list[str]:
+    """Run the tool calls of one LLM turn; results keep call order.
+
+    Calls are serial by default: every tool not marked ``parallel_safe``
+    shares one ``_serial_key`` chain and runs in model order, as do
+    write_file calls on the same path. Only parallel-safe calls (key None)
+    run concurrently with the rest. Calls still running after ``timeout``
+    are cancelled and return an error result.
+    """
+    if len(calls) == 1:
+        name, tool_input = calls[0]
+        try:
+            return [await asyncio.wait_for(_execute_tool_async(agent_id, name, tool_input), timeout)]
+        except asyncio.TimeoutError:
+            return [json.dumps({"error": f"Tool timed out after {timeout:.0f}s"})]
+
+    locks: dict[str, asyncio.Lock] = {}
+
+    async def _one(name: str, tool_input: dict) -> str:
+        key = _serial_key(name, tool_input)
+        if key is None:
+            return await _execute_tool_async(agent_id, name, tool_input)
+        async with locks.setdefault(key, asyncio.Lock()):
+            return await _execute_tool_async(agent_id, name, tool_input)
+
+    tasks = [asyncio.create_task(_one(name, tool_input)) for name, tool_input in calls]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for t in pending:
+        t.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results = []
+    for t in tasks:
+        if t in done and not t.cancelled() and t.exception() is None:
+            results.append(t.result())
+        elif t in done and not t.cancelled():
+            results.append(json.dumps({"error": str(t.exception())}))
+        else:
+            results.append(json.dumps({"error": f"Tool timed out after {timeout:.0f}s (turn limit)"}))
+    return results
+
+
 def _save_output(agent_id: str, task: str, response: str, proc: AgentProc):
     """Save agent output to workspace."""
     ws = WORKSPACE / agent_id / "output"
@@ -183,13 +356,14 @@ def _save_output(agent_id: str, task: str, response: str, proc: AgentProc):
         proc.log(f"  📄 response_{ts}.md")
 
 
-def _run(proc: AgentProc, task: str):
+async def _run(proc: AgentProc, task: str):
     """
     Core agent execution loop with real tool-calling support.
-    Runs in a background thread.
+    Runs as an asyncio task on the main event loop.
     """
     db = get_db()
-    agent = _sync_db(db.get_agent(proc.agent_id))
+    loop = asyncio.get_running_loop()
+    agent = await db.get_agent(proc.agent_id)
     if not agent:
         proc.status = "error"
         proc.log("Agent bulunamadi!")
@@ -197,7 +371,7 @@ def _run(proc: AgentProc, task: str):
 
     proc.log("Workspace okunuyor...")
     proc.status = "searching"
-    ctx = _workspace_context(proc.agent_id)
+    ctx = await loop.run_in_executor(_TOOL_EXECUTOR, _workspace_context, proc.agent_id)
     dept_id = agent.get("department_id", "")
 
     sys_prompt = agent["system_prompt"] + f"""
@@ -217,6 +391,8 @@ ARACLARIN (Trade - Gercek Piyasa Verisi):
 - get_funding_rate: Gercek zamanli perpetual futures funding rate
 - get_multi_exchange_price: Binance/Bybit/OKX karsilastirmali fiyat
 - generate_signal: Elliott Wave + SMC + multi-timeframe analiz ile BUY/SELL/HOLD sinyali
+- scan_market: Coklu sembol tarama (hacme gore top USDT pariteleri), skor siralamali tablo
+- backtest_signal: Sinyal skorlamasini gecmis mum verisinde test et (yerel mum deposu veya CSV/Parquet; PnL, drawdown, win rate)
 
 ARACLARIN (Bots - Otomasyon):
 - fetch_x_trends: Kripto trending konular (CoinGecko gercek veri)
@@ -238,29 +414,48 @@ KURALLAR:
     proc.status = "working"
 
     try:
-        llm = get_llm_provider(task)
-        provider_name = type(llm).__name__.replace("Provider", "")
-        proc.log(f"LLM: {provider_name} hazir")
+        llm = ResilientLLM(get_llm_provider(task))
+        proc.log(f"LLM: {llm.name} ({llm.model}) hazir")
 
         messages = [{"role": "user", "content": user_msg}]
+        history = HistoryManager(proc.agent_id)
         final_text = ""
 
         for round_num in range(MAX_TOOL_ROUNDS):
             proc.log(f"Tur {round_num + 1}/{MAX_TOOL_ROUNDS}...")
+            compaction = history.compact(messages)
+            if compaction.tokens_saved > 0:
+                proc.log(f"Gecmis sikistirildi: -{compaction.tokens_saved} token (~{compaction.tokens_after})")
             dept_tools = get_tools_for_dept(dept_id)
-            response = llm.get_response(sys_prompt, messages, dept_tools)
+            if LLM_STREAMING:
+                token_stream = _TokenStream(proc, round_num + 1)
+                try:
+                    response = await llm.aget_response(
+                        sys_prompt, messages, dept_tools, on_delta=token_stream,
+                    )
+                finally:
+                    await token_stream.close()
+            else:
+                response = await llm.aget_response(sys_prompt, messages, dept_tools)
 
             # Record LLM cost (never crash agent for tracking)
             try:
                 usage = llm.get_last_usage() if hasattr(llm, 'get_last_usage') else {"input_tokens": 0, "output_tokens": 0}
-                if usage["input_tokens"] > 0:
-                    model_name = getattr(llm, 'model', getattr(llm, 'model_name', 'unknown'))
-                    cost = calculate_cost(model_name, usage["input_tokens"], usage["output_tokens"])
-                    provider_name_for_db = "gemini" if "gemini" in model_name.lower() else "anthropic"
-                    _sync_db(db.record_llm_usage(
-                        agent_id=proc.agent_id, provider=provider_name_for_db,
+                cache_read = usage.get("cache_read_tokens", 0)
+                cache_write = usage.get("cache_write_tokens", 0)
+                failover_from = llm.take_failover()
+                if failover_from:
+                    proc.log(f"⚠ Failover: {failover_from} → {llm.name}:{llm.model}")
+                if usage["input_tokens"] > 0 or cache_read > 0 or failover_from:
+                    model_name = llm.model
+                    cost = calculate_cost(model_name, usage["input_tokens"], usage["output_tokens"],
+                                          cache_read, cache_write)
+                    await db.record_llm_usage(
+                        agent_id=proc.agent_id, provider=llm.name,
                         model=model_name, input_tokens=usage["input_tokens"],
-                        output_tokens=usage["output_tokens"], cost_usd=cost))
+                        output_tokens=usage["output_tokens"], cost_usd=cost,
+                        cache_read_tokens=cache_read, cache_write_tokens=cache_write,
+                        failover_from=failover_from)
             except Exception:
                 pass
 
@@ -268,14 +463,22 @@ KURALLAR:
                 tool_results = []
                 assistant_content = []
 
+                tool_blocks = [b for b in response.content if b.type == "tool_use"]
+                for block in tool_blocks:
+                    proc.log(f"  🔧 {block.name}({json.dumps(block.input)[:80]})")
+                proc.status = "coding"
+                if len(tool_blocks) > 1:
+                    proc.log(f"  ⇉ {len(tool_blocks)} arac paralel calisiyor")
+                results = await _execute_tool_calls(
+                    proc.agent_id, [(b.name, b.input) for b in tool_blocks],
+                )
+                ordered_results = iter(results)
+
                 for block in response.content:
                     if block.type == "tool_use":
-                        proc.log(f"  🔧 {block.name}({json.dumps(block.input)[:80]})")
-                        proc.status = "coding"
-
-                        result_str = _execute_tool(proc.agent_id, block.name, block.input)
+                        result_str = next(ordered_results)
                         result_preview = result_str[:100].replace("\n", " ")
-                        proc.log(f"  ✓ Sonuc: {result_preview}")
+                        proc.log(f"  ✓ {block.name}: {result_preview}")
 
                         tool_results.append({
                             "type": "tool_result",
@@ -308,37 +511,52 @@ KURALLAR:
 
         proc.status = "coding"
         proc.log("Cikti kaydediliyor...")
-        _save_output(proc.agent_id, task, final_text, proc)
+        await loop.run_in_executor(_TOOL_EXECUTOR, _save_output, proc.agent_id, task, final_text, proc)
         proc.status = "done"
         proc.log("✅ Gorev tamamlandi!")
 
-        _sync_db(db.add_event(
+        await db.add_event(
             proc.agent_id, f"Gorev tamamlandi: {task[:50]}", "info",
             department_id=dept_id if dept_id else None,
-        ))
+        )
 
     except Exception as e:
         proc.status = "error"
         proc.log(f"❌ Hata: {e}")
         try:
-            _sync_db(db.add_event(
+            await db.add_event(
                 proc.agent_id, f"Hata: {e}", "warning",
                 department_id=dept_id if dept_id else None,
-            ))
+            )
         except Exception:
             pass
 
 
+async def _run_admitted(proc: AgentProc, task: str, department: str, provider: str, priority: int):
+    """Wait for an admission slot, then run the agent while holding it."""
+    try:
+        async with get_admission_controller().slot(proc.agent_id, department, provider, priority) as waited:
+            if waited >= 1:
+                proc.log(f"Kuyrukta {waited:.1f}s beklendi")
+            await _run(proc, task)
+    except RuntimeError as e:
+        proc.status = "error"
+        proc.log(f"❌ {e}")
+
+
 # ── Public API ──
 
-async def spawn_agent(agent_id: str, task: str = "") -> dict:
-    """Spawn an agent to execute a task."""
+async def spawn_agent(agent_id: str, task: str = "", priority: int = DEFAULT_PRIORITY) -> dict:
+    """Spawn an agent to execute a task (admitted through the concurrency governor)."""
     db = get_db()
     agent = await db.get_agent(agent_id)
     if not agent:
         return {"error": f"Unknown agent: {agent_id}"}
     if agent_id in PROCS and PROCS[agent_id].alive:
         return {"error": "Already running", **PROCS[agent_id].to_dict()}
+    admission = get_admission_controller()
+    if admission.is_saturated():
+        return {"error": "Admission queue full", "queue_depth": admission.queue_depth()}
 
     if not task:
         inbox = WORKSPACE / agent_id / "inbox"
@@ -361,10 +579,16 @@ async def spawn_agent(agent_id: str, task: str = "") -> dict:
     proc.log(f"workspace/{agent_id}/")
     proc.log(f"{agent.get('domain', '')}")
 
-    t = threading.Thread(target=_run, args=(proc, task), daemon=True)
-    proc.thread = t
+    try:
+        provider = get_llm_provider_name(task)
+    except RuntimeError:
+        provider = ""  # _run surfaces the missing-key error
+    proc.status = "queued"
     PROCS[agent_id] = proc
-    t.start()
+    proc.task = asyncio.create_task(
+        _run_admitted(proc, task, agent.get("department_id") or "", provider, priority),
+        name=f"agent:{agent_id}",
+    )
     return proc.to_dict()
 
 
@@ -372,8 +596,11 @@ def kill_agent(agent_id: str) -> dict:
     """Stop a running agent."""
     if agent_id not in PROCS:
         return {"error": "Not running"}
-    PROCS[agent_id].status = "done"
-    PROCS[agent_id].log("Durduruldu")
+    proc = PROCS[agent_id]
+    if proc.alive:
+        proc.task.cancel()
+    proc.status = "done"
+    proc.log("Durduruldu")
     return {"status": "killed", "agent_id": agent_id}
 
 
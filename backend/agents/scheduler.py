@@ -3,10 +3,14 @@ COWORK.ARMY — AgentScheduler
 asyncio.PriorityQueue tabanlı görev zamanlayıcı.
 Öncelik sırası: CRITICAL > HIGH > MEDIUM > LOW
 Cascade derinlik limiti, idle timeout, kapasite kontrolü.
+Throughput, öncelik başına kuyruk gecikmesi ve açlık (starvation) metrikleri.
 """
 import asyncio
+import itertools
 import logging
+import time
 import uuid
+from collections import Counter, deque
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import IntEnum
@@ -16,6 +20,11 @@ logger = logging.getLogger("cowork.scheduler")
 
 MAX_CASCADE_DEPTH = 10
 MAX_QUEUE_SIZE = 500
+STARVATION_SECONDS = 300       # Bu süreden uzun bekleyen görev "aç" sayılır
+THROUGHPUT_WINDOW_SECONDS = 300
+_LATENCY_SAMPLES = 200
+
+_task_seq = itertools.count()
 
 
 class TaskPriority(IntEnum):
@@ -28,14 +37,16 @@ class TaskPriority(IntEnum):
 
 @dataclass(order=True)
 class ScheduledTask:
-    """A task in the priority queue. Ordered by priority (lower = higher priority)."""
+    """A task in the priority queue. Ordered by priority (lower = higher priority), then FIFO."""
     priority: TaskPriority
+    seq: int = field(default=0)
     created_at: datetime = field(default_factory=datetime.utcnow, compare=False)
     agent_id: str = field(compare=False, default="")
     task: str = field(compare=False, default="")
     cascade_id: Optional[str] = field(compare=False, default=None)
     cascade_depth: int = field(compare=False, default=0)
     thread_id: str = field(compare=False, default_factory=lambda: str(uuid.uuid4()))
+    requeue_count: int = field(compare=False, default=0)
 
     def __init__(
         self,
@@ -52,6 +63,8 @@ class ScheduledTask:
         self.cascade_depth = cascade_depth
         self.created_at = datetime.utcnow()
         self.thread_id = str(uuid.uuid4())
+        self.seq = next(_task_seq)
+        self.requeue_count = 0
 
 
 class AgentScheduler:
@@ -66,6 +79,19 @@ class AgentScheduler:
         self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=MAX_QUEUE_SIZE)
         self._active_tasks: dict[str, ScheduledTask] = {}  # agent_id → aktif görev
         self._idle_timers: dict[str, asyncio.Task] = {}   # agent_id → idle timer
+        self._pending: Counter = Counter()                 # agent_id → kuyruktaki görev sayısı
+
+        # Metrics
+        self._enqueued_total = 0
+        self._dispatched_total = 0
+        self._completed_total = 0
+        self._requeued_total = 0
+        self._dropped_total = 0
+        self._completions: deque = deque()                 # monotonic completion timestamps
+        self._latency: dict[TaskPriority, deque] = {
+            p: deque(maxlen=_LATENCY_SAMPLES) for p in TaskPriority
+        }
+        self._starved: Counter = Counter()                 # priority name → starved count
 
     def queue_size(self) -> int:
         return self._queue.qsize()
@@ -84,24 +110,62 @@ class AgentScheduler:
             logger.warning(f"[SCHEDULER] Queue full ({MAX_QUEUE_SIZE}), dropping LOW priority tasks")
             if task.priority > TaskPriority.HIGH:
                 logger.warning(f"[SCHEDULER] Dropping task for {task.agent_id}: queue full")
+                self._dropped_total += 1
                 return
 
+        self._pending[task.agent_id] += 1
+        self._enqueued_total += 1
         await self._queue.put(task)
         logger.debug(
             f"[SCHEDULER] Enqueued [{task.priority.name}] for {task.agent_id}: {task.task[:50]}"
         )
 
+    def hold(self, agent_id: str) -> None:
+        """Count a task as pending before it is back in the queue (requeue delay)."""
+        self._pending[agent_id] += 1
+
+    def release_hold(self, agent_id: str) -> None:
+        """Undo hold() for a task that will not be requeued after all."""
+        self._unpend(agent_id)
+
+    def _unpend(self, agent_id: str) -> None:
+        self._pending[agent_id] -= 1
+        if self._pending[agent_id] <= 0:
+            del self._pending[agent_id]
+
+    async def requeue(self, task: ScheduledTask, held: bool = False) -> None:
+        """Put a task back (e.g. its agent was busy). Keeps priority and age.
+        held=True: the caller already counted it as pending via hold()."""
+        task.requeue_count += 1
+        self._requeued_total += 1
+        if not held:
+            self._pending[task.agent_id] += 1
+        await self._queue.put(task)
+
     async def dequeue(self) -> ScheduledTask:
         """Get the highest priority task from the queue (blocks if empty)."""
-        return await self._queue.get()
+        task = await self._queue.get()
+        self._unpend(task.agent_id)
+        waited = (datetime.utcnow() - task.created_at).total_seconds()
+        self._latency[task.priority].append(waited)
+        if waited > STARVATION_SECONDS and task.requeue_count == 0:
+            self._starved[task.priority.name] += 1
+        return task
+
+    def has_pending(self, agent_id: str) -> bool:
+        """Returns True if agent already has a task waiting in the queue."""
+        return self._pending.get(agent_id, 0) > 0
 
     def mark_active(self, agent_id: str, task: ScheduledTask) -> None:
         """Mark an agent as actively working on a task."""
         self._active_tasks[agent_id] = task
+        self._dispatched_total += 1
 
     def mark_done(self, agent_id: str) -> None:
         """Mark an agent's task as done."""
-        self._active_tasks.pop(agent_id, None)
+        if self._active_tasks.pop(agent_id, None) is not None:
+            self._completed_total += 1
+            self._completions.append(time.monotonic())
 
     def is_agent_busy(self, agent_id: str) -> bool:
         """Returns True if agent has an active task."""
@@ -134,12 +198,34 @@ class AgentScheduler:
             self._idle_timers[agent_id].cancel()
             del self._idle_timers[agent_id]
 
+    def _throughput_per_min(self) -> float:
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW_SECONDS
+        while self._completions and self._completions[0] < cutoff:
+            self._completions.popleft()
+        return round(len(self._completions) * 60 / THROUGHPUT_WINDOW_SECONDS, 2)
+
     def get_stats(self) -> dict:
         """Return scheduler statistics."""
+        latency = {}
+        for p, samples in self._latency.items():
+            if samples:
+                latency[p.name] = {
+                    "avg_s": round(sum(samples) / len(samples), 2),
+                    "max_s": round(max(samples), 2),
+                    "samples": len(samples),
+                }
         return {
             "queue_size": self.queue_size(),
             "active_tasks": self.active_task_count(),
             "active_agents": list(self._active_tasks.keys()),
+            "enqueued_total": self._enqueued_total,
+            "dispatched_total": self._dispatched_total,
+            "completed_total": self._completed_total,
+            "requeued_total": self._requeued_total,
+            "dropped_total": self._dropped_total,
+            "throughput_per_min": self._throughput_per_min(),
+            "queue_latency": latency,
+            "starved": dict(self._starved),
         }
 
 
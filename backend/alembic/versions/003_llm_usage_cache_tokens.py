@@ -0,0 +1,35 @@
+"""LLM usage prompt-cache token columns
+
+Revision ID: 003_llm_cache_tokens
+Revises: 002_agent_world
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "003_llm_cache_tokens"
+down_revision: Union[str, None] = "002_agent_world"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _missing_columns(table: str, names: list[str]) -> list[str]:
+    """llm_usage is created by Base.metadata.create_all, not by an earlier revision."""
+    insp = sa.inspect(op.get_bind())
+    if not insp.has_table(table):
+        return []
+    existing = {c["name"] for c in insp.get_columns(table)}
+    return [n for n in names if n not in existing]
+
+
+def upgrade() -> None:
+    for name in _missing_columns("llm_usage", ["cache_read_tokens", "cache_write_tokens"]):
+        op.add_column("llm_usage", sa.Column(name, sa.Integer, nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    insp = sa.inspect(op.get_bind())
+    if insp.has_table("llm_usage"):
+        op.drop_column("llm_usage", "cache_write_tokens")
+        op.drop_column("llm_usage", "cache_read_tokens")
@@ -0,0 +1,33 @@
+"""LLM usage failover column
+
+Revision ID: 004_llm_failover
+Revises: 003_llm_cache_tokens
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "004_llm_failover"
+down_revision: Union[str, None] = "003_llm_cache_tokens"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _missing_columns(table: str, names: list[str]) -> list[str]:
+    """llm_usage is created by Base.metadata.create_all, not by an earlier revision."""
+    insp = sa.inspect(op.get_bind())
+    if not insp.has_table(table):
+        return []
+    existing = {c["name"] for c in insp.get_columns(table)}
+    return [n for n in names if n not in existing]
+
+
+def upgrade() -> None:
+    if _missing_columns("llm_usage", ["failover_from"]):
+        op.add_column("llm_usage", sa.Column("failover_from", sa.String(150), nullable=True))
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("llm_usage"):
+        op.drop_column("llm_usage", "failover_from")
@@ -154,6 +154,13 @@ async def statuses():
     return await get_statuses()
 
 
+@router.get("/admission")
+async def admission_stats():
+    """Spawn admission queue: in-flight slots, queue depth, wait times."""
+    from ..agents.admission import get_admission_controller
+    return get_admission_controller().get_stats()
+
+
 @router.post("/agents/{agent_id}/collaborate")
 async def collaborate(
     agent_id: str,
@@ -211,3 +218,43 @@ async def collaborate(
         "agent_b": {"id": partner_id, "name": agent_b["name"], "result": result_b},
         "task": task_title,
     }
+
+
+@router.get("/scheduler")
+async def scheduler_stats():
+    """Scheduler dispatch: queue size, throughput, per-priority latency, starvation."""
+    from ..agents.dispatcher import get_dispatcher
+    return get_dispatcher().get_stats()
+
+
+@router.get("/history-compaction")
+async def history_compaction_stats():
+    """Tool-loop history compaction: tokens saved per agent."""
+    from ..agents.history import get_compaction_stats
+    return get_compaction_stats()
+
+
+@router.get("/external-watcher")
+async def external_watcher_stats():
+    """External data streams: per-stream HTTP latency / bytes / 304s and degradation."""
+    from ..agents.external_watcher import get_external_watcher
+    return get_external_watcher().get_stats()
+
+
+@router.get("/websocket-hub")
+async def websocket_hub_stats():
+    """/ws/events producer and per-client send queues: ticks vs. diffs, lag, drops, coalesced updates."""
+    from .websocket import get_world_hub
+    return get_world_hub().get_stats()
+
+
+@router.get("/db-writes")
+async def db_write_stats():
+    """Write-behind buffer: rows queued / written, flushes, backpressure and pending per table."""
+    return get_db().get_write_stats()
+
+
+@router.get("/agent-cache")
+async def agent_cache_stats():
+    """In-process agents table cache: hits vs. loads, version, invalidations (local / NOTIFY)."""
+    return get_db().agents.get_stats()
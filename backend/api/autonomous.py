@@ -26,6 +26,12 @@ async def status():
 
 
 @router.get("/events")
-async def events(limit: int = 50, since: str = "", department_id: str | None = None):
+async def events(limit: int = 50, since: str = "", department_id: str | None = None,
+                 since_id: int | None = None):
+    """
+    Newest events, or with `since_id` the events after that id in ascending
+    order; pass the last returned id back as `since_id` to resume.
+    """
     db = get_db()
-    return await db.get_events(limit=limit, since=since, department_id=department_id)
+    return await db.get_events(limit=min(limit, 500), since=since,
+                               department_id=department_id, since_id=since_id)
@@ -21,3 +21,31 @@ async def get_department(dept_id: str):
         return {"error": "Department not found"}
     agents = await db.get_all_agents(department_id=dept_id)
     return {**dept, "agents": agents}
+
+
+@router.get("/trade/market-data")
+async def trade_market_data_stats():
+    """ccxt market-data cache: entries, in-flight fetches, hit/miss per kind."""
+    from ..departments.trade.market_data import get_market_data_stats
+    return get_market_data_stats()
+
+
+@router.get("/trade/exchanges")
+async def trade_exchange_stats():
+    """Pooled ccxt clients: health, latency, markets age, rate-limit waits."""
+    from ..departments.trade.exchanges import get_exchange_pool
+    return get_exchange_pool().get_stats()
+
+
+@router.get("/trade/ohlcv-store")
+async def trade_ohlcv_store_stats():
+    """Local candle store: stored series, sync requests, candles fetched vs served."""
+    from ..departments.trade.ohlcv_store import get_ohlcv_store
+    return get_ohlcv_store().get_stats()
+
+
+@router.get("/trade/live-indicators")
+async def trade_live_indicators():
+    """Incremental indicator states kept per (exchange, symbol, timeframe)."""
+    from ..departments.trade.streaming import get_indicator_registry
+    return get_indicator_registry().get_stats()
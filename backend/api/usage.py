@@ -25,3 +25,10 @@ async def usage_budget():
 async def usage_by_agent(agent_id: str):
     db = get_db()
     return await db.get_usage_by_agent(agent_id)
+
+
+@router.get("/resilience")
+async def usage_resilience():
+    """Per provider:model circuit breaker state and rate-limit pacing."""
+    from ..agents.resilience import get_resilience_stats
+    return get_resilience_stats()
@@ -1,73 +1,417 @@
-"""\nCOWORK.ARMY v7.0 — WebSocket Hub\nReal-time agent status and event streaming.\n\nDesteklenen event tipleri:\n- update: 2 saniyelik polling (statuses + events + world_models + scheduler_stats)\n- agent_message: agent'lar arası mesaj (AgentMessageBus tarafından gönderilir)\n- external_trigger: dış veri tetiklemesi (ExternalDataWatcher tarafından)\n- cascade_event: cascade zinciri adımı\n- cascade_complete: cascade zinciri tamamlandı\n"""
+"""
+COWORK.ARMY v7.0 — WebSocket Hub
+Real-time agent status and event streaming.
+
+Desteklenen event tipleri:
+- update: WorldHub anlık görüntüsü. Bağlanınca tam durum (full=true), sonra
+  her tick'te yalnızca değişenler: değişen agent durumları, yeni event'ler,
+  değiştiyse world_models / scheduler_stats. `cursor` güvenli devam
+  noktasıdır: ondan küçük/eşit tüm event id'leri gönderildi. Id'ler commit'ten
+  önce alındığı için eşzamanlı insert'lerde küçük bir id büyük olandan sonra
+  görünebilir; hub bu boşlukları EVENT_GAP_SECONDS boyunca tekrar okur, geç
+  gelen event'i de yollar. Yeniden bağlanan client /ws/events?since_id=<cursor>
+  ile kaçırdıklarını `resumed` mesajında alır (cursor'u ilerletmez; event'ler
+  id ile tekilleştirilebilir)
+- agent_message: agent'lar arası mesaj (AgentMessageBus tarafından gönderilir)
+- external_trigger: dış veri tetiklemesi (ExternalDataWatcher tarafından)
+- cascade_event: cascade zinciri adımı
+- cascade_complete: cascade zinciri tamamlandı
+- agent_token: LLM yanıtının akan parçası (runner._TokenStream)
+
+Tek bir üretici (WorldHub) tick başına bir kez DB'yi okur ve aynı
+serileştirilmiş metni tüm client'lara yollar; açık dashboard sayısı DB
+yükünü artırmaz.
+
+Gönderim: her client'ın sınırlı bir kuyruğu ve kendi writer task'ı var.
+broadcast() yalnızca kuyruğa ekler, hiç beklemez; yavaş bir client diğerlerini
+ve AgentMessageBus / watcher gibi üreticileri durdurmaz.
+"""
 import asyncio
 import json
+import logging
+import time
+from collections import deque
+from typing import Callable, Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from ..agents.runner import get_statuses
+from ..config import WS_CLIENT_QUEUE_SIZE, WS_HUB_TICK_SECONDS
 from ..database import get_db
 
+logger = logging.getLogger("cowork.websocket")
+
 router = APIRouter(tags=["websocket"])
 
+RECENT_EVENTS = 10
+RESUME_EVENTS = 200
+EVENT_GAP_SECONDS = 10   # how long a missing id below the cursor is re-read
+MAX_EVENT_GAPS = 200
+
+
+class ClientChannel:
+    """
+    Bounded outbound queue of one WebSocket client, drained by its own writer
+    task. When the queue is full:
+    - hub updates (diffs) are folded into a single full-state resync, sent
+      from the hub's latest snapshot once the client catches up
+    - otherwise the oldest queued message is dropped
+    """
+
+    def __init__(self, websocket: WebSocket, snapshot: Optional[Callable[[], str]] = None,
+                 maxsize: int = WS_CLIENT_QUEUE_SIZE):
+        self.ws = websocket
+        self.snapshot = snapshot or (lambda: get_world_hub().full_text())
+        self.maxsize = maxsize
+        self.resync = False
+        self.closed = False
+        self.stats = {"sent": 0, "dropped": 0, "coalesced": 0, "resyncs": 0,
+                      "max_queue": 0, "last_lag_ms": 0.0, "max_lag_ms": 0.0}
+        self._queue: deque[tuple[float, bool, str]] = deque()  # (enqueued_at, is_update, text)
+        self._ready = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = asyncio.create_task(self._writer())
+
+    def offer(self, text: str, update: bool = False) -> None:
+        """Queue a message without waiting; applies the slow-consumer policy when full."""
+        if self.closed:
+            return
+        if update and self.resync:
+            self.stats["coalesced"] += 1  # the pending resync will carry it
+            return
+        if len(self._queue) >= self.maxsize:
+            if update or any(item[1] for item in self._queue):
+                kept = deque(item for item in self._queue if not item[1])
+                self.stats["coalesced"] += len(self._queue) - len(kept) + update
+                self._queue = kept
+                self.resync = True
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.stats["dropped"] += 1
+        if not update or not self.resync:
+            self._queue.append((time.monotonic(), update, text))
+        self.stats["max_queue"] = max(self.stats["max_queue"], len(self._queue))
+        self._idle.clear()
+        self._ready.set()
+
+    def request_resync(self) -> None:
+        """Send the hub's full state next (used on connect)."""
+        self.resync = True
+        self._idle.clear()
+        self._ready.set()
+
+    async def _writer(self) -> None:
+        while True:
+            if not self._queue and not self.resync:
+                self._idle.set()
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            if self.resync:
+                self.resync = False
+                self.stats["resyncs"] += 1
+                enqueued, text = None, self.snapshot()
+            else:
+                enqueued, _, text = self._queue.popleft()
+            try:
+                await self.ws.send_text(text)
+            except Exception:
+                unregister_client(self.ws)
+                return
+            self.stats["sent"] += 1
+            if enqueued is not None:
+                lag = (time.monotonic() - enqueued) * 1000
+                self.stats["last_lag_ms"] = round(lag, 1)
+                self.stats["max_lag_ms"] = round(max(self.stats["max_lag_ms"], lag), 1)
+
+    async def drain(self) -> None:
+        """Wait until everything queued so far has been sent (or the client is gone)."""
+        while not self.closed and not self._idle.is_set():
+            waiter = asyncio.ensure_future(self._idle.wait())
+            try:
+                await asyncio.wait({waiter, self._task}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._idle.set()
+        if not self._task.done() and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "queued": len(self._queue), "resync_pending": self.resync}
+
+
 # Connected clients
-_clients: set[WebSocket] = set()
+_clients: dict[WebSocket, ClientChannel] = {}
+_closed_totals = {"clients": 0, "sent": 0, "dropped": 0, "coalesced": 0}
+
+
+def register_client(websocket: WebSocket, snapshot: Optional[Callable[[], str]] = None) -> ClientChannel:
+    channel = _clients.get(websocket)
+    if channel is None:
+        channel = ClientChannel(websocket, snapshot)
+        _clients[websocket] = channel
+    return channel
+
+
+def unregister_client(websocket: WebSocket) -> None:
+    channel = _clients.pop(websocket, None)
+    if channel is None:
+        return
+    channel.close()
+    _closed_totals["clients"] += 1
+    for key in ("sent", "dropped", "coalesced"):
+        _closed_totals[key] += channel.stats[key]
+
+
+async def drain_clients() -> None:
+    """Wait for all client queues to empty (tests, graceful shutdown)."""
+    await asyncio.gather(*(c.drain() for c in list(_clients.values())))
+
+
+def get_broadcast_stats() -> dict:
+    channels = list(_clients.values())
+    live = [c.get_stats() for c in channels]
+    return {
+        "clients": len(channels),
+        "queue_size": WS_CLIENT_QUEUE_SIZE,
+        "queued": sum(c["queued"] for c in live),
+        "max_lag_ms": max((c["max_lag_ms"] for c in live), default=0.0),
+        **{key: _closed_totals[key] + sum(c[key] for c in live)
+           for key in ("sent", "dropped", "coalesced")},
+        "disconnected": _closed_totals["clients"],
+        "per_client": live,
+    }
+
+
+class WorldHub:
+    """
+    Shared producer for `update` messages. One snapshot per tick; clients get
+    the full state once on connect and then only what changed.
+    """
+
+    def __init__(self, tick: float = WS_HUB_TICK_SECONDS):
+        self.tick = tick
+        self.seq = 0
+        self.cursor = 0  # id of the newest event seen
+        self._gaps: dict[int, float] = {}  # missing ids below the cursor → first noticed (monotonic)
+        self._statuses: dict = {}
+        self._events: list[dict] = []  # newest first
+        self._world_models: list = []
+        self._scheduler_stats: dict = {}
+        self._full_text: Optional[str] = None
+        self._full_seq = -1
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+        self.stats = {"ticks": 0, "updates": 0, "idle_ticks": 0, "full_snapshots": 0,
+                      "bytes_broadcast": 0, "errors": 0, "late_events": 0, "expired_gaps": 0}
+
+    @property
+    def watermark(self) -> int:
+        """Resume point: every event id up to it has been delivered (or given up on)."""
+        return min(self._gaps) - 1 if self._gaps else self.cursor
+
+    async def _collect(self) -> dict:
+        statuses = await get_statuses()
+        db = get_db()
+        if self.cursor:
+            # Primary-key range scan from the oldest open gap: usually empty, never a recount
+            since = self.watermark
+            events = await db.get_events(limit=RECENT_EVENTS + self.cursor - since, since_id=since)
+        else:
+            events = await db.get_events(limit=RECENT_EVENTS)
+        try:
+            from ..agents.world_model import get_world_model_manager
+            from ..agents.scheduler import get_scheduler
+            world_models = get_world_model_manager().get_snapshot()
+            scheduler_stats = get_scheduler().get_stats()
+        except Exception:
+            world_models = []
+            scheduler_stats = {}
+        return {"statuses": statuses, "events": events,
+                "world_models": world_models, "scheduler_stats": scheduler_stats}
+
+    def _apply(self, snap: dict) -> Optional[dict]:
+        """Store the snapshot and return the diff against the previous one (None if unchanged)."""
+        statuses = snap["statuses"]
+        changed = {aid: s for aid, s in statuses.items() if self._statuses.get(aid) != s}
+        removed = [aid for aid in self._statuses if aid not in statuses]
+        new_events = self._take_new_events(snap["events"])
+        diff: dict = {}
+        if changed:
+            diff["statuses"] = changed
+        if removed:
+            diff["removed"] = removed
+        if new_events:
+            diff["events"] = new_events
+        if snap["world_models"] != self._world_models:
+            diff["world_models"] = snap["world_models"]
+        if snap["scheduler_stats"] != self._scheduler_stats:
+            diff["scheduler_stats"] = snap["scheduler_stats"]
+
+        self._statuses = statuses
+        if new_events:
+            self._events = sorted(new_events + self._events, key=lambda e: e["id"], reverse=True)[:RECENT_EVENTS]
+        self._world_models = snap["world_models"]
+        self._scheduler_stats = snap["scheduler_stats"]
+        if not diff:
+            return None
+        self.seq += 1
+        return {"type": "update", "full": False, "seq": self.seq, "cursor": self.watermark,
+                "new_events": bool(new_events), **diff}
+
+    def _take_new_events(self, events: list[dict]) -> list[dict]:
+        """
+        Events not delivered yet (newest first): ids above the cursor plus
+        late commits that fill a gap. Ids skipped on the way up are tracked as
+        gaps until they show up or EVENT_GAP_SECONDS pass (rolled back).
+        """
+        now = time.monotonic()
+        ids = {e.get("id") or 0 for e in events}
+        fresh = [e for e in events if (e.get("id") or 0) > self.cursor or e.get("id") in self._gaps]
+        late = [e for e in fresh if e["id"] <= self.cursor]
+        self.stats["late_events"] += len(late)
+        for e in late:
+            del self._gaps[e["id"]]
+        if fresh:
+            top = max(e["id"] for e in fresh)
+            if self.cursor:  # the first snapshot is the newest page, not a contiguous range
+                for missing in range(self.cursor + 1, top):
+                    if missing not in ids:
+                        self._gaps[missing] = now
+            self.cursor = max(self.cursor, top)
+        expired = [i for i, seen in self._gaps.items() if now - seen >= EVENT_GAP_SECONDS]
+        for i in expired:
+            del self._gaps[i]
+        if len(self._gaps) > MAX_EVENT_GAPS:  # keep the newest gaps
+            oldest = sorted(self._gaps)[:len(self._gaps) - MAX_EVENT_GAPS]
+            for i in oldest:
+                del self._gaps[i]
+            expired += oldest
+        self.stats["expired_gaps"] += len(expired)
+        return sorted(fresh, key=lambda e: e["id"], reverse=True)
+
+    async def refresh(self) -> Optional[str]:
+        """Take one snapshot; returns the serialized diff (None if nothing changed)."""
+        async with self._refresh_lock:
+            self.stats["ticks"] += 1
+            diff = self._apply(await self._collect())
+        if diff is None:
+            self.stats["idle_ticks"] += 1
+            return None
+        self.stats["updates"] += 1
+        return json.dumps(diff, default=str)
+
+    def full_text(self) -> str:
+        """Serialized full state, built at most once per snapshot version."""
+        if self._full_seq != self.seq or self._full_text is None:
+            self._full_text = json.dumps({
+                "type": "update", "full": True, "seq": self.seq, "cursor": self.watermark,
+                "statuses": self._statuses, "events": self._events,
+                "new_events": False,
+                "world_models": self._world_models,
+                "scheduler_stats": self._scheduler_stats,
+            }, default=str)
+            self._full_seq = self.seq
+            self.stats["full_snapshots"] += 1
+        return self._full_text
+
+    async def join(self, websocket: WebSocket, since_id: Optional[int] = None) -> ClientChannel:
+        """
+        Queue the current state for a new client and make sure the producer
+        runs. A reconnecting client passes its last cursor as `since_id` and
+        also gets the events it missed (up to RESUME_EVENTS) in a `resumed`
+        message. It carries no cursor: the full state sent first already has a
+        cursor at least as new, and the backfill must not move it back.
+        """
+        if self._task is None or self._task.done():
+            # Producer was idle (no clients): the cached state may be stale
+            text = await self.refresh()
+            if text is not None:
+                publish(text, update=True)
+        channel = register_client(websocket, self.full_text)
+        channel.request_resync()
+        if since_id is not None and since_id < self.cursor:
+            missed = await get_db().get_events(limit=RESUME_EVENTS, since_id=since_id)
+            missed = [e for e in missed if e["id"] <= self.cursor][::-1]
+            if missed:
+                channel.offer(json.dumps({
+                    "type": "update", "full": False, "resumed": True, "seq": self.seq,
+                    "new_events": True, "events": missed,
+                }, default=str))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return channel
+
+    async def _run(self) -> None:
+        while _clients:
+            await asyncio.sleep(self.tick)
+            if not _clients:
+                break
+            try:
+                text = await self.refresh()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"[WS] Snapshot failed: {e}")
+                continue
+            if text is not None:
+                self.stats["bytes_broadcast"] += len(text)
+                publish(text, update=True)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "clients": len(_clients),
+            "seq": self.seq,
+            "cursor": self.cursor,
+            "watermark": self.watermark,
+            "open_gaps": len(self._gaps),
+            "tick_seconds": self.tick,
+            "running": self._task is not None and not self._task.done(),
+            "broadcast": get_broadcast_stats(),
+        }
+
+
+_hub: Optional[WorldHub] = None
+
+
+def get_world_hub() -> WorldHub:
+    global _hub
+    if _hub is None:
+        _hub = WorldHub()
+    return _hub
 
 
 @router.websocket("/ws/events")
-async def websocket_events(websocket: WebSocket):
+async def websocket_events(websocket: WebSocket, since_id: Optional[int] = None):
     """
     WebSocket endpoint for real-time updates.
-    Sends agent statuses and events every 2 seconds.
+    Full state on connect, then WorldHub diffs every tick.
     """
     await websocket.accept()
-    _clients.add(websocket)
-    last_event_count = 0
-
     try:
+        await get_world_hub().join(websocket, since_id)
+        # Client mesaj göndermez; receive yalnızca kopmayı fark etmek için
         while True:
-            # Gather statuses
-            statuses = await get_statuses()
-
-            # Gather recent events
-            db = get_db()
-            events = await db.get_events(limit=10)
-            event_count = await db.get_event_count()
-
-            # World model snapshots
-            try:
-                from ..agents.world_model import get_world_model_manager
-                from ..agents.scheduler import get_scheduler
-                world_models = get_world_model_manager().get_snapshot()
-                scheduler_stats = get_scheduler().get_stats()
-            except Exception:
-                world_models = []
-                scheduler_stats = {}
-
-            payload = {
-                "type": "update",
-                "statuses": statuses,
-                "events": events,
-                "new_events": event_count > last_event_count,
-                "world_models": world_models,
-                "scheduler_stats": scheduler_stats,
-            }
-            last_event_count = event_count
-
-            await websocket.send_text(json.dumps(payload, default=str))
-            await asyncio.sleep(2)
+            await websocket.receive_text()
     except WebSocketDisconnect:
         pass
     except Exception:
         pass
     finally:
-        _clients.discard(websocket)
+        unregister_client(websocket)
+
+
+def publish(text: str, update: bool = False) -> None:
+    """Queue an already serialized message for every client; never waits on a socket."""
+    for channel in list(_clients.values()):  # list() snapshot — dict writer'larca değişebilir
+        channel.offer(text, update)
 
 
 async def broadcast(message: dict):
-    """Broadcast a message to all connected WebSocket clients."""
-    text = json.dumps(message, default=str)
-    dead = set()
-    for ws in list(_clients):  # list() snapshot — iteration sırasında set değişmez
-        try:
-            await ws.send_text(text)
-        except Exception:
-            dead.add(ws)
-    _clients.difference_update(dead)  # in-place, atama yapmaz → UnboundLocalError olmaz
+    """Broadcast a message to all connected WebSocket clients (non-blocking enqueue)."""
+    publish(json.dumps(message, default=str))
@@ -33,3 +33,60 @@ COWORK_ROOT = os.environ.get("COWORK_ROOT", str(PROJECT_ROOT))
 AGENT_MAX_TOKENS = 4096
 AUTONOMOUS_TICK_SECONDS = 30
 AGENT_OUTPUT_MAX_LINES = 200
+# Thread pool size for blocking agent tools (agents themselves run as coroutines)
+TOOL_EXECUTOR_WORKERS = int(os.environ.get("TOOL_EXECUTOR_WORKERS", 16))
+# Stream LLM tokens into agent logs + WebSocket agent_token events
+LLM_STREAMING = os.environ.get("LLM_STREAMING", "1") != "0"
+AGENT_STREAM_FLUSH_MS = int(os.environ.get("AGENT_STREAM_FLUSH_MS", 100))
+# LLM resilience: requests/min per "provider" or "provider:model", retries, circuit breaker
+LLM_RATE_LIMITS = os.environ.get("LLM_RATE_LIMITS", "anthropic=50,gemini=60")
+LLM_RATE_BURST = int(os.environ.get("LLM_RATE_BURST", 5))
+LLM_MAX_ATTEMPTS = int(os.environ.get("LLM_MAX_ATTEMPTS", 4))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", 1.0))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", 30.0))
+LLM_BREAKER_THRESHOLD = int(os.environ.get("LLM_BREAKER_THRESHOLD", 5))
+LLM_BREAKER_RESET_SECONDS = float(os.environ.get("LLM_BREAKER_RESET_SECONDS", 60))
+# Wall-clock limit for all tool calls of one LLM turn (serial unless parallel_safe)
+TOOL_TURN_TIMEOUT_SECONDS = float(os.environ.get("TOOL_TURN_TIMEOUT_SECONDS", 120))
+
+# Admission control for agent spawns (slot specs: "trade=2,software=4,*=3")
+AGENT_MAX_IN_FLIGHT = int(os.environ.get("AGENT_MAX_IN_FLIGHT", 8))
+AGENT_DEPT_SLOTS = os.environ.get("AGENT_DEPT_SLOTS", "*=3")
+AGENT_PROVIDER_SLOTS = os.environ.get("AGENT_PROVIDER_SLOTS", "anthropic=4,gemini=6")
+AGENT_ADMISSION_QUEUE_SIZE = int(os.environ.get("AGENT_ADMISSION_QUEUE_SIZE", 200))
+
+# Tool-loop history compaction (token budget for the messages list, per agent override spec)
+AGENT_HISTORY_TOKEN_BUDGET = int(os.environ.get("AGENT_HISTORY_TOKEN_BUDGET", 24000))
+AGENT_HISTORY_BUDGETS = os.environ.get("AGENT_HISTORY_BUDGETS", "ceo=48000")
+AGENT_HISTORY_KEEP_ROUNDS = int(os.environ.get("AGENT_HISTORY_KEEP_ROUNDS", 2))
+
+# Scheduler dispatcher (worker coroutines consuming AgentScheduler)
+SCHEDULER_WORKERS = int(os.environ.get("SCHEDULER_WORKERS", AGENT_MAX_IN_FLIGHT))
+SCHEDULER_REQUEUE_DELAY = float(os.environ.get("SCHEDULER_REQUEUE_DELAY", 2.0))
+
+# MarketDataStream live indicator state (ccxt candles → departments/trade/streaming.py)
+MARKET_STREAM_SYMBOLS = os.environ.get("MARKET_STREAM_SYMBOLS", "BTC/USDT,ETH/USDT,SOL/USDT")
+MARKET_STREAM_TIMEFRAME = os.environ.get("MARKET_STREAM_TIMEFRAME", "1h")
+
+# ExternalDataWatcher shared HTTP session (one pooled aiohttp connector for all streams)
+WATCHER_HTTP_LIMIT = int(os.environ.get("WATCHER_HTTP_LIMIT", 20))
+WATCHER_HTTP_LIMIT_PER_HOST = int(os.environ.get("WATCHER_HTTP_LIMIT_PER_HOST", 4))
+WATCHER_DNS_TTL = int(os.environ.get("WATCHER_DNS_TTL", 300))
+WATCHER_KEEPALIVE = float(os.environ.get("WATCHER_KEEPALIVE", 60))
+# ExternalDataWatcher event dedup: repeats of one fingerprint within the window are dropped
+# unless severity rises; events reaching the same departments within COALESCE are merged
+WATCHER_DEDUP_WINDOW = float(os.environ.get("WATCHER_DEDUP_WINDOW", 600))
+WATCHER_COALESCE_SECONDS = float(os.environ.get("WATCHER_COALESCE_SECONDS", 5))
+# WebSocket hub: one shared snapshot producer for all /ws/events clients
+WS_HUB_TICK_SECONDS = float(os.environ.get("WS_HUB_TICK_SECONDS", 2))
+# Per-client outbound queue; a full queue folds pending updates into one full-state resync
+# and drops the oldest other message, so a slow client never blocks producers
+WS_CLIENT_QUEUE_SIZE = int(os.environ.get("WS_CLIENT_QUEUE_SIZE", 256))
+# Write-behind buffer for events / LLM usage / agent messages / task history
+DB_WRITE_BUFFER = os.environ.get("DB_WRITE_BUFFER", "1") != "0"
+DB_WRITE_BATCH_SIZE = int(os.environ.get("DB_WRITE_BATCH_SIZE", 200))
+DB_WRITE_FLUSH_MS = float(os.environ.get("DB_WRITE_FLUSH_MS", 500))
+DB_WRITE_MAX_PENDING = int(os.environ.get("DB_WRITE_MAX_PENDING", 5000))
+# In-process agent table cache; NOTIFY=1 shares invalidations between replicas over Postgres
+AGENT_CACHE_TTL = float(os.environ.get("AGENT_CACHE_TTL", 60))
+AGENT_CACHE_NOTIFY = os.environ.get("AGENT_CACHE_NOTIFY", "0") == "1"
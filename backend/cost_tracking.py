@@ -2,21 +2,30 @@
 
 import os
 
+# USD per 1M tokens. cache_read / cache_write price prompt-prefix cache hits and writes.
 PRICING: dict[str, dict[str, float]] = {
-    "claude-sonnet-4-20250514": {"input": 3.0, "output": 15.0},
-    "claude-haiku-4-5-20251001": {"input": 0.80, "output": 4.0},
-    "gemini-2.5-pro": {"input": 1.25, "output": 10.0},
-    "gemini-2.5-flash": {"input": 0.15, "output": 0.60},
+    "claude-sonnet-4-20250514": {"input": 3.0, "output": 15.0, "cache_read": 0.30, "cache_write": 3.75},
+    "claude-haiku-4-5-20251001": {"input": 0.80, "output": 4.0, "cache_read": 0.08, "cache_write": 1.0},
+    "gemini-2.5-pro": {"input": 1.25, "output": 10.0, "cache_read": 0.3125, "cache_write": 1.25},
+    "gemini-2.5-flash": {"input": 0.15, "output": 0.60, "cache_read": 0.0375, "cache_write": 0.15},
 }
 
 
-def calculate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+def calculate_cost(
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0,
+) -> float:
     if model not in PRICING:
         return 0.0
     rates = PRICING[model]
     return round(
         (input_tokens / 1_000_000) * rates["input"]
-        + (output_tokens / 1_000_000) * rates["output"],
+        + (output_tokens / 1_000_000) * rates["output"]
+        + (cache_read_tokens / 1_000_000) * rates.get("cache_read", rates["input"])
+        + (cache_write_tokens / 1_000_000) * rates.get("cache_write", rates["input"]),
         6,
     )
 
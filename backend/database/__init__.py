@@ -9,9 +9,12 @@ _db: Database | None = None
 async def setup_db() -> Database:
     """Initialize database connection and return repository instance."""
     global _db
-    from .connection import async_session_factory, init_db
+    from ..config import AGENT_CACHE_NOTIFY, DB_WRITE_BUFFER
+    from .connection import async_session_factory, engine, init_db
     await init_db()
-    _db = Database(async_session_factory)
+    _db = Database(async_session_factory, write_buffer=DB_WRITE_BUFFER)
+    if AGENT_CACHE_NOTIFY:
+        await _db.enable_agent_notify(engine)
     return _db
 
 
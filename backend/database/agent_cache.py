@@ -0,0 +1,162 @@
+"""
+COWORK.ARMY — Agent Cache (versioned read-through cache of the agents table)
+get_agent / get_all_agents run on every agent round, spawn, route_task,
+autonomous tick and status poll, while the table changes only when an agent
+is seeded, created or deleted. The repository keeps one in-process snapshot:
+- loaded with a single SELECT on first use, then served from memory
+  (get_agent is a dict lookup, department filters run on the snapshot)
+- every upsert_agent / delete_agent bumps the version and drops the
+  snapshot; a load that raced with an invalidation is not kept
+- optional Postgres LISTEN/NOTIFY (AGENT_CACHE_NOTIFY=1) carries
+  invalidations between replicas; AGENT_CACHE_TTL bounds staleness when
+  another writer does not notify; if the LISTEN connection drops the
+  snapshot is bypassed until it is re-established (with backoff)
+Callers get deep copies, so mutating a returned dict or its skills / rules /
+triggers lists never touches the cache.
+"""
+import asyncio
+import copy
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+from ..config import AGENT_CACHE_TTL
+
+logger = logging.getLogger("cowork.db.agents")
+
+NOTIFY_CHANNEL = "cowork_agents"
+
+
+class AgentCache:
+    """Versioned snapshot of all agents, ordered like get_all_agents()."""
+
+    reconnect_delay = 1.0  # first LISTEN reconnect backoff, doubled up to 60s
+
+    def __init__(self, ttl: float = AGENT_CACHE_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self.instance_id = uuid.uuid4().hex  # NOTIFY payload: replicas skip their own
+        self._agents: Optional[list[dict]] = None
+        self._by_id: dict[str, dict] = {}
+        self._loaded_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener = None
+        self._engine = None  # set by listen(): invalidations are expected over NOTIFY
+        self._reconnect: Optional[asyncio.Task] = None
+        self._closing = False
+        self.stats = {"hits": 0, "loads": 0, "invalidations": 0, "remote_invalidations": 0,
+                      "listener_reconnects": 0}
+
+    def _fresh(self) -> bool:
+        if self._agents is None:
+            return False
+        if self._engine is not None and self._listener is None:
+            return False  # LISTEN is down: other replicas' writes would go unseen
+        return not self.ttl or time.monotonic() - self._loaded_at < self.ttl
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    async def _snapshot(self, loader: Callable[[], Awaitable[list[dict]]]) -> list[dict]:
+        if self._fresh():
+            self.stats["hits"] += 1
+            return self._agents
+        async with self._get_lock():
+            if self._fresh():
+                self.stats["hits"] += 1
+                return self._agents
+            version = self.version
+            agents = await loader()
+            self.stats["loads"] += 1
+            if version == self.version:  # no write landed while loading
+                self._agents = agents
+                self._by_id = {a["id"]: a for a in agents}
+                self._loaded_at = time.monotonic()
+            return agents
+
+    async def get_all(self, loader, department_id: Optional[str] = None) -> list[dict]:
+        agents = await self._snapshot(loader)
+        if department_id:
+            agents = [a for a in agents if a.get("department_id") == department_id]
+        return copy.deepcopy(agents)
+
+    async def get(self, loader, agent_id: str) -> Optional[dict]:
+        agents = await self._snapshot(loader)
+        by_id = self._by_id if agents is self._agents else {a["id"]: a for a in agents}
+        agent = by_id.get(agent_id)
+        return copy.deepcopy(agent) if agent else None
+
+    def invalidate(self, remote: bool = False) -> None:
+        self.version += 1
+        self._agents = None
+        self._by_id = {}
+        self.stats["remote_invalidations" if remote else "invalidations"] += 1
+
+    # ── LISTEN/NOTIFY ──
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        if payload != self.instance_id:
+            self.invalidate(remote=True)
+
+    async def listen(self, engine) -> None:
+        """Hold one asyncpg connection that LISTENs for other replicas' agent writes."""
+        self._engine = engine
+        await self._connect()
+
+    async def _connect(self) -> None:
+        conn = await self._engine.connect()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        raw.driver_connection.add_termination_listener(self._on_listener_lost)
+        self._listener = conn
+        logger.info(f"[DB] Agent cache listening on '{NOTIFY_CHANNEL}'")
+
+    def _on_listener_lost(self, connection) -> None:
+        lost, self._listener = self._listener, None
+        if self._closing or lost is None:
+            return
+        logger.warning("[DB] Agent cache LISTEN connection lost — reconnecting")
+        self.invalidate(remote=True)
+        if self._reconnect is None or self._reconnect.done():
+            self._reconnect = asyncio.get_running_loop().create_task(self._reconnect_loop(lost))
+
+    async def _reconnect_loop(self, lost) -> None:
+        try:
+            await lost.invalidate()
+        except Exception:
+            pass
+        delay = self.reconnect_delay
+        while not self._closing:
+            try:
+                await self._connect()
+            except Exception as e:
+                logger.warning(f"[DB] Agent cache LISTEN reconnect failed ({e}); retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+                continue
+            self.stats["listener_reconnects"] += 1
+            self.invalidate(remote=True)  # NOTIFYs sent while we were away are gone
+            return
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._reconnect is not None and not self._reconnect.done():
+            self._reconnect.cancel()
+            await asyncio.gather(self._reconnect, return_exceptions=True)
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "version": self.version,
+            "cached_agents": len(self._agents) if self._agents is not None else None,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._agents is not None else None,
+            "ttl_seconds": self.ttl,
+            "listening": self._listener is not None,
+        }
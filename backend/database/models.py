@@ -244,6 +244,9 @@ class LlmUsage(Base):
     model: Mapped[str] = mapped_column(String(100), nullable=False)
     input_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     output_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cache_read_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    cache_write_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    failover_from: Mapped[str] = mapped_column(String(150), nullable=True)  # "provider:model" on failover
     cost_usd = mapped_column(Numeric(10, 6), nullable=False, default=0)
     timestamp: Mapped[datetime] = mapped_column(TIMESTAMPTZ, default=_utcnow)
     __table_args__ = (
@@ -2,15 +2,63 @@
 COWORK.ARMY v7.0 — Database Repository (async CRUD)
 """
 from datetime import datetime, timezone
-from sqlalchemy import select, delete, update, func
+from sqlalchemy import select, delete, update, func, text
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from .models import Department, Agent, Task, Event, CargoLog, LlmUsage, TaskHistory, User
+from .agent_cache import NOTIFY_CHANNEL, AgentCache
+from .write_buffer import WriteBuffer
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
 
 
 class Database:
-    def __init__(self, session_factory: async_sessionmaker):
+    def __init__(self, session_factory: async_sessionmaker, write_buffer: bool = False):
         self._sf = session_factory
+        # Maintained by add_event / purge_old_events; seeded by one COUNT on first use
+        self._event_count: int | None = None
+        # Append-only writes (events, agent messages, task history) go through the
+        # write-behind buffer unless a caller passes sync=True; LLM usage is
+        # always committed at once for the budget check
+        self._writes = WriteBuffer(session_factory, on_flush=self._rows_flushed) if write_buffer else None
+        # get_agent / get_all_agents are served from memory; agent writes invalidate
+        self.agents = AgentCache()
+        self._notify_agents = False
+
+    def _rows_flushed(self, model: type, count: int) -> None:
+        if model is Event and self._event_count is not None:
+            self._event_count += count
+
+    async def _insert(self, model: type, row: dict, buffered: bool = True):
+        """Buffered insert, or an immediate single-row commit (returns the ORM object)."""
+        if self._writes is not None and buffered:
+            await self._writes.add(model, row)
+            return None
+        async with self._sf() as s:
+            obj = model(**row)
+            s.add(obj)
+            await s.commit()
+        return obj
+
+    async def flush_writes(self) -> int:
+        """Commit buffered writes now (read-your-writes before a query)."""
+        return await self._writes.flush() if self._writes is not None else 0
+
+    async def close(self) -> None:
+        """Flush buffered writes and stop the agent cache listener on shutdown."""
+        if self._writes is not None:
+            await self._writes.close()
+        await self.agents.close()
+
+    def get_write_stats(self) -> dict:
+        return self._writes.get_stats() if self._writes is not None else {"buffered": False}
+
+    async def enable_agent_notify(self, engine) -> None:
+        """Share agent cache invalidations with other replicas (Postgres LISTEN/NOTIFY)."""
+        await self.agents.listen(engine)
+        self._notify_agents = True
 
     # ── Departments ──
 
@@ -74,29 +122,39 @@ class Database:
                 },
             )
             await s.execute(stmt)
+            await self._agents_changed(s)
             await s.commit()
+        self.agents.invalidate()
 
-    async def get_all_agents(self, department_id: str | None = None) -> list[dict]:
+    async def _agents_changed(self, s) -> None:
+        """Queue a NOTIFY for other replicas; Postgres delivers it when the write commits."""
+        if self._notify_agents:
+            await s.execute(text("SELECT pg_notify(:channel, :sender)"),
+                            {"channel": NOTIFY_CHANNEL, "sender": self.agents.instance_id})
+
+    async def _load_agents(self) -> list[dict]:
         async with self._sf() as s:
             query = select(Agent).order_by(Agent.is_base.desc(), Agent.created_at)
-            if department_id:
-                query = query.where(Agent.department_id == department_id)
             result = await s.execute(query)
             return [self._agent_to_dict(a) for a in result.scalars().all()]
 
+    async def get_all_agents(self, department_id: str | None = None) -> list[dict]:
+        return await self.agents.get_all(self._load_agents, department_id)
+
     async def get_agent(self, agent_id: str) -> dict | None:
-        async with self._sf() as s:
-            result = await s.execute(select(Agent).where(Agent.id == agent_id))
-            a = result.scalar_one_or_none()
-            return self._agent_to_dict(a) if a else None
+        return await self.agents.get(self._load_agents, agent_id)
 
     async def delete_agent(self, agent_id: str) -> bool:
         async with self._sf() as s:
             result = await s.execute(
                 delete(Agent).where(Agent.id == agent_id, Agent.is_base == False)
             )
+            if result.rowcount > 0:
+                await self._agents_changed(s)
             await s.commit()
-            return result.rowcount > 0
+        if result.rowcount > 0:
+            self.agents.invalidate()
+        return result.rowcount > 0
 
     # ── Tasks ──
 
@@ -139,17 +197,29 @@ class Database:
     # ── Events ──
 
     async def add_event(self, agent_id: str, message: str, etype: str = "info",
-                        department_id: str | None = None):
-        async with self._sf() as s:
-            event = Event(agent_id=agent_id, message=message, type=etype,
-                          department_id=department_id)
-            s.add(event)
-            await s.commit()
+                        department_id: str | None = None, sync: bool = False) -> int | None:
+        """Returns the event id when committed at once (sync=True or no write buffer)."""
+        event = await self._insert(Event, {
+            "agent_id": agent_id, "message": message, "type": etype,
+            "department_id": department_id, "timestamp": _now(),
+        }, buffered=not sync)
+        if event is None:
+            return None
+        if self._event_count is not None:
+            self._event_count += 1
+        return event.id
 
     async def get_events(self, limit: int = 50, since: str = "",
-                         department_id: str | None = None) -> list[dict]:
+                         department_id: str | None = None,
+                         since_id: int | None = None) -> list[dict]:
+        """
+        Newest `limit` events, or with `since_id` the next `limit` events after
+        that id in ascending order (a resumable cursor: pass the last id back).
+        """
         async with self._sf() as s:
             query = select(Event)
+            if since_id is not None:
+                query = query.where(Event.id > since_id)
             if since:
                 try:
                     since_dt = datetime.fromisoformat(since.replace("Z", "+00:00"))
@@ -158,14 +228,18 @@ class Database:
                     pass
             if department_id:
                 query = query.where(Event.department_id == department_id)
-            query = query.order_by(Event.id.desc()).limit(limit)
+            order = Event.id.asc() if since_id is not None else Event.id.desc()
+            query = query.order_by(order).limit(limit)
             result = await s.execute(query)
             return [self._event_to_dict(e) for e in result.scalars().all()]
 
-    async def get_event_count(self) -> int:
-        async with self._sf() as s:
-            result = await s.execute(select(func.count(Event.id)))
-            return result.scalar() or 0
+    async def get_event_count(self, refresh: bool = False) -> int:
+        """Event total; counted once, then kept current by add_event / purge_old_events."""
+        if self._event_count is None or refresh:
+            async with self._sf() as s:
+                result = await s.execute(select(func.count(Event.id)))
+                self._event_count = result.scalar() or 0
+        return self._event_count
 
     # ── Cargo Logs ──
 
@@ -248,6 +322,7 @@ class Database:
     @staticmethod
     def _event_to_dict(e: Event) -> dict:
         return {
+            "id": e.id,
             "timestamp": e.timestamp.isoformat() if e.timestamp else "",
             "department_id": e.department_id,
             "agent_id": e.agent_id, "message": e.message, "type": e.type,
@@ -268,14 +343,21 @@ class Database:
 
     # ── Agent World — AgentMessageBus DB methods ──
 
-    async def save_agent_message(self, msg: dict) -> str:
+    async def save_agent_message(self, msg: dict, sync: bool = False) -> str:
         """Save an agent message to DB. Returns message id."""
+        import uuid
         from .models import AgentMessage
-        async with self._sf() as s:
-            obj = AgentMessage(**msg)
-            s.add(obj)
-            await s.commit()
-            return obj.id
+        # Buffered rows share one INSERT: every row carries the same columns
+        row = {
+            "id": msg.get("id") or str(uuid.uuid4()),
+            "from_agent": msg["from_agent"], "to_agent": msg["to_agent"],
+            "message_type": msg["message_type"], "priority": msg.get("priority", "MEDIUM"),
+            "payload": msg.get("payload") or {}, "thread_id": msg.get("thread_id"),
+            "cascade_id": msg.get("cascade_id"), "status": msg.get("status", "SENT"),
+            "created_at": msg.get("created_at") or _now(), "completed_at": msg.get("completed_at"),
+        }
+        await self._insert(AgentMessage, row, buffered=not sync)
+        return row["id"]
 
     async def get_agent_messages(self, limit: int = 50, cascade_id: str | None = None) -> list[dict]:
         """Get recent agent messages, optionally filtered by cascade_id."""
@@ -366,11 +448,14 @@ class Database:
 
     # ── LLM Usage Tracking ──
 
-    async def record_llm_usage(self, agent_id, provider, model, input_tokens, output_tokens, cost_usd):
-        async with self._sf() as s:
-            s.add(LlmUsage(agent_id=agent_id, provider=provider, model=model,
-                           input_tokens=input_tokens, output_tokens=output_tokens, cost_usd=cost_usd))
-            await s.commit()
+    async def record_llm_usage(self, agent_id, provider, model, input_tokens, output_tokens, cost_usd,
+                               cache_read_tokens=0, cache_write_tokens=0, failover_from=None):
+        await self._insert(LlmUsage, {
+            "agent_id": agent_id, "provider": provider, "model": model,
+            "input_tokens": input_tokens, "output_tokens": output_tokens,
+            "cache_read_tokens": cache_read_tokens, "cache_write_tokens": cache_write_tokens,
+            "failover_from": failover_from, "cost_usd": cost_usd, "timestamp": _now(),
+        }, buffered=False)
 
     async def get_usage_summary(self, period="day"):
         from datetime import timedelta
@@ -380,12 +465,16 @@ class Database:
             result = await s.execute(
                 select(func.sum(LlmUsage.input_tokens).label("ti"),
                        func.sum(LlmUsage.output_tokens).label("to"),
+                       func.sum(LlmUsage.cache_read_tokens).label("tcr"),
+                       func.sum(LlmUsage.cache_write_tokens).label("tcw"),
                        func.sum(LlmUsage.cost_usd).label("tc"),
                        func.count(LlmUsage.id).label("cc"))
                 .where(LlmUsage.timestamp >= cutoff))
             row = result.one()
             return {"period": period, "total_input_tokens": int(row.ti or 0),
                     "total_output_tokens": int(row.to or 0),
+                    "total_cache_read_tokens": int(row.tcr or 0),
+                    "total_cache_write_tokens": int(row.tcw or 0),
                     "total_cost_usd": float(row.tc or 0), "call_count": int(row.cc or 0)}
 
     async def get_usage_by_agent(self, agent_id):
@@ -394,7 +483,9 @@ class Database:
                 select(LlmUsage).where(LlmUsage.agent_id == agent_id)
                 .order_by(LlmUsage.timestamp.desc()).limit(100))
             return [{"provider": r.provider, "model": r.model, "input_tokens": r.input_tokens,
-                     "output_tokens": r.output_tokens, "cost_usd": float(r.cost_usd),
+                     "output_tokens": r.output_tokens, "cache_read_tokens": r.cache_read_tokens,
+                     "cache_write_tokens": r.cache_write_tokens, "failover_from": r.failover_from,
+                     "cost_usd": float(r.cost_usd),
                      "timestamp": r.timestamp.isoformat()} for r in result.scalars().all()]
 
     async def get_daily_spend(self):
@@ -406,11 +497,11 @@ class Database:
 
     # ── Task History ──
 
-    async def record_task_transition(self, task_id, old_status, new_status, changed_by="system"):
-        async with self._sf() as s:
-            s.add(TaskHistory(task_id=task_id, old_status=old_status,
-                             new_status=new_status, changed_by=changed_by))
-            await s.commit()
+    async def record_task_transition(self, task_id, old_status, new_status, changed_by="system", sync=False):
+        await self._insert(TaskHistory, {
+            "task_id": task_id, "old_status": old_status, "new_status": new_status,
+            "changed_by": changed_by, "changed_at": _now(),
+        }, buffered=not sync)
 
     async def get_task_history(self, task_id):
         async with self._sf() as s:
@@ -427,7 +518,9 @@ class Database:
         async with self._sf() as s:
             result = await s.execute(delete(Event).where(Event.timestamp < cutoff))
             await s.commit()
-            return result.rowcount
+        if self._event_count is not None:
+            self._event_count = max(0, self._event_count - (result.rowcount or 0))
+        return result.rowcount
 
     # ── User Auth ──
 
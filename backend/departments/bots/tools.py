@@ -124,6 +124,7 @@ BOTS_TOOL_DEFINITIONS = [
     {
         "name": "fetch_x_trends",
         "description": "Fetch trending topics for crypto or other subjects from real-time sources",
+        "parallel_safe": True,
         "parameters": {
             "topic": {"type": "string", "description": "Topic to search trends for (e.g., 'crypto', 'bitcoin')"},
             "language": {"type": "string", "description": "Language code (tr, en)"},
@@ -133,6 +134,7 @@ BOTS_TOOL_DEFINITIONS = [
     {
         "name": "generate_social_content",
         "description": "Generate social media content template for a topic",
+        "parallel_safe": True,
         "parameters": {
             "topic": {"type": "string", "description": "Content topic"},
             "platform": {"type": "string", "description": "Platform: x, instagram"},
@@ -143,6 +145,7 @@ BOTS_TOOL_DEFINITIONS = [
     {
         "name": "check_website_status",
         "description": "Check if a website is online and measure response time",
+        "parallel_safe": True,
         "parameters": {
             "url": {"type": "string", "description": "Full URL to check (https://...)"},
         },
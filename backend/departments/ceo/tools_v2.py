@@ -255,6 +255,7 @@ CEO_V2_TOOL_DEFINITIONS = [
     {
         "name": "get_dept_deep_dive",
         "description": "Bir departmanin ozel metriklerini ve son olaylarini derinlemesine analiz eder.",
+        "parallel_safe": True,
         "input_schema": {
             "type": "object",
             "properties": {"dept": {"type": "string", "enum": list(DEPT_CONTEXT.keys())}},
@@ -264,6 +265,7 @@ CEO_V2_TOOL_DEFINITIONS = [
     {
         "name": "brainstorm_improvements",
         "description": "Gemini AI kullanarak departman icin somut iyilestirme gorevleri uretir.",
+        "parallel_safe": True,
         "input_schema": {
             "type": "object",
             "properties": {
@@ -21,6 +21,7 @@ HOTEL_TOOLS = [
     {
         "name": "dynamic_pricing",
         "description": "Dinamik fiyatlandirma hesapla (sezon, doluluk, talep bazli)",
+        "parallel_safe": True,
         "parameters": {
             "room_type": {"type": "string", "description": "Oda tipi"},
             "date": {"type": "string", "description": "Tarih (YYYY-MM-DD)"},
@@ -32,6 +33,7 @@ HOTEL_TOOLS = [
     {
         "name": "search_flights",
         "description": "Ucus arama ve fiyat karsilastirma",
+        "parallel_safe": True,
         "parameters": {
             "origin": {"type": "string", "description": "Kalkis havaalani kodu (BKK, IST, SAW)"},
             "destination": {"type": "string", "description": "Varis havaalani kodu"},
@@ -40,6 +40,7 @@ MEDICAL_TOOLS = [
     {
         "name": "analyze_investment",
         "description": "Medikal uretim yatirim analizi (BOI tesvik, maliyet, pazar)",
+        "parallel_safe": True,
         "parameters": {
             "product_type": {"type": "string", "description": "Urun tipi (gloves, masks, medical_devices)"},
             "location": {"type": "string", "description": "Fabrika konumu (EEC bolgeleri)"},
@@ -51,6 +52,7 @@ MEDICAL_TOOLS = [
     {
         "name": "check_compliance",
         "description": "Medikal uyumluluk kontrolu (ISO, FDA, CE)",
+        "parallel_safe": True,
         "parameters": {
             "standard": {"type": "string", "description": "Standart (ISO_13485, FDA_510k, CE_mark, GMP)"},
             "product": {"type": "string", "description": "Urun adi"},
@@ -27,6 +27,7 @@ SOFTWARE_TOOLS = [
     {
         "name": "design_api",
         "description": "REST API endpoint tasarla (OpenAPI spec formatinda)",
+        "parallel_safe": True,
         "parameters": {
             "method": {"type": "string", "description": "HTTP method (GET, POST, PUT, DELETE)"},
             "path": {"type": "string", "description": "Endpoint path (/api/...)"},
@@ -48,6 +49,7 @@ SOFTWARE_TOOLS = [
     {
         "name": "optimize_prompt",
         "description": "Agent system prompt optimize et (A/B test, metrik olcum)",
+        "parallel_safe": True,
         "parameters": {
             "agent_id": {"type": "string", "description": "Hedef agent ID"},
             "current_prompt": {"type": "string", "description": "Mevcut system prompt"},
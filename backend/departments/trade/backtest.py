@@ -0,0 +1,412 @@
+"""
+COWORK.ARMY — Trade Backtest Engine
+Offline replay of generate_signal's scoring rules over historical candles.
+- Candles are read from local CSV or Parquet (timestamp, open, high, low,
+  close, volume); no exchange access is needed
+- Every bar is scored as generate_signal would score it from the `window`
+  candles ending at that bar (analyze_chart's 100 by default):
+    RSI / MACD / EMA trend evaluated on each window as one 2-D NumPy batch,
+    BOS and Elliott Wave from full-series swing dominance limited to the window,
+    macro bias from the 1d / 1w candles resampled from the same data (49 closed
+    bars plus the forming one, like the live 50-candle fetch)
+- Positions, PnL, drawdown and per-trade stats are vectorized
+- Parameter sweeps are spread over a process pool; bar scores are computed
+  once per (window, macro) group in each worker
+
+    python -m backend.departments.trade.backtest candles.csv --timeframe 1h [--sweep]
+"""
+from __future__ import annotations
+import argparse
+import csv
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from . import indicators
+from .market_data import timeframe_seconds
+from .structure import MarketStructure
+
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+DEFAULT_WINDOW = 100
+MACRO_TIMEFRAMES = ("1d", "1w")
+MACRO_WINDOW = 50
+_WEEK_OFFSET_MS = 4 * 86400 * 1000
+_CHUNK_ROWS = 8192
+
+
+# ── Loading ──
+
+def _to_ms(value) -> int:
+    """Epoch milliseconds from a number, ISO-8601 string or datetime (naive = UTC)."""
+    if isinstance(value, str):
+        try:
+            return int(float(value))
+        except ValueError:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+
+def _from_rows(rows: list) -> dict[str, np.ndarray]:
+    rows.sort(key=lambda r: r[0])
+    candles = {"timestamp": np.array([r[0] for r in rows], dtype=np.int64)}
+    for i, name in enumerate(COLUMNS[1:], start=1):
+        candles[name] = np.array([r[i] for r in rows], dtype=np.float64)
+    return candles
+
+
+def load_candles(path: str) -> dict[str, np.ndarray]:
+    """
+    Read OHLCV from .csv or .parquet into column arrays sorted by time.
+    Timestamps may be epoch milliseconds or ISO-8601 strings; a header row
+    is optional for CSV.
+    """
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is not installed. Run: pip install pyarrow")
+        table = pq.read_table(path, columns=list(COLUMNS)).to_pydict()
+        ts = [_to_ms(t) for t in table["timestamp"]]
+        rows = list(zip(ts, *(table[c] for c in COLUMNS[1:])))
+        return _from_rows(rows)
+
+    rows = []
+    with open(path, newline="") as f:
+        for record in csv.reader(f):
+            if not record:
+                continue
+            try:
+                values = [float(x) for x in record[1:6]]
+            except ValueError:
+                continue  # header
+            rows.append((_to_ms(record[0]), *values))
+    return _from_rows(rows)
+
+
+def _bucket_starts(timestamps: np.ndarray, timeframe: str) -> np.ndarray:
+    tf_ms = timeframe_seconds(timeframe) * 1000
+    offset = _WEEK_OFFSET_MS if timeframe.endswith("w") else 0
+    return (timestamps - offset) // tf_ms * tf_ms + offset
+
+
+def resample(candles: dict[str, np.ndarray], timeframe: str) -> dict[str, np.ndarray]:
+    """Aggregate candles into a higher timeframe (weeks start on Monday, like the exchanges)."""
+    buckets = _bucket_starts(candles["timestamp"], timeframe)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return {
+        "timestamp": buckets[starts],
+        "open": candles["open"][starts],
+        "high": np.maximum.reduceat(candles["high"], starts),
+        "low": np.minimum.reduceat(candles["low"], starts),
+        "close": candles["close"][ends],
+        "volume": np.add.reduceat(candles["volume"], starts),
+    }
+
+
+# ── Per-bar scoring ──
+
+def _window_trend(closes: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """RSI (rounded like _calc_rsi), MACD histogram and EMA20 - EMA50 sign for each full window."""
+    n = len(closes)
+    rsi_raw = indicators.rsi(closes)
+    rsi = np.full(n, 50.0)
+    rsi[14:] = [round(x, 2) for x in rsi_raw[14:].tolist()]
+
+    hist = np.full(n, np.nan)
+    ema_diff = np.full(n, np.nan)
+    windows = sliding_window_view(closes, window)
+    for start in range(0, len(windows), _CHUNK_ROWS):
+        block = windows[start:start + _CHUNK_ROWS]
+        rows = slice(start + window - 1, start + window - 1 + len(block))
+        m = indicators.macd(block)
+        hist[rows] = m["histogram"][:, -1] if m["signal"].shape[-1] else 0.0
+        ema_diff[rows] = np.sign(indicators.ema(block, 20)[:, -1] - indicators.ema(block, min(50, window))[:, -1])
+    return rsi, hist, ema_diff
+
+
+def _latest_swings(structure: MarketStructure, lookback: int, window: int, side: str):
+    """
+    Prices of the last two swings visible at every bar t: a swing needs
+    `lookback` bars on both sides inside the window [t - window + 1, t].
+    """
+    left, right = structure.swing_spans(side)
+    prices = structure.highs if side == "high" else structure.lows
+    left, right, prices = np.asarray(left), np.asarray(right), np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    idx = np.arange(n)
+    last = np.maximum.accumulate(np.where((left >= lookback) & (right >= lookback), idx, -1))
+
+    at = idx - lookback
+    s1 = np.where(at >= 0, last[np.clip(at, 0, None)], -1)
+    s2 = np.where(s1 >= 1, last[np.clip(s1 - 1, 0, None)], -1)
+    earliest = idx - window + 1 + lookback
+    valid = (s2 >= 0) & (s2 >= earliest)
+    return valid, prices[np.clip(s1, 0, None)], prices[np.clip(s2, 0, None)]
+
+
+def _macro_bias(candles: dict[str, np.ndarray], timeframe: str) -> np.ndarray:
+    """
+    +1 / -1 / 0 per bar following _get_macro_trend: each higher timeframe's
+    last 50 candles are the 49 closed ones plus the forming candle, whose
+    close is the bar's close. Timeframes without 49 closed bars are skipped.
+    """
+    closes = candles["close"]
+    n = len(closes)
+    trends = []
+    for macro_tf in MACRO_TIMEFRAMES:
+        if timeframe_seconds(macro_tf) < timeframe_seconds(timeframe):
+            continue
+        higher = resample(candles, macro_tf)
+        bucket = np.searchsorted(higher["timestamp"], _bucket_starts(candles["timestamp"], macro_tf))
+        closed = MACRO_WINDOW - 1
+        hc = higher["close"]
+        trend = np.full(n, np.nan)
+        if len(hc) >= closed:
+            hw = sliding_window_view(hc, closed)
+            ema20_prev = indicators.ema(hw, 20)[:, -1]
+            sums = hw[:, 0].copy()
+            for j in range(1, closed):
+                sums += hw[:, j]
+            # Bar t in bucket b sees closed candles b-49 .. b-1
+            row = bucket - closed
+            ok = row >= 0
+            r = row[ok]
+            cur = closes[ok]
+            k = 2 / 21
+            ema20 = cur * k + ema20_prev[r] * (1 - k)
+            ema50 = (sums[r] + cur) / MACRO_WINDOW
+            trend[ok] = np.where((ema20 > ema50) & (cur > ema20), 1.0,
+                                 np.where((ema20 < ema50) & (cur < ema20), -1.0, 0.0))
+        trends.append(trend)
+
+    if not trends:
+        return np.zeros(n)
+    t = np.vstack(trends)
+    available = ~np.isnan(t)
+    count = available.sum(axis=0)
+    bulls = (t == 1).sum(axis=0)
+    bears = (t == -1).sum(axis=0)
+    bias = np.where(bulls > 0, 1.0, np.where(bears > 0, -1.0, 0.0))
+    bias = np.where((bears == count) & (count > 0), -1.0, bias)
+    bias = np.where((bulls == count) & (count > 0), 1.0, bias)
+    return np.where(count > 0, bias, 0.0)
+
+
+def signal_scores(candles: dict[str, np.ndarray], timeframe: str = "4h",
+                  window: int = DEFAULT_WINDOW, macro: bool = True) -> dict[str, np.ndarray]:
+    """
+    generate_signal's score for every bar (NaN during the first window - 1
+    bars) plus the components it was built from.
+    """
+    if window < 50:
+        raise ValueError("window must be at least 50 candles")
+    closes = candles["close"]
+    n = len(closes)
+    score = np.full(n, np.nan)
+    if n < window:
+        return {"score": score}
+
+    rsi, hist, ema_dir = _window_trend(closes, window)
+    structure = MarketStructure(candles["high"].tolist(), candles["low"].tolist())
+
+    h_ok, sh1, sh2 = _latest_swings(structure, 5, window, "high")
+    l_ok, sl1, sl2 = _latest_swings(structure, 5, window, "low")
+    bull_bos = h_ok & (closes > sh1) & (sh1 > sh2)
+    bear_bos = l_ok & (closes < sl1) & (sl1 < sl2)
+    bos = np.where(bear_bos, -1.0, np.where(bull_bos, 1.0, 0.0))
+
+    h3_ok, eh1, eh2 = _latest_swings(structure, 3, window, "high")
+    l3_ok, el1, el2 = _latest_swings(structure, 3, window, "low")
+    uptrend = h3_ok & l3_ok & (eh1 > eh2) & (el1 > el2)
+    move_up = eh1 - el1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        retracement = np.where(move_up > 0, (eh1 - closes) / move_up, 0.0)
+    impulse = uptrend & (retracement < 0.236)
+
+    bias = _macro_bias(candles, timeframe) if macro else np.zeros(n)
+
+    total = (
+        np.where(rsi < 35, 2.0, np.where(rsi > 65, -2.0, 0.0))
+        + np.where(hist > 0, 1.0, -1.0)
+        + np.where(ema_dir > 0, 1.0, -1.0)
+        + 2.0 * bos
+        + impulse
+        + bias
+    )
+    score[window - 1:] = total[window - 1:]
+    return {
+        "score": score,
+        "rsi": rsi,
+        "macd_histogram": hist,
+        "bos": bos,
+        "elliott_impulse": impulse,
+        "macro_bias": bias,
+    }
+
+
+# ── Simulation ──
+
+def _positions(score: np.ndarray, entry: float, exit: float, allow_short: bool) -> np.ndarray:
+    """Target position after each bar's close: enter at |score| >= entry, flatten at |score| <= exit."""
+    n = len(score)
+    target = np.full(n, np.nan)
+    target[score >= entry] = 1.0
+    target[score <= -entry] = -1.0 if allow_short else 0.0
+    target[np.abs(score) <= exit] = 0.0
+    target[np.isnan(score)] = 0.0
+    # Forward-fill bars that neither enter nor exit
+    last = np.maximum.accumulate(np.where(np.isnan(target), 0, np.arange(n)))
+    return target[last]
+
+
+def simulate(candles: dict[str, np.ndarray], score: np.ndarray, timeframe: str = "4h",
+             entry: float = 2, exit: float = 1, allow_short: bool = True,
+             fee_bps: float = 4.0) -> dict:
+    """PnL of trading the score at each bar's close, filled at that close."""
+    closes = candles["close"]
+    n = len(closes)
+    pos = _positions(score, entry, exit, allow_short)
+    pos[-1] = 0.0  # everything is closed on the last bar
+    returns = np.zeros(n)
+    returns[1:] = closes[1:] / closes[:-1] - 1
+    held = np.r_[0.0, pos[:-1]]
+    changed = pos != held
+    # Exit fees land on the closing trade's last bar, entry fees on the new trade's first
+    fee = fee_bps / 10000
+    strat = held * returns - fee * changed * np.abs(held)
+    strat[1:] -= fee * changed[:-1] * np.abs(pos[:-1])
+
+    equity = np.cumprod(1 + strat)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    # A trade spans the bars held with one non-zero position
+    starts = np.flatnonzero(np.diff(np.r_[0.0, held]) != 0)
+    trade_returns = np.array([])
+    if len(starts):
+        per_segment = np.expm1(np.add.reduceat(np.log1p(strat), starts))
+        trade_returns = per_segment[held[starts] != 0]
+
+    bars_per_year = 365 * 86400 / timeframe_seconds(timeframe)
+    std = strat.std()
+    wins = trade_returns[trade_returns > 0]
+    losses = trade_returns[trade_returns < 0]
+    return {
+        "bars": n,
+        "total_return_pct": round(float(equity[-1] - 1) * 100, 2),
+        "max_drawdown_pct": round(float(drawdown.min()) * 100, 2),
+        "sharpe": round(float(strat.mean() / std) * math.sqrt(bars_per_year), 2) if std > 0 else 0.0,
+        "trades": int(len(trade_returns)),
+        "win_rate_pct": round(len(wins) / len(trade_returns) * 100, 2) if len(trade_returns) else 0.0,
+        "avg_trade_pct": round(float(trade_returns.mean()) * 100, 3) if len(trade_returns) else 0.0,
+        "profit_factor": round(float(wins.sum() / -losses.sum()), 2) if len(losses) else None,
+        "exposure_pct": round(np.count_nonzero(held) / n * 100, 2),
+    }
+
+
+def run_backtest(candles: dict[str, np.ndarray], timeframe: str = "4h", window: int = DEFAULT_WINDOW,
+                 macro: bool = True, entry: float = 2, exit: float = 1, allow_short: bool = True,
+                 fee_bps: float = 4.0) -> dict:
+    """Score every bar and trade it; returns the metrics with the parameters used."""
+    scores = signal_scores(candles, timeframe, window, macro)
+    result = simulate(candles, scores["score"], timeframe, entry, exit, allow_short, fee_bps)
+    params = {"window": window, "macro": macro, "entry": entry, "exit": exit,
+              "allow_short": allow_short, "fee_bps": fee_bps}
+    return {"params": params, **result}
+
+
+# ── Parameter sweeps ──
+
+_SCORE_KEYS = ("window", "macro")
+_worker_candles: Optional[dict] = None
+_worker_timeframe = "4h"
+_worker_scores: dict[tuple, np.ndarray] = {}
+
+
+def _init_worker(candles: dict, timeframe: str) -> None:
+    global _worker_candles, _worker_timeframe
+    _worker_candles, _worker_timeframe = candles, timeframe
+    _worker_scores.clear()
+
+
+def _run_params(params: dict) -> dict:
+    key = tuple(params[k] for k in _SCORE_KEYS)
+    score = _worker_scores.get(key)
+    if score is None:
+        score = signal_scores(_worker_candles, _worker_timeframe, *key)["score"]
+        _worker_scores[key] = score
+    trade_params = {k: v for k, v in params.items() if k not in _SCORE_KEYS}
+    return {"params": params, **simulate(_worker_candles, score, _worker_timeframe, **trade_params)}
+
+
+def sweep(candles: dict[str, np.ndarray], grid: dict[str, list], timeframe: str = "4h",
+          processes: Optional[int] = None, sort_by: str = "sharpe") -> list[dict]:
+    """
+    Backtest every combination of `grid` (keys of run_backtest) across a
+    process pool, best first. Combinations sharing a (window, macro) pair are
+    sent to workers together so their bar scores are computed once.
+    """
+    defaults = {"window": DEFAULT_WINDOW, "macro": True, "entry": 2, "exit": 1,
+                "allow_short": True, "fee_bps": 4.0}
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    axes = {k: list(grid.get(k, [v])) for k, v in defaults.items()}
+    combos = [dict(zip(axes, values)) for values in itertools.product(*axes.values())]
+    combos.sort(key=lambda p: tuple(p[k] for k in _SCORE_KEYS))
+
+    processes = processes or min(os.cpu_count() or 1, len(combos))
+    if processes <= 1:
+        _init_worker(candles, timeframe)
+        results = [_run_params(p) for p in combos]
+    else:
+        chunk = max(1, math.ceil(len(combos) / processes))
+        # spawn: sweeps are also started from the API server's threads, where fork is unsafe
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(processes, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(candles, timeframe)) as pool:
+            results = list(pool.map(_run_params, combos, chunksize=chunk))
+
+    results.sort(key=lambda r: r[sort_by] if r[sort_by] is not None else -math.inf, reverse=True)
+    return results
+
+
+# ── CLI ──
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", help="CSV or Parquet candles")
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--no-macro", action="store_true")
+    parser.add_argument("--sweep", action="store_true", help="Grid over entry/exit/short/macro")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    candles = load_candles(args.path)
+    if args.sweep:
+        grid = {"entry": [2, 3, 4], "exit": [0, 1], "allow_short": [True, False],
+                "macro": [True, False], "window": [args.window]}
+        output = sweep(candles, grid, args.timeframe, args.processes)[:10]
+    else:
+        output = run_backtest(candles, args.timeframe, args.window, not args.no_macro)
+    print(json.dumps(output, indent=2))
+    print(f"{len(candles['close'])} candles in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
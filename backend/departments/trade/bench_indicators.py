@@ -0,0 +1,141 @@
+"""
+COWORK.ARMY — Indicator micro-benchmark
+Compares the NumPy engine (indicators.py) with the original list-based
+implementations kept below as reference, and checks they agree exactly.
+
+    python -m backend.departments.trade.bench_indicators [--symbols 300] [--bars 100]
+"""
+from __future__ import annotations
+import argparse
+import math
+import random
+import time
+
+from . import indicators
+
+
+# ── Reference: original pure-Python implementations ──
+
+def ref_rsi(closes: list[float], period: int = 14) -> float:
+    if len(closes) < period + 1:
+        return 50.0
+    deltas = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
+    gains = [d for d in deltas[-period:] if d > 0]
+    losses = [-d for d in deltas[-period:] if d < 0]
+    avg_gain = sum(gains) / period if gains else 0
+    avg_loss = sum(losses) / period if losses else 0.001
+    rs = avg_gain / avg_loss
+    return round(100 - (100 / (1 + rs)), 2)
+
+
+def ref_ema(closes: list[float], period: int) -> list[float]:
+    if len(closes) < period:
+        return closes
+    k = 2 / (period + 1)
+    ema = [sum(closes[:period]) / period]
+    for price in closes[period:]:
+        ema.append(price * k + ema[-1] * (1 - k))
+    return ema
+
+
+def ref_macd(closes: list[float]) -> dict:
+    ema12 = ref_ema(closes, 12)
+    ema26 = ref_ema(closes, 26)
+    min_len = min(len(ema12), len(ema26))
+    macd_line = [ema12[-(min_len - i)] - ema26[-(min_len - i)] for i in range(min_len)]
+    signal = ref_ema(macd_line, 9)
+    histogram = macd_line[-1] - signal[-1] if signal else 0
+    return {
+        "macd": round(macd_line[-1], 4) if macd_line else 0,
+        "signal": round(signal[-1], 4) if signal else 0,
+        "histogram": round(histogram, 4),
+        "trend": "bullish" if histogram > 0 else "bearish",
+    }
+
+
+def ref_bollinger(closes: list[float], period: int = 20) -> dict:
+    if len(closes) < period:
+        return {"upper": 0, "middle": 0, "lower": 0}
+    recent = closes[-period:]
+    middle = sum(recent) / period
+    std = math.sqrt(sum((x - middle) ** 2 for x in recent) / period)
+    return {
+        "upper": round(middle + 2 * std, 4),
+        "middle": round(middle, 4),
+        "lower": round(middle - 2 * std, 4),
+        "bandwidth": round(4 * std / middle * 100, 2),
+    }
+
+
+def ref_screen(closes: list[float]) -> dict:
+    """What screening one symbol costs with the list implementations."""
+    return {
+        "rsi": ref_rsi(closes),
+        "ema20": ref_ema(closes, 20)[-1],
+        "ema50": ref_ema(closes, min(50, len(closes)))[-1],
+        "macd": ref_macd(closes),
+        "bollinger": ref_bollinger(closes),
+    }
+
+
+# ── Benchmark ──
+
+def random_walk(n: int, seed: int, base: float = 100.0) -> list[float]:
+    rng = random.Random(seed)
+    out, price = [], base
+    for _ in range(n):
+        price *= 1 + rng.uniform(-0.02, 0.02)
+        out.append(price)
+    return out
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(symbols: int = 300, bars: int = 100, repeat: int = 5) -> dict:
+    universe = {f"SYM{i}/USDT": random_walk(bars, seed=i) for i in range(symbols)}
+
+    list_s = _best_of(lambda: [ref_screen(c) for c in universe.values()], repeat)
+    batch_s = _best_of(lambda: indicators.compute_batch(universe), repeat)
+
+    batch = indicators.compute_batch(universe)
+    mismatches = 0
+    for sym, closes in universe.items():
+        ref, row = ref_screen(closes), batch[sym]
+        if bars >= 15 and round(row["rsi"], 2) != ref["rsi"]:
+            mismatches += 1
+        if row["ema20"] != ref["ema20"] or row["ema50"] != ref["ema50"]:
+            mismatches += 1
+        if round(row["macd_histogram"], 4) != ref["macd"]["histogram"]:
+            mismatches += 1
+        if bars >= 20 and round(row["bb_upper"], 4) != ref["bollinger"]["upper"]:
+            mismatches += 1
+
+    return {
+        "symbols": symbols,
+        "bars": bars,
+        "list_ms": round(list_s * 1000, 2),
+        "numpy_batch_ms": round(batch_s * 1000, 2),
+        "speedup": round(list_s / batch_s, 1) if batch_s else None,
+        "mismatches": mismatches,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--bars", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for key, value in run(args.symbols, args.bars, args.repeat).items():
+        print(f"{key:>16}: {value}")
+
+
+if __name__ == "__main__":
+    main()
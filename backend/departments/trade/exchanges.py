@@ -0,0 +1,230 @@
+"""
+COWORK.ARMY — Trade Exchange Client Pool
+One long-lived ccxt client per exchange for the whole process.
+- Keeps loaded markets and the HTTP keep-alive session between tool calls
+- Market metadata is loaded lazily and refreshed every EXCHANGE_MARKETS_TTL
+- Rate-limit accounting is shared by every caller of an exchange: slots are
+  reserved under a lock, callers sleep outside it (time.sleep or asyncio.sleep)
+- Per-exchange health: latency, error counts, healthy / degraded / down
+ccxt's own per-instance throttle is disabled because it is not thread-safe;
+the pool's limiter uses the exchange's published `rateLimit` instead.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+EXCHANGE_MARKETS_TTL = float(os.environ.get("EXCHANGE_MARKETS_TTL", 3600))
+EXCHANGE_DOWN_AFTER = int(os.environ.get("EXCHANGE_DOWN_AFTER", 3))
+EXCHANGE_TIMEOUT_MS = int(os.environ.get("EXCHANGE_TIMEOUT_MS", 10000))
+
+EXCHANGE_CLASSES = {
+    "binance": "binance",
+    "bybit": "bybit",
+    "okx": "okx",
+    "kucoin": "kucoin",
+    "gate": "gate",
+}
+DEFAULT_EXCHANGE = "binance"
+
+
+def _ccxt_factory(name: str):
+    try:
+        import ccxt
+    except ImportError:
+        raise ImportError("ccxt is not installed. Run: pip install ccxt")
+    cls_name = EXCHANGE_CLASSES[name]
+    # Older ccxt releases only ship the "gateio" alias
+    cls = getattr(ccxt, cls_name, None) or getattr(ccxt, f"{cls_name}io")
+    return cls({"enableRateLimit": False, "timeout": EXCHANGE_TIMEOUT_MS})
+
+
+class RateLimiter:
+    """Minimum spacing between requests, shared across threads and coroutines."""
+
+    def __init__(self, interval_seconds: float):
+        self.interval = max(0.0, interval_seconds)
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+        self.waited_total = 0.0
+
+    def reserve(self) -> float:
+        """Claim the next request slot; returns how long the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            wait = slot - now
+            self.waited_total += wait
+        return wait
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class ExchangeHealth:
+    """Rolling health of one exchange."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.latency_ms_avg = 0.0
+        self.last_error = ""
+        self.last_ok_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, latency_s: float, error: Optional[Exception] = None) -> None:
+        with self._lock:
+            self.calls += 1
+            latency_ms = latency_s * 1000
+            self.latency_ms_avg = latency_ms if self.calls == 1 else 0.8 * self.latency_ms_avg + 0.2 * latency_ms
+            if error is None:
+                self.consecutive_errors = 0
+                self.last_ok_at = time.time()
+            else:
+                self.errors += 1
+                self.consecutive_errors += 1
+                self.last_error = f"{type(error).__name__}: {error}"[:200]
+
+    @property
+    def status(self) -> str:
+        if self.consecutive_errors >= EXCHANGE_DOWN_AFTER:
+            return "down"
+        if self.consecutive_errors:
+            return "degraded"
+        return "healthy"
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "calls": self.calls,
+            "errors": self.errors,
+            "consecutive_errors": self.consecutive_errors,
+            "latency_ms_avg": round(self.latency_ms_avg, 1),
+            "last_error": self.last_error,
+            "last_ok_at": self.last_ok_at,
+        }
+
+
+class PooledExchange:
+    """
+    Proxy around a shared ccxt client. Network methods (fetch_*, load_markets)
+    go through the shared limiter and health tracking; everything else is
+    passed straight to the client.
+    """
+
+    def __init__(self, name: str, client, markets_ttl: float = EXCHANGE_MARKETS_TTL):
+        self.name = name
+        self.client = client
+        self.markets_ttl = markets_ttl
+        rate_limit_ms = getattr(client, "rateLimit", 0)
+        self.limiter = RateLimiter((rate_limit_ms if isinstance(rate_limit_ms, (int, float)) else 0) / 1000)
+        self.health = ExchangeHealth()
+        self.markets_loaded_at: Optional[float] = None
+        self._markets_lock = threading.Lock()
+
+    def _timed(self, fn: Callable, *args, **kwargs):
+        self.limiter.acquire()
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.health.record(time.monotonic() - start, e)
+            raise
+        self.health.record(time.monotonic() - start)
+        return result
+
+    def ensure_markets(self) -> None:
+        """Load markets on first use and again once they are older than markets_ttl."""
+        loaded = self.markets_loaded_at
+        if loaded is not None and time.monotonic() - loaded < self.markets_ttl:
+            return
+        with self._markets_lock:
+            loaded = self.markets_loaded_at
+            if loaded is not None and time.monotonic() - loaded < self.markets_ttl:
+                return
+            self._timed(self.client.load_markets, loaded is not None)
+            self.markets_loaded_at = time.monotonic()
+
+    def __getattr__(self, attr: str):
+        value = getattr(self.client, attr)
+        if not callable(value) or not attr.startswith("fetch_"):
+            return value
+
+        def call(*args, **kwargs):
+            self.ensure_markets()
+            return self._timed(value, *args, **kwargs)
+
+        return call
+
+
+class ExchangePool:
+    """Process-wide registry of PooledExchange clients, created on first use."""
+
+    def __init__(self, factory: Callable = _ccxt_factory, markets_ttl: float = EXCHANGE_MARKETS_TTL):
+        self._factory = factory
+        self.markets_ttl = markets_ttl
+        self._clients: dict[str, PooledExchange] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resolve(exchange_name: str) -> str:
+        name = (exchange_name or DEFAULT_EXCHANGE).lower()
+        return name if name in EXCHANGE_CLASSES else DEFAULT_EXCHANGE
+
+    def get(self, exchange_name: str = DEFAULT_EXCHANGE) -> PooledExchange:
+        name = self.resolve(exchange_name)
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = PooledExchange(name, self._factory(name), self.markets_ttl)
+                    self._clients[name] = client
+        return client
+
+    def is_healthy(self, exchange_name: str) -> bool:
+        client = self._clients.get(self.resolve(exchange_name))
+        return client is None or client.health.status != "down"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+    def get_stats(self) -> dict:
+        return {
+            name: {
+                **c.health.to_dict(),
+                "markets_loaded": c.markets_loaded_at is not None,
+                "markets_age_s": round(time.monotonic() - c.markets_loaded_at, 1)
+                if c.markets_loaded_at is not None else None,
+                "rate_limit_ms": round(c.limiter.interval * 1000),
+                "rate_limit_waited_s": round(c.limiter.waited_total, 2),
+            }
+            for name, c in list(self._clients.items())
+        }
+
+
+_pool: Optional[ExchangePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_exchange_pool() -> ExchangePool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ExchangePool()
+    return _pool
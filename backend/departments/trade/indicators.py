@@ -0,0 +1,176 @@
+"""
+COWORK.ARMY — Trade Indicator Engine (NumPy)
+Array-backed RSI / EMA / MACD / Bollinger over whole series.
+- Every function accepts a 1-D series or a 2-D (symbols × bars) batch and
+  works along the last axis
+- Results are full series (not just the last value) and unrounded;
+  tools_impl rounds exactly like before
+- Numerics match the original list implementations bit-for-bit: window sums
+  are accumulated left-to-right (like Python's sum), RSI is the simple
+  average over the last `period` deltas with the 0.001 empty-loss floor,
+  EMA seeds with the SMA of the first `period` values
+EMA is a recurrence, so it is sequential in time; a batch still advances all
+symbols with one vector operation per bar.
+"""
+from __future__ import annotations
+from typing import Mapping, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+RSI_EMPTY_LOSS = 0.001
+
+
+def _as_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _window_sums(values: np.ndarray, period: int) -> np.ndarray:
+    """Sum of every `period` window along the last axis, accumulated in Python's order."""
+    windows = sliding_window_view(values, period, axis=-1)
+    acc = windows[..., 0].copy()
+    for j in range(1, period):
+        acc += windows[..., j]
+    return acc
+
+
+# ── RSI ──
+
+def rsi(closes, period: int = 14) -> np.ndarray:
+    """
+    RSI for every bar. Output has the input's shape; bars without `period`
+    prior deltas are NaN.
+    """
+    values = _as_array(closes)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < period + 1:
+        return out
+    deltas = np.diff(values, axis=-1)
+    gain_sum = _window_sums(np.where(deltas > 0, deltas, 0.0), period)
+    loss_sum = _window_sums(np.where(deltas < 0, -deltas, 0.0), period)
+    has_loss = _window_sums((deltas < 0).astype(np.float64), period) > 0
+    avg_gain = gain_sum / period
+    avg_loss = np.where(has_loss, loss_sum / period, RSI_EMPTY_LOSS)
+    rs = avg_gain / avg_loss
+    out[..., period:] = 100 - (100 / (1 + rs))
+    return out
+
+
+# ── EMA ──
+
+def ema(values, period: int) -> np.ndarray:
+    """
+    EMA seeded with the SMA of the first `period` values; length n - period + 1.
+    Series shorter than `period` are returned unchanged.
+    """
+    arr = _as_array(values)
+    n = arr.shape[-1]
+    if n < period:
+        return arr
+    k = 2 / (period + 1)
+    keep = 1 - k
+    seed = _window_sums(arr[..., :period], period)[..., 0] / period
+
+    if arr.ndim == 1:
+        # Scalar recurrence on Python floats beats per-element NumPy dispatch
+        out = [float(seed)]
+        prev = out[0]
+        for price in arr[period:].tolist():
+            prev = price * k + prev * keep
+            out.append(prev)
+        return np.array(out)
+
+    # Time-major copies keep each step's vector contiguous
+    prices = np.ascontiguousarray(np.moveaxis(arr[..., period:], -1, 0))
+    out = np.empty((n - period + 1,) + arr.shape[:-1])
+    out[0] = seed
+    scratch = np.empty(arr.shape[:-1])
+    for j in range(1, n - period + 1):
+        np.multiply(prices[j - 1], k, out=out[j])
+        np.multiply(out[j - 1], keep, out=scratch)
+        out[j] += scratch
+    return np.moveaxis(out, 0, -1)
+
+
+# ── MACD ──
+
+def macd(closes, fast: int = 12, slow: int = 26, signal_period: int = 9) -> dict:
+    """MACD line, signal line and histogram series (each tail-aligned to the latest bar)."""
+    fast_ema = ema(closes, fast)
+    slow_ema = ema(closes, slow)
+    length = min(fast_ema.shape[-1], slow_ema.shape[-1])
+    line = fast_ema[..., fast_ema.shape[-1] - length:] - slow_ema[..., slow_ema.shape[-1] - length:]
+    signal = ema(line, signal_period)
+    hist = line[..., line.shape[-1] - signal.shape[-1]:] - signal
+    return {"macd": line, "signal": signal, "histogram": hist}
+
+
+# ── Bollinger ──
+
+def bollinger(closes, period: int = 20, width: float = 2) -> dict:
+    """Middle / upper / lower band and bandwidth (%) for every full window."""
+    values = _as_array(closes)
+    if values.shape[-1] < period:
+        empty = np.empty(values.shape[:-1] + (0,))
+        return {"middle": empty, "upper": empty, "lower": empty, "bandwidth": empty}
+    middle = _window_sums(values, period) / period
+    windows = sliding_window_view(values, period, axis=-1)
+    sq = (windows - middle[..., None]) ** 2
+    acc = sq[..., 0].copy()
+    for j in range(1, period):
+        acc += sq[..., j]
+    std = np.sqrt(acc / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bandwidth = 2 * width * std / middle * 100
+    return {
+        "middle": middle,
+        "upper": middle + width * std,
+        "lower": middle - width * std,
+        "bandwidth": bandwidth,
+    }
+
+
+# ── Batch screening ──
+
+def compute_batch(closes_by_symbol: Mapping[str, Sequence[float]]) -> dict[str, dict]:
+    """
+    Latest RSI / EMA20 / EMA50 / MACD / Bollinger for many symbols at once.
+    Symbols are grouped by series length so each group is one 2-D pass.
+    """
+    groups: dict[int, list[str]] = {}
+    for symbol, closes in closes_by_symbol.items():
+        groups.setdefault(len(closes), []).append(symbol)
+
+    results: dict[str, dict] = {}
+    for n, symbols in groups.items():
+        if n == 0:
+            for s in symbols:
+                results[s] = {}
+            continue
+        matrix = np.array([closes_by_symbol[s] for s in symbols], dtype=np.float64)
+        # Only the latest value is reported, so window indicators run on the tail
+        cols = {
+            "close": matrix[:, -1],
+            "rsi": rsi(matrix[:, -15:])[:, -1] if n >= 15 else np.full(len(symbols), 50.0),
+            "ema20": ema(matrix, 20)[:, -1],
+            "ema50": ema(matrix, min(50, n))[:, -1],
+        }
+        m = macd(matrix)
+        if m["signal"].shape[-1]:
+            cols.update({
+                "macd": m["macd"][:, -1],
+                "macd_signal": m["signal"][:, -1],
+                "macd_histogram": m["histogram"][:, -1],
+            })
+        if n >= 20:
+            bb = bollinger(matrix[:, -20:])
+            cols.update({
+                "bb_upper": bb["upper"][:, -1],
+                "bb_middle": bb["middle"][:, -1],
+                "bb_lower": bb["lower"][:, -1],
+                "bb_bandwidth": bb["bandwidth"][:, -1],
+            })
+        lists = {name: col.tolist() for name, col in cols.items()}
+        for i, s in enumerate(symbols):
+            results[s] = {name: values[i] for name, values in lists.items()}
+    return results
@@ -0,0 +1,190 @@
+"""
+COWORK.ARMY — Trade Market Data Cache
+Shared layer in front of ccxt for the trade tools.
+- Entries keyed by (kind, exchange, symbol, timeframe, limit)
+- OHLCV TTL is aligned to the candle: never outlives the current candle,
+  capped at a small fraction of the timeframe for the still-forming bar
+- Concurrent identical requests are coalesced (single-flight): one thread
+  fetches, the others wait for its result
+- Per-kind hit / miss / coalesced / error counters
+Tool calls run in runner's thread pool, so everything here is thread-safe.
+Cached values are shared between callers and must be treated as read-only.
+"""
+from __future__ import annotations
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+# Trade tools are importable standalone (departments.trade.*), so settings are read here.
+MARKET_DATA_TTL_FRACTION = float(os.environ.get("MARKET_DATA_TTL_FRACTION", 0.02))
+MARKET_DATA_MIN_TTL = float(os.environ.get("MARKET_DATA_MIN_TTL", 5))
+MARKET_DATA_MAX_TTL = float(os.environ.get("MARKET_DATA_MAX_TTL", 300))
+MARKET_DATA_TICKER_TTL = float(os.environ.get("MARKET_DATA_TICKER_TTL", 5))
+MARKET_DATA_TICKERS_TTL = float(os.environ.get("MARKET_DATA_TICKERS_TTL", 60))
+MARKET_DATA_FUNDING_TTL = float(os.environ.get("MARKET_DATA_FUNDING_TTL", 60))
+MARKET_DATA_OHLCV_LIMIT = int(os.environ.get("MARKET_DATA_OHLCV_LIMIT", 100))
+MARKET_DATA_MAX_ENTRIES = int(os.environ.get("MARKET_DATA_MAX_ENTRIES", 512))
+# Serve OHLCV through the local candle store (ohlcv_store.py); "0" fetches everything live
+MARKET_DATA_OHLCV_STORE = os.environ.get("MARKET_DATA_OHLCV_STORE", "1") == "1"
+
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800, "M": 2592000}
+_TIMEFRAME_RE = re.compile(r"^(\d+)([smhdwM])$")
+# Weekly candles open on Monday 00:00 UTC; the Unix epoch was a Thursday.
+_WEEK_OFFSET = 4 * 86400
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    """ccxt timeframe string ("15m", "4h", "1w") → seconds."""
+    m = _TIMEFRAME_RE.match(timeframe.strip())
+    if not m:
+        raise ValueError(f"Unknown timeframe: {timeframe}")
+    return int(m.group(1)) * _UNIT_SECONDS[m.group(2)]
+
+
+def candle_start(timeframe: str, now: Optional[float] = None) -> float:
+    """Open time (epoch seconds) of the candle forming at `now`."""
+    tf = timeframe_seconds(timeframe)
+    now = time.time() if now is None else now
+    offset = _WEEK_OFFSET if timeframe.endswith("w") else 0
+    return now - ((now - offset) % tf)
+
+
+def candle_ttl(timeframe: str, now: Optional[float] = None) -> float:
+    """Seconds an OHLCV response stays fresh: until the candle closes, at most the live cap."""
+    tf = timeframe_seconds(timeframe)
+    now = time.time() if now is None else now
+    until_close = tf - (now - candle_start(timeframe, now))
+    live_cap = min(max(tf * MARKET_DATA_TTL_FRACTION, MARKET_DATA_MIN_TTL), MARKET_DATA_MAX_TTL)
+    return max(1.0, min(until_close, live_cap))
+
+
+class MarketDataCache:
+    """Thread-safe TTL cache with single-flight loading and LRU eviction."""
+
+    def __init__(self, max_entries: int = MARKET_DATA_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[tuple, Future] = {}
+        self._stats: dict[str, dict] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        )
+
+    def get_or_fetch(self, key: tuple, ttl: float, loader: Callable[[], Any]) -> Any:
+        """Return the fresh cached value for `key`, or load it once for all concurrent callers."""
+        with self._lock:
+            stats = self._stats[key[0]]
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                stats["hits"] += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                stats["misses"] += 1
+            else:
+                stats["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+                stats["errors"] += 1
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, key: tuple) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            kinds = {k: dict(v) for k, v in self._stats.items()}
+            entries = len(self._entries)
+            inflight = len(self._inflight)
+        for s in kinds.values():
+            lookups = s["hits"] + s["misses"] + s["coalesced"]
+            s["hit_ratio"] = round((s["hits"] + s["coalesced"]) / lookups, 3) if lookups else 0.0
+        return {"entries": entries, "inflight": inflight, "kinds": kinds}
+
+
+_cache = MarketDataCache()
+
+
+def get_market_data_cache() -> MarketDataCache:
+    return _cache
+
+
+# ── Cached fetchers (exchange factory is injected so callers keep control of it) ──
+
+def fetch_ohlcv(get_exchange: Callable, exchange_name: str, symbol: str, timeframe: str,
+                limit: int = MARKET_DATA_OHLCV_LIMIT) -> list:
+    """
+    Most recent `limit` candles. Smaller requests are served from a single
+    fetch of at least MARKET_DATA_OHLCV_LIMIT candles, so e.g. the 50-candle
+    macro-trend read and the 100-candle chart read share one request.
+    Closed candles come from the local store when enabled; only the candles
+    after its last stored one are requested.
+    """
+    fetch_limit = max(limit, MARKET_DATA_OHLCV_LIMIT)
+    key = ("ohlcv", exchange_name, symbol, timeframe, fetch_limit)
+
+    def load() -> list:
+        if MARKET_DATA_OHLCV_STORE and not timeframe.endswith("M"):
+            from .ohlcv_store import get_ohlcv_store  # imports this module
+            return get_ohlcv_store().read_through(get_exchange, exchange_name, symbol, timeframe, fetch_limit)
+        return get_exchange(exchange_name).fetch_ohlcv(symbol, timeframe, limit=fetch_limit)
+
+    ohlcv = _cache.get_or_fetch(key, candle_ttl(timeframe), load)
+    return ohlcv[-limit:] if ohlcv and len(ohlcv) > limit else ohlcv
+
+
+def fetch_ticker(get_exchange: Callable, exchange_name: str, symbol: str) -> dict:
+    return _cache.get_or_fetch(
+        ("ticker", exchange_name, symbol, None, None), MARKET_DATA_TICKER_TTL,
+        lambda: get_exchange(exchange_name).fetch_ticker(symbol),
+    )
+
+
+def fetch_tickers(get_exchange: Callable, exchange_name: str) -> dict:
+    """All tickers of an exchange (used to pick the scan universe by volume)."""
+    return _cache.get_or_fetch(
+        ("tickers", exchange_name, None, None, None), MARKET_DATA_TICKERS_TTL,
+        lambda: get_exchange(exchange_name).fetch_tickers(),
+    )
+
+
+def fetch_funding_rate(get_exchange: Callable, exchange_name: str, symbol: str) -> dict:
+    return _cache.get_or_fetch(
+        ("funding", exchange_name, symbol, None, None), MARKET_DATA_FUNDING_TTL,
+        lambda: get_exchange(exchange_name).fetch_funding_rate(symbol),
+    )
+
+
+def get_market_data_stats() -> dict:
+    return _cache.get_stats()
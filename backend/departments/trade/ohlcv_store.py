@@ -0,0 +1,330 @@
+"""
+COWORK.ARMY — Trade OHLCV Store
+Local, append-only candle history per (exchange, symbol, timeframe).
+- Columnar layout: one raw little-endian file per column
+  (<root>/<exchange>/<symbol>/<timeframe>/timestamp.i8, open.f8, ...)
+- Reads memory-map the columns and binary-search the timestamps, so a range
+  query only touches the pages it returns
+- Only closed candles are stored: the newest row of every fetch is treated
+  as forming and a candle must have closed TRADE_OHLCV_CLOSE_MARGIN seconds
+  ago, so clock skew or a fetch on a candle boundary never persists a
+  still-forming candle (the store is append-only and would keep it)
+- read_through() fills the series forward from the last stored candle (paged
+  `since` fetches) and serves the rest from disk, so a restart or a longer
+  history costs one small request instead of a full re-download. It pages at
+  most TRADE_OHLCV_SYNC_PAGES per call; after a longer outage the latest
+  candles are served straight from the exchange while later calls keep
+  catching up
+- ensure_history() backfills older candles, walking back from the first
+  stored one, at most `max_pages` requests per call so an agent tool can
+  return "partial, retry" instead of paging for minutes; prepending is the
+  only rewrite and swaps in a complete new directory
+- every read takes the series lock, so it never sees a half-swapped
+  directory or a mapping of the replaced files
+Uneven column lengths after a crash are trimmed to the shortest on open.
+"""
+from __future__ import annotations
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from .market_data import timeframe_seconds
+
+OHLCV_STORE_DIR = Path(os.environ.get(
+    "TRADE_OHLCV_STORE_DIR",
+    Path(__file__).resolve().parents[2] / "workspace" / "trade_data" / "ohlcv",
+))
+OHLCV_STORE_PAGE = int(os.environ.get("TRADE_OHLCV_STORE_PAGE", 1000))
+OHLCV_SYNC_PAGES = int(os.environ.get("TRADE_OHLCV_SYNC_PAGES", 10))
+OHLCV_BACKFILL_PAGES = int(os.environ.get("TRADE_OHLCV_BACKFILL_PAGES", 30))
+OHLCV_CLOSE_MARGIN = float(os.environ.get("TRADE_OHLCV_CLOSE_MARGIN", 10))
+
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+_DTYPES = {c: np.dtype("<i8") if c == "timestamp" else np.dtype("<f8") for c in COLUMNS}
+_SUFFIX = {c: ".i8" if c == "timestamp" else ".f8" for c in COLUMNS}
+
+
+def _safe(part: str) -> str:
+    return part.replace("/", "-").replace(":", "_")
+
+
+class OHLCVSeries:
+    """Append-only columnar candles of one (exchange, symbol, timeframe)."""
+
+    def __init__(self, path: Path, timeframe: str):
+        self.path = path
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_seconds(timeframe) * 1000
+        self.lock = threading.RLock()  # reads take it too; writers call them while holding it
+        self._recover()
+
+    def _file(self, column: str, base: Optional[Path] = None) -> Path:
+        return (base or self.path) / f"{column}{_SUFFIX[column]}"
+
+    def _recover(self) -> None:
+        backup = self.path.with_name(self.path.name + ".old")
+        if not self.path.exists() and backup.exists():
+            backup.rename(self.path)
+        elif backup.exists():
+            shutil.rmtree(backup, ignore_errors=True)
+        self.path.mkdir(parents=True, exist_ok=True)
+        sizes = {c: self._file(c).stat().st_size // 8 if self._file(c).exists() else 0 for c in COLUMNS}
+        self.length = min(sizes.values())
+        for c, size in sizes.items():
+            if size != self.length or not self._file(c).exists():
+                with open(self._file(c), "ab") as f:
+                    f.truncate(self.length * 8)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _column(self, column: str, length: int) -> np.ndarray:
+        if length == 0:
+            return np.empty(0, dtype=_DTYPES[column])
+        return np.memmap(self._file(column), dtype=_DTYPES[column], mode="r", shape=(length,))
+
+    def first_timestamp(self) -> Optional[int]:
+        with self.lock:
+            return int(self._column("timestamp", self.length)[0]) if self.length else None
+
+    def last_timestamp(self) -> Optional[int]:
+        with self.lock:
+            n = self.length
+            return int(self._column("timestamp", n)[n - 1]) if n else None
+
+    def append(self, rows: list) -> int:
+        """Append candles newer than the last stored one; returns how many were written."""
+        last = self.last_timestamp()
+        rows = sorted((r for r in rows if last is None or r[0] > last), key=lambda r: r[0])
+        # Exchanges can repeat a candle across pages
+        rows = [r for i, r in enumerate(rows) if i == 0 or r[0] != rows[i - 1][0]]
+        if not rows:
+            return 0
+        for i, c in enumerate(COLUMNS):
+            data = np.array([r[i] for r in rows], dtype=_DTYPES[c])
+            with open(self._file(c), "ab") as f:
+                f.write(data.tobytes())
+        self.length += len(rows)
+        return len(rows)
+
+    def prepend(self, rows: list) -> int:
+        """Insert candles older than the first stored one (rewrites the series once)."""
+        first = self.first_timestamp()
+        rows = sorted({r[0]: r for r in rows if first is None or r[0] < first}.values(), key=lambda r: r[0])
+        if not rows:
+            return 0
+        if first is None:
+            return self.append(rows)
+        staging = self.path.with_name(self.path.name + ".new")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        for i, c in enumerate(COLUMNS):
+            with open(self._file(c, staging), "wb") as f:
+                f.write(np.array([r[i] for r in rows], dtype=_DTYPES[c]).tobytes())
+                with open(self._file(c), "rb") as old:
+                    shutil.copyfileobj(old, f)
+        backup = self.path.with_name(self.path.name + ".old")
+        self.path.rename(backup)
+        staging.rename(self.path)
+        shutil.rmtree(backup, ignore_errors=True)
+        self.length += len(rows)
+        return len(rows)
+
+    def read(self, start: Optional[int] = None, end: Optional[int] = None,
+             columns: tuple = COLUMNS) -> dict[str, np.ndarray]:
+        """Candles with start <= timestamp < end (ms), as column arrays copied off the map."""
+        with self.lock:
+            n = self.length
+            ts = self._column("timestamp", n)
+            lo = int(np.searchsorted(ts, start, side="left")) if start is not None else 0
+            hi = int(np.searchsorted(ts, end, side="left")) if end is not None else n
+            return {c: np.array(self._column(c, n)[lo:hi]) for c in columns}
+
+    def tail(self, count: int) -> list[list]:
+        """Last `count` candles as ccxt-style [ts, o, h, l, c, v] rows."""
+        with self.lock:
+            n = self.length
+            lo = max(0, n - count)
+            cols = [self._column(c, n)[lo:n].tolist() for c in COLUMNS]
+        return [list(row) for row in zip(*cols)]
+
+
+class OHLCVStore:
+    """Process-wide set of OHLCVSeries under one root directory."""
+
+    def __init__(self, root: Path = OHLCV_STORE_DIR, page: int = OHLCV_STORE_PAGE,
+                 sync_pages: int = OHLCV_SYNC_PAGES, close_margin: float = OHLCV_CLOSE_MARGIN,
+                 backfill_pages: int = OHLCV_BACKFILL_PAGES):
+        self.root = Path(root)
+        self.page = max(page, 2)
+        self.sync_pages = sync_pages
+        self.backfill_pages = backfill_pages
+        self.close_margin = close_margin
+        self._series: dict[tuple, OHLCVSeries] = {}
+        self._lock = threading.Lock()
+        self.stats = {"reads": 0, "syncs": 0, "requests": 0, "candles_fetched": 0,
+                      "candles_stored": 0, "candles_served": 0, "partial_syncs": 0,
+                      "partial_backfills": 0}
+
+    def series(self, exchange: str, symbol: str, timeframe: str) -> OHLCVSeries:
+        key = (exchange, symbol, timeframe)
+        s = self._series.get(key)
+        if s is None:
+            with self._lock:
+                s = self._series.get(key)
+                if s is None:
+                    s = OHLCVSeries(self.root / _safe(exchange) / _safe(symbol) / timeframe, timeframe)
+                    self._series[key] = s
+        return s
+
+    def _fetch(self, client, symbol: str, timeframe: str, since: int, limit: int) -> list:
+        self.stats["requests"] += 1
+        rows = client.fetch_ohlcv(symbol, timeframe, since=since, limit=limit) or []
+        self.stats["candles_fetched"] += len(rows)
+        return rows
+
+    def _store_closed(self, series: OHLCVSeries, rows: list, now: float) -> tuple[list, bool]:
+        """
+        Append the closed candles of one fetch. The newest row may still be
+        forming whatever the local clock says, so it is never stored here.
+        Returns (rows newer than the store, whether every row but the newest
+        was closed).
+        """
+        cutoff = (now - self.close_margin) * 1000
+        closed = []
+        for r in rows[:-1]:
+            if r[0] + series.tf_ms > cutoff:
+                break
+            closed.append(r)
+        self.stats["candles_stored"] += series.append(closed)
+        return [list(r) for r in rows[len(closed):]], len(closed) == len(rows) - 1
+
+    def _sync_forward(self, series: OHLCVSeries, client, symbol: str, since: int, now: float,
+                      max_pages: Optional[int] = None) -> tuple[list, bool]:
+        """
+        Fetch from `since` until the newest candle is reached, storing the
+        closed ones. Returns (candles newer than the store, caught_up); the
+        first is usually just the forming candle. caught_up is False when
+        `max_pages` ran out first.
+        """
+        self.stats["syncs"] += 1
+        pages = 0
+        while True:
+            rows = self._fetch(client, symbol, series.timeframe, since, self.page)
+            pages += 1
+            if not rows:
+                return [], True
+            newer, all_closed = self._store_closed(series, rows, now)
+            if len(rows) < self.page or not all_closed or rows[-1][0] <= since:
+                return newer, True
+            if max_pages is not None and pages >= max_pages:
+                return newer, False
+            since = rows[-1][0]  # re-read the held-back row as part of the next page
+
+    def read_through(self, get_exchange: Callable, exchange: str, symbol: str, timeframe: str,
+                     limit: int, now: Optional[float] = None) -> list[list]:
+        """
+        Latest `limit` candles (forming one included), fetching only what the
+        store does not have yet. An empty series is seeded with the exchange's
+        latest `limit` candles.
+        """
+        now = time.time() if now is None else now
+        series = self.series(exchange, symbol, timeframe)
+        client = get_exchange(exchange)
+        with series.lock:
+            last = series.last_timestamp()
+            if last is None:
+                newer, _ = self._store_closed(series, self._fetch(client, symbol, timeframe, None, limit), now)
+                caught_up = True
+            else:
+                newer, caught_up = self._sync_forward(
+                    series, client, symbol, last + series.tf_ms, now, self.sync_pages,
+                )
+            if caught_up:
+                rows = (series.tail(limit) + newer)[-limit:]
+        if not caught_up:
+            # Still backfilling a long outage: serve the latest window directly
+            self.stats["partial_syncs"] += 1
+            rows = [list(r) for r in self._fetch(client, symbol, timeframe, None, limit)]
+        self.stats["reads"] += 1
+        self.stats["candles_served"] += len(rows)
+        return rows
+
+    def ensure_history(self, get_exchange: Callable, exchange: str, symbol: str, timeframe: str,
+                       since: int, now: Optional[float] = None,
+                       max_pages: Optional[int] = None) -> tuple[OHLCVSeries, bool]:
+        """
+        Make the series cover [since, last closed candle], fetching only the
+        missing ends. Returns (series, complete): with `max_pages` the work
+        stops after that many requests and complete is False; what was
+        fetched is kept, so the next call continues where this one stopped.
+        """
+        now = time.time() if now is None else now
+        series = self.series(exchange, symbol, timeframe)
+        client = get_exchange(exchange)
+        pages, complete = 0, True
+
+        def budget_left() -> bool:
+            return max_pages is None or pages < max_pages
+
+        with series.lock:
+            first = series.first_timestamp()
+            if first is not None and since < first:
+                # Walk back from the first stored candle so a partial backfill
+                # still joins the stored series without a gap
+                older, edge = [], first
+                while since < edge:
+                    if not budget_left():
+                        complete = False
+                        break
+                    cursor = max(since, edge - self.page * series.tf_ms)
+                    rows = [r for r in self._fetch(client, symbol, timeframe, cursor, self.page)
+                            if cursor <= r[0] < edge]
+                    pages += 1
+                    if not rows:
+                        break  # nothing older on the exchange (listing date)
+                    older = rows + older
+                    edge = rows[0][0]
+                self.stats["candles_stored"] += series.prepend(older)
+            if complete and budget_left():
+                start = since if first is None else series.last_timestamp() + series.tf_ms
+                _, complete = self._sync_forward(
+                    series, client, symbol, start, now,
+                    None if max_pages is None else max_pages - pages,
+                )
+            else:
+                complete = False
+        if not complete:
+            self.stats["partial_backfills"] += 1
+        return series, complete
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            series = list(self._series.items())
+        return {
+            **self.stats,
+            "root": str(self.root),
+            "series": [
+                {"exchange": ex, "symbol": sym, "timeframe": tf, "candles": len(s),
+                 "first": s.first_timestamp(), "last": s.last_timestamp()}
+                for (ex, sym, tf), s in series
+            ],
+        }
+
+
+_store: Optional[OHLCVStore] = None
+_store_lock = threading.Lock()
+
+
+def get_ohlcv_store() -> OHLCVStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = OHLCVStore()
+    return _store
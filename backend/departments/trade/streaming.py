@@ -0,0 +1,324 @@
+"""
+COWORK.ARMY — Trade Streaming Indicators
+Stateful per-(exchange, symbol, timeframe) indicators updated one candle at a time.
+- EMA (SMA-seeded, same numbers as indicators.ema), MACD 12/26/9
+- Wilder RSI, rolling mean/variance for Bollinger (sliding Welford)
+- Swing highs/lows over a rolling 2·lookback+1 window (monotonic deques)
+Every closed bar is folded in with O(1) (amortised) work. The still-forming
+bar is not committed: snapshot() evaluates it with side-effect-free peek()s,
+so re-sending the same candle with updated prices is cheap and exact.
+"""
+from __future__ import annotations
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional, Sequence
+
+
+class StreamingEMA:
+    """EMA seeded with the SMA of the first `period` values."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2 / (period + 1)
+        self._keep = 1 - self.k
+        self._seed_sum = 0.0
+        self.count = 0
+        self.value: Optional[float] = None
+
+    def _next(self, x: float) -> Optional[float]:
+        if self.count + 1 < self.period:
+            return None
+        if self.count + 1 == self.period:
+            return (self._seed_sum + x) / self.period
+        return x * self.k + self.value * self._keep
+
+    def peek(self, x: float) -> Optional[float]:
+        return self._next(x)
+
+    def push(self, x: float) -> Optional[float]:
+        value = self._next(x)
+        if self.count < self.period:
+            self._seed_sum += x
+        self.count += 1
+        self.value = value
+        return value
+
+
+class WilderRSI:
+    """RSI with Wilder smoothing; seeded with simple averages of the first `period` deltas."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close: Optional[float] = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.deltas = 0
+
+    @staticmethod
+    def _rsi(avg_gain: float, avg_loss: float) -> float:
+        if avg_loss == 0:
+            return 50.0 if avg_gain == 0 else 100.0
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+    def _next(self, close: float) -> tuple[float, float, Optional[float]]:
+        delta = close - self.prev_close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        n = self.deltas + 1
+        if n < self.period:
+            return self.avg_gain + gain, self.avg_loss + loss, None
+        if n == self.period:
+            ag, al = (self.avg_gain + gain) / self.period, (self.avg_loss + loss) / self.period
+        else:
+            ag = (self.avg_gain * (self.period - 1) + gain) / self.period
+            al = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return ag, al, self._rsi(ag, al)
+
+    def peek(self, close: float) -> Optional[float]:
+        if self.prev_close is None:
+            return None
+        return self._next(close)[2]
+
+    def push(self, close: float) -> Optional[float]:
+        if self.prev_close is None:
+            self.prev_close = close
+            return None
+        self.avg_gain, self.avg_loss, value = self._next(close)
+        self.deltas += 1
+        self.prev_close = close
+        return value
+
+
+class RollingStats:
+    """Mean / population variance of the last `period` values (sliding Welford)."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: deque = deque()
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def _next(self, x: float) -> tuple[float, float]:
+        n = len(self.window)
+        if n < self.period:
+            mean = self.mean + (x - self.mean) / (n + 1)
+            return mean, self._m2 + (x - self.mean) * (x - mean)
+        old = self.window[0]
+        mean = self.mean + (x - old) / self.period
+        return mean, self._m2 + (x - old) * (x - mean + old - self.mean)
+
+    def _bands(self, mean: float, m2: float, width: float) -> dict:
+        std = math.sqrt(max(m2, 0.0) / self.period)
+        return {
+            "upper": mean + width * std,
+            "middle": mean,
+            "lower": mean - width * std,
+            "bandwidth": 2 * width * std / mean * 100 if mean else 0.0,
+        }
+
+    def peek_bands(self, x: float, width: float = 2) -> Optional[dict]:
+        if len(self.window) + 1 < self.period:
+            return None
+        return self._bands(*self._next(x), width)
+
+    def push(self, x: float) -> None:
+        self.mean, self._m2 = self._next(x)
+        self.window.append(x)
+        if len(self.window) > self.period:
+            self.window.popleft()
+
+
+class SwingWindow:
+    """
+    Confirms swing highs/lows `lookback` bars after they happen: a bar is a
+    swing high when it is the max of the 2·lookback+1 bars centred on it
+    (ties count, as in tools_impl._find_swing_points).
+    """
+
+    def __init__(self, lookback: int = 5, keep: int = 10):
+        self.lookback = lookback
+        self.size = 2 * lookback + 1
+        self.index = -1
+        self._highs: deque = deque()        # (index, high, ts) for the window
+        self._lows: deque = deque()
+        self._max: deque = deque()          # indices, highs decreasing
+        self._min: deque = deque()          # indices, lows increasing
+        self.swing_highs: deque = deque(maxlen=keep)
+        self.swing_lows: deque = deque(maxlen=keep)
+
+    def push(self, ts, high: float, low: float) -> None:
+        self.index += 1
+        i = self.index
+        self._highs.append((i, high, ts))
+        self._lows.append((i, low, ts))
+        while self._max and self._max[-1][1] < high:
+            self._max.pop()
+        self._max.append((i, high))
+        while self._min and self._min[-1][1] > low:
+            self._min.pop()
+        self._min.append((i, low))
+        if len(self._highs) > self.size:
+            self._highs.popleft()
+            self._lows.popleft()
+        start = i - self.size + 1
+        while self._max[0][0] < start:
+            self._max.popleft()
+        while self._min[0][0] < start:
+            self._min.popleft()
+        if len(self._highs) < self.size:
+            return
+        c_idx, c_high, c_ts = self._highs[self.lookback]
+        _, c_low, _ = self._lows[self.lookback]
+        if c_high >= self._max[0][1]:
+            self.swing_highs.append({"index": c_idx, "timestamp": c_ts, "price": c_high})
+        if c_low <= self._min[0][1]:
+            self.swing_lows.append({"index": c_idx, "timestamp": c_ts, "price": c_low})
+
+
+class IndicatorState:
+    """Live indicator state for one (exchange, symbol, timeframe)."""
+
+    def __init__(self, symbol: str, timeframe: str, exchange: str = "binance", swing_lookback: int = 5):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.exchange = exchange
+        self.swing_lookback = swing_lookback
+        self.lock = threading.Lock()
+        self.updates = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.ema20 = StreamingEMA(20)
+        self.ema50 = StreamingEMA(50)
+        self.ema12 = StreamingEMA(12)
+        self.ema26 = StreamingEMA(26)
+        self.macd_signal = StreamingEMA(9)
+        self.rsi = WilderRSI(14)
+        self.bollinger = RollingStats(20)
+        self.swings = SwingWindow(self.swing_lookback)
+        self.forming: Optional[list] = None
+        self.bars_committed = 0
+        self.updated_at = 0.0
+
+    def _commit(self, bar: Sequence) -> None:
+        ts, _, high, low, close = bar[0], bar[1], bar[2], bar[3], bar[4]
+        self.ema20.push(close)
+        self.ema50.push(close)
+        fast, slow = self.ema12.push(close), self.ema26.push(close)
+        if fast is not None and slow is not None:
+            self.macd_signal.push(fast - slow)
+        self.rsi.push(close)
+        self.bollinger.push(close)
+        self.swings.push(ts, high, low)
+        self.bars_committed += 1
+
+    def update(self, bar: Sequence) -> None:
+        """Ingest one OHLCV bar: a newer timestamp closes the previous bar, the same one replaces it."""
+        if self.forming is not None and bar[0] < self.forming[0]:
+            return
+        if self.forming is not None and bar[0] > self.forming[0]:
+            self._commit(self.forming)
+        self.forming = list(bar)
+        self.updates += 1
+        self.updated_at = time.time()
+
+    def ingest(self, ohlcv: Sequence[Sequence]) -> int:
+        """
+        Feed a fetched OHLCV list; only bars at or after the forming bar are
+        applied. A list that starts after the forming bar leaves a gap, so the
+        state is rebuilt from it instead.
+        """
+        last_ts = self.forming[0] if self.forming is not None else None
+        if last_ts is not None and ohlcv and ohlcv[0][0] > last_ts:
+            self.reset()
+            last_ts = None
+        applied = 0
+        for bar in ohlcv:
+            if last_ts is not None and bar[0] < last_ts:
+                continue
+            self.update(bar)
+            applied += 1
+        return applied
+
+    def snapshot(self) -> dict:
+        if self.forming is None:
+            return {"symbol": self.symbol, "timeframe": self.timeframe, "ready": False}
+        close = self.forming[4]
+        fast, slow = self.ema12.peek(close), self.ema26.peek(close)
+        macd = signal = hist = None
+        if fast is not None and slow is not None:
+            macd = fast - slow
+            signal = self.macd_signal.peek(macd)
+            hist = macd - signal if signal is not None else None
+        return {
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "exchange": self.exchange,
+            "ready": self.bars_committed >= 50,
+            "timestamp": self.forming[0],
+            "close": close,
+            "ema20": self.ema20.peek(close),
+            "ema50": self.ema50.peek(close),
+            "rsi": self.rsi.peek(close),
+            "macd": {"macd": macd, "signal": signal, "histogram": hist},
+            "bollinger": self.bollinger.peek_bands(close),
+            "swing_highs": list(self.swings.swing_highs)[-5:],
+            "swing_lows": list(self.swings.swing_lows)[-5:],
+            "bars": self.bars_committed + 1,
+        }
+
+
+class IndicatorRegistry:
+    """Thread-safe LRU registry of IndicatorState objects."""
+
+    def __init__(self, max_states: int = 256):
+        self.max_states = max_states
+        self._states: OrderedDict[tuple, IndicatorState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str, timeframe: str, exchange: str = "binance") -> IndicatorState:
+        key = (exchange, symbol, timeframe)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = IndicatorState(symbol, timeframe, exchange)
+                self._states[key] = state
+                while len(self._states) > self.max_states:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(key)
+        return state
+
+    def peek(self, symbol: str, timeframe: str, exchange: str = "binance") -> Optional[IndicatorState]:
+        with self._lock:
+            return self._states.get((exchange, symbol, timeframe))
+
+    def ingest(self, symbol: str, timeframe: str, ohlcv: Sequence[Sequence], exchange: str = "binance") -> dict:
+        state = self.get(symbol, timeframe, exchange)
+        with state.lock:
+            state.ingest(ohlcv)
+            return state.snapshot()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            states = list(self._states.values())
+        return {
+            "states": len(states),
+            "symbols": [
+                {"exchange": s.exchange, "symbol": s.symbol, "timeframe": s.timeframe,
+                 "bars": s.bars_committed, "updates": s.updates}
+                for s in states
+            ],
+        }
+
+
+_registry = IndicatorRegistry()
+
+
+def get_indicator_registry() -> IndicatorRegistry:
+    return _registry
@@ -0,0 +1,176 @@
+"""
+COWORK.ARMY — Trade Market Structure (SMC)
+Single-pass swing / order-block / FVG detection shared by the trade tools.
+- One monotonic-stack sweep per side gives, for every bar, how far its high
+  (low) dominates to the left and right. A bar is a swing high for lookback L
+  when it dominates at least L bars on both sides, so every lookback is
+  answered from the same O(n) pass.
+- Order blocks and fair value gaps are found in one shared sweep
+- MarketStructure objects are memoised per series, so analyze_chart and
+  generate_signal calls on the same candles reuse one instance
+Results are identical to the original per-bar `all(...)` scans.
+"""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+
+def _dominance(values: Sequence[float]) -> tuple[list[int], list[int]]:
+    """
+    For each bar, how many consecutive neighbours on the left and on the right
+    are not strictly greater than it (monotonic stack, O(n)).
+    """
+    n = len(values)
+    left = [0] * n
+    right = [0] * n
+    stack: list[int] = []
+    for i in range(n):
+        v = values[i]
+        while stack and values[stack[-1]] <= v:
+            stack.pop()
+        left[i] = i - stack[-1] - 1 if stack else i
+        stack.append(i)
+    stack.clear()
+    for i in range(n - 1, -1, -1):
+        v = values[i]
+        while stack and values[stack[-1]] <= v:
+            stack.pop()
+        right[i] = stack[-1] - i - 1 if stack else n - 1 - i
+        stack.append(i)
+    return left, right
+
+
+def _order_blocks_and_fvgs(highs, lows, opens=None, closes=None) -> tuple[list, list]:
+    """Order blocks (need candle bodies) and FVGs (highs/lows only) in one sweep."""
+    order_blocks, fvgs = [], []
+    with_bodies = opens is not None and closes is not None
+    for i in range(1, len(highs) - 1):
+        if with_bodies and i >= 3:
+            # Bullish OB: bearish candle followed by a close above its high
+            if closes[i] < opens[i]:
+                if closes[i + 1] > highs[i]:
+                    order_blocks.append({
+                        "type": "bullish_ob",
+                        "top": highs[i],
+                        "bottom": lows[i],
+                        "index": i,
+                        "description": f"Bullish Order Block at {lows[i]:.2f}-{highs[i]:.2f}",
+                    })
+            # Bearish OB: bullish candle followed by a close below its low
+            elif closes[i] > opens[i]:
+                if closes[i + 1] < lows[i]:
+                    order_blocks.append({
+                        "type": "bearish_ob",
+                        "top": highs[i],
+                        "bottom": lows[i],
+                        "index": i,
+                        "description": f"Bearish Order Block at {lows[i]:.2f}-{highs[i]:.2f}",
+                    })
+        # FVG: gap between candle[i-1] and candle[i+1]
+        if lows[i + 1] > highs[i - 1]:
+            fvgs.append({
+                "type": "bullish_fvg",
+                "top": lows[i + 1],
+                "bottom": highs[i - 1],
+                "description": f"Bullish FVG: {highs[i-1]:.2f} - {lows[i+1]:.2f}",
+            })
+        elif highs[i + 1] < lows[i - 1]:
+            fvgs.append({
+                "type": "bearish_fvg",
+                "top": lows[i - 1],
+                "bottom": highs[i + 1],
+                "description": f"Bearish FVG: {highs[i+1]:.2f} - {lows[i-1]:.2f}",
+            })
+    return order_blocks, fvgs
+
+
+class MarketStructure:
+    """Swings for any lookback, order blocks and FVGs of one OHLC series."""
+
+    def __init__(self, highs: Sequence[float], lows: Sequence[float],
+                 opens: Optional[Sequence[float]] = None, closes: Optional[Sequence[float]] = None):
+        self.highs, self.lows, self.opens, self.closes = highs, lows, opens, closes
+        self._high_left, self._high_right = _dominance(highs)
+        # A low dominates when nothing nearby is strictly lower: same sweep on -low
+        self._low_left, self._low_right = _dominance([-x for x in lows])
+        self._order_blocks: Optional[list] = None
+        self._fvgs: Optional[list] = None
+        self._swings: dict[int, dict] = {}
+
+    def swings(self, lookback: int = 5) -> dict:
+        """All swing highs/lows for `lookback` (callers slice what they need)."""
+        cached = self._swings.get(lookback)
+        if cached is not None:
+            return cached
+        n = len(self.highs)
+        hl, hr, ll, lr = self._high_left, self._high_right, self._low_left, self._low_right
+        swing_highs, swing_lows = [], []
+        for i in range(lookback, n - lookback):
+            if hl[i] >= lookback and hr[i] >= lookback:
+                swing_highs.append({"index": i, "price": self.highs[i]})
+            if ll[i] >= lookback and lr[i] >= lookback:
+                swing_lows.append({"index": i, "price": self.lows[i]})
+        result = {"swing_highs": swing_highs, "swing_lows": swing_lows}
+        self._swings[lookback] = result
+        return result
+
+    def swing_spans(self, side: str = "high") -> tuple[list[int], list[int]]:
+        """
+        Per bar, how many bars to the left / right it dominates (its high is
+        not exceeded, or its low not undercut). Bar i is a swing for
+        `lookback` when both spans are >= lookback.
+        """
+        if side == "high":
+            return self._high_left, self._high_right
+        if side == "low":
+            return self._low_left, self._low_right
+        raise ValueError(f"side must be 'high' or 'low', got {side!r}")
+
+    def recent_swings(self, lookback: int = 5, last: int = 5) -> dict:
+        s = self.swings(lookback)
+        return {"swing_highs": s["swing_highs"][-last:], "swing_lows": s["swing_lows"][-last:]}
+
+    def _sweep(self) -> None:
+        if self._order_blocks is None:
+            self._order_blocks, self._fvgs = _order_blocks_and_fvgs(
+                self.highs, self.lows, self.opens, self.closes,
+            )
+
+    def order_blocks(self, last: int = 3) -> list:
+        self._sweep()
+        return self._order_blocks[-last:]
+
+    def fair_value_gaps(self, last: int = 3) -> list:
+        self._sweep()
+        return self._fvgs[-last:]
+
+
+# ── Shared instances ──
+
+_structures: OrderedDict[tuple, MarketStructure] = OrderedDict()
+_lock = threading.Lock()
+_MAX_STRUCTURES = 128
+
+
+def get_structure(highs, lows, opens=None, closes=None, key: Optional[tuple] = None) -> MarketStructure:
+    """
+    MarketStructure for the series, reused while `key` (e.g. exchange,
+    symbol, timeframe) and the latest candle stay the same.
+    """
+    if key is None or not highs:
+        return MarketStructure(highs, lows, opens, closes)
+    last_close = closes[-1] if closes else None
+    first_open = opens[0] if opens else None
+    full_key = key + (len(highs), highs[-1], lows[-1], last_close, first_open)
+    with _lock:
+        structure = _structures.get(full_key)
+        if structure is not None:
+            _structures.move_to_end(full_key)
+            return structure
+    structure = MarketStructure(highs, lows, opens, closes)
+    with _lock:
+        _structures[full_key] = structure
+        while len(_structures) > _MAX_STRUCTURES:
+            _structures.popitem(last=False)
+    return structure
@@ -6,67 +6,107 @@ Implements: Elliott Wave analysis, SMC structures, multi-timeframe trend,
 """
 from __future__ import annotations
 import json
-import math
-from datetime import datetime, timedelta
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Any
 
+from . import backtest, indicators
+from .exchanges import get_exchange_pool
+from .market_data import fetch_funding_rate, fetch_ohlcv, fetch_ticker, fetch_tickers
+from .ohlcv_store import get_ohlcv_store
+from .streaming import get_indicator_registry
+from .structure import MarketStructure, get_structure
+
+SCAN_WORKERS = int(os.environ.get("TRADE_SCAN_WORKERS", 8))
+SCAN_MAX_SYMBOLS = int(os.environ.get("TRADE_SCAN_MAX_SYMBOLS", 100))
+SCAN_MIN_CANDLES = 30
+
+TRADE_DATA_DIR = Path(os.environ.get(
+    "TRADE_DATA_DIR", Path(__file__).resolve().parents[2] / "workspace" / "trade_data",
+))
+
+# Per-venue deadline for fanned-out fetches; TRADE_FETCH_TIMEOUT_<EXCHANGE> overrides it
+FETCH_TIMEOUT = float(os.environ.get("TRADE_FETCH_TIMEOUT", 8))
+FANOUT_WORKERS = int(os.environ.get("TRADE_FANOUT_WORKERS", 16))
+MULTI_PRICE_EXCHANGES = ("binance", "bybit", "okx")
+MACRO_TIMEFRAMES = ("1d", "1w")
+
+# Shared by all scans so concurrent scan_market calls stay within one bound
+_SCAN_EXECUTOR = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="trade-scan")
+# Leaf fetches only (never tasks that wait on this pool), so it cannot deadlock
+_FANOUT_EXECUTOR = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="trade-fanout")
+
 
 # ── Exchange Factory ──────────────────────────────────────────────────────────
 
 def _get_exchange(exchange_name: str = "binance"):
-    """Create a ccxt exchange instance. Binance is primary, others as fallback."""
-    try:
-        import ccxt
-        exchange_map = {
-            "binance": ccxt.binance,
-            "bybit": ccxt.bybit,
-            "okx": ccxt.okx,
-            "kucoin": ccxt.kucoin,
-            "gate": ccxt.gateio,
-        }
-        exchange_cls = exchange_map.get(exchange_name.lower(), ccxt.binance)
-        return exchange_cls({"enableRateLimit": True})
-    except ImportError:
-        raise ImportError("ccxt is not installed. Run: pip install ccxt")
+    """Shared ccxt client from the process-wide pool. Binance is primary, others as fallback."""
+    return get_exchange_pool().get(exchange_name)
+
+
+def _fetch_timeout(exchange_name: str) -> float:
+    return float(os.environ.get(f"TRADE_FETCH_TIMEOUT_{exchange_name.upper()}", FETCH_TIMEOUT))
+
+
+def _fan_out(calls: dict) -> dict:
+    """
+    Run independent fetches concurrently. `calls` maps a key to
+    (exchange_name, fn, args); each result is the value or the exception,
+    and a venue that misses its deadline yields a TimeoutError instead of
+    holding up the others. Wall time is the slowest fetch, not the sum.
+    """
+    start = time.monotonic()
+    futures = {key: (ex, _FANOUT_EXECUTOR.submit(fn, *args)) for key, (ex, fn, args) in calls.items()}
+    results = {}
+    for key, (ex, future) in futures.items():
+        timeout = _fetch_timeout(ex)
+        try:
+            results[key] = future.result(timeout=max(0.0, start + timeout - time.monotonic()))
+        except FuturesTimeout:
+            results[key] = TimeoutError(f"{ex} did not answer within {timeout:g}s")
+        except Exception as e:
+            results[key] = e
+    return results
+
+
+def _fetch_chart_series(symbol: str, timeframes, exchange_name: str = "binance") -> dict:
+    """100-candle series for the chart timeframes plus the macro ones, fetched in parallel."""
+    tfs = dict.fromkeys([*timeframes, *MACRO_TIMEFRAMES])
+    return _fan_out({
+        tf: (exchange_name, fetch_ohlcv, (_get_exchange, exchange_name, symbol, tf, 100)) for tf in tfs
+    })
 
 
 # ── Technical Indicator Calculations ─────────────────────────────────────────
+# Thin wrappers over the NumPy engine (indicators.py) that keep the original
+# return shapes and rounding.
 
 def _calc_rsi(closes: list[float], period: int = 14) -> float:
     """Calculate RSI from close prices."""
     if len(closes) < period + 1:
         return 50.0
-    deltas = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
-    gains = [d for d in deltas[-period:] if d > 0]
-    losses = [-d for d in deltas[-period:] if d < 0]
-    avg_gain = sum(gains) / period if gains else 0
-    avg_loss = sum(losses) / period if losses else 0.001
-    rs = avg_gain / avg_loss
-    return round(100 - (100 / (1 + rs)), 2)
+    return round(float(indicators.rsi(closes[-(period + 1):], period)[-1]), 2)
 
 
 def _calc_ema(closes: list[float], period: int) -> list[float]:
     """Calculate EMA from close prices."""
     if len(closes) < period:
         return closes
-    k = 2 / (period + 1)
-    ema = [sum(closes[:period]) / period]
-    for price in closes[period:]:
-        ema.append(price * k + ema[-1] * (1 - k))
-    return ema
+    return indicators.ema(closes, period).tolist()
 
 
 def _calc_macd(closes: list[float]) -> dict:
     """Calculate MACD (12, 26, 9)."""
-    ema12 = _calc_ema(closes, 12)
-    ema26 = _calc_ema(closes, 26)
-    min_len = min(len(ema12), len(ema26))
-    macd_line = [ema12[-(min_len - i)] - ema26[-(min_len - i)] for i in range(min_len)]
-    signal = _calc_ema(macd_line, 9)
-    histogram = macd_line[-1] - signal[-1] if signal else 0
+    m = indicators.macd(closes)
+    macd_line, signal = m["macd"], m["signal"]
+    histogram = float(m["histogram"][-1]) if signal.size else 0
     return {
-        "macd": round(macd_line[-1], 4) if macd_line else 0,
-        "signal": round(signal[-1], 4) if signal else 0,
+        "macd": round(float(macd_line[-1]), 4) if macd_line.size else 0,
+        "signal": round(float(signal[-1]), 4) if signal.size else 0,
         "histogram": round(histogram, 4),
         "trend": "bullish" if histogram > 0 else "bearish",
     }
@@ -76,37 +116,31 @@ def _calc_bollinger(closes: list[float], period: int = 20) -> dict:
     """Calculate Bollinger Bands."""
     if len(closes) < period:
         return {"upper": 0, "middle": 0, "lower": 0}
-    recent = closes[-period:]
-    middle = sum(recent) / period
-    std = math.sqrt(sum((x - middle) ** 2 for x in recent) / period)
+    bb = indicators.bollinger(closes[-period:], period)
     return {
-        "upper": round(middle + 2 * std, 4),
-        "middle": round(middle, 4),
-        "lower": round(middle - 2 * std, 4),
-        "bandwidth": round(4 * std / middle * 100, 2),
+        "upper": round(float(bb["upper"][-1]), 4),
+        "middle": round(float(bb["middle"][-1]), 4),
+        "lower": round(float(bb["lower"][-1]), 4),
+        "bandwidth": round(float(bb["bandwidth"][-1]), 2),
     }
 
 
 # ── SMC (Smart Money Concepts) Analysis ──────────────────────────────────────
 
-def _find_swing_points(highs: list, lows: list, lookback: int = 5) -> dict:
+def _find_swing_points(highs: list, lows: list, lookback: int = 5,
+                       structure: MarketStructure | None = None) -> dict:
     """Find swing highs and lows for SMC analysis."""
-    swing_highs = []
-    swing_lows = []
-    for i in range(lookback, len(highs) - lookback):
-        if all(highs[i] >= highs[i - j] and highs[i] >= highs[i + j] for j in range(1, lookback + 1)):
-            swing_highs.append({"index": i, "price": highs[i]})
-        if all(lows[i] <= lows[i - j] and lows[i] <= lows[i + j] for j in range(1, lookback + 1)):
-            swing_lows.append({"index": i, "price": lows[i]})
-    return {"swing_highs": swing_highs[-5:], "swing_lows": swing_lows[-5:]}
+    structure = structure or MarketStructure(highs, lows)
+    return structure.recent_swings(lookback)
 
 
-def _detect_bos_choch(closes: list, highs: list, lows: list) -> dict:
+def _detect_bos_choch(closes: list, highs: list, lows: list,
+                      structure: MarketStructure | None = None) -> dict:
     """Detect Break of Structure (BOS) and Change of Character (CHoCH)."""
     if len(closes) < 20:
         return {"bos": None, "choch": None}
 
-    swings = _find_swing_points(highs, lows)
+    swings = _find_swing_points(highs, lows, structure=structure)
     sh = swings["swing_highs"]
     sl = swings["swing_lows"]
 
@@ -135,62 +169,23 @@ def _detect_bos_choch(closes: list, highs: list, lows: list) -> dict:
 
 def _find_order_blocks(opens: list, highs: list, lows: list, closes: list) -> list:
     """Find Order Blocks (institutional entry zones)."""
-    order_blocks = []
-    for i in range(3, len(closes) - 1):
-        # Bullish OB: bearish candle followed by strong bullish move
-        if closes[i] < opens[i]:  # bearish candle
-            if closes[i + 1] > highs[i]:  # next candle breaks above
-                order_blocks.append({
-                    "type": "bullish_ob",
-                    "top": highs[i],
-                    "bottom": lows[i],
-                    "index": i,
-                    "description": f"Bullish Order Block at {lows[i]:.2f}-{highs[i]:.2f}",
-                })
-        # Bearish OB: bullish candle followed by strong bearish move
-        elif closes[i] > opens[i]:  # bullish candle
-            if closes[i + 1] < lows[i]:  # next candle breaks below
-                order_blocks.append({
-                    "type": "bearish_ob",
-                    "top": highs[i],
-                    "bottom": lows[i],
-                    "index": i,
-                    "description": f"Bearish Order Block at {lows[i]:.2f}-{highs[i]:.2f}",
-                })
-    return order_blocks[-3:]  # Return last 3 OBs
+    return MarketStructure(highs, lows, opens, closes).order_blocks()
 
 
 def _find_fvg(highs: list, lows: list) -> list:
     """Find Fair Value Gaps (FVG) / Imbalances."""
-    fvgs = []
-    for i in range(1, len(highs) - 1):
-        # Bullish FVG: gap between candle[i-1] high and candle[i+1] low
-        if lows[i + 1] > highs[i - 1]:
-            fvgs.append({
-                "type": "bullish_fvg",
-                "top": lows[i + 1],
-                "bottom": highs[i - 1],
-                "description": f"Bullish FVG: {highs[i-1]:.2f} - {lows[i+1]:.2f}",
-            })
-        # Bearish FVG: gap between candle[i-1] low and candle[i+1] high
-        elif highs[i + 1] < lows[i - 1]:
-            fvgs.append({
-                "type": "bearish_fvg",
-                "top": lows[i - 1],
-                "bottom": highs[i + 1],
-                "description": f"Bearish FVG: {highs[i+1]:.2f} - {lows[i-1]:.2f}",
-            })
-    return fvgs[-3:]
+    return MarketStructure(highs, lows).fair_value_gaps()
 
 
 # ── Elliott Wave Analysis ─────────────────────────────────────────────────────
 
-def _analyze_elliott_wave(closes: list, highs: list, lows: list) -> dict:
+def _analyze_elliott_wave(closes: list, highs: list, lows: list,
+                          structure: MarketStructure | None = None) -> dict:
     """
     Simplified Elliott Wave analysis using swing point detection.
     Identifies likely wave position and provides context for LLM analysis.
     """
-    swings = _find_swing_points(highs, lows, lookback=3)
+    swings = _find_swing_points(highs, lows, lookback=3, structure=structure)
     sh = swings["swing_highs"]
     sl = swings["swing_lows"]
 
@@ -260,19 +255,27 @@ def _analyze_elliott_wave(closes: list, highs: list, lows: list) -> dict:
 
 # ── Multi-Timeframe Trend Analysis ───────────────────────────────────────────
 
-def _get_macro_trend(symbol: str, exchange_name: str = "binance") -> dict:
+def _get_macro_trend(symbol: str, exchange_name: str = "binance", series: dict | None = None) -> dict:
     """
     Fetch 1D, 1W data and determine macro trend direction.
     This is the foundation for all trade decisions.
+    `series` holds already fetched candles (or the fetch error) per timeframe;
+    a timeframe that failed is reported under "unavailable" and left out.
     """
     try:
-        exchange = _get_exchange(exchange_name)
+        if series is None:
+            series = _fetch_chart_series(symbol, (), exchange_name)
         results = {}
+        unavailable = {}
 
-        for tf in ["1d", "1w"]:
-            ohlcv = exchange.fetch_ohlcv(symbol, tf, limit=50)
+        for tf in MACRO_TIMEFRAMES:
+            ohlcv = series.get(tf)
+            if isinstance(ohlcv, Exception):
+                unavailable[tf] = str(ohlcv)[:120]
+                continue
             if not ohlcv:
                 continue
+            ohlcv = ohlcv[-50:]
             closes = [c[4] for c in ohlcv]
             highs = [c[2] for c in ohlcv]
             lows = [c[3] for c in ohlcv]
@@ -292,6 +295,9 @@ def _get_macro_trend(symbol: str, exchange_name: str = "binance") -> dict:
                 "rsi": _calc_rsi(closes),
             }
 
+        if not results and unavailable:
+            return {"status": "error", "message": "; ".join(f"{tf}: {e}" for tf, e in unavailable.items())}
+
         # Determine overall macro bias
         trends = [v["trend"] for v in results.values()]
         if trends.count("bullish") == len(trends):
@@ -310,26 +316,108 @@ def _get_macro_trend(symbol: str, exchange_name: str = "binance") -> dict:
             "symbol": symbol,
             "macro_bias": macro_bias,
             "timeframes": results,
+            **({"unavailable": unavailable} if unavailable else {}),
             "fetched_at": datetime.now().isoformat(),
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
+# ── Signal Scoring ────────────────────────────────────────────────────────────
+
+def _score_signal(rsi: float, macd_trend: str, ema_trend: str, bos: dict | None = None,
+                  elliott: dict | None = None, macro_bias: str = "NEUTRAL") -> tuple[int, list[str]]:
+    """Score-based signal: RSI, MACD, EMA trend, SMC BOS, Elliott Wave and macro alignment."""
+    score = 0
+    reasons = []
+
+    # RSI signals
+    if rsi < 35:
+        score += 2
+        reasons.append(f"RSI oversold ({rsi})")
+    elif rsi > 65:
+        score -= 2
+        reasons.append(f"RSI overbought ({rsi})")
+
+    # MACD signals
+    if macd_trend == "bullish":
+        score += 1
+        reasons.append("MACD bullish crossover")
+    else:
+        score -= 1
+        reasons.append("MACD bearish")
+
+    # EMA trend
+    if ema_trend == "bullish":
+        score += 1
+        reasons.append("EMA20 > EMA50 (bullish)")
+    else:
+        score -= 1
+        reasons.append("EMA20 < EMA50 (bearish)")
+
+    # SMC BOS/CHoCH
+    if bos and "bullish" in bos.get("type", ""):
+        score += 2
+        reasons.append(f"Bullish BOS at {bos['level']:.2f}")
+    elif bos and "bearish" in bos.get("type", ""):
+        score -= 2
+        reasons.append(f"Bearish BOS at {bos['level']:.2f}")
+
+    # Elliott Wave context
+    ew = elliott or {}
+    if "3" in ew.get("likely_wave", "") or "5" in ew.get("likely_wave", ""):
+        if ew["trend"] == "uptrend":
+            score += 1
+            reasons.append(f"Elliott Wave: {ew['likely_wave']}")
+
+    # Macro trend alignment
+    if macro_bias in ("STRONG_BULL", "MILD_BULL"):
+        score += 1
+        reasons.append(f"Macro trend: {macro_bias}")
+    elif macro_bias in ("STRONG_BEAR", "MILD_BEAR"):
+        score -= 1
+        reasons.append(f"Macro trend: {macro_bias}")
+
+    return score, reasons
+
+
+def _signal_from_score(score: int) -> str:
+    if score >= 4:
+        return "STRONG_BUY"
+    if score >= 2:
+        return "BUY"
+    if score <= -4:
+        return "STRONG_SELL"
+    if score <= -2:
+        return "SELL"
+    return "HOLD"
+
+
 # ── Main Tool Functions ───────────────────────────────────────────────────────
 
 def analyze_chart(symbol: str, timeframe: str, exchange_name: str = "binance") -> dict:
     """
     Full chart analysis: real OHLCV data + technical indicators + Elliott Wave + SMC.
     Primary exchange: Binance. Falls back to other exchanges if needed.
+    The chart and macro (1d/1w) candles are fetched concurrently.
     """
+    series = _fetch_chart_series(symbol, (timeframe,), exchange_name)
+    return _analyze_chart(symbol, timeframe, exchange_name, series)
+
+
+def _analyze_chart(symbol: str, timeframe: str, exchange_name: str, series: dict) -> dict:
+    """analyze_chart on candles already fetched by _fetch_chart_series."""
     try:
-        exchange = _get_exchange(exchange_name)
-        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=100)
+        ohlcv = series[timeframe]
+        if isinstance(ohlcv, Exception):
+            raise ohlcv
 
         if not ohlcv:
             return {"status": "error", "message": "No OHLCV data returned"}
 
+        # Keep the live (symbol, timeframe) state current; only new bars are folded in
+        get_indicator_registry().ingest(symbol, timeframe, ohlcv, exchange_name)
+
         timestamps = [o[0] for o in ohlcv]
         opens = [o[1] for o in ohlcv]
         highs = [o[2] for o in ohlcv]
@@ -348,16 +436,17 @@ def analyze_chart(symbol: str, timeframe: str, exchange_name: str = "binance") -
         ema20 = _calc_ema(closes, 20)
         ema50 = _calc_ema(closes, min(50, len(closes)))
 
-        # SMC analysis
-        smc = _detect_bos_choch(closes, highs, lows)
-        order_blocks = _find_order_blocks(opens, highs, lows, closes)
-        fvgs = _find_fvg(highs, lows)
+        # SMC analysis — one structure pass shared by swings (lookback 5 and 3), OBs and FVGs
+        structure = get_structure(highs, lows, opens, closes, key=(exchange_name, symbol, timeframe))
+        smc = _detect_bos_choch(closes, highs, lows, structure=structure)
+        order_blocks = structure.order_blocks()
+        fvgs = structure.fair_value_gaps()
 
         # Elliott Wave analysis
-        elliott = _analyze_elliott_wave(closes, highs, lows)
+        elliott = _analyze_elliott_wave(closes, highs, lows, structure=structure)
 
         # Macro trend (higher timeframe context)
-        macro = _get_macro_trend(symbol, exchange_name)
+        macro = _get_macro_trend(symbol, exchange_name, series)
 
         # Volume analysis
         avg_volume = sum(volumes[-20:]) / 20 if len(volumes) >= 20 else sum(volumes) / len(volumes)
@@ -408,13 +497,12 @@ def analyze_chart(symbol: str, timeframe: str, exchange_name: str = "binance") -
 def get_funding_rate(symbol: str, exchange_name: str = "binance") -> dict:
     """Fetch real-time perpetual futures funding rate."""
     try:
-        exchange = _get_exchange(exchange_name)
         # Normalize symbol for futures
         futures_symbol = symbol.replace("/", "").replace("USDT", "/USDT:USDT")
         if ":" not in futures_symbol:
             futures_symbol = symbol
 
-        funding = exchange.fetch_funding_rate(futures_symbol)
+        funding = fetch_funding_rate(_get_exchange, exchange_name, futures_symbol)
         rate = funding.get("fundingRate", 0)
         next_time = funding.get("fundingDatetime", "")
 
@@ -434,13 +522,18 @@ def get_funding_rate(symbol: str, exchange_name: str = "binance") -> dict:
 
 
 def get_multi_exchange_price(symbol: str) -> dict:
-    """Get price from multiple exchanges for comparison."""
+    """
+    Get price from multiple exchanges for comparison. Venues are queried in
+    parallel; one that errors or misses its timeout is reported and skipped.
+    """
+    tickers = _fan_out({
+        ex_name: (ex_name, fetch_ticker, (_get_exchange, ex_name, symbol)) for ex_name in MULTI_PRICE_EXCHANGES
+    })
     results = {}
-    exchanges = ["binance", "bybit", "okx"]
-    for ex_name in exchanges:
+    for ex_name, ticker in tickers.items():
         try:
-            ex = _get_exchange(ex_name)
-            ticker = ex.fetch_ticker(symbol)
+            if isinstance(ticker, Exception):
+                raise ticker
             results[ex_name] = {
                 "price": round(ticker["last"], 4),
                 "bid": round(ticker["bid"], 4) if ticker.get("bid") else None,
@@ -458,6 +551,7 @@ def get_multi_exchange_price(symbol: str) -> dict:
         "symbol": symbol,
         "exchanges": results,
         "average_price": avg_price,
+        "responded": len(prices),
         "fetched_at": datetime.now().isoformat(),
     }
 
@@ -467,80 +561,26 @@ def generate_signal(symbol: str, analysis_type: str = "combined", risk_level: st
     Generate a trading signal based on real market data.
     Combines Elliott Wave, SMC, and technical indicators.
     """
-    # Get chart analysis for multiple timeframes
-    analysis_4h = analyze_chart(symbol, "4h")
-    analysis_1d = analyze_chart(symbol, "1d")
+    # Get chart analysis for multiple timeframes: 4h, 1d and 1w candles in one parallel fetch
+    series = _fetch_chart_series(symbol, ("4h", "1d"))
+    analysis_4h = _analyze_chart(symbol, "4h", "binance", series)
+    analysis_1d = _analyze_chart(symbol, "1d", "binance", series)
 
     if analysis_4h.get("status") == "error":
         return {"status": "error", "message": analysis_4h.get("message")}
 
     # Score-based signal generation
-    score = 0
-    reasons = []
-
-    # RSI signals
-    rsi = analysis_4h["indicators"]["rsi"]
-    if rsi < 35:
-        score += 2
-        reasons.append(f"RSI oversold ({rsi})")
-    elif rsi > 65:
-        score -= 2
-        reasons.append(f"RSI overbought ({rsi})")
-
-    # MACD signals
-    macd = analysis_4h["indicators"]["macd"]
-    if macd["trend"] == "bullish":
-        score += 1
-        reasons.append("MACD bullish crossover")
-    else:
-        score -= 1
-        reasons.append("MACD bearish")
-
-    # EMA trend
-    if analysis_4h["indicators"]["ema_trend"] == "bullish":
-        score += 1
-        reasons.append("EMA20 > EMA50 (bullish)")
-    else:
-        score -= 1
-        reasons.append("EMA20 < EMA50 (bearish)")
-
-    # SMC BOS/CHoCH
-    bos = analysis_4h["smc"]["bos"]
-    choch = analysis_4h["smc"]["choch"]
-    if bos and "bullish" in bos.get("type", ""):
-        score += 2
-        reasons.append(f"Bullish BOS at {bos['level']:.2f}")
-    elif bos and "bearish" in bos.get("type", ""):
-        score -= 2
-        reasons.append(f"Bearish BOS at {bos['level']:.2f}")
-
-    # Elliott Wave context
     ew = analysis_4h["elliott_wave"]
-    if "3" in ew.get("likely_wave", "") or "5" in ew.get("likely_wave", ""):
-        if ew["trend"] == "uptrend":
-            score += 1
-            reasons.append(f"Elliott Wave: {ew['likely_wave']}")
-
-    # Macro trend alignment
     macro_bias = analysis_4h.get("macro_trend", {}).get("macro_bias", "NEUTRAL")
-    if macro_bias in ("STRONG_BULL", "MILD_BULL"):
-        score += 1
-        reasons.append(f"Macro trend: {macro_bias}")
-    elif macro_bias in ("STRONG_BEAR", "MILD_BEAR"):
-        score -= 1
-        reasons.append(f"Macro trend: {macro_bias}")
-
-    # Determine signal
-    if score >= 4:
-        signal = "STRONG_BUY"
-    elif score >= 2:
-        signal = "BUY"
-    elif score <= -4:
-        signal = "STRONG_SELL"
-    elif score <= -2:
-        signal = "SELL"
-    else:
-        signal = "HOLD"
+    score, reasons = _score_signal(
+        rsi=analysis_4h["indicators"]["rsi"],
+        macd_trend=analysis_4h["indicators"]["macd"]["trend"],
+        ema_trend=analysis_4h["indicators"]["ema_trend"],
+        bos=analysis_4h["smc"]["bos"],
+        elliott=ew,
+        macro_bias=macro_bias,
+    )
+    signal = _signal_from_score(score)
 
     # Risk-adjusted targets
     current_price = analysis_4h["price"]["current"]
@@ -563,12 +603,177 @@ def generate_signal(symbol: str, analysis_type: str = "combined", risk_level: st
         "reasons": reasons,
         "elliott_wave": ew,
         "macro_bias": macro_bias,
+        **({"partial_data": sorted(tf for tf, v in series.items() if isinstance(v, Exception))}
+           if any(isinstance(v, Exception) for v in series.values()) else {}),
         "analysis_type": analysis_type,
         "risk_level": risk_level,
         "generated_at": datetime.now().isoformat(),
     }
 
 
+def _top_usdt_symbols(exchange_name: str, count: int) -> list[str]:
+    """Most liquid spot USDT pairs by 24h quote volume."""
+    tickers = fetch_tickers(_get_exchange, exchange_name)
+    pairs = [
+        (sym, t.get("quoteVolume") or 0) for sym, t in tickers.items()
+        if sym.endswith("/USDT") and ":" not in sym
+    ]
+    pairs.sort(key=lambda p: p[1], reverse=True)
+    return [sym for sym, _ in pairs[:count]]
+
+
+_SCAN_COLUMNS = ["symbol", "price", "change_pct", "rsi", "macd", "ema_trend", "smc", "wave", "score", "signal"]
+
+
+def scan_market(symbols: list[str] | str | None = None, timeframe: str = "4h",
+                exchange_name: str = "binance", top_n: int = 50, direction: str = "both",
+                max_results: int = 20) -> dict:
+    """
+    Scan many symbols in one call: OHLCV is fetched concurrently (bounded by
+    TRADE_SCAN_WORKERS, through the shared market-data cache), indicators run
+    as one NumPy batch, SMC structure per symbol, scored like generate_signal
+    (without the macro fetch). Returns a compact ranked table.
+    """
+    try:
+        if isinstance(symbols, str):
+            symbols = [s.strip() for s in symbols.split(",") if s.strip()]
+        if not symbols:
+            symbols = _top_usdt_symbols(exchange_name, min(int(top_n), SCAN_MAX_SYMBOLS))
+        symbols = list(dict.fromkeys(symbols))[:SCAN_MAX_SYMBOLS]
+    except Exception as e:
+        return {"status": "error", "message": f"Symbol universe unavailable: {e}"}
+    if not symbols:
+        return {"status": "error", "message": "No symbols to scan"}
+
+    series: dict[str, list] = {}
+    errors: dict[str, str] = {}
+    futures = {
+        _SCAN_EXECUTOR.submit(fetch_ohlcv, _get_exchange, exchange_name, sym, timeframe, 100): sym
+        for sym in symbols
+    }
+    for fut in as_completed(futures):
+        sym = futures[fut]
+        try:
+            ohlcv = fut.result()
+        except Exception as e:
+            errors[sym] = str(e)[:120]
+            continue
+        if not ohlcv or len(ohlcv) < SCAN_MIN_CANDLES:
+            errors[sym] = "insufficient data"
+            continue
+        series[sym] = ohlcv
+
+    closes = {sym: [c[4] for c in ohlcv] for sym, ohlcv in series.items()}
+    batch = indicators.compute_batch(closes)
+
+    rows = []
+    for sym, ohlcv in series.items():
+        c = closes[sym]
+        opens = [o[1] for o in ohlcv]
+        highs = [o[2] for o in ohlcv]
+        lows = [o[3] for o in ohlcv]
+        ind = batch[sym]
+        structure = get_structure(highs, lows, opens, c, key=(exchange_name, sym, timeframe))
+        smc = _detect_bos_choch(c, highs, lows, structure=structure)
+        elliott = _analyze_elliott_wave(c, highs, lows, structure=structure)
+
+        rsi = round(ind["rsi"], 2)
+        macd_trend = "bullish" if ind.get("macd_histogram", 0) > 0 else "bearish"
+        ema_trend = "bullish" if ind["ema20"] > ind["ema50"] else "bearish"
+        score, _ = _score_signal(rsi, macd_trend, ema_trend, smc["bos"], elliott)
+        structure_event = smc["bos"] or smc["choch"]
+        rows.append([
+            sym,
+            round(c[-1], 6),
+            round((c[-1] - c[-2]) / c[-2] * 100, 2),
+            rsi,
+            macd_trend,
+            ema_trend,
+            structure_event["type"] if structure_event else None,
+            elliott["likely_wave"],
+            score,
+            _signal_from_score(score),
+        ])
+
+    score_idx = _SCAN_COLUMNS.index("score")
+    if direction == "long":
+        rows.sort(key=lambda r: -r[score_idx])
+    elif direction == "short":
+        rows.sort(key=lambda r: r[score_idx])
+    else:
+        rows.sort(key=lambda r: -abs(r[score_idx]))
+
+    return {
+        "status": "success",
+        "exchange": exchange_name,
+        "timeframe": timeframe,
+        "scanned": len(series),
+        "requested": len(symbols),
+        "columns": _SCAN_COLUMNS,
+        "rows": rows[:max(1, int(max_results))],
+        "errors": errors,
+        "fetched_at": datetime.now().isoformat(),
+    }
+
+
+def _flag(value) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes")
+
+
+def backtest_signal(data_file: str | None = None, symbol: str | None = None, timeframe: str = "1h",
+                    days: int = 365, exchange_name: str = "binance", entry_score: int = 2,
+                    exit_score: int = 1, allow_short: bool = True, fee_bps: float = 4.0,
+                    sweep: bool = False) -> dict:
+    """
+    Backtest generate_signal's scoring on historical candles: a CSV/Parquet
+    file under TRADE_DATA_DIR, or the last `days` of `symbol` from the local
+    OHLCV store (only candles it does not hold yet are downloaded, a bounded
+    number of pages per call: a long history returns status "partial" until
+    it is complete). With
+    sweep=True, entry/exit/short/macro variants are compared in parallel and
+    the best five returned.
+    """
+    source = data_file or symbol
+    try:
+        # Gemini declares every tool parameter as STRING
+        days, entry_score, exit_score, fee_bps = int(days), int(entry_score), int(exit_score), float(fee_bps)
+        allow_short, sweep = _flag(allow_short), _flag(sweep)
+        if data_file:
+            root = TRADE_DATA_DIR.resolve()
+            path = (root / data_file).resolve()
+            if root not in path.parents or not path.is_file():
+                return {"status": "error", "message": f"Data file not found under {root}: {data_file}"}
+            candles = backtest.load_candles(str(path))
+        elif symbol:
+            since = int((datetime.now(timezone.utc) - timedelta(days=days)).timestamp() * 1000)
+            store = get_ohlcv_store()
+            series, complete = store.ensure_history(_get_exchange, exchange_name, symbol, timeframe, since,
+                                                    max_pages=store.backfill_pages)
+            if not complete:
+                # Never page the exchange for minutes inside one agent turn
+                return {"status": "partial", "source": source, "candles_stored": len(series),
+                        "message": "History is still downloading; call backtest_signal again to continue"}
+            candles = series.read(since)
+        else:
+            return {"status": "error", "message": "Either data_file or symbol is required"}
+        if len(candles["close"]) < backtest.DEFAULT_WINDOW + 1:
+            return {"status": "error", "message": "Not enough candles to backtest"}
+        period = {
+            "from": datetime.fromtimestamp(candles["timestamp"][0] / 1000, tz=timezone.utc).isoformat(),
+            "to": datetime.fromtimestamp(candles["timestamp"][-1] / 1000, tz=timezone.utc).isoformat(),
+        }
+        if sweep:
+            grid = {"entry": [2, 3, 4], "exit": [0, 1], "allow_short": [True, False],
+                    "macro": [True, False], "fee_bps": [fee_bps]}
+            return {"status": "success", "source": source, "period": period,
+                    "results": backtest.sweep(candles, grid, timeframe)[:5]}
+        result = backtest.run_backtest(candles, timeframe, entry=entry_score, exit=exit_score,
+                                       allow_short=allow_short, fee_bps=fee_bps)
+        return {"status": "success", "source": source, "period": period, **result}
+    except Exception as e:
+        return {"status": "error", "message": str(e), "source": source}
+
+
 # ── Tool Definitions (for agent runner) ──────────────────────────────────────
 
 TRADE_TOOLS_IMPL = {
@@ -576,12 +781,15 @@ TRADE_TOOLS_IMPL = {
     "get_funding_rate": get_funding_rate,
     "get_multi_exchange_price": get_multi_exchange_price,
     "generate_signal": generate_signal,
+    "scan_market": scan_market,
+    "backtest_signal": backtest_signal,
 }
 
 TRADE_TOOL_DEFINITIONS = [
     {
         "name": "analyze_chart",
         "description": "Real-time chart analysis: OHLCV data from Binance/multi-exchange + Elliott Wave + SMC (BOS, CHoCH, Order Blocks, FVG) + RSI/MACD/EMA/Bollinger",
+        "parallel_safe": True,
         "parameters": {
             "symbol": {"type": "string", "description": "Trading pair (BTC/USDT, ETH/USDT etc.)"},
             "timeframe": {"type": "string", "description": "Timeframe (1m, 5m, 15m, 1h, 4h, 1d, 1w)"},
@@ -592,6 +800,7 @@ TRADE_TOOL_DEFINITIONS = [
     {
         "name": "get_funding_rate",
         "description": "Fetch real-time perpetual futures funding rate from exchange",
+        "parallel_safe": True,
         "parameters": {
             "symbol": {"type": "string", "description": "Trading pair"},
             "exchange_name": {"type": "string", "description": "Exchange (binance, bybit)"},
@@ -601,6 +810,7 @@ TRADE_TOOL_DEFINITIONS = [
     {
         "name": "get_multi_exchange_price",
         "description": "Get current price from multiple exchanges (Binance, Bybit, OKX) for comparison",
+        "parallel_safe": True,
         "parameters": {
             "symbol": {"type": "string", "description": "Trading pair (BTC/USDT)"},
         },
@@ -609,6 +819,7 @@ TRADE_TOOL_DEFINITIONS = [
     {
         "name": "generate_signal",
         "description": "Generate BUY/SELL/HOLD signal based on real market data, Elliott Wave, SMC, and multi-timeframe analysis",
+        "parallel_safe": True,
         "parameters": {
             "symbol": {"type": "string", "description": "Trading pair"},
             "analysis_type": {"type": "string", "description": "Analysis type: combined, elliott, smc"},
@@ -616,4 +827,33 @@ TRADE_TOOL_DEFINITIONS = [
         },
         "required": ["symbol"],
     },
+    {
+        "name": "scan_market",
+        "description": "Scan many pairs at once (default: top USDT pairs by volume): batch RSI/MACD/EMA + SMC, ranked table with score and signal",
+        "parallel_safe": True,
+        "parameters": {
+            "symbols": {"type": "array", "items": {"type": "string"}, "description": "Pairs to scan; omit for top pairs by volume"},
+            "timeframe": {"type": "string", "description": "Timeframe (15m, 1h, 4h, 1d)"},
+            "top_n": {"type": "integer", "description": "Universe size when symbols is omitted (max 100)"},
+            "direction": {"type": "string", "description": "Ranking: long, short or both"},
+            "max_results": {"type": "integer", "description": "Rows to return (default 20)"},
+        },
+        "required": [],
+    },
+    {
+        "name": "backtest_signal",
+        "description": "Backtest the generate_signal scoring on historical candles (local store or CSV/Parquet file): PnL, drawdown, win rate; optional parameter sweep",
+        "parallel_safe": True,
+        "parameters": {
+            "symbol": {"type": "string", "description": "Trading pair, read from the local candle store"},
+            "days": {"type": "integer", "description": "History length for symbol (default 365)"},
+            "data_file": {"type": "string", "description": "Or: candle file under the trade data dir"},
+            "timeframe": {"type": "string", "description": "Candle timeframe (1h, 4h, 1d)"},
+            "entry_score": {"type": "integer", "description": "Enter when |score| >= this (default 2)"},
+            "exit_score": {"type": "integer", "description": "Exit when |score| <= this (default 1)"},
+            "allow_short": {"type": "boolean", "description": "Trade SELL signals short"},
+            "sweep": {"type": "boolean", "description": "Compare parameter variants in parallel"},
+        },
+        "required": [],
+    },
 ]
@@ -17,6 +17,7 @@ from .database.connection import set_event_loop
 from .departments import DEPARTMENTS, ALL_AGENTS
 from .agents.world_model import get_world_model_manager
 from .agents.external_watcher import get_external_watcher
+from .agents.dispatcher import get_dispatcher
 from .logging_config import configure_logging
 from .middleware.error_handler import add_error_handlers
 from .middleware.rate_limit import add_rate_limiting
@@ -69,10 +70,16 @@ async def lifespan(app: FastAPI):
     await watcher.start()
     logger.info("ExternalDataWatcher started (5 streams)")
 
+    # Start scheduler dispatcher (priority queue → runner)
+    dispatcher = get_dispatcher()
+    await dispatcher.start()
+
     yield
 
-    # Shutdown: stop ExternalDataWatcher
+    # Shutdown: stop dispatcher and ExternalDataWatcher
+    await dispatcher.stop()
     await watcher.stop()
+    await db.close()  # flush buffered event / usage / message writes
     logger.info("COWORK.ARMY shutting down...")
 
 
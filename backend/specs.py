@@ -0,0 +1,28 @@
+"""
+COWORK.ARMY — Override specs
+Env ayarlarındaki "anahtar=değer" listelerini çözer, örn.
+AGENT_DEPT_SLOTS="trade=2,*=3", LLM_RATE_LIMITS="anthropic=50,gemini=60",
+AGENT_HISTORY_BUDGETS="ceo=48000". "*" varsayılan değeri değiştirir.
+"""
+import logging
+
+logger = logging.getLogger("cowork.config")
+
+
+def parse_overrides(spec: str, default: int) -> tuple[int, dict[str, int]]:
+    """Parse a spec like "trade=2,software=4,*=3" into (default, overrides)."""
+    overrides: dict[str, int] = {}
+    for part in (spec or "").split(","):
+        key, sep, value = part.strip().partition("=")
+        if not sep:
+            continue
+        try:
+            n = int(value)
+        except ValueError:
+            logger.warning(f"[CONFIG] Invalid override ignored: {part!r}")
+            continue
+        if key.strip() == "*":
+            default = n
+        else:
+            overrides[key.strip()] = n
+    return default, overrides
@@ -0,0 +1,108 @@
+"""Tests for the agent spawn AdmissionController."""
+import asyncio
+import pytest
+from backend.agents.admission import AdmissionController
+from backend.specs import parse_overrides
+
+
+def test_parse_overrides():
+    default, overrides = parse_overrides("trade=2,software=4,*=3", 8)
+    assert default == 3
+    assert overrides == {"trade": 2, "software": 4}
+    assert parse_overrides("", 5) == (5, {})
+
+
+@pytest.mark.asyncio
+async def test_max_in_flight_queues_excess():
+    ac = AdmissionController(max_in_flight=2, dept_slots="", provider_slots="", max_queue=10)
+    await ac.acquire("a")
+    await ac.acquire("b")
+    waiter = asyncio.create_task(ac.acquire("c"))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    assert ac.queue_depth() == 1
+
+    ac.release()
+    waited = await asyncio.wait_for(waiter, 1)
+    assert waited >= 0
+    assert ac.in_flight() == 2
+    assert ac.queue_depth() == 0
+
+
+@pytest.mark.asyncio
+async def test_priority_then_fifo_order():
+    ac = AdmissionController(max_in_flight=1, dept_slots="", provider_slots="", max_queue=10)
+    await ac.acquire("holder")
+    order = []
+
+    async def run(agent_id, priority):
+        await ac.acquire(agent_id, priority=priority)
+        order.append(agent_id)
+
+    tasks = [
+        asyncio.create_task(run("low", 3)),
+        asyncio.create_task(run("med-1", 2)),
+        asyncio.create_task(run("critical", 0)),
+        asyncio.create_task(run("med-2", 2)),
+    ]
+    await asyncio.sleep(0)
+    for _ in range(4):
+        ac.release()
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    assert order == ["critical", "med-1", "med-2", "low"]
+
+
+@pytest.mark.asyncio
+async def test_department_slots_do_not_block_other_departments():
+    ac = AdmissionController(max_in_flight=5, dept_slots="trade=1", provider_slots="", max_queue=10)
+    await ac.acquire("t1", department="trade")
+    blocked = asyncio.create_task(ac.acquire("t2", department="trade"))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(ac.acquire("s1", department="software"), 1)
+    assert not blocked.done()
+    assert ac.get_stats()["by_department"] == {"trade": 1, "software": 1}
+
+    ac.release(department="trade")
+    await asyncio.wait_for(blocked, 1)
+
+
+@pytest.mark.asyncio
+async def test_provider_slots():
+    ac = AdmissionController(max_in_flight=5, dept_slots="", provider_slots="gemini=1", max_queue=10)
+    await ac.acquire("a", provider="gemini")
+    blocked = asyncio.create_task(ac.acquire("b", provider="gemini"))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+    await asyncio.wait_for(ac.acquire("c", provider="anthropic"), 1)
+    blocked.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await blocked
+    assert ac.queue_depth() == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_full_rejects_and_counts():
+    ac = AdmissionController(max_in_flight=1, dept_slots="", provider_slots="", max_queue=1)
+    await ac.acquire("a")
+    waiter = asyncio.create_task(ac.acquire("b"))
+    await asyncio.sleep(0)
+    assert ac.is_saturated()
+    with pytest.raises(RuntimeError, match="queue full"):
+        await ac.acquire("c")
+    stats = ac.get_stats()
+    assert stats["rejected_total"] == 1
+    assert stats["queue_depth"] == 1
+    assert stats["peak_queue_depth"] == 1
+    waiter.cancel()
+
+
+@pytest.mark.asyncio
+async def test_slot_context_releases():
+    ac = AdmissionController(max_in_flight=1, dept_slots="", provider_slots="", max_queue=10)
+    async with ac.slot("a", department="trade", provider="gemini"):
+        assert ac.in_flight() == 1
+    assert ac.in_flight() == 0
+    stats = ac.get_stats()
+    assert stats["admitted_total"] == 1
+    assert "wait_ms_avg" in stats and "wait_ms_p95" in stats
@@ -0,0 +1,168 @@
+"""Tests for the repository's in-process agent cache."""
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from backend.database.agent_cache import AgentCache
+from backend.database.repository import Database
+
+AGENTS = [
+    {"id": "ceo", "department_id": None, "name": "CEO", "skills": ["strategy"]},
+    {"id": "trade-indicator", "department_id": "trade", "name": "Indicator"},
+    {"id": "software-fullstack", "department_id": "software", "name": "Fullstack"},
+]
+
+
+def _db(rowcount=1):
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(rowcount=rowcount))
+    session.commit = AsyncMock()
+
+    @asynccontextmanager
+    async def sf():
+        yield session
+
+    db = Database(sf)
+    db._load_agents = AsyncMock(side_effect=lambda: [dict(a) for a in AGENTS])
+    return db, session
+
+
+@pytest.mark.asyncio
+async def test_reads_are_served_from_one_load():
+    db, _ = _db()
+    assert [a["id"] for a in await db.get_all_agents()] == [a["id"] for a in AGENTS]
+    assert (await db.get_agent("trade-indicator"))["name"] == "Indicator"
+    assert await db.get_agent("missing") is None
+    assert [a["id"] for a in await db.get_all_agents(department_id="software")] == ["software-fullstack"]
+    assert db._load_agents.await_count == 1
+    assert db.agents.get_stats()["hits"] == 3
+
+    # Callers get copies, down to the list fields
+    agent = await db.get_agent("ceo")
+    agent["name"] = "changed"
+    agent["skills"].append("leaked")
+    (await db.get_all_agents())[0]["skills"].clear()
+    assert await db.get_agent("ceo") == AGENTS[0]
+
+
+@pytest.mark.asyncio
+async def test_upsert_and_delete_invalidate():
+    db, session = _db()
+    await db.get_all_agents()
+    await db.upsert_agent({"id": "new", "name": "New"})
+    assert db.agents.version == 1
+    await db.get_agent("ceo")
+    assert db._load_agents.await_count == 2
+
+    await db.delete_agent("new")
+    await db.get_all_agents()
+    assert db._load_agents.await_count == 3
+
+    db_nothing, _ = _db(rowcount=0)
+    await db_nothing.get_all_agents()
+    assert await db_nothing.delete_agent("ceo") is False  # base agent: no row deleted
+    assert db_nothing.agents.version == 0
+
+
+@pytest.mark.asyncio
+async def test_load_racing_with_a_write_is_not_cached():
+    cache = AgentCache(ttl=0)
+    gate = asyncio.Event()
+
+    async def slow_loader():
+        await gate.wait()
+        return [dict(a) for a in AGENTS]
+
+    reader = asyncio.create_task(cache.get_all(slow_loader))
+    await asyncio.sleep(0)
+    cache.invalidate()  # an agent was written while the SELECT ran
+    gate.set()
+    assert len(await reader) == 3
+    assert cache.get_stats()["cached_agents"] is None
+
+
+@pytest.mark.asyncio
+async def test_ttl_and_remote_notifications_expire_the_snapshot():
+    loader = AsyncMock(side_effect=lambda: [dict(a) for a in AGENTS])
+    cache = AgentCache(ttl=0.01)
+    await cache.get_all(loader)
+    await asyncio.sleep(0.02)
+    await cache.get_all(loader)
+    assert loader.await_count == 2
+
+    cache._on_notify(None, 1, "cowork_agents", cache.instance_id)  # our own write: ignored
+    await cache.get_all(loader)
+    assert loader.await_count == 2
+    cache._on_notify(None, 1, "cowork_agents", "other-replica")
+    await cache.get_all(loader)
+    assert loader.await_count == 3
+    assert cache.stats["remote_invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_agent_writes_notify_other_replicas_when_enabled():
+    db, session = _db()
+    db._notify_agents = True
+    await db.upsert_agent({"id": "new", "name": "New"})
+    notify = session.execute.await_args_list[-1]
+    assert "pg_notify" in str(notify.args[0])
+    assert notify.args[1] == {"channel": "cowork_agents", "sender": db.agents.instance_id}
+
+
+class FakeListenConn:
+    def __init__(self):
+        self.driver_connection = self
+        self.on_lost = None
+        self.invalidated = False
+
+    async def get_raw_connection(self):
+        return self
+
+    async def add_listener(self, channel, callback):
+        self.channel = channel
+
+    def add_termination_listener(self, callback):
+        self.on_lost = callback
+
+    async def invalidate(self):
+        self.invalidated = True
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_lost_listen_connection_bypasses_the_cache_and_reconnects():
+    conns, failures = [], [1]
+
+    class Engine:
+        async def connect(self):
+            if conns and failures[0]:
+                failures[0] -= 1
+                raise OSError("connection refused")
+            conns.append(FakeListenConn())
+            return conns[-1]
+
+    loader = AsyncMock(side_effect=lambda: [dict(a) for a in AGENTS])
+    cache = AgentCache(ttl=0)
+    cache.reconnect_delay = 0.01
+    await cache.listen(Engine())
+    await cache.get_all(loader)
+    await cache.get_all(loader)
+    assert loader.await_count == 1
+
+    conns[0].on_lost(conns[0])  # the server dropped the LISTEN connection
+    assert not cache.get_stats()["listening"]
+    await cache.get_all(loader)
+    await cache.get_all(loader)
+    assert loader.await_count == 3  # no snapshot while NOTIFYs could be missed
+
+    await asyncio.sleep(0.05)  # one failed attempt, then reconnected
+    assert conns[0].invalidated and len(conns) == 2
+    assert cache.get_stats()["listening"] and cache.stats["listener_reconnects"] == 1
+    await cache.get_all(loader)
+    await cache.get_all(loader)
+    assert loader.await_count == 4
+    await cache.close()
@@ -45,20 +45,22 @@ def test_convert_to_agent_format_software_code():
 
 @pytest.mark.asyncio
 @patch("backend.cargo.consult.get_db")
-async def test_consult_and_route_trade_task(mock_get_db):
+async def test_consult_and_route_trade_task(mock_get_db, tmp_path):
     mock_db = AsyncMock()
     mock_db.add_event = AsyncMock()
     mock_db.create_task = AsyncMock(return_value={"id": "task-1"})
     mock_get_db.return_value = mock_db
 
-    result = await consult_and_route(
-        title="BTC Elliott Wave Analizi",
-        description="BTC için sinyal üret ve grafik analiz yap",
-        content="",
-        filename="btc_data.csv",
-    )
+    with patch("backend.cargo.consult.WORKSPACE", tmp_path):
+        result = await consult_and_route(
+            title="BTC Elliott Wave Analizi",
+            description="BTC için sinyal üret ve grafik analiz yap",
+            content="",
+            filename="btc_data.csv",
+        )
     assert result["success"] is True
     assert result["target_department_id"] == "trade"
     assert result["ceo_approved"] is True
     assert result["cargo_converted"] is True
     mock_db.add_event.assert_called()
+    assert len(list((tmp_path / "indicator" / "inbox").glob("TASK-consult-*.json"))) == 1
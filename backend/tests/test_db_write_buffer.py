@@ -0,0 +1,169 @@
+"""Tests for the database write-behind buffer."""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from backend.database.models import Event, LlmUsage, TaskHistory
+from backend.database.repository import Database
+from backend.database.write_buffer import WriteBuffer
+
+
+class FakeSession:
+    def __init__(self, log, fail=False):
+        self.log, self.fail = log, fail
+        self.added = []
+
+    async def execute(self, stmt, rows=None):
+        if self.fail:
+            raise ConnectionError("db down")
+        self.log.append((stmt.table.name, list(rows or [])))
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        for i, obj in enumerate(self.added, start=1):
+            obj.id = i
+        self.log.append(("commit", self.added))
+
+
+def _factory(log, state=None):
+    state = state if state is not None else {}
+
+    @asynccontextmanager
+    async def sf():
+        yield FakeSession(log, fail=state.get("fail", False))
+    return sf
+
+
+@pytest.mark.asyncio
+async def test_rows_are_grouped_per_table_and_flushed_on_timer():
+    log = []
+    buf = WriteBuffer(_factory(log), batch_size=100, flush_ms=20)
+    for i in range(3):
+        await buf.add(Event, {"agent_id": "a", "message": f"m{i}"})
+    await buf.add(LlmUsage, {"provider": "anthropic"})
+    assert log == []  # nothing written inline
+    await asyncio.sleep(0.08)
+    assert log[:2] == [("events", [{"agent_id": "a", "message": f"m{i}"} for i in range(3)]),
+                       ("llm_usage", [{"provider": "anthropic"}])]
+    assert log[2][0] == "commit"
+    assert len(log) == 3  # one transaction for both tables
+    assert buf.get_stats()["written"] == 4
+    await buf.close()
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_early_and_full_buffer_applies_backpressure():
+    log = []
+    buf = WriteBuffer(_factory(log), batch_size=5, flush_ms=60_000, max_pending=8)
+    for i in range(5):
+        await buf.add(Event, {"message": i})
+    await asyncio.sleep(0.01)  # the flusher wakes up for the full batch
+    assert [len(rows) for table, rows in log if table == "events"] == [5]
+    for i in range(4):
+        await buf.add(TaskHistory, {"task_id": i})
+    for i in range(4):
+        await buf.add(Event, {"message": i})  # 8 pending: add() itself flushes
+    assert buf.stats["backpressure_flushes"] == 1
+    assert buf.get_stats()["pending"] == 0
+    await buf.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_retried_and_close_writes_the_rest():
+    log, state = [], {"fail": True}
+    buf = WriteBuffer(_factory(log, state), batch_size=100, flush_ms=60_000)
+    await buf.add(Event, {"message": "first"})
+    assert await buf.flush() == 0
+    assert buf.stats["failed_flushes"] == 1
+    state["fail"] = False
+    await buf.add(Event, {"message": "second"})
+    await buf.close()
+    assert log[0] == ("events", [{"message": "first"}, {"message": "second"}])
+    with pytest.raises(RuntimeError):
+        await buf.add(Event, {"message": "late"})
+
+
+@pytest.mark.asyncio
+async def test_bad_row_is_rejected_alone_and_the_rest_is_written():
+    log = []
+
+    class PickySession(FakeSession):
+        async def execute(self, stmt, rows=None):
+            if any(r.get("bad") for r in rows or []):
+                raise IntegrityError("INSERT", {}, Exception("null value in column"))
+            self.added.append((stmt.table.name, list(rows or [])))
+
+        async def commit(self):
+            self.log.extend(self.added)
+
+    @asynccontextmanager
+    async def sf():
+        yield PickySession(log)
+
+    buf = WriteBuffer(sf, batch_size=100, flush_ms=60_000)
+    for row in ({"message": "m0"}, {"message": "m1", "bad": True}, {"message": "m2"}):
+        await buf.add(Event, row)
+    await buf.add(TaskHistory, {"task_id": "T-1"})
+    assert await buf.flush() == 3
+    # The events table is retried row by row; task history still goes in whole
+    assert log == [("events", [{"message": "m0"}]), ("events", [{"message": "m2"}]),
+                   ("task_history", [{"task_id": "T-1"}])]
+    assert buf.stats["rejected"] == 1
+    assert buf.get_stats()["pending"] == 0
+    await buf.close()
+
+
+@pytest.mark.asyncio
+async def test_repository_buffers_appends_and_commits_sync_and_llm_usage_at_once():
+    log = []
+    db = Database(_factory(log), write_buffer=True)
+    db._event_count = 10
+    assert await db.add_event("a", "buffered") is None
+    msg_id = await db.save_agent_message({"from_agent": "a", "to_agent": "b", "message_type": "X"})
+    assert log == []
+
+    # The budget check reads LLM spend back right away
+    await db.record_llm_usage("a", "anthropic", "m", 1, 2, 0.1)
+    assert log[0][0] == "commit"
+    assert await db.get_event_count() == 10
+
+    # Critical writes opt into an immediate commit
+    assert await db.add_event("a", "critical", sync=True) == 1
+    assert log[1][0] == "commit"
+    assert await db.get_event_count() == 11
+
+    assert await db.flush_writes() == 2
+    tables = {table: rows for table, rows in log if table != "commit"}
+    assert [r["message"] for r in tables["events"]] == ["buffered"]
+    assert tables["agent_messages"][0]["id"] == msg_id
+    assert "llm_usage" not in tables
+    assert await db.get_event_count() == 12
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_close_during_a_slow_flush_keeps_the_batch():
+    log, gate = [], asyncio.Event()
+
+    class SlowSession(FakeSession):
+        async def execute(self, stmt, rows=None):
+            await gate.wait()
+            await super().execute(stmt, rows)
+
+    @asynccontextmanager
+    async def sf():
+        yield SlowSession(log)
+
+    buf = WriteBuffer(sf, batch_size=100, flush_ms=10)
+    await buf.add(Event, {"message": "in flight"})
+    await asyncio.sleep(0.05)  # the flusher is now blocked inside flush()
+    closing = asyncio.create_task(buf.close())
+    await asyncio.sleep(0.01)
+    gate.set()
+    await closing
+    assert log[0] == ("events", [{"message": "in flight"}])
+    assert buf.get_stats()["written"] == 1
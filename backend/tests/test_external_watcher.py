@@ -99,3 +99,168 @@ def test_severity_enum():
     assert Severity.MEDIUM == "MEDIUM"
     assert Severity.HIGH == "HIGH"
     assert Severity.CRITICAL == "CRITICAL"
+
+
+@pytest.mark.asyncio
+async def test_watcher_http_shares_session_and_uses_conditional_get():
+    from aiohttp import web
+    from backend.agents.external_watcher import WatcherHttp
+
+    body = "<rss><channel><item><title>Rates on hold</title></item></channel></rss>"
+
+    async def feed(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text=body, headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/rss", feed)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    http = WatcherHttp()
+    try:
+        url = f"http://127.0.0.1:{port}/rss"
+        assert await http.get_text("news", url, conditional=True) == body
+        session = http._session
+        assert await http.get_text("news", url, conditional=True) is None
+        assert http._session is session
+        assert session.connector.limit_per_host > 0
+    finally:
+        await http.close()
+        await runner.cleanup()
+
+    stats = http.get_stats()["news"]
+    assert stats["requests"] == 2
+    assert stats["not_modified"] == 1
+    assert stats["bytes"] == len(body)
+    assert stats["errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_news_stream_skips_unchanged_feeds():
+    from backend.agents.external_watcher import NewsDataStream
+
+    stream = NewsDataStream()
+    rss = "<rss><channel><item><title>Markets rally</title></item></channel></rss>"
+    stream.http = MagicMock()
+    stream.http.get_text = AsyncMock(side_effect=lambda name, url, **kw: None if "bbci" in url else rss)
+    events = await stream.fetch()
+    assert [e.raw_data["title"] for e in events] == ["Markets rally"]
+    assert all(call.kwargs["conditional"] for call in stream.http.get_text.call_args_list)
+
+
+def test_watcher_stats_cover_every_stream():
+    watcher = ExternalDataWatcher()
+    stats = watcher.get_stats()
+    assert set(stats["streams"]) == {"market", "news", "social", "operational", "system"}
+    assert all(s.http is watcher.http for s in watcher.streams)
+
+
+def _market_event(change, severity, symbol="BTC", depts=("trade",)):
+    return ExternalEvent("coingecko", "market", {"symbol": symbol, "price": 84000 + change, "change_pct": change},
+                         severity, f"{symbol} {change:+.1f}%", list(depts))
+
+
+@pytest.mark.asyncio
+async def test_coalescer_suppresses_repeats_and_passes_escalations():
+    from backend.agents.external_watcher import EventCoalescer, event_fingerprint
+
+    delivered = []
+
+    async def sink(event):
+        delivered.append(event)
+
+    coalescer = EventCoalescer(sink, window=600, delay=0)
+    assert event_fingerprint(_market_event(2.1, Severity.HIGH)) == event_fingerprint(_market_event(2.4, Severity.HIGH))
+    assert event_fingerprint(_market_event(2.1, Severity.HIGH)) != event_fingerprint(_market_event(-2.1, Severity.HIGH))
+
+    assert await coalescer.submit(_market_event(2.1, Severity.HIGH)) is True
+    assert await coalescer.submit(_market_event(2.3, Severity.HIGH)) is False   # same condition, 30s later
+    assert await coalescer.submit(_market_event(1.2, Severity.MEDIUM)) is False  # calmer: no re-trigger
+    assert await coalescer.submit(_market_event(2.2, Severity.HIGH)) is False   # flapped back: not above emitted
+    assert await coalescer.submit(_market_event(5.5, Severity.CRITICAL)) is True
+    assert await coalescer.submit(_market_event(-2.4, Severity.HIGH)) is True   # reversal
+    assert await coalescer.submit(_market_event(2.0, Severity.HIGH, symbol="ETH")) is True
+
+    assert [e.raw_data["change_pct"] for e in delivered] == [2.1, 5.5, -2.4, 2.0]
+    assert coalescer.stats["suppressed"] == 3
+    assert coalescer.stats["escalated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_coalescer_merges_bursts_per_department():
+    from backend.agents.external_watcher import EventCoalescer
+
+    delivered = []
+
+    async def sink(event):
+        delivered.append(event)
+
+    coalescer = EventCoalescer(sink, window=600, delay=0.05)
+    await coalescer.submit(_market_event(2.1, Severity.HIGH, "BTC"))
+    await coalescer.submit(_market_event(1.1, Severity.MEDIUM, "ETH"))
+    await coalescer.submit(ExternalEvent("wttr.in", "operational", {"city": "Istanbul"},
+                                         Severity.LOW, "İstanbul 20°C", ["hotel"]))
+    assert delivered == []
+    await asyncio.sleep(0.1)
+
+    by_dept = {tuple(e.target_departments): e for e in delivered}
+    assert set(by_dept) == {("trade",), ("hotel",)}
+    merged = by_dept[("trade",)]
+    assert merged.source == "coalesced"
+    assert merged.severity == Severity.HIGH
+    assert merged.raw_data["count"] == 2
+    assert by_dept[("hotel",)].source == "wttr.in"
+    assert coalescer.stats["merged"] == 1
+
+
+@pytest.mark.asyncio
+async def test_coalescer_flushes_critical_immediately_and_on_stop():
+    from backend.agents.external_watcher import EventCoalescer
+
+    delivered = []
+
+    async def sink(event):
+        delivered.append(event)
+
+    coalescer = EventCoalescer(sink, window=600, delay=30)
+    await coalescer.submit(_market_event(1.1, Severity.MEDIUM, "ETH"))
+    await coalescer.submit(_market_event(6.0, Severity.CRITICAL, "BTC"))
+    assert len(delivered) == 1 and delivered[0].raw_data["count"] == 2
+
+    await coalescer.submit(_market_event(1.5, Severity.MEDIUM, "SOL"))
+    await coalescer.flush_all()
+    assert len(delivered) == 2
+
+
+def test_adaptive_interval_speeds_up_on_volatility_and_backs_off_when_calm():
+    stream = MarketDataStream()
+    schedule = stream.schedule
+    assert schedule.current == 30
+    assert schedule.floor == 10  # 360 requests/hour budget beats base/4
+    assert schedule.ceiling == 120
+
+    high = [_market_event(2.5, Severity.HIGH)]
+    assert schedule.update(high, 1) == 15
+    assert schedule.update(high, 0) == 10      # repeats of a HIGH move keep it fast
+    assert schedule.update(high, 0) == 10      # budget floor
+    assert schedule.update([], 0) == 15
+    assert schedule.update([], 0) == 22.5
+    assert schedule.update([], 0) == 33.75
+    for _ in range(5):
+        schedule.update([], 0)
+    assert schedule.current == 120             # ceiling while nothing changes
+    assert schedule.update([_market_event(1.2, Severity.MEDIUM)], 1) == 30
+
+
+def test_watcher_stats_report_effective_interval():
+    watcher = ExternalDataWatcher()
+    news = next(s for s in watcher.streams if s.name == "news")
+    news.schedule.update([], 0)
+    stats = watcher.get_stats()["streams"]
+    assert stats["news"]["effective_interval_seconds"] == 900
+    assert stats["news"]["interval_bounds"] == [150, 2400]
+    assert stats["market"]["effective_interval_seconds"] == 30
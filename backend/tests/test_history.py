@@ -0,0 +1,66 @@
+"""Tests for tool-loop history compaction."""
+import json
+
+from backend.agents.history import (
+    HistoryManager, digest_tool_result, estimate_tokens, get_compaction_stats,
+)
+
+
+def _round(i: int, size: int, tool: str = "run_command") -> list:
+    return [
+        {"role": "assistant", "content": [
+            {"type": "tool_use", "id": f"t{i}", "name": tool, "input": {"content": "x" * size}},
+        ]},
+        {"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": f"t{i}", "tool_name": tool, "content": "y" * size},
+        ]},
+    ]
+
+
+def _history(rounds: int, size: int = 10_000) -> list:
+    messages = [{"role": "user", "content": "Gorevin: test"}]
+    for i in range(rounds):
+        messages += _round(i, size)
+    return messages
+
+
+def test_recent_rounds_kept_verbatim_old_rounds_digested():
+    messages = _history(5)
+    result = HistoryManager("agent-a", budget_tokens=1_000_000, keep_recent_rounds=2).compact(messages)
+
+    results = [m["content"][0]["content"] for m in messages[1:] if m["role"] == "user"]
+    assert all(r.startswith("[ozet]") for r in results[:3])
+    assert results[3] == "y" * 10_000 and results[4] == "y" * 10_000
+    assert result.results_digested == 3
+    assert result.tokens_saved > 0
+    # tool_use / tool_result pairing is preserved
+    assert messages[1]["content"][0]["id"] == messages[2]["content"][0]["tool_use_id"]
+
+
+def test_budget_enforced_but_latest_round_untouched():
+    messages = _history(6)
+    result = HistoryManager("agent-b", budget_tokens=4_000, keep_recent_rounds=3).compact(messages)
+
+    assert result.results_dropped > 0
+    assert messages[-1]["content"][0]["content"] == "y" * 10_000
+    assert result.tokens_after < result.tokens_before
+    assert messages[0]["content"] == "Gorevin: test"
+
+
+def test_compaction_is_idempotent_and_reports_stats():
+    messages = _history(4)
+    mgr = HistoryManager("agent-c", budget_tokens=1_000_000, keep_recent_rounds=1)
+    first = mgr.compact(messages)
+    second = mgr.compact(messages)
+    assert first.tokens_saved > 0
+    assert second.tokens_saved == 0
+    stats = get_compaction_stats()["agents"]["agent-c"]
+    assert stats["compactions"] == 1
+    assert stats["tokens_saved"] == first.tokens_saved
+
+
+def test_json_digest_keeps_scalar_fields():
+    content = json.dumps({"symbol": "BTC/USDT", "rsi": 61.2, "candles": list(range(500))})
+    digest = digest_tool_result("analyze_chart", content)
+    assert "BTC/USDT" in digest and "61.2" in digest and "<500 oge>" in digest
+    assert estimate_tokens(digest) < estimate_tokens(content)
@@ -93,3 +93,222 @@ def test_anthropic_provider_normalizes_text_response(MockAnthropic):
     assert result.stop_reason == "end_turn"
     assert isinstance(result.content[0], TextBlock)
     assert result.content[0].text == "Task completed successfully."
+
+
+@pytest.mark.asyncio
+@patch("anthropic.Anthropic")
+async def test_anthropic_provider_aget_response_uses_async_client(MockAnthropic):
+    """aget_response should await the shared AsyncAnthropic client."""
+    from unittest.mock import AsyncMock
+    from agents import llm_providers
+    from agents.llm_providers import AnthropicProvider, TextBlock
+
+    mock_text_block = MagicMock()
+    mock_text_block.type = "text"
+    mock_text_block.text = "async ok"
+    mock_response = MagicMock()
+    mock_response.stop_reason = "end_turn"
+    mock_response.content = [mock_text_block]
+
+    async_client = MagicMock()
+    async_client.messages.create = AsyncMock(return_value=mock_response)
+
+    with patch.dict(llm_providers._async_anthropic_clients, {"test-async": async_client}):
+        provider = AnthropicProvider(api_key="test-async", model="claude-3-haiku-20240307")
+        result = await provider.aget_response("system", [{"role": "user", "content": "test"}], [])
+
+    async_client.messages.create.assert_awaited_once()
+    MockAnthropic.return_value.messages.create.assert_not_called()
+    assert isinstance(result.content[0], TextBlock)
+    assert result.content[0].text == "async ok"
+
+
+@patch("anthropic.Anthropic")
+def test_anthropic_marks_system_and_tools_cacheable(MockAnthropic):
+    """System prompt and last tool carry cache_control; cache tokens are tracked."""
+    from types import SimpleNamespace
+    from agents.llm_providers import AnthropicProvider, TOOL_DEFS
+
+    provider = AnthropicProvider(api_key="test", model="claude-3-haiku-20240307")
+    kwargs = provider._build_request("sabit sistem", [{"role": "user", "content": "x"}], TOOL_DEFS)
+
+    assert kwargs["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert kwargs["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in kwargs["tools"][0]
+
+    response = SimpleNamespace(
+        content=[], stop_reason="end_turn",
+        usage=SimpleNamespace(input_tokens=12, output_tokens=5,
+                              cache_read_input_tokens=3000, cache_creation_input_tokens=0),
+    )
+    provider._parse_response(response)
+    assert provider.get_last_usage()["cache_read_tokens"] == 3000
+    assert provider.get_last_usage()["cache_write_tokens"] == 0
+
+
+def test_gemini_uses_cached_content_for_large_prefix():
+    """Large stable prefixes are moved into a Gemini cached content once and reused."""
+    from types import SimpleNamespace
+    from agents import llm_providers
+    from agents.llm_providers import GeminiProvider, TOOL_DEFS
+
+    with patch("google.genai.Client") as MockClient:
+        client = MockClient.return_value
+        client.caches.create.return_value = SimpleNamespace(
+            name="cachedContents/abc", usage_metadata=SimpleNamespace(total_token_count=9000),
+        )
+        part = SimpleNamespace(function_call=None, text="ok")
+        client.models.generate_content.return_value = SimpleNamespace(
+            candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))],
+            usage_metadata=SimpleNamespace(prompt_token_count=9100, candidates_token_count=4,
+                                           cached_content_token_count=9000),
+        )
+        provider = GeminiProvider(api_key="k", model="gemini-2.5-flash")
+        big_system = "kural " * 10_000
+
+        with patch.dict(llm_providers._gemini_caches, clear=True):
+            provider.get_response(big_system, [{"role": "user", "content": "a"}], TOOL_DEFS)
+            usage = provider.get_last_usage()
+            provider.get_response(big_system, [{"role": "user", "content": "b"}], TOOL_DEFS)
+
+        assert client.caches.create.call_count == 1
+        config = client.models.generate_content.call_args.kwargs["config"]
+        assert config.cached_content == "cachedContents/abc"
+        assert config.system_instruction is None
+        assert usage == {"input_tokens": 100, "output_tokens": 4,
+                         "cache_read_tokens": 9000, "cache_write_tokens": 9000}
+
+
+def _gemini_cached_provider(MockClient):
+    from types import SimpleNamespace
+    from agents.llm_providers import GeminiProvider
+    client = MockClient.return_value
+    client.caches.create.return_value = SimpleNamespace(
+        name="cachedContents/abc", usage_metadata=SimpleNamespace(total_token_count=9000),
+    )
+    return client, GeminiProvider(api_key="k", model="gemini-2.5-flash")
+
+
+def test_gemini_stale_cache_retries_once_without_cache():
+    """A cache-not-found error is retried once with the full prefix."""
+    from types import SimpleNamespace
+    from agents import llm_providers
+    from agents.llm_providers import TOOL_DEFS
+
+    with patch("google.genai.Client") as MockClient:
+        client, provider = _gemini_cached_provider(MockClient)
+        part = SimpleNamespace(function_call=None, text="ok")
+        client.models.generate_content.side_effect = [
+            Exception("404 NOT_FOUND: CachedContent not found (or permission denied)"),
+            SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))],
+                            usage_metadata=None),
+        ]
+        with patch.dict(llm_providers._gemini_caches, clear=True):
+            result = provider.get_response("kural " * 10_000, [{"role": "user", "content": "a"}], TOOL_DEFS)
+
+        assert result.content[0].text == "ok"
+        assert client.caches.create.call_count == 1
+        config = client.models.generate_content.call_args.kwargs["config"]
+        assert config.cached_content is None
+
+
+def test_gemini_persistent_error_with_cache_is_raised():
+    """Other errors are not retried through a new cache (no unbounded recursion)."""
+    from agents import llm_providers
+    from agents.llm_providers import TOOL_DEFS
+
+    with patch("google.genai.Client") as MockClient:
+        client, provider = _gemini_cached_provider(MockClient)
+        provider.auto_fallback = False
+        client.models.generate_content.side_effect = Exception("500 INTERNAL")
+        with patch.dict(llm_providers._gemini_caches, clear=True):
+            with pytest.raises(Exception, match="500 INTERNAL"):
+                provider.get_response("kural " * 10_000, [{"role": "user", "content": "a"}], TOOL_DEFS)
+
+        assert client.caches.create.call_count == 1
+        assert client.models.generate_content.call_count == 1
+
+
+def test_calculate_cost_prices_cache_tokens():
+    from cost_tracking import calculate_cost
+    base = calculate_cost("claude-sonnet-4-20250514", 1_000_000, 0)
+    cached = calculate_cost("claude-sonnet-4-20250514", 0, 0, cache_read_tokens=1_000_000)
+    assert base == 3.0
+    assert cached == 0.30
+
+
+@pytest.mark.asyncio
+@patch("anthropic.Anthropic")
+async def test_anthropic_aget_response_streams_deltas(MockAnthropic):
+    """With on_delta, Anthropic text and tool-input deltas are forwarded as they arrive."""
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    from agents import llm_providers
+    from agents.llm_providers import AnthropicProvider
+
+    events = [
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text="Merhaba")),
+        SimpleNamespace(type="content_block_start", content_block=SimpleNamespace(type="tool_use", name="read_file")),
+        SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="input_json_delta", partial_json='{"pa')),
+    ]
+    final = SimpleNamespace(content=[SimpleNamespace(type="text", text="Merhaba")],
+                            stop_reason="end_turn", usage=None)
+
+    class FakeStream:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def __aiter__(self):
+            async def gen():
+                for e in events:
+                    yield e
+            return gen()
+
+        get_final_message = AsyncMock(return_value=final)
+
+    async_client = MagicMock()
+    async_client.messages.stream.return_value = FakeStream()
+    deltas = []
+
+    with patch.dict(llm_providers._async_anthropic_clients, {"k-stream": async_client}):
+        provider = AnthropicProvider(api_key="k-stream", model="claude-3-haiku-20240307")
+        result = await provider.aget_response("s", [{"role": "user", "content": "x"}], [],
+                                              on_delta=lambda k, t: deltas.append((k, t)))
+
+    assert deltas == [("text", "Merhaba"), ("tool_start", "read_file"), ("tool_input", '{"pa')]
+    assert result.content[0].text == "Merhaba"
+
+
+@pytest.mark.asyncio
+async def test_gemini_aget_response_streams_and_merges_text():
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+    from agents.llm_providers import GeminiProvider
+
+    def chunk(part, usage=None):
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))],
+                               usage_metadata=usage)
+
+    chunks = [
+        chunk(SimpleNamespace(function_call=None, text="Sel")),
+        chunk(SimpleNamespace(function_call=None, text="am"),
+              SimpleNamespace(prompt_token_count=10, candidates_token_count=2)),
+    ]
+
+    async def agen():
+        for c in chunks:
+            yield c
+
+    with patch("google.genai.Client") as MockClient:
+        MockClient.return_value.aio.models.generate_content_stream = AsyncMock(return_value=agen())
+        provider = GeminiProvider(api_key="k", model="gemini-2.5-flash")
+        deltas = []
+        result = await provider.aget_response("s", [{"role": "user", "content": "x"}], [],
+                                              on_delta=lambda k, t: deltas.append(t))
+
+    assert deltas == ["Sel", "am"]
+    assert len(result.content) == 1 and result.content[0].text == "Selam"
+    assert provider.get_last_usage()["output_tokens"] == 2
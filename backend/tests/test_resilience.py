@@ -0,0 +1,151 @@
+"""Tests for the LLM resilience layer (pacing, backoff, circuit breaker, failover)."""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from backend.agents import resilience
+from backend.agents.resilience import (
+    CircuitBreaker, ResilientLLM, TokenBucket, backoff_delay, is_retryable_error,
+    retry_after_seconds,
+)
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after="2"):
+        super().__init__("429 rate limit")
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+@pytest.fixture(autouse=True)
+def _fresh_registries():
+    with patch.dict(resilience._breakers, clear=True), patch.dict(resilience._buckets, clear=True):
+        yield
+
+
+def _provider(model: str, side_effect):
+    p = MagicMock()
+    p.model = model
+    p.aget_response = AsyncMock(side_effect=side_effect)
+    p.get_last_usage.return_value = {"input_tokens": 1, "output_tokens": 1}
+    return p
+
+
+def test_retry_after_from_header_and_gemini_message():
+    assert retry_after_seconds(RateLimited("7")) == 7.0
+    assert retry_after_seconds(Exception("RESOURCE_EXHAUSTED {'retryDelay': '27s'}")) == 27.0
+    assert retry_after_seconds(ValueError("bad request")) is None
+
+
+def test_retryable_classification():
+    assert is_retryable_error(RateLimited())
+    assert is_retryable_error(ConnectionError("reset"))
+    assert is_retryable_error(type("E", (Exception,), {"status_code": 529})("overloaded"))
+    assert not is_retryable_error(type("E", (Exception,), {"status_code": 400})("invalid"))
+
+
+def test_backoff_honors_retry_after_and_cap():
+    for attempt in range(6):
+        assert 0 <= backoff_delay(attempt, base=1, cap=8) <= 8
+    assert backoff_delay(0, retry_after=5, base=1, cap=8) >= 5
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    b = CircuitBreaker("x", threshold=2, reset_seconds=0)
+    b.record_failure()
+    assert b.allow()
+    b.record_failure()
+    assert b.opens_total == 1
+    assert b.state == "half_open"  # reset_seconds=0
+    b.record_success()
+    assert b.state == "closed"
+
+
+def test_half_open_circuit_lets_one_probe_through(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    b = CircuitBreaker("x", threshold=1, reset_seconds=30)
+    b.record_failure()
+    assert not b.allow()
+    clock[0] += 30
+    assert b.allow()  # the probe
+    assert not b.allow() and not b.allow()  # everyone else fails fast
+    b.record_failure()  # probe failed: open again
+    assert b.state == "open" and not b.allow()
+    clock[0] += 30
+    assert b.allow()
+    b.release_probe()  # e.g. a 400: no verdict, next caller probes
+    assert b.allow()
+    b.record_success()
+    assert b.allow() and b.allow()
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rpm=600, burst=1)  # 10/s
+    await bucket.acquire()
+    waited = await bucket.acquire()
+    assert waited >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_error_then_succeeds():
+    ok = SimpleNamespace(stop_reason="end_turn", content=[])
+    primary = _provider("claude-x", [ConnectionError("reset"), ok])
+    llm = ResilientLLM(primary, max_attempts=3, alternate_factory=lambda name: None)
+    with patch("backend.agents.resilience.backoff_delay", return_value=0):
+        assert await llm.aget_response("s", [], []) is ok
+    assert llm.retries == 1
+    assert llm.take_failover() is None
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_over_and_records_origin():
+    ok = SimpleNamespace(stop_reason="end_turn", content=[])
+    primary = _provider("claude-x", RateLimited("0"))
+    alternate = _provider("gemini-y", [ok, ok])
+    factory = MagicMock(return_value=alternate)
+
+    resilience._breakers["anthropic:claude-x"] = CircuitBreaker("anthropic:claude-x", threshold=2)
+
+    with patch("backend.agents.resilience.backoff_delay", return_value=0):
+        llm = ResilientLLM(primary, max_attempts=5, alternate_factory=factory)
+        assert await llm.aget_response("s", [{"role": "user", "content": "x"}], []) is ok
+        assert llm.take_failover() == "anthropic:claude-x"
+        assert llm.model == "gemini-y"
+        # Sticky: the next round goes straight to the alternate
+        await llm.aget_response("s", [], [])
+
+    assert primary.aget_response.await_count == 2
+    assert alternate.aget_response.await_count == 2
+    factory.assert_called_once_with("anthropic")
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_error_is_raised_immediately():
+    primary = _provider("claude-x", ValueError("invalid request"))
+    llm = ResilientLLM(primary, alternate_factory=lambda name: None)
+    with pytest.raises(ValueError):
+        await llm.aget_response("s", [], [])
+    assert primary.aget_response.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_no_retry_or_failover_after_streamed_delta():
+    async def partial_stream(system_prompt, messages, tools, on_delta=None):
+        on_delta("text", "Merhaba")
+        raise ConnectionError("stream reset")
+
+    primary = _provider("claude-x", partial_stream)
+    alternate = _provider("gemini-y", [SimpleNamespace(stop_reason="end_turn", content=[])])
+    deltas = []
+    llm = ResilientLLM(primary, max_attempts=3, alternate_factory=lambda name: alternate)
+    with patch("backend.agents.resilience.backoff_delay", return_value=0):
+        with pytest.raises(ConnectionError):
+            await llm.aget_response("s", [], [], on_delta=lambda kind, text: deltas.append(text))
+
+    assert deltas == ["Merhaba"]
+    assert primary.aget_response.await_count == 1
+    alternate.aget_response.assert_not_awaited()
@@ -104,3 +104,186 @@ def test_workspace_context_with_readme(tmp_path):
 
     assert "README.md" in ctx
     assert "Test Agent" in ctx
+
+
+@pytest.mark.asyncio
+async def test_execute_tool_async_offloads_blocking_tool():
+    """_execute_tool_async should run sync tools on the tool executor and return JSON."""
+    import threading
+    from backend.agents.runner import _execute_tool_async
+
+    seen = {}
+
+    def fake_read(agent_id, path):
+        seen["thread"] = threading.current_thread().name
+        return {"content": "x"}
+
+    with patch("backend.agents.runner.read_file", side_effect=fake_read):
+        result = await _execute_tool_async("test-agent", "read_file", {"path": "a.md"})
+
+    assert json.loads(result)["content"] == "x"
+    assert seen["thread"].startswith("agent-tool")
+
+
+@pytest.mark.asyncio
+async def test_execute_tool_async_awaits_coroutine_tool():
+    """Coroutine tools should be awaited and receive the db when they declare it."""
+    from backend.agents.runner import _execute_tool_async
+
+    async def deep_dive(db, dept: str) -> str:
+        return f"{db}:{dept}"
+
+    with patch.dict("backend.agents.runner.ALL_TOOLS_IMPL", {"deep_dive": deep_dive}), \
+         patch("backend.agents.runner.get_db", return_value="DB"):
+        result = await _execute_tool_async("ceo", "deep_dive", {"dept": "trade"})
+
+    assert json.loads(result) == "DB:trade"
+
+
+@pytest.mark.asyncio
+async def test_spawn_agent_runs_as_task(tmp_path):
+    """spawn_agent should run _run as an asyncio task without threads or _sync_db."""
+    from unittest.mock import AsyncMock
+    from backend.agents import runner
+    from backend.agents.llm_providers import LLMResponse, TextBlock
+
+    db = MagicMock()
+    db.get_agent = AsyncMock(return_value={
+        "id": "test-agent", "name": "Test", "icon": "", "domain": "",
+        "system_prompt": "sys", "department_id": "trade",
+    })
+    db.add_event = AsyncMock()
+    db.record_llm_usage = AsyncMock()
+
+    llm = MagicMock()
+    llm.model = "claude-3-haiku-20240307"
+    llm.aget_response = AsyncMock(return_value=LLMResponse("end_turn", [TextBlock("bitti")]))
+    llm.get_last_usage.return_value = {"input_tokens": 0, "output_tokens": 0}
+
+    with patch("backend.agents.runner.get_db", return_value=db), \
+         patch("backend.agents.runner.get_llm_provider", return_value=llm), \
+         patch("backend.agents.runner.WORKSPACE", tmp_path):
+        result = await runner.spawn_agent("test-agent", "rapor yaz")
+        assert result["alive"] is True
+        await runner.PROCS["test-agent"].task
+
+    proc = runner.PROCS.pop("test-agent")
+    assert proc.status == "done"
+    assert proc.alive is False
+    llm.aget_response.assert_awaited_once()
+    db.add_event.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_execute_tool_calls_runs_concurrently_in_order():
+    """Independent tool calls of one turn overlap; results keep the model's order."""
+    import asyncio
+    from backend.agents.runner import _execute_tool_calls
+
+    active = {"now": 0, "peak": 0}
+
+    async def fake_exec(agent_id, name, tool_input):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02 if tool_input["symbol"] == "BTC" else 0)
+        active["now"] -= 1
+        return tool_input["symbol"]
+
+    calls = [("analyze_chart", {"symbol": s}) for s in ("BTC", "ETH", "SOL")]
+    with patch("backend.agents.runner._execute_tool_async", side_effect=fake_exec):
+        results = await _execute_tool_calls("trade-indicator", calls)
+
+    assert results == ["BTC", "ETH", "SOL"]
+    assert active["peak"] == 3
+
+
+@pytest.mark.asyncio
+async def test_execute_tool_calls_serializes_same_path_writes_and_times_out():
+    import asyncio
+    from backend.agents.runner import _execute_tool_calls
+
+    order = []
+
+    async def fake_exec(agent_id, name, tool_input):
+        if name == "list_dir":
+            await asyncio.sleep(1)
+        order.append(("start", tool_input.get("content")))
+        await asyncio.sleep(0.01)
+        order.append(("end", tool_input.get("content")))
+        return "ok"
+
+    calls = [
+        ("write_file", {"path": "out.md", "content": "a"}),
+        ("write_file", {"path": "./out.md", "content": "b"}),
+        ("list_dir", {"path": ""}),
+    ]
+    with patch("backend.agents.runner._execute_tool_async", side_effect=fake_exec):
+        results = await _execute_tool_calls("agent", calls, timeout=0.2)
+
+    assert order[:4] == [("start", "a"), ("end", "a"), ("start", "b"), ("end", "b")]
+    assert results[:2] == ["ok", "ok"]
+    assert "timed out" in json.loads(results[2])["error"]
+
+
+@pytest.mark.asyncio
+async def test_execute_tool_calls_runs_side_effect_tools_serially():
+    """Tools are serial unless they opt in with parallel_safe (e.g. schedule_post)."""
+    import asyncio
+    from backend.agents.runner import _PARALLEL_SAFE, _execute_tool_calls
+
+    assert _PARALLEL_SAFE["schedule_post"] is False
+    assert _PARALLEL_SAFE["analyze_chart"] is True
+    order = []
+
+    async def fake_exec(agent_id, name, tool_input):
+        order.append(("start", tool_input["content"]))
+        await asyncio.sleep(0.01)
+        order.append(("end", tool_input["content"]))
+        return "ok"
+
+    calls = [("schedule_post", {"content": c, "platform": "x", "scheduled_time": "t"}) for c in "ab"]
+    with patch("backend.agents.runner._execute_tool_async", side_effect=fake_exec):
+        await _execute_tool_calls("social-media", calls)
+
+    assert order == [("start", "a"), ("end", "a"), ("start", "b"), ("end", "b")]
+
+
+def test_agent_proc_stream_appends_to_current_line():
+    from backend.agents.runner import AgentProc
+
+    proc = AgentProc("a")
+    proc.log("Tur 1/15...")
+    proc.stream("Mer")
+    proc.stream("haba\ndun")
+    proc.stream("ya")
+    proc.log("Yanit")
+
+    assert proc.lines[1].endswith("▸ Merhaba")
+    assert proc.lines[2].endswith("▸ dunya")
+    assert proc.lines[3].endswith("Yanit")
+
+
+@pytest.mark.asyncio
+async def test_token_stream_broadcasts_ordered_agent_token_events():
+    from backend.agents.runner import AgentProc, _TokenStream
+
+    sent = []
+
+    async def fake_broadcast(event):
+        sent.append(event)
+
+    proc = AgentProc("trade-indicator")
+    with patch("backend.api.websocket.broadcast", side_effect=fake_broadcast):
+        stream = _TokenStream(proc, round_num=1)
+        stream("text", "BTC ")
+        stream("text", "yukselis")
+        stream("tool_start", "analyze_chart")
+        stream("tool_input", '{"symbol": "BTC')
+        await stream.close()
+
+    assert all(e["type"] == "agent_token" and e["agent_id"] == "trade-indicator" for e in sent)
+    assert [e["seq"] for e in sent] == list(range(1, len(sent) + 1))
+    text = "".join(e["delta"] for e in sent if e["kind"] == "text")
+    assert text == "BTC yukselis"
+    assert any(e["kind"] == "tool_start" and e["delta"] == "analyze_chart" for e in sent)
+    assert any("🔧 analyze_chart" in line and '{"symbol": "BTC' in line for line in proc.lines)
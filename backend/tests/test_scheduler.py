@@ -92,3 +92,127 @@ def test_task_priority_ordering():
     assert TaskPriority.CRITICAL < TaskPriority.HIGH
     assert TaskPriority.HIGH < TaskPriority.MEDIUM
     assert TaskPriority.MEDIUM < TaskPriority.LOW
+
+
+@pytest.mark.asyncio
+async def test_same_priority_is_fifo(scheduler):
+    for i in range(5):
+        await scheduler.enqueue(ScheduledTask(f"agent-{i}", "t", TaskPriority.MEDIUM))
+    order = [(await scheduler.dequeue()).agent_id for _ in range(5)]
+    assert order == [f"agent-{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_stats_report_latency_throughput_and_pending(scheduler):
+    await scheduler.enqueue(ScheduledTask("agent-a", "t", TaskPriority.LOW))
+    assert scheduler.has_pending("agent-a")
+    task = await scheduler.dequeue()
+    assert not scheduler.has_pending("agent-a")
+    scheduler.mark_active("agent-a", task)
+    scheduler.mark_done("agent-a")
+
+    stats = scheduler.get_stats()
+    assert stats["dispatched_total"] == 1
+    assert stats["completed_total"] == 1
+    assert stats["throughput_per_min"] > 0
+    assert stats["queue_latency"]["LOW"]["samples"] == 1
+    assert stats["starved"] == {}
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_runs_critical_before_low(monkeypatch):
+    from backend.agents import dispatcher as dmod
+
+    started = []
+
+    async def fake_spawn(agent_id, task, priority=2):
+        started.append(agent_id)
+        return {"agent_id": agent_id, "status": "queued"}
+
+    monkeypatch.setattr(dmod, "spawn_agent", fake_spawn)
+    sched = AgentScheduler()
+    for i in range(3):
+        await sched.enqueue(ScheduledTask(f"low-{i}", "rutin", TaskPriority.LOW))
+    await sched.enqueue(ScheduledTask("ceo", "eskalasyon", TaskPriority.CRITICAL))
+
+    d = dmod.AgentDispatcher(scheduler=sched, workers=1, requeue_delay=0.01)
+    await d.start()
+    try:
+        for _ in range(50):
+            if len(started) == 4:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await d.stop()
+
+    assert started[0] == "ceo"
+    assert d.get_stats()["completed_total"] == 4
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_requeues_busy_agent(monkeypatch):
+    from backend.agents import dispatcher as dmod
+
+    started = []
+
+    async def fake_spawn(agent_id, task, priority=2):
+        started.append(agent_id)
+        return {"agent_id": agent_id}
+
+    monkeypatch.setattr(dmod, "spawn_agent", fake_spawn)
+    sched = AgentScheduler()
+    sched.mark_active("busy-agent", ScheduledTask("busy-agent", "x", TaskPriority.LOW))
+    await sched.enqueue(ScheduledTask("busy-agent", "ikinci", TaskPriority.HIGH))
+
+    d = dmod.AgentDispatcher(scheduler=sched, workers=1, requeue_delay=0.01)
+    await d.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert started == []
+        assert sched.get_stats()["requeued_total"] >= 1
+        sched.mark_done("busy-agent")
+        for _ in range(50):
+            if started:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await d.stop()
+
+    assert started == ["busy-agent"]
+
+
+@pytest.mark.asyncio
+async def test_requeue_delay_keeps_task_pending(monkeypatch):
+    from backend.agents import dispatcher as dmod
+
+    sched = AgentScheduler()
+    sched.mark_active("busy-agent", ScheduledTask("busy-agent", "x", TaskPriority.LOW))
+    await sched.enqueue(ScheduledTask("busy-agent", "ikinci", TaskPriority.HIGH))
+
+    d = dmod.AgentDispatcher(scheduler=sched, workers=1, requeue_delay=5)
+    await d.start()
+    try:
+        for _ in range(50):
+            if sched.queue_size() == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert sched.queue_size() == 0  # dequeued, sleeping before the requeue
+        assert sched.has_pending("busy-agent")
+    finally:
+        await d.stop()
+    assert not sched.has_pending("busy-agent")
+
+
+def test_escalation_message_becomes_critical_task():
+    from backend.agents.dispatcher import task_from_message
+    from backend.agents.message_bus import AgentMessage, MessageType, Priority
+
+    msg = AgentMessage(
+        from_agent="trade-indicator", to_agent="ceo",
+        message_type=MessageType.ESCALATION, priority=Priority.HIGH,
+        payload={"reason": "Drawdown limiti asildi"},
+    )
+    task = task_from_message(msg)
+    assert task.agent_id == "ceo"
+    assert task.priority == TaskPriority.CRITICAL
+    assert "Drawdown" in task.task
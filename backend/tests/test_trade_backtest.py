@@ -0,0 +1,208 @@
+"""Tests for the offline trade backtest engine."""
+import numpy as np
+import pytest
+
+from backend.departments.trade import backtest as bt
+from backend.departments.trade import tools_impl
+from backend.departments.trade.bench_indicators import random_walk
+
+H12 = 12 * 3_600_000
+
+
+def _candles(n=800, seed=5, step=H12, start=1_577_836_800_000):
+    closes = np.array(random_walk(n, seed=seed))
+    rng = np.random.default_rng(seed)
+    opens = np.r_[closes[0], closes[:-1]]
+    return {
+        "timestamp": start + np.arange(n, dtype=np.int64) * step,
+        "open": opens,
+        "high": np.maximum(opens, closes) * (1 + rng.uniform(0, 0.01, n)),
+        "low": np.minimum(opens, closes) * (1 - rng.uniform(0, 0.01, n)),
+        "close": closes,
+        "volume": rng.uniform(100, 1000, n),
+    }
+
+
+def _reference_macro(candles, t):
+    """_get_macro_trend on what a live 50-candle fetch would return at bar t."""
+    upto = {k: v[:t + 1] for k, v in candles.items()}
+    trends = []
+    for tf in ("1d", "1w"):
+        closes = bt.resample(upto, tf)["close"].tolist()
+        if len(closes) < 50:
+            continue
+        closes = closes[-50:]
+        ema20 = tools_impl._calc_ema(closes, 20)
+        ema50 = tools_impl._calc_ema(closes, 50)
+        cur = closes[-1]
+        trends.append("bullish" if ema20[-1] > ema50[-1] and cur > ema20[-1] else
+                      "bearish" if ema20[-1] < ema50[-1] and cur < ema20[-1] else "neutral")
+    if not trends:
+        return "NEUTRAL"
+    if trends.count("bullish") == len(trends):
+        return "STRONG_BULL"
+    if trends.count("bearish") == len(trends):
+        return "STRONG_BEAR"
+    if "bullish" in trends:
+        return "MILD_BULL"
+    if "bearish" in trends:
+        return "MILD_BEAR"
+    return "NEUTRAL"
+
+
+def _reference_score(candles, t, window=100, macro=True):
+    """generate_signal's scoring run on the `window` candles ending at bar t."""
+    sl = slice(t - window + 1, t + 1)
+    closes = candles["close"][sl].tolist()
+    highs = candles["high"][sl].tolist()
+    lows = candles["low"][sl].tolist()
+    ema20 = tools_impl._calc_ema(closes, 20)
+    ema50 = tools_impl._calc_ema(closes, 50)
+    score, _ = tools_impl._score_signal(
+        rsi=tools_impl._calc_rsi(closes),
+        macd_trend=tools_impl._calc_macd(closes)["trend"],
+        ema_trend="bullish" if ema20[-1] > ema50[-1] else "bearish",
+        bos=tools_impl._detect_bos_choch(closes, highs, lows)["bos"],
+        elliott=tools_impl._analyze_elliott_wave(closes, highs, lows),
+        macro_bias=_reference_macro(candles, t) if macro else "NEUTRAL",
+    )
+    return score
+
+
+def test_scores_replay_generate_signal_rules_exactly():
+    candles = _candles()
+    scores = bt.signal_scores(candles, "12h")["score"]
+    assert np.isnan(scores[:99]).all()
+    expected = [_reference_score(candles, t) for t in range(99, len(candles["close"]))]
+    assert scores[99:].tolist() == expected
+    # Both macro timeframes become available within the sample
+    assert np.abs(bt.signal_scores(candles, "12h")["macro_bias"][-100:]).sum() > 0
+
+
+def test_scores_without_macro_and_custom_window():
+    candles = _candles(n=300, seed=9)
+    scores = bt.signal_scores(candles, "12h", window=60, macro=False)["score"]
+    expected = [_reference_score(candles, t, window=60, macro=False) for t in range(59, 300)]
+    assert scores[59:].tolist() == expected
+
+
+def test_simulate_tracks_positions_fees_and_trades():
+    closes = np.array([100.0, 100, 110, 121, 121, 110, 100, 100])
+    candles = {"close": closes}
+    score = np.array([np.nan, 3, 3, 0, -3, -3, 0, 0])
+    result = bt.simulate(candles, score, "1h", entry=2, exit=1, allow_short=True, fee_bps=0)
+    # Long 100 -> 121, flat one bar, short from 121 to 100 (rebalanced each bar)
+    assert result["trades"] == 2
+    assert result["win_rate_pct"] == 100.0
+    assert result["total_return_pct"] == pytest.approx((1.21 * (1 + 11 / 121) * (1 + 10 / 110) - 1) * 100, abs=0.01)
+
+    long_only = bt.simulate(candles, score, "1h", allow_short=False, fee_bps=0)
+    assert long_only["trades"] == 1
+    assert long_only["total_return_pct"] == 21.0
+
+    with_fees = bt.simulate(candles, score, "1h", allow_short=False, fee_bps=10)
+    assert with_fees["total_return_pct"] == pytest.approx((1.099 * 1.099 - 1) * 100, abs=0.01)
+    assert with_fees["max_drawdown_pct"] <= 0
+
+
+def test_load_candles_csv_and_resample(tmp_path):
+    path = tmp_path / "btc_1h.csv"
+    rows = ["timestamp,open,high,low,close,volume"]
+    for i in range(48):
+        ts = f"2024-01-0{1 + i // 24}T{i % 24:02d}:00:00Z"
+        rows.append(f"{ts},{100 + i},{101 + i},{99 + i},{100.5 + i},10")
+    path.write_text("\n".join(reversed(rows[1:])) + "\n")  # unsorted, no header
+    candles = bt.load_candles(str(path))
+    assert candles["timestamp"][0] == 1_704_067_200_000
+    assert candles["close"][-1] == 147.5
+
+    daily = bt.resample(candles, "1d")
+    assert daily["timestamp"].tolist() == [1_704_067_200_000, 1_704_153_600_000]
+    assert daily["open"].tolist() == [100, 124]
+    assert daily["high"].tolist() == [124, 148]
+    assert daily["close"].tolist() == [123.5, 147.5]
+    assert daily["volume"].tolist() == [240, 240]
+    # 2024-01-01 is a Monday: the weekly bucket starts there
+    assert bt.resample(candles, "1w")["timestamp"].tolist() == [1_704_067_200_000]
+
+
+def test_sweep_runs_in_processes_and_ranks():
+    candles = _candles(n=400, seed=2)
+    grid = {"entry": [2, 3], "allow_short": [True, False]}
+    inline = bt.sweep(candles, grid, "12h", processes=1)
+    pooled = bt.sweep(candles, grid, "12h", processes=2)
+    assert len(inline) == 4
+    assert [r["params"] for r in inline] == [r["params"] for r in pooled]
+    assert inline == pooled
+    sharpes = [r["sharpe"] for r in inline]
+    assert sharpes == sorted(sharpes, reverse=True)
+    with pytest.raises(ValueError):
+        bt.sweep(candles, {"bogus": [1]}, "12h", processes=1)
+
+
+def test_backtest_signal_tool_reads_from_data_dir(tmp_path, monkeypatch):
+    candles = _candles(n=300, seed=4)
+    lines = [",".join(str(candles[c][i]) for c in bt.COLUMNS) for i in range(300)]
+    (tmp_path / "btc_12h.csv").write_text("\n".join(lines))
+    monkeypatch.setattr(tools_impl, "TRADE_DATA_DIR", tmp_path)
+
+    result = tools_impl.backtest_signal("btc_12h.csv", timeframe="12h")
+    assert result["status"] == "success"
+    assert result["bars"] == 300
+    assert result == {**result, **bt.run_backtest(candles, "12h")}
+    assert result["source"] == "btc_12h.csv"
+
+    assert tools_impl.backtest_signal("../outside.csv")["status"] == "error"
+    assert tools_impl.backtest_signal("missing.csv")["status"] == "error"
+
+
+def test_backtest_signal_tool_reads_symbol_from_store(tmp_path, monkeypatch):
+    from backend.departments.trade import ohlcv_store
+    candles = _candles(n=300, seed=4, step=3_600_000, start=1_704_067_200_000)
+    history = [[int(candles["timestamp"][i])] + [float(candles[c][i]) for c in bt.COLUMNS[1:]] for i in range(300)]
+
+    class Exchange:
+        def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+            return [r for r in history if r[0] >= since][:limit]
+
+    store = ohlcv_store.OHLCVStore(tmp_path)
+    monkeypatch.setattr(tools_impl, "get_ohlcv_store", lambda: store)
+    monkeypatch.setattr(tools_impl, "_get_exchange", lambda name: Exchange())
+    result = tools_impl.backtest_signal(symbol="BTC/USDT", timeframe="1h", days=10_000)
+    assert result["status"] == "success"
+    assert result["source"] == "BTC/USDT"
+    # The exchange's newest candle is treated as forming and never stored
+    assert result["bars"] == 299
+    assert len(store.series("binance", "BTC/USDT", "1h")) == 299
+
+
+def test_backtest_signal_tool_coerces_string_arguments(tmp_path, monkeypatch):
+    candles = _candles(n=300, seed=4)
+    lines = [",".join(str(candles[c][i]) for c in bt.COLUMNS) for i in range(300)]
+    (tmp_path / "btc_12h.csv").write_text("\n".join(lines))
+    monkeypatch.setattr(tools_impl, "TRADE_DATA_DIR", tmp_path)
+
+    # What the Gemini path sends: every argument as a string
+    result = tools_impl.backtest_signal("btc_12h.csv", timeframe="12h", days="30", entry_score="3",
+                                        exit_score="0", allow_short="false", fee_bps="2.5", sweep="false")
+    assert result["status"] == "success"
+    expected = bt.run_backtest(candles, "12h", entry=3, exit=0, allow_short=False, fee_bps=2.5)
+    assert result == {**result, **expected}
+    assert "results" not in result  # sweep="false" is not a sweep
+
+
+def test_backtest_signal_tool_returns_partial_while_history_downloads(tmp_path, monkeypatch):
+    from backend.departments.trade import ohlcv_store
+    start = 1_704_067_200_000
+    history = [[start + i * 3_600_000, 100.0, 101.0, 99.0, 100.5, 10.0] for i in range(300)]
+
+    class Exchange:
+        def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+            return [r for r in history if r[0] >= since][:limit]
+
+    store = ohlcv_store.OHLCVStore(tmp_path, page=50, backfill_pages=2)
+    monkeypatch.setattr(tools_impl, "get_ohlcv_store", lambda: store)
+    monkeypatch.setattr(tools_impl, "_get_exchange", lambda name: Exchange())
+    result = tools_impl.backtest_signal(symbol="BTC/USDT", timeframe="1h", days=10_000)
+    assert result["status"] == "partial"
+    assert result["candles_stored"] == 98  # each page holds back its newest row
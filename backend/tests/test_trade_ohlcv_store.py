@@ -0,0 +1,197 @@
+"""Tests for the local columnar OHLCV store."""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from backend.departments.trade import market_data
+from backend.departments.trade.ohlcv_store import OHLCVSeries, OHLCVStore
+
+H1 = 3_600_000
+START = 1_704_067_200_000  # 2024-01-01T00:00Z
+
+
+class FakeExchange:
+    """Answers `since`/`limit` fetches from a synthetic 1h history, like ccxt."""
+
+    def __init__(self, bars: int, max_page: int = 1000):
+        self.history = [[START + i * H1, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0 + i] for i in range(bars)]
+        self.max_page = max_page
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls.append((since, limit))
+        n = min(limit or self.max_page, self.max_page)
+        if since is None:  # ccxt: the latest candles
+            return [list(r) for r in self.history[-n:]]
+        return [list(r) for r in self.history if r[0] >= since][:n]
+
+
+def _now(bars):
+    """A moment inside the last (forming) candle of a `bars`-long history."""
+    return (START + (bars - 1) * H1) / 1000 + 600
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OHLCVStore(tmp_path, page=50)
+
+
+def test_read_through_seeds_then_fetches_only_new_candles(store):
+    ex = FakeExchange(300)
+    rows = store.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 100, now=_now(300))
+    assert rows == ex.history[-100:]
+    series = store.series("binance", "BTC/USDT", "1h")
+    assert len(series) == 99  # the forming candle is not stored
+
+    # Three hours later: one request from the last stored candle on
+    ex.calls.clear()
+    ex.history = FakeExchange(303).history
+    rows = store.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 100, now=_now(303))
+    assert rows == ex.history[-100:]
+    assert ex.calls == [(START + 299 * H1, 50)]
+    assert len(series) == 102
+
+
+def test_sync_pages_forward_across_a_long_gap(store):
+    ex = FakeExchange(130)
+    store.read_through(lambda name: ex, "binance", "ETH/USDT", "1h", 10, now=_now(130))
+    ex.history = FakeExchange(400).history
+    ex.calls.clear()
+    rows = store.read_through(lambda name: ex, "binance", "ETH/USDT", "1h", 100, now=_now(400))
+    assert rows == ex.history[-100:]
+    assert len(ex.calls) == 6  # 270 missing candles in pages of 50
+    ts = store.series("binance", "ETH/USDT", "1h").read()["timestamp"]
+    assert (np.diff(ts) == H1).all()
+
+
+def test_forming_candle_not_stored_when_local_clock_runs_ahead(store):
+    ex = FakeExchange(100)
+    skewed = _now(100) + 2 * 3600  # local clock two hours ahead of the exchange
+    rows = store.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 20, now=skewed)
+    assert rows[-1] == ex.history[-1]
+    series = store.series("binance", "BTC/USDT", "1h")
+    assert series.last_timestamp() == ex.history[-2][0]
+
+    # On the boundary the candle that closed less than the margin ago is held back too
+    boundary = (START + 100 * H1) / 1000
+    ex.history = FakeExchange(101).history
+    rows = store.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 20, now=boundary)
+    assert rows == ex.history[-20:]
+    assert series.last_timestamp() == ex.history[-3][0]
+
+
+def test_read_through_caps_forward_backfill(tmp_path):
+    store = OHLCVStore(tmp_path, page=50, sync_pages=2)
+    ex = FakeExchange(60)
+    store.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 10, now=_now(60))
+    ex.history = FakeExchange(400).history
+    ex.calls.clear()
+
+    rows = store.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 30, now=_now(400))
+    assert rows == ex.history[-30:]
+    assert len(ex.calls) == 3  # two backfill pages + the latest window
+    assert store.stats["partial_syncs"] == 1
+    series = store.series("binance", "BTC/USDT", "1h")
+    assert (np.diff(series.read()["timestamp"]) == H1).all()
+
+    for _ in range(5):
+        rows = store.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 30, now=_now(400))
+    assert rows == ex.history[-30:]
+    assert series.last_timestamp() == ex.history[-2][0]
+
+
+def test_range_queries_and_restart(tmp_path):
+    ex = FakeExchange(200)
+    first = OHLCVStore(tmp_path)
+    first.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 200, now=_now(200))
+
+    # A new process opens the same files without fetching the history again
+    reopened = OHLCVStore(tmp_path).series("binance", "BTC/USDT", "1h")
+    assert len(reopened) == 199
+    window = reopened.read(START + 10 * H1, START + 20 * H1)
+    assert window["timestamp"].tolist() == [START + i * H1 for i in range(10, 20)]
+    assert window["close"].tolist() == [100.5 + i for i in range(10, 20)]
+    assert reopened.read(columns=("close",))["close"].shape == (199,)
+    assert reopened.read(START + 500 * H1)["open"].size == 0
+
+
+def test_partial_append_is_trimmed_on_open(tmp_path):
+    series = OHLCVSeries(tmp_path / "s", "1h")
+    series.append(FakeExchange(5).history)
+    with open(tmp_path / "s" / "close.f8", "ab") as f:
+        f.write(np.array([1.0]).tobytes())  # crash after writing one column
+    reopened = OHLCVSeries(tmp_path / "s", "1h")
+    assert len(reopened) == 5
+    assert (tmp_path / "s" / "close.f8").stat().st_size == 5 * 8
+
+
+def test_append_skips_duplicates_and_older_rows(tmp_path):
+    series = OHLCVSeries(tmp_path / "s", "1h")
+    history = FakeExchange(10).history
+    assert series.append(history[:6]) == 6
+    assert series.append(history[4:8] + [history[7]]) == 2
+    assert series.read()["timestamp"].tolist() == [r[0] for r in history[:8]]
+
+
+def test_ensure_history_backfills_and_prepends(store):
+    ex = FakeExchange(300)
+    store.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 20, now=_now(300))
+    series, complete = store.ensure_history(lambda name: ex, "binance", "BTC/USDT", "1h", START, now=_now(300))
+    assert complete
+    data = series.read()
+    assert data["timestamp"].tolist() == [r[0] for r in ex.history[:-1]]
+    assert data["volume"].tolist() == [r[5] for r in ex.history[:-1]]
+    assert not (series.path.parent / "1h.old").exists()
+
+
+def test_ensure_history_pages_are_capped_and_resume(store):
+    ex = FakeExchange(300)
+    store.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 20, now=_now(300))
+    ex.calls.clear()
+
+    series, complete = store.ensure_history(lambda name: ex, "binance", "BTC/USDT", "1h", START,
+                                            now=_now(300), max_pages=2)
+    assert not complete and len(ex.calls) == 2
+    # The partial backfill joins the stored candles without a gap
+    assert series.read()["timestamp"].tolist() == [r[0] for r in ex.history[180:299]]  # 19 seeded + 2 pages of 50
+    assert store.stats["partial_backfills"] == 1
+
+    for _ in range(5):
+        series, complete = store.ensure_history(lambda name: ex, "binance", "BTC/USDT", "1h", START,
+                                                now=_now(300), max_pages=2)
+        if complete:
+            break
+    assert complete
+    assert series.read()["timestamp"].tolist() == [r[0] for r in ex.history[:-1]]
+
+
+def test_reads_wait_for_a_prepend_in_progress(store):
+    ex = FakeExchange(10)
+    store.read_through(lambda name: ex, "binance", "BTC/USDT", "1h", 10, now=_now(10))
+    series = store.series("binance", "BTC/USDT", "1h")
+    done = []
+    with series.lock:  # what prepend() holds while it swaps the directory
+        reader = threading.Thread(target=lambda: done.append(len(series.read()["close"])))
+        reader.start()
+        time.sleep(0.05)
+        assert done == []
+    reader.join()
+    assert done == [9]
+
+
+def test_fetch_ohlcv_reads_through_store(tmp_path, monkeypatch):
+    from backend.departments.trade import ohlcv_store
+    ex = FakeExchange(150)
+    store = OHLCVStore(tmp_path)
+    monkeypatch.setattr(ohlcv_store, "_store", store)
+    monkeypatch.setattr(market_data, "MARKET_DATA_OHLCV_STORE", True)
+    monkeypatch.setattr(market_data.time, "time", lambda: _now(150))
+    market_data.get_market_data_cache().clear()
+    try:
+        rows = market_data.fetch_ohlcv(lambda name: ex, "binance", "SOL/USDT", "1h", limit=50)
+    finally:
+        market_data.get_market_data_cache().clear()
+    assert rows == ex.history[-50:]
+    assert len(store.series("binance", "SOL/USDT", "1h")) == 99
@@ -0,0 +1,136 @@
+"""Tests for the incremental (per-candle) trade indicators."""
+import asyncio
+import math
+from unittest.mock import patch
+
+import pytest
+
+from backend.departments.trade import indicators
+from backend.departments.trade.bench_indicators import random_walk
+from backend.departments.trade.streaming import IndicatorState, IndicatorRegistry, WilderRSI
+from backend.departments.trade.tools_impl import _find_swing_points
+
+
+def _bars(n=120, seed=3):
+    closes = random_walk(n, seed=seed)
+    ts = 1_700_000_000_000
+    bars = []
+    for i, c in enumerate(closes):
+        o = closes[i - 1] if i else c
+        bars.append([ts + i * 3_600_000, o, max(o, c) * 1.004, min(o, c) * 0.996, c, 100.0])
+    return bars
+
+
+def _wilder_reference(closes, period=14):
+    deltas = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
+    ag = sum(max(d, 0.0) for d in deltas[:period]) / period
+    al = sum(max(-d, 0.0) for d in deltas[:period]) / period
+    for d in deltas[period:]:
+        ag = (ag * (period - 1) + max(d, 0.0)) / period
+        al = (al * (period - 1) + max(-d, 0.0)) / period
+    return 100 - 100 / (1 + ag / al)
+
+
+def test_streaming_ema_and_macd_match_batch_exactly():
+    bars = _bars()
+    closes = [b[4] for b in bars]
+    state = IndicatorState("BTC/USDT", "1h")
+    state.ingest(bars)
+    snap = state.snapshot()
+
+    assert snap["ema20"] == indicators.ema(closes, 20)[-1]
+    assert snap["ema50"] == indicators.ema(closes, 50)[-1]
+    batch = indicators.macd(closes)
+    assert snap["macd"]["macd"] == batch["macd"][-1]
+    assert snap["macd"]["signal"] == batch["signal"][-1]
+
+
+def test_streaming_rsi_and_bollinger():
+    bars = _bars()
+    closes = [b[4] for b in bars]
+    state = IndicatorState("BTC/USDT", "1h")
+    state.ingest(bars)
+    snap = state.snapshot()
+
+    assert snap["rsi"] == pytest.approx(_wilder_reference(closes), rel=1e-12)
+    bb = indicators.bollinger(closes)
+    assert snap["bollinger"]["upper"] == pytest.approx(bb["upper"][-1], rel=1e-9)
+    assert snap["bollinger"]["lower"] == pytest.approx(bb["lower"][-1], rel=1e-9)
+
+
+def test_streaming_swings_match_batch_detector():
+    bars = _bars(200, seed=11)
+    state = IndicatorState("ETH/USDT", "1h")
+    state.ingest(bars)
+
+    closed = bars[:-1]  # the forming bar is never used for swings
+    ref = _find_swing_points([b[2] for b in closed], [b[3] for b in closed])
+    snap = state.snapshot()
+    assert [s["price"] for s in snap["swing_highs"]] == [s["price"] for s in ref["swing_highs"]]
+    assert [s["price"] for s in snap["swing_lows"]] == [s["price"] for s in ref["swing_lows"]]
+
+
+def test_forming_bar_is_replaced_not_committed():
+    bars = _bars(60)
+    state = IndicatorState("BTC/USDT", "1h")
+    state.ingest(bars)
+    committed = state.bars_committed
+
+    live = list(bars[-1])
+    live[4] *= 1.01
+    state.update(live)
+    assert state.bars_committed == committed
+    assert state.snapshot()["close"] == live[4]
+
+    # Re-ingesting an overlapping fetch only folds in the new bar
+    nxt = [bars[-1][0] + 3_600_000, live[4], live[4], live[4], live[4], 1.0]
+    assert state.ingest(bars[-2:] + [nxt]) == 2
+    assert state.bars_committed == committed + 1
+
+
+def test_gap_in_ingest_rebuilds_state():
+    bars = _bars(120)
+    state = IndicatorState("BTC/USDT", "1h")
+    state.ingest(bars[:40])
+    state.ingest(bars[60:])
+    fresh = IndicatorState("BTC/USDT", "1h")
+    fresh.ingest(bars[60:])
+    assert state.snapshot()["ema20"] == fresh.snapshot()["ema20"]
+    assert state.bars_committed == fresh.bars_committed
+
+
+def test_wilder_rsi_flat_series():
+    rsi = WilderRSI(3)
+    for _ in range(5):
+        rsi.push(10.0)
+    assert rsi.peek(10.0) == 50.0
+    assert rsi.peek(11.0) == 100.0
+
+
+def test_registry_ingest_returns_snapshot():
+    registry = IndicatorRegistry(max_states=2)
+    snap = registry.ingest("BTC/USDT", "1h", _bars(80))
+    assert snap["ready"] is True
+    registry.ingest("ETH/USDT", "1h", _bars(10))
+    registry.ingest("SOL/USDT", "1h", _bars(10))
+    assert registry.peek("BTC/USDT", "1h") is None
+    assert registry.get_stats()["states"] == 2
+
+
+def test_market_stream_emits_on_rsi_zone_change():
+    from backend.agents.external_watcher import MarketDataStream, Severity
+
+    stream = MarketDataStream(symbols=["BTC/USDT"])
+    snaps = [
+        [{"symbol": "BTC/USDT", "timeframe": "1h", "ready": True, "rsi": 55.0, "close": 1.0}],
+        [{"symbol": "BTC/USDT", "timeframe": "1h", "ready": True, "rsi": 72.5, "close": 1.1}],
+        [{"symbol": "BTC/USDT", "timeframe": "1h", "ready": True, "rsi": 74.0, "close": 1.2}],
+    ]
+    results = []
+    with patch.object(MarketDataStream, "_refresh_indicators", side_effect=snaps):
+        for _ in snaps:
+            results.append(asyncio.run(stream._indicator_events()))
+
+    assert [len(r) for r in results] == [0, 1, 0]
+    assert results[1][0].severity == Severity.MEDIUM
+    assert "overbought" in results[1][0].summary
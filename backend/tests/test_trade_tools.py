@@ -5,6 +5,17 @@ from unittest.mock import patch, MagicMock
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def _clear_market_data_cache(monkeypatch):
+    from backend.departments.trade import market_data
+    from backend.departments.trade.market_data import get_market_data_cache
+    # Mocked exchanges answer plain `limit` fetches; the candle store has its own tests
+    monkeypatch.setattr(market_data, "MARKET_DATA_OHLCV_STORE", False)
+    get_market_data_cache().clear()
+    yield
+    get_market_data_cache().clear()
+
+
 def _make_ohlcv(n=100, base_price=84000.0):
     """Generate synthetic OHLCV data for testing."""
     import random
@@ -174,3 +185,350 @@ def test_elliott_wave_analysis():
     assert "likely_wave" in result
     assert "fibonacci_levels" in result
     assert result["trend"] in ("uptrend", "downtrend", "sideways", "unknown")
+
+
+def test_generate_signal_fetches_each_series_once():
+    """4h + 1d analysis with macro trend: 4h/1d/1w fetched once each, in parallel."""
+    from backend.departments.trade.tools_impl import generate_signal
+    from backend.departments.trade.market_data import get_market_data_stats
+
+    with patch("backend.departments.trade.tools_impl._get_exchange") as mock_get_ex:
+        mock_exchange = MagicMock()
+        mock_exchange.fetch_ohlcv.return_value = _make_ohlcv(100)
+        mock_get_ex.return_value = mock_exchange
+
+        result = generate_signal("BTC/USDT")
+
+    assert result["status"] == "success"
+    fetched = sorted(c.args[1] for c in mock_exchange.fetch_ohlcv.call_args_list)
+    assert fetched == ["1d", "1w", "4h"]
+    assert get_market_data_stats()["kinds"]["ohlcv"]["misses"] == 3
+
+
+def test_market_data_single_flight():
+    """Concurrent identical requests share one loader call."""
+    import threading
+    import time
+    from backend.departments.trade.market_data import MarketDataCache
+
+    cache = MarketDataCache()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(2)
+        return [1, 2, 3]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch(("ohlcv", "binance"), 60, loader)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 2
+    while cache.get_stats()["kinds"].get("ohlcv", {}).get("coalesced", 0) < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [[1, 2, 3]] * 5
+
+
+def test_market_data_errors_are_not_cached():
+    from backend.departments.trade.market_data import MarketDataCache
+
+    cache = MarketDataCache()
+    loader = MagicMock(side_effect=[Exception("Network error"), {"last": 1.0}])
+    with pytest.raises(Exception):
+        cache.get_or_fetch(("ticker", "binance", "BTC/USDT"), 5, loader)
+    assert cache.get_or_fetch(("ticker", "binance", "BTC/USDT"), 5, loader) == {"last": 1.0}
+    assert cache.get_stats()["kinds"]["ticker"]["errors"] == 1
+
+
+def test_candle_ttl_aligned_to_close():
+    from backend.departments.trade.market_data import candle_ttl
+
+    # 10s before a 4h boundary → expires with the candle, not after the live cap
+    boundary = 1700006400  # multiple of 14400
+    assert candle_ttl("4h", now=boundary - 10) == 10
+    # Right after the boundary → live cap (4h * 0.02 = 288s)
+    assert candle_ttl("4h", now=boundary + 1) == pytest.approx(288)
+    # Weekly candles close Monday 00:00 UTC (2023-11-20 is a Monday)
+    assert candle_ttl("1w", now=1700438400 - 30) == 30
+
+
+def _fake_client(rate_limit_ms=0):
+    client = MagicMock()
+    client.rateLimit = rate_limit_ms
+    client.fetch_ticker.return_value = {"last": 1.0}
+    return client
+
+
+def test_exchange_pool_reuses_clients_and_loads_markets_once():
+    from backend.departments.trade.exchanges import ExchangePool
+
+    created = []
+    pool = ExchangePool(factory=lambda name: created.append(name) or _fake_client())
+
+    ex = pool.get("binance")
+    assert pool.get("BINANCE") is ex
+    assert pool.get("unknown-exchange") is ex
+    ex.fetch_ticker("BTC/USDT")
+    ex.fetch_ticker("ETH/USDT")
+
+    assert created == ["binance"]
+    ex.client.load_markets.assert_called_once_with(False)
+    assert pool.get_stats()["binance"]["calls"] == 3
+
+
+def test_exchange_pool_refreshes_stale_markets():
+    from backend.departments.trade.exchanges import ExchangePool
+
+    pool = ExchangePool(factory=lambda name: _fake_client(), markets_ttl=0)
+    ex = pool.get("okx")
+    ex.fetch_ticker("BTC/USDT")
+    ex.fetch_ticker("BTC/USDT")
+    assert [c.args for c in ex.client.load_markets.call_args_list] == [(False,), (True,)]
+
+
+def test_exchange_health_marks_down_after_consecutive_errors():
+    from backend.departments.trade.exchanges import ExchangePool, EXCHANGE_DOWN_AFTER
+
+    pool = ExchangePool(factory=lambda name: _fake_client())
+    ex = pool.get("bybit")
+    ex.client.fetch_ticker.side_effect = Exception("Network error")
+    for _ in range(EXCHANGE_DOWN_AFTER):
+        with pytest.raises(Exception):
+            ex.fetch_ticker("BTC/USDT")
+    assert pool.get_stats()["bybit"]["status"] == "down"
+    assert not pool.is_healthy("bybit")
+
+    ex.client.fetch_ticker.side_effect = None
+    ex.fetch_ticker("BTC/USDT")
+    assert pool.get_stats()["bybit"]["status"] == "healthy"
+
+
+def test_rate_limiter_spaces_reservations():
+    from backend.departments.trade.exchanges import RateLimiter
+
+    limiter = RateLimiter(0.05)
+    waits = [limiter.reserve() for _ in range(3)]
+    assert waits[0] == 0
+    assert waits[1] == pytest.approx(0.05, abs=0.01)
+    assert waits[2] == pytest.approx(0.10, abs=0.01)
+
+
+@pytest.mark.parametrize("n", [5, 14, 15, 19, 20, 26, 34, 50, 100, 250])
+def test_numpy_indicators_match_reference_exactly(n):
+    """Vectorized indicators keep the original list implementations' numbers."""
+    from backend.departments.trade import tools_impl as ti
+    from backend.departments.trade import bench_indicators as ref
+
+    for seed in range(5):
+        closes = ref.random_walk(n, seed=seed)
+        assert ti._calc_rsi(closes) == ref.ref_rsi(closes)
+        assert ti._calc_ema(closes, 20) == ref.ref_ema(closes, 20)
+        assert ti._calc_ema(closes, min(50, n)) == ref.ref_ema(closes, min(50, n))
+        assert ti._calc_bollinger(closes) == ref.ref_bollinger(closes)
+        assert ti._calc_macd(closes) == ref.ref_macd(closes)
+
+
+def test_numpy_indicator_series_and_batch():
+    import numpy as np
+    from backend.departments.trade import indicators
+    from backend.departments.trade import bench_indicators as ref
+
+    closes = ref.random_walk(60, seed=7)
+    series = indicators.rsi(closes)
+    assert series.shape == (60,)
+    assert np.isnan(series[:14]).all()
+    for i in (14, 30, 59):
+        assert round(float(series[i]), 2) == ref.ref_rsi(closes[:i + 1])
+
+    universe = {f"S{i}": ref.random_walk(80, seed=i) for i in range(4)}
+    universe["SHORT"] = ref.random_walk(30, seed=99)
+    batch = indicators.compute_batch(universe)
+    for sym, c in universe.items():
+        assert batch[sym]["ema20"] == ref.ref_ema(c, 20)[-1]
+        assert round(batch[sym]["rsi"], 2) == ref.ref_rsi(c)
+        assert round(batch[sym]["bb_upper"], 4) == ref.ref_bollinger(c)["upper"]
+
+
+def test_indicator_benchmark_runs():
+    from backend.departments.trade.bench_indicators import run
+
+    result = run(symbols=20, bars=60, repeat=1)
+    assert result["mismatches"] == 0
+    assert result["numpy_batch_ms"] > 0
+
+
+# ── Market structure (single-pass SMC) ──
+
+def _ref_swing_points(highs, lows, lookback=5):
+    """Original O(n·lookback) swing scan."""
+    swing_highs, swing_lows = [], []
+    for i in range(lookback, len(highs) - lookback):
+        if all(highs[i] >= highs[i - j] and highs[i] >= highs[i + j] for j in range(1, lookback + 1)):
+            swing_highs.append({"index": i, "price": highs[i]})
+        if all(lows[i] <= lows[i - j] and lows[i] <= lows[i + j] for j in range(1, lookback + 1)):
+            swing_lows.append({"index": i, "price": lows[i]})
+    return {"swing_highs": swing_highs, "swing_lows": swing_lows}
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_structure_swings_match_reference_for_all_lookbacks(seed):
+    import random
+    from backend.departments.trade.structure import MarketStructure
+
+    rng = random.Random(seed)
+    # Coarse prices produce plenty of ties, which the >= / <= rules must keep
+    highs = [float(rng.randint(95, 105)) for _ in range(150)]
+    lows = [h - rng.randint(1, 4) for h in highs]
+    structure = MarketStructure(highs, lows)
+    for lookback in (1, 2, 3, 5, 8):
+        assert structure.swings(lookback) == _ref_swing_points(highs, lows, lookback)
+        hl, hr = structure.swing_spans("high")
+        assert [i for i in range(lookback, 150 - lookback) if hl[i] >= lookback and hr[i] >= lookback] == \
+            [s["index"] for s in structure.swings(lookback)["swing_highs"]]
+
+
+def test_structure_order_blocks_and_fvgs_match_reference():
+    from backend.departments.trade import tools_impl as ti
+    from backend.departments.trade.structure import MarketStructure
+
+    ohlcv = _make_ohlcv(120)
+    opens, highs, lows, closes = ([o[k] for o in ohlcv] for k in (1, 2, 3, 4))
+    structure = MarketStructure(highs, lows, opens, closes)
+    assert structure.order_blocks() == ti._find_order_blocks(opens, highs, lows, closes)
+    assert structure.fair_value_gaps() == ti._find_fvg(highs, lows)
+    assert MarketStructure(highs, lows).order_blocks() == []
+
+
+def test_get_structure_is_shared_per_series():
+    from backend.departments.trade.structure import get_structure
+
+    ohlcv = _make_ohlcv(100)
+    opens, highs, lows, closes = ([o[k] for o in ohlcv] for k in (1, 2, 3, 4))
+    key = ("binance", "BTC/USDT", "4h")
+    first = get_structure(highs, lows, opens, closes, key=key)
+    assert get_structure(list(highs), list(lows), opens, list(closes), key=key) is first
+
+    closes[-1] *= 1.01
+    assert get_structure(highs, lows, opens, closes, key=key) is not first
+
+
+def test_scan_market_ranks_symbols_like_generate_signal():
+    """scan_market scores every symbol with generate_signal's rules and ranks them."""
+    from backend.departments.trade import tools_impl
+    series = {
+        "BTC/USDT": _make_ohlcv(100, 84000.0),
+        "ETH/USDT": [[ts, o * 0.04, h * 0.04, l * 0.04, c * 0.04, v] for ts, o, h, l, c, v in _make_ohlcv(100)],
+        "DOGE/USDT": _make_ohlcv(10, 0.1),
+    }
+    mock_ex = MagicMock()
+    mock_ex.fetch_ohlcv.side_effect = lambda sym, timeframe, limit: series[sym]
+    with patch("backend.departments.trade.tools_impl._get_exchange", return_value=mock_ex):
+        result = tools_impl.scan_market(symbols=list(series), timeframe="1h")
+
+    assert result["status"] == "success"
+    assert result["scanned"] == 2
+    assert result["errors"] == {"DOGE/USDT": "insufficient data"}
+    cols = result["columns"]
+    rows = [dict(zip(cols, r)) for r in result["rows"]]
+    assert {r["symbol"] for r in rows} == {"BTC/USDT", "ETH/USDT"}
+    scores = [abs(r["score"]) for r in rows]
+    assert scores == sorted(scores, reverse=True)
+
+    closes = [c[4] for c in series["BTC/USDT"]]
+    btc = next(r for r in rows if r["symbol"] == "BTC/USDT")
+    assert btc["rsi"] == tools_impl._calc_rsi(closes)
+    assert btc["macd"] == tools_impl._calc_macd(closes)["trend"]
+    assert btc["signal"] == tools_impl._signal_from_score(btc["score"])
+
+
+def test_scan_market_defaults_to_top_volume_pairs():
+    from backend.departments.trade import tools_impl
+    mock_ex = MagicMock()
+    mock_ex.fetch_tickers.return_value = {
+        "BTC/USDT": {"quoteVolume": 9e9},
+        "ETH/USDT": {"quoteVolume": 5e9},
+        "XRP/USDT": {"quoteVolume": 1e6},
+        "BTC/USDT:USDT": {"quoteVolume": 2e10},
+        "ETH/BTC": {"quoteVolume": 1e10},
+    }
+    mock_ex.fetch_ohlcv.return_value = _make_ohlcv(60)
+    with patch("backend.departments.trade.tools_impl._get_exchange", return_value=mock_ex):
+        result = tools_impl.scan_market(top_n=2)
+
+    assert result["requested"] == 2
+    assert sorted(r[0] for r in result["rows"]) == ["BTC/USDT", "ETH/USDT"]
+    assert mock_ex.fetch_ohlcv.call_count == 2
+
+
+def _slow(seconds, value):
+    import time
+
+    def call(*args, **kwargs):
+        time.sleep(seconds)
+        return value
+    return call
+
+
+def test_multi_exchange_price_is_parallel_with_partial_results(monkeypatch):
+    """A venue past its deadline is reported; the others answer in the slowest-fetch time."""
+    import time
+    from backend.departments.trade import tools_impl
+
+    ticker = {"last": 84000.0, "bid": 83999.0, "ask": 84001.0, "quoteVolume": 1e9}
+    venues = {
+        "binance": MagicMock(fetch_ticker=_slow(0.2, ticker)),
+        "bybit": MagicMock(fetch_ticker=_slow(0.2, {**ticker, "last": 84010.0})),
+        "okx": MagicMock(fetch_ticker=_slow(2.0, ticker)),
+    }
+    monkeypatch.setenv("TRADE_FETCH_TIMEOUT_OKX", "0.4")
+    with patch("backend.departments.trade.tools_impl._get_exchange", side_effect=venues.get):
+        start = time.monotonic()
+        result = tools_impl.get_multi_exchange_price("BTC/USDT")
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 0.6
+    assert result["responded"] == 2
+    assert result["average_price"] == 84005.0
+    assert "did not answer" in result["exchanges"]["okx"]["error"]
+
+
+def test_generate_signal_fetches_timeframes_concurrently():
+    import time
+    from backend.departments.trade.tools_impl import generate_signal
+
+    mock_exchange = MagicMock(fetch_ohlcv=_slow(0.2, _make_ohlcv(100)))
+    with patch("backend.departments.trade.tools_impl._get_exchange", return_value=mock_exchange):
+        start = time.monotonic()
+        result = generate_signal("BTC/USDT")
+        elapsed = time.monotonic() - start
+    assert result["status"] == "success"
+    assert elapsed < 0.5  # three sequential fetches would take 0.6s
+
+
+def test_generate_signal_uses_partial_macro_when_a_timeframe_fails():
+    from backend.departments.trade.tools_impl import analyze_chart, generate_signal
+
+    def fetch(symbol, timeframe, limit):
+        if timeframe == "1w":
+            raise RuntimeError("weekly endpoint down")
+        return _make_ohlcv(100)
+
+    with patch("backend.departments.trade.tools_impl._get_exchange") as mock_get_ex:
+        mock_get_ex.return_value = MagicMock(fetch_ohlcv=fetch)
+        result = generate_signal("BTC/USDT")
+        analysis = analyze_chart("BTC/USDT", "4h")
+
+    assert result["status"] == "success"
+    assert result["partial_data"] == ["1w"]
+    macro = analysis["macro_trend"]
+    assert list(macro["timeframes"]) == ["1d"]
+    assert "weekly endpoint down" in macro["unavailable"]["1w"]
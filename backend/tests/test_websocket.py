@@ -8,6 +8,8 @@ Kapsanan davranışlar:
 3. broadcast() hiç client yoksa hata vermez
 4. broadcast() birden fazla client'a paralel gönderir
 5. broadcast() iteration sırasında set değişmez (RuntimeError olmaz)
+6. broadcast() yavaş bir client'ı beklemez; dolu kuyrukta update'ler birleşir
+7. WorldHub tam durum + diff gönderir
 """
 import asyncio
 import json
@@ -20,13 +22,16 @@ from unittest.mock import AsyncMock, MagicMock, patch
 class FakeWebSocket:
     """Minimal WebSocket mock — send_text kaydeder veya hata fırlatır."""
 
-    def __init__(self, fail: bool = False):
+    def __init__(self, fail: bool = False, gate: asyncio.Event | None = None):
         self.sent: list[str] = []
         self._fail = fail
+        self._gate = gate
 
     async def send_text(self, text: str) -> None:
         if self._fail:
             raise RuntimeError("connection closed")
+        if self._gate is not None:
+            await self._gate.wait()
         self.sent.append(text)
 
 
@@ -35,39 +40,41 @@ class FakeWebSocket:
 @pytest.mark.asyncio
 async def test_broadcast_sends_to_connected_client():
     """broadcast() bağlı bir client'a mesajı JSON olarak gönderir."""
-    from backend.api.websocket import broadcast, _clients
+    from backend.api.websocket import broadcast, drain_clients, register_client, unregister_client
 
     ws = FakeWebSocket()
-    _clients.add(ws)
+    register_client(ws)
     try:
         await broadcast({"type": "test", "value": 42})
+        await drain_clients()
         assert len(ws.sent) == 1
         payload = json.loads(ws.sent[0])
         assert payload["type"] == "test"
         assert payload["value"] == 42
     finally:
-        _clients.discard(ws)
+        unregister_client(ws)
 
 
 @pytest.mark.asyncio
 async def test_broadcast_removes_dead_client_without_error():
     """broadcast() kopuk client'ı kaldırır — UnboundLocalError veya RuntimeError fırlatmaz."""
-    from backend.api.websocket import broadcast, _clients
+    from backend.api.websocket import broadcast, drain_clients, register_client, unregister_client, _clients
 
     dead_ws = FakeWebSocket(fail=True)
     live_ws = FakeWebSocket(fail=False)
-    _clients.add(dead_ws)
-    _clients.add(live_ws)
+    register_client(dead_ws)
+    register_client(live_ws)
     try:
         # Bu satır önceden UnboundLocalError fırlatıyordu (_clients -= dead)
         await broadcast({"type": "ping"})
+        await drain_clients()
         # Kopuk client temizlendi mi?
         assert dead_ws not in _clients
         # Canlı client mesajı aldı mı?
         assert len(live_ws.sent) == 1
     finally:
-        _clients.discard(dead_ws)
-        _clients.discard(live_ws)
+        unregister_client(dead_ws)
+        unregister_client(live_ws)
 
 
 @pytest.mark.asyncio
@@ -76,7 +83,7 @@ async def test_broadcast_with_no_clients_does_not_raise():
     from backend.api.websocket import broadcast, _clients
 
     # _clients'ın boş olduğundan emin ol (diğer testlerden kirlenme)
-    original = set(_clients)
+    original = dict(_clients)
     _clients.clear()
     try:
         await broadcast({"type": "empty"})  # hata fırlatmamalı
@@ -87,37 +94,250 @@ async def test_broadcast_with_no_clients_does_not_raise():
 @pytest.mark.asyncio
 async def test_broadcast_sends_to_multiple_clients():
     """broadcast() birden fazla client'a aynı mesajı gönderir."""
-    from backend.api.websocket import broadcast, _clients
+    from backend.api.websocket import broadcast, drain_clients, register_client, unregister_client
 
     clients = [FakeWebSocket() for _ in range(3)]
     for ws in clients:
-        _clients.add(ws)
+        register_client(ws)
     try:
         await broadcast({"type": "multi", "n": 3})
+        await drain_clients()
         for ws in clients:
             assert len(ws.sent) == 1
             assert json.loads(ws.sent[0])["n"] == 3
     finally:
         for ws in clients:
-            _clients.discard(ws)
+            unregister_client(ws)
 
 
 @pytest.mark.asyncio
 async def test_broadcast_iteration_safe_when_client_fails():
     """broadcast() iteration sırasında set değişse de RuntimeError fırlatmaz."""
-    from backend.api.websocket import broadcast, _clients
+    from backend.api.websocket import broadcast, drain_clients, register_client, unregister_client, _clients
 
     # 2 kopuk + 1 canlı
     dead1 = FakeWebSocket(fail=True)
     dead2 = FakeWebSocket(fail=True)
     live = FakeWebSocket(fail=False)
     for ws in [dead1, dead2, live]:
-        _clients.add(ws)
+        register_client(ws)
     try:
         await broadcast({"type": "safe"})
+        await drain_clients()
         assert dead1 not in _clients
         assert dead2 not in _clients
         assert len(live.sent) == 1
     finally:
         for ws in [dead1, dead2, live]:
-            _clients.discard(ws)
+            unregister_client(ws)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_does_not_wait_for_slow_client():
+    """Takılan bir client broadcast()'ı ve diğer client'ları bekletmez."""
+    from backend.api.websocket import broadcast, drain_clients, get_broadcast_stats, register_client, unregister_client
+
+    gate = asyncio.Event()
+    slow, fast = FakeWebSocket(gate=gate), FakeWebSocket()
+    register_client(slow)
+    register_client(fast)
+    try:
+        await asyncio.wait_for(asyncio.gather(*(broadcast({"n": i}) for i in range(5))), timeout=0.5)
+        await asyncio.wait_for(_wait_for(lambda: len(fast.sent) == 5), timeout=1)
+        assert slow.sent == []
+        assert get_broadcast_stats()["queued"] >= 4
+        gate.set()
+        await drain_clients()
+        assert [json.loads(t)["n"] for t in slow.sent] == list(range(5))
+    finally:
+        unregister_client(slow)
+        unregister_client(fast)
+
+
+async def _wait_for(predicate):
+    while not predicate():
+        await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_full_queue_coalesces_updates_and_drops_oldest_messages():
+    """Dolu kuyrukta update'ler tek bir tam duruma katlanır, diğer mesajlarda en eski düşer."""
+    from backend.api.websocket import ClientChannel
+
+    gate = asyncio.Event()
+    ws = FakeWebSocket(gate=gate)
+    channel = ClientChannel(ws, snapshot=lambda: "FULL", maxsize=3)
+    try:
+        channel.offer("blocked")      # taken by the writer, waits on the gate
+        await asyncio.sleep(0)
+        for i in range(3):
+            channel.offer(f"diff-{i}", update=True)
+        channel.offer("msg-a")          # full: the queued diffs become one resync
+        channel.offer("diff-3", update=True)
+        channel.offer("msg-b")
+        channel.offer("msg-c")
+        channel.offer("msg-d")          # full of plain messages: oldest goes
+        stats = channel.get_stats()
+        assert stats["coalesced"] == 4
+        assert stats["dropped"] == 1
+        assert stats["resync_pending"] is True
+        gate.set()
+        await channel.drain()
+        assert ws.sent == ["blocked", "FULL", "msg-b", "msg-c", "msg-d"]
+        assert channel.stats["max_lag_ms"] >= 0
+    finally:
+        channel.close()
+
+
+# ── WorldHub ───────────────────────────────────────────────────────────────
+
+def _snapshot(statuses, events, world_models=None, scheduler_stats=None):
+    return {"statuses": statuses, "events": events,
+            "world_models": world_models or [], "scheduler_stats": scheduler_stats or {}}
+
+
+@pytest.mark.asyncio
+async def test_world_hub_sends_full_state_then_only_changes():
+    """Yeni client tam durumu alır; sonraki tick'lerde yalnızca değişenler gider."""
+    from backend.api.websocket import WorldHub, drain_clients, unregister_client
+
+    hub = WorldHub(tick=3600)
+    snaps = [
+        _snapshot({"a": {"status": "idle"}, "b": {"status": "idle"}}, [{"id": 2, "message": "x"}]),
+        _snapshot({"a": {"status": "working"}, "b": {"status": "idle"}},
+                  [{"id": 3, "message": "y"}, {"id": 2, "message": "x"}]),
+        _snapshot({"a": {"status": "working"}, "b": {"status": "idle"}},
+                  [{"id": 3, "message": "y"}, {"id": 2, "message": "x"}]),
+    ]
+    hub._collect = AsyncMock(side_effect=snaps)
+    ws1, ws2 = FakeWebSocket(), FakeWebSocket()
+    try:
+        await hub.join(ws1)
+        await hub.join(ws2)
+        await drain_clients()
+        full = json.loads(ws2.sent[-1])
+        assert full["full"] is True
+        assert set(full["statuses"]) == {"a", "b"}
+        assert ws1.sent[0] == ws2.sent[0]  # the same cached bytes
+        assert hub._collect.await_count == 1  # second client reused the snapshot
+
+        text = await hub.refresh()
+        diff = json.loads(text)
+        assert diff["statuses"] == {"a": {"status": "working"}}
+        assert [e["id"] for e in diff["events"]] == [3]
+        assert diff["new_events"] is True
+        assert "world_models" not in diff
+
+        assert await hub.refresh() is None  # nothing changed: nothing to send
+        assert hub.get_stats()["idle_ticks"] == 1
+    finally:
+        hub._task.cancel()
+        unregister_client(ws1)
+        unregister_client(ws2)
+
+
+@pytest.mark.asyncio
+async def test_world_hub_producer_broadcasts_one_payload_per_tick():
+    """Üretici tick başına bir kez okur ve aynı metni tüm client'lara yollar."""
+    from backend.api.websocket import WorldHub, unregister_client
+
+    hub = WorldHub(tick=0.01)
+    calls = {"n": 0}
+
+    async def collect():
+        calls["n"] += 1
+        return _snapshot({"a": {"status": "idle", "n": calls["n"]}}, [])
+
+    hub._collect = collect
+    clients = [FakeWebSocket() for _ in range(3)]
+    try:
+        for ws in clients:
+            await hub.join(ws)
+        await asyncio.sleep(0.05)
+    finally:
+        for ws in clients:
+            unregister_client(ws)
+    await asyncio.sleep(0.03)
+    assert hub._task.done()  # stops once no client is left
+    diffs = clients[0].sent[1:]
+    assert diffs and all(ws.sent[1:] == diffs for ws in clients[1:])
+    assert calls["n"] == hub.stats["ticks"]
+
+
+@pytest.mark.asyncio
+async def test_world_hub_follows_event_cursor_and_resumes_clients():
+    """Hub yeni event'leri since_id ile okur; since_id ile bağlanan client kaçırdıklarını alır."""
+    from backend.api.websocket import WorldHub, drain_clients, unregister_client
+
+    rows = [{"id": i, "message": f"e{i}"} for i in range(1, 8)]
+
+    async def get_events(limit=50, since_id=None, **kw):
+        if since_id is None:
+            return sorted(rows, key=lambda e: -e["id"])[:limit]
+        return [e for e in rows if e["id"] > since_id][:limit]
+
+    db = MagicMock()
+    db.get_events = AsyncMock(side_effect=get_events)
+    hub = WorldHub(tick=3600)
+    ws = FakeWebSocket()
+    with patch("backend.api.websocket.get_db", return_value=db), \
+         patch("backend.api.websocket.get_statuses", AsyncMock(return_value={})):
+        try:
+            await hub.refresh()
+            assert hub.cursor == 7
+            rows.append({"id": 8, "message": "e8"})
+            diff = json.loads(await hub.refresh())
+            assert db.get_events.await_args.kwargs["since_id"] == 7
+            assert [e["id"] for e in diff["events"]] == [8]
+            assert diff["cursor"] == 8
+
+            await hub.join(ws, since_id=5)
+            await drain_clients()
+            full, resumed = (json.loads(t) for t in ws.sent)
+            assert full["cursor"] == 8
+            assert resumed["resumed"] is True
+            assert "cursor" not in resumed  # a backfill never moves the client's cursor back
+            assert [e["id"] for e in resumed["events"]] == [8, 7, 6]
+        finally:
+            hub._task.cancel()
+            unregister_client(ws)
+
+
+@pytest.mark.asyncio
+async def test_world_hub_delivers_events_that_commit_below_the_cursor():
+    """Id 9 commits after id 10: the hub keeps 9 as a gap and delivers it when it shows up."""
+    from backend.api import websocket as wsmod
+    from backend.api.websocket import WorldHub
+
+    rows = [{"id": i, "message": f"e{i}"} for i in range(1, 9)]
+
+    async def get_events(limit=50, since_id=None, **kw):
+        if since_id is None:
+            return sorted(rows, key=lambda e: -e["id"])[:limit]
+        return sorted((e for e in rows if e["id"] > since_id), key=lambda e: e["id"])[:limit]
+
+    db = MagicMock()
+    db.get_events = AsyncMock(side_effect=get_events)
+    hub = WorldHub(tick=3600)
+    with patch("backend.api.websocket.get_db", return_value=db), \
+         patch("backend.api.websocket.get_statuses", AsyncMock(return_value={})):
+        await hub.refresh()
+        rows.append({"id": 10, "message": "e10"})
+        diff = json.loads(await hub.refresh())
+        assert [e["id"] for e in diff["events"]] == [10]
+        assert hub.cursor == 10 and diff["cursor"] == 8  # resume point stays below the gap
+
+        rows.append({"id": 9, "message": "e9"})
+        diff = json.loads(await hub.refresh())
+        assert db.get_events.await_args.kwargs["since_id"] == 8
+        assert [e["id"] for e in diff["events"]] == [9]
+        assert diff["cursor"] == 10
+        assert hub.stats["late_events"] == 1
+        assert [e["id"] for e in hub._events[:3]] == [10, 9, 8]
+
+        # A gap that never fills (rolled-back insert) expires
+        rows.append({"id": 12, "message": "e12"})
+        await hub.refresh()
+        with patch.object(wsmod, "EVENT_GAP_SECONDS", 0):
+            assert await hub.refresh() is None
+        assert hub.watermark == 12 and hub.stats["expired_gaps"] == 1
@@ -0,0 +1,162 @@
+"""Agent spawn admission control for COWORK.ARMY.
+
+Caps concurrent agent runs globally, per department and per LLM provider.
+Excess spawns wait in a priority/FIFO queue instead of fanning out into
+simultaneous LLM tool loops.
+"""
+import asyncio
+import bisect
+import itertools
+import os
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+import structlog
+from specs import parse_overrides
+
+logger = structlog.get_logger()
+
+PRIORITY_HIGH = 1
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3
+
+MAX_IN_FLIGHT = int(os.environ.get("AGENT_MAX_IN_FLIGHT", 6))
+DEPT_SLOTS = os.environ.get("AGENT_DEPT_SLOTS", "*=3")
+PROVIDER_SLOTS = os.environ.get("AGENT_PROVIDER_SLOTS", "anthropic=4,gemini=6")
+MAX_QUEUE = int(os.environ.get("AGENT_ADMISSION_QUEUE_SIZE", 100))
+
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    agent_id: str = field(compare=False)
+    department: str = field(compare=False)
+    provider: str = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        dept_slots: str = DEPT_SLOTS,
+        provider_slots: str = PROVIDER_SLOTS,
+        max_queue: int = MAX_QUEUE,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self._dept_default, self._dept_slots = parse_overrides(dept_slots, max_in_flight)
+        self._prov_default, self._prov_slots = parse_overrides(provider_slots, max_in_flight)
+        self.max_queue = max_queue
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._dept_in_flight: Counter = Counter()
+        self._prov_in_flight: Counter = Counter()
+        self._admitted_total = 0
+        self._rejected_total = 0
+        self._peak_queue_depth = 0
+        self._wait_times: deque = deque(maxlen=500)
+
+    def _fits(self, department: str, provider: str) -> bool:
+        return (
+            self._in_flight < self.max_in_flight
+            and self._dept_in_flight[department] < self._dept_slots.get(department, self._dept_default)
+            and self._prov_in_flight[provider] < self._prov_slots.get(provider, self._prov_default)
+        )
+
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def is_saturated(self) -> bool:
+        return len(self._waiters) >= self.max_queue
+
+    def _dispatch(self) -> None:
+        if not self._waiters or self._in_flight >= self.max_in_flight:
+            return
+        remaining = []
+        now = time.monotonic()
+        for w in self._waiters:
+            if w.future.done():
+                continue
+            if self._fits(w.department, w.provider):
+                self._in_flight += 1
+                self._dept_in_flight[w.department] += 1
+                self._prov_in_flight[w.provider] += 1
+                self._admitted_total += 1
+                self._wait_times.append(now - w.enqueued_at)
+                w.future.set_result(now - w.enqueued_at)
+            else:
+                remaining.append(w)
+        self._waiters = remaining
+
+    async def acquire(self, agent_id: str, department: str = "", provider: str = "",
+                      priority: int = PRIORITY_NORMAL) -> float:
+        """Wait for a slot; returns seconds spent queued."""
+        if self.is_saturated():
+            self._rejected_total += 1
+            raise RuntimeError(f"Admission queue full ({self.max_queue})")
+        waiter = _Waiter(
+            priority=int(priority), seq=next(self._seq), agent_id=agent_id,
+            department=department, provider=provider, enqueued_at=time.monotonic(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        bisect.insort(self._waiters, waiter)
+        self._peak_queue_depth = max(self._peak_queue_depth, len(self._waiters))
+        self._dispatch()
+        if not waiter.future.done():
+            logger.info("agent_admission_queued", agent_id=agent_id,
+                        depth=len(self._waiters), in_flight=self._in_flight)
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(department, provider)
+            else:
+                self._waiters = [w for w in self._waiters if w is not waiter]
+            raise
+
+    def release(self, department: str = "", provider: str = "") -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        if self._dept_in_flight[department] > 0:
+            self._dept_in_flight[department] -= 1
+        if self._prov_in_flight[provider] > 0:
+            self._prov_in_flight[provider] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, agent_id: str, department: str = "", provider: str = "",
+                   priority: int = PRIORITY_NORMAL):
+        waited = await self.acquire(agent_id, department, provider, priority)
+        try:
+            yield waited
+        finally:
+            self.release(department, provider)
+
+    def get_stats(self) -> dict:
+        waits = sorted(self._wait_times)
+        p95 = waits[int(len(waits) * 0.95) - 1] if len(waits) >= 20 else (waits[-1] if waits else 0.0)
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": len(self._waiters),
+            "peak_queue_depth": self._peak_queue_depth,
+            "max_queue": self.max_queue,
+            "admitted_total": self._admitted_total,
+            "rejected_total": self._rejected_total,
+            "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "wait_ms_p95": round(p95 * 1000, 1),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            "by_department": {k: v for k, v in self._dept_in_flight.items() if v},
+            "by_provider": {k: v for k, v in self._prov_in_flight.items() if v},
+            "queued_agents": [w.agent_id for w in self._waiters],
+        }
+
+
+admission = AdmissionController()
@@ -0,0 +1,32 @@
+"""Add failover_from to llm_usage
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def _missing_columns(table: str, names: list[str]) -> list[str]:
+    """llm_usage is created by Base.metadata.create_all, not by an earlier revision."""
+    insp = sa.inspect(op.get_bind())
+    if not insp.has_table(table):
+        return []
+    existing = {c["name"] for c in insp.get_columns(table)}
+    return [n for n in names if n not in existing]
+
+
+def upgrade() -> None:
+    if _missing_columns("llm_usage", ["failover_from"]):
+        op.add_column("llm_usage", sa.Column("failover_from", sa.String(150), nullable=True))
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("llm_usage"):
+        op.drop_column("llm_usage", "failover_from")
@@ -8,6 +8,7 @@ from datetime import datetime
 from pathlib import Path
 from database import get_db
 from runner import spawn_agent, PROCS, cleanup_finished_agents
+from admission import admission, PRIORITY_LOW
 
 logger = structlog.get_logger()
 
@@ -82,7 +83,7 @@ class AutonomousLoop:
                 try:
                     t = json.loads(tasks[0].read_text())
                     await db.add_event(aid, f"Inbox'ta görev bulundu: {t.get('title', '?')[:50]}", "inbox_check")
-                    await spawn_agent(aid, f"{t['title']}: {t.get('description', '')}")
+                    await spawn_agent(aid, f"{t['title']}: {t.get('description', '')}", priority=PRIORITY_LOW)
                 except Exception as e:
                     logger.error("autonomous_spawn_error", agent_id=aid, error=str(e))
                     try:
@@ -100,6 +101,7 @@ class AutonomousLoop:
             "total_events": event_count,
             "agents_tracked": len(agents),
             "last_tick": self.last_tick,
+            "admission": admission.get_stats(),
         }
 
 
@@ -1,6 +1,7 @@
 """
 COWORK.ARMY — Database Package (PostgreSQL + async SQLAlchemy)
 """
+import os
 from .connection import engine, async_session_factory, init_db, set_event_loop
 from .repository import Database
 
@@ -11,7 +12,8 @@ async def setup_db() -> Database:
     """Initialize database: create tables and return Database instance."""
     await init_db()
     global _db
-    _db = Database(async_session_factory)
+    # Write-behind for events / LLM usage / task history (DB_WRITE_BUFFER=0 to disable)
+    _db = Database(async_session_factory, write_buffer=os.environ.get("DB_WRITE_BUFFER", "1") != "0")
     return _db
 
 
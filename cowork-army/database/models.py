@@ -80,6 +80,7 @@ class LlmUsage(Base):
     input_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     output_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     cost_usd: Mapped[float] = mapped_column(Numeric(10, 6), nullable=False, default=0)
+    failover_from: Mapped[str] = mapped_column(String(150), nullable=True)  # "provider:model"
     timestamp: Mapped[datetime] = mapped_column(TIMESTAMPTZ, default=_utcnow)
 
     __table_args__ = (
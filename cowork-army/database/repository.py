@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.exc import OperationalError, InterfaceError
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from .models import Agent, Task, Event, LlmUsage, TaskHistory
+from .write_buffer import WriteBuffer
 
 
 def db_retry(func):
@@ -28,8 +29,41 @@ def db_retry(func):
 
 
 class Database:
-    def __init__(self, session_factory: async_sessionmaker):
+    def __init__(self, session_factory: async_sessionmaker, write_buffer: bool = False):
         self._sf = session_factory
+        # Maintained by add_event / purge_old_events; seeded by one COUNT on first use
+        self._event_count: int | None = None
+        # Events and task history go through the write-behind buffer unless a
+        # caller passes sync=True; LLM usage is always committed at once because
+        # the runner's budget check reads it back
+        self._writes = WriteBuffer(session_factory, on_flush=self._rows_flushed) if write_buffer else None
+
+    def _rows_flushed(self, model: type, count: int) -> None:
+        if model is Event and self._event_count is not None:
+            self._event_count += count
+
+    async def _insert(self, model: type, row: dict, buffered: bool = True):
+        """Buffered insert, or an immediate single-row commit (returns the ORM object)."""
+        if self._writes is not None and buffered:
+            await self._writes.add(model, row)
+            return None
+        async with self._sf() as session:
+            obj = model(**row)
+            session.add(obj)
+            await session.commit()
+        return obj
+
+    async def flush_writes(self) -> int:
+        """Commit buffered writes now (read-your-writes before a query)."""
+        return await self._writes.flush() if self._writes is not None else 0
+
+    async def close(self) -> None:
+        """Flush buffered writes on shutdown."""
+        if self._writes is not None:
+            await self._writes.close()
+
+    def get_write_stats(self) -> dict:
+        return self._writes.get_stats() if self._writes is not None else {"buffered": False}
 
     # ── Agent CRUD ──
 
@@ -161,32 +195,45 @@ class Database:
 
     # ── Events ──
 
-    async def add_event(self, agent_id: str, message: str, etype: str = "info"):
-        """Add an event."""
-        async with self._sf() as session:
-            event = Event(agent_id=agent_id, message=message, type=etype)
-            session.add(event)
-            await session.commit()
-
-    async def get_events(self, limit: int = 50, since: str = "") -> list[dict]:
-        """Get events, optionally since a timestamp."""
+    async def add_event(self, agent_id: str, message: str, etype: str = "info", sync: bool = False) -> int | None:
+        """Add an event. Returns its id (the feed cursor) when committed at once (sync=True or no buffer)."""
+        event = await self._insert(Event, {
+            "agent_id": agent_id, "message": message, "type": etype,
+            "timestamp": datetime.now(timezone.utc),
+        }, buffered=not sync)
+        if event is None:
+            return None
+        if self._event_count is not None:
+            self._event_count += 1
+        return event.id
+
+    async def get_events(self, limit: int = 50, since: str = "", since_id: int | None = None) -> list[dict]:
+        """
+        Get the newest events, optionally since a timestamp. With `since_id`,
+        the next `limit` events after that id, oldest first (resumable cursor).
+        """
         async with self._sf() as session:
             query = select(Event)
+            if since_id is not None:
+                query = query.where(Event.id > since_id)
             if since:
                 try:
                     since_dt = datetime.fromisoformat(since.replace("Z", "+00:00"))
                     query = query.where(Event.timestamp > since_dt)
                 except ValueError:
                     pass
-            query = query.order_by(Event.id.desc()).limit(limit)
+            order = Event.id.asc() if since_id is not None else Event.id.desc()
+            query = query.order_by(order).limit(limit)
             result = await session.execute(query)
             return [self._event_to_dict(e) for e in result.scalars().all()]
 
-    async def get_event_count(self) -> int:
-        """Get total event count."""
-        async with self._sf() as session:
-            result = await session.execute(select(func.count(Event.id)))
-            return result.scalar() or 0
+    async def get_event_count(self, refresh: bool = False) -> int:
+        """Get total event count (one COUNT, then kept current in memory)."""
+        if self._event_count is None or refresh:
+            async with self._sf() as session:
+                result = await session.execute(select(func.count(Event.id)))
+                self._event_count = result.scalar() or 0
+        return self._event_count
 
     async def purge_old_events(self, days: int = 7) -> int:
         """Delete events older than `days` days. Returns row count deleted."""
@@ -194,7 +241,9 @@ class Database:
         async with self._sf() as session:
             result = await session.execute(delete(Event).where(Event.timestamp < cutoff))
             await session.commit()
-            return result.rowcount
+        if self._event_count is not None:
+            self._event_count = max(0, self._event_count - (result.rowcount or 0))
+        return result.rowcount
 
     async def get_agent_ids_and_status(self) -> list[dict]:
         """Selective query: return only id, name, is_base for all agents (lightweight)."""
@@ -228,13 +277,13 @@ class Database:
 
     # ── LLM Usage ──
 
-    async def record_llm_usage(self, agent_id, provider, model, input_tokens, output_tokens, cost_usd):
-        async with self._sf() as session:
-            session.add(LlmUsage(
-                agent_id=agent_id, provider=provider, model=model,
-                input_tokens=input_tokens, output_tokens=output_tokens, cost_usd=cost_usd,
-            ))
-            await session.commit()
+    async def record_llm_usage(self, agent_id, provider, model, input_tokens, output_tokens, cost_usd,
+                               failover_from=None):
+        await self._insert(LlmUsage, {
+            "agent_id": agent_id, "provider": provider, "model": model,
+            "input_tokens": input_tokens, "output_tokens": output_tokens, "cost_usd": cost_usd,
+            "failover_from": failover_from, "timestamp": datetime.now(timezone.utc),
+        }, buffered=False)
 
     async def get_daily_spend(self) -> float:
         """Return total LLM spend (USD) for today."""
@@ -288,13 +337,11 @@ class Database:
 
     # ── Task History ──
 
-    async def record_task_transition(self, task_id, old_status, new_status, changed_by="system"):
-        async with self._sf() as session:
-            session.add(TaskHistory(
-                task_id=task_id, old_status=old_status,
-                new_status=new_status, changed_by=changed_by,
-            ))
-            await session.commit()
+    async def record_task_transition(self, task_id, old_status, new_status, changed_by="system", sync=False):
+        await self._insert(TaskHistory, {
+            "task_id": task_id, "old_status": old_status, "new_status": new_status,
+            "changed_by": changed_by, "changed_at": datetime.now(timezone.utc),
+        }, buffered=not sync)
 
     async def get_task_history(self, task_id):
         async with self._sf() as session:
@@ -347,6 +394,7 @@ class Database:
     @staticmethod
     def _event_to_dict(e: Event) -> dict:
         return {
+            "id": e.id,
             "timestamp": e.timestamp.isoformat() if e.timestamp else "",
             "agent_id": e.agent_id, "message": e.message, "type": e.type,
         }
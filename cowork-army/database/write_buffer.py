@@ -0,0 +1,209 @@
+"""
+COWORK.ARMY — Database Write Buffer (write-behind for append-only tables)
+Events and task transitions are insert-only and nobody waits on them, yet
+each one opened a session and committed a single row — from runner threads
+via a _sync_db round trip per row. WriteBuffer collects them instead:
+- rows are grouped per table and written in one transaction, one multi-row
+  INSERT per table (SQLAlchemy "insertmanyvalues")
+- flush triggers: a table reaching DB_WRITE_BATCH_SIZE rows, the
+  DB_WRITE_FLUSH_MS timer, or shutdown (close)
+- backpressure: once DB_WRITE_MAX_PENDING rows are waiting, add() flushes
+  inline, so callers slow down instead of growing memory
+- a flush that fails on the connection is retried with the next one while
+  it fits in the buffer; one that fails on the data is retried table by
+  table, then row by row, so a bad row is logged and dropped on its own
+  instead of failing (and re-failing) the whole batch
+Callers that need the row committed before they continue pass sync=True to
+the repository, which bypasses the buffer; LLM spend (read back right away
+by the budget check) always does.
+"""
+import asyncio
+import os
+from typing import Callable, Optional
+import structlog
+from sqlalchemy import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+logger = structlog.get_logger()
+
+DB_WRITE_BATCH_SIZE = int(os.environ.get("DB_WRITE_BATCH_SIZE", 200))
+DB_WRITE_FLUSH_MS = float(os.environ.get("DB_WRITE_FLUSH_MS", 500))
+DB_WRITE_MAX_PENDING = int(os.environ.get("DB_WRITE_MAX_PENDING", 5000))
+
+# Lost connection / server going away: the rows are fine, write them later
+_TRANSIENT_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+
+
+def _is_transient(exc: Exception) -> bool:
+    return isinstance(exc, _TRANSIENT_ERRORS) or getattr(exc, "connection_invalidated", False)
+
+
+class WriteBuffer:
+    """Write-behind buffer: rows grouped per model, flushed as batched INSERTs."""
+
+    def __init__(self, session_factory: async_sessionmaker,
+                 batch_size: int = DB_WRITE_BATCH_SIZE,
+                 flush_ms: float = DB_WRITE_FLUSH_MS,
+                 max_pending: int = DB_WRITE_MAX_PENDING,
+                 on_flush: Optional[Callable[[type, int], None]] = None):
+        self._sf = session_factory
+        self.batch_size = batch_size
+        self.interval = flush_ms / 1000
+        self.max_pending = max(max_pending, batch_size)
+        self._on_flush = on_flush
+        self._pending: dict[type, list[dict]] = {}
+        self._count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False  # close(): the flusher exits after its current flush
+        self._closed = False
+        self.stats = {"queued": 0, "written": 0, "flushes": 0, "failed_flushes": 0,
+                      "dropped": 0, "rejected": 0, "backpressure_flushes": 0}
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    async def add(self, model: type, row: dict) -> None:
+        """Queue one row; flushes inline when the buffer is full."""
+        if self._closed:
+            raise RuntimeError("WriteBuffer is closed")
+        self._ensure_started()
+        rows = self._pending.setdefault(model, [])
+        rows.append(row)
+        self._count += 1
+        self.stats["queued"] += 1
+        if self._count >= self.max_pending:
+            self.stats["backpressure_flushes"] += 1
+            await self.flush()
+        elif len(rows) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._count and not self._stopping:
+                await self.flush()
+
+    async def flush(self) -> int:
+        """Write everything queued so far in one transaction; returns rows written."""
+        if self._lock is None:
+            return 0
+        async with self._lock:
+            if not self._count:
+                return 0
+            batch, count = self._pending, self._count
+            self._pending, self._count = {}, 0
+            try:
+                await self._write(batch)
+                written = batch
+            except Exception as e:
+                self.stats["failed_flushes"] += 1
+                if _is_transient(e):
+                    self._requeue(batch, count)
+                    logger.error("db_write_flush_failed", rows=count, error=str(e))
+                    return 0
+                logger.warning("db_write_flush_isolating", rows=count, error=str(e))
+                written = await self._write_isolated(batch)
+            done = sum(len(rows) for rows in written.values())
+            if done:
+                self.stats["flushes"] += 1
+                self.stats["written"] += done
+        if self._on_flush is not None:
+            for model, rows in written.items():
+                self._on_flush(model, len(rows))
+        return done
+
+    async def _write(self, batch: dict[type, list[dict]]) -> None:
+        async with self._sf() as s:
+            for model, rows in batch.items():
+                await s.execute(insert(model), rows)
+            await s.commit()
+
+    async def _write_isolated(self, batch: dict[type, list[dict]]) -> dict[type, list[dict]]:
+        """Retry a batch the database refused, table by table and then row by row.
+
+        Rows refused on their own are counted as rejected and dropped; if the
+        connection goes away part-way, what is left is requeued. Returns the
+        rows that were written.
+        """
+        written: dict[type, list[dict]] = {}
+        retry: dict[type, list[dict]] = {}
+        for model, rows in batch.items():
+            if retry:  # connection lost: keep the remaining tables for the next flush
+                retry[model] = rows
+                continue
+            try:
+                await self._write({model: rows})
+                written[model] = rows
+                continue
+            except Exception as e:
+                if _is_transient(e):
+                    retry[model] = rows
+                    continue
+            for i, row in enumerate(rows):
+                try:
+                    await self._write({model: [row]})
+                except Exception as e:
+                    if _is_transient(e):
+                        retry[model] = rows[i:]
+                        break
+                    self.stats["rejected"] += 1
+                    logger.error("db_write_row_rejected", table=model.__tablename__, error=str(e))
+                    continue
+                written.setdefault(model, []).append(row)
+        if retry:
+            self._requeue(retry, sum(len(rows) for rows in retry.values()))
+        return written
+
+    def _requeue(self, batch: dict[type, list[dict]], count: int) -> None:
+        """Put a failed batch back in front of newer rows, unless that overflows the buffer."""
+        if self._closed or self._count + count > self.max_pending:
+            self._drop(count, "closed" if self._closed else "buffer full")
+            return
+        for model, rows in batch.items():
+            self._pending[model] = rows + self._pending.get(model, [])
+        self._count += count
+
+    def _drop(self, count: int, reason: str) -> None:
+        self.stats["dropped"] += count
+        logger.error("db_write_rows_dropped", rows=count, reason=reason)
+
+    async def close(self) -> None:
+        """Stop the flusher and write what is left (shutdown).
+
+        The flusher is woken and awaited rather than cancelled: a cancel
+        landing inside flush() would lose the batch it had already taken.
+        """
+        self._stopping = True
+        if self._task is not None and not self._task.done():
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+        self._closed = True
+        if self._count:  # the final flush failed: nothing will retry these
+            self._drop(self._count, "closed")
+            self._pending, self._count = {}, 0
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "pending": self._count,
+            "pending_by_table": {m.__tablename__: len(r) for m, r in self._pending.items()},
+            "batch_size": self.batch_size,
+            "flush_ms": self.interval * 1000,
+            "max_pending": self.max_pending,
+        }
@@ -0,0 +1,373 @@
+"""LLM call resilience for COWORK.ARMY agent threads.
+
+Token-bucket pacing per provider/model, jittered exponential backoff that
+honors retry-after, a circuit breaker per provider/model, and mid-task
+failover between Anthropic and Gemini with the message history translated
+to the target provider's format.
+"""
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+
+import structlog
+
+from specs import parse_overrides
+
+logger = structlog.get_logger()
+
+RATE_LIMITS = os.environ.get("LLM_RATE_LIMITS", "anthropic=50,gemini=60")
+RATE_BURST = int(os.environ.get("LLM_RATE_BURST", 5))
+MAX_ATTEMPTS = int(os.environ.get("LLM_MAX_ATTEMPTS", 3))
+BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", 1.0))
+BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", 30.0))
+BREAKER_THRESHOLD = int(os.environ.get("LLM_BREAKER_THRESHOLD", 5))
+BREAKER_RESET_SECONDS = float(os.environ.get("LLM_BREAKER_RESET_SECONDS", 60))
+
+_DEFAULT_RPM, _RPM_OVERRIDES = parse_overrides(RATE_LIMITS, 60)
+_RETRY_HINT = re.compile(
+    r"(?:retryDelay['\"]?\s*:\s*['\"]?|retry in\s+|retry[- ]after[:\s]+)([\d.]+)\s*s?", re.I,
+)
+_TRANSIENT_MARKERS = ("overloaded", "unavailable", "503", "502", "504", "529", "timeout", "timed out")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    msg = str(exc).lower()
+    return (
+        "429" in msg or "resource_exhausted" in msg or "quota" in msg or "rate limit" in msg
+        or getattr(exc, "status_code", None) == 429 or getattr(exc, "code", None) == 429
+    )
+
+
+def retry_after_seconds(exc: Exception) -> float | None:
+    value = getattr(exc, "retry_after", None)
+    if isinstance(value, (int, float)):
+        return float(value)
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    raw = None
+    if headers is not None:
+        try:
+            raw = headers.get("retry-after")
+        except Exception:
+            raw = None
+    if isinstance(raw, str) and raw:
+        try:
+            return max(float(raw), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(raw).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    m = _RETRY_HINT.search(str(exc))
+    return float(m.group(1)) if m else None
+
+
+def is_retryable_error(exc: Exception) -> bool:
+    if is_rate_limit_error(exc):
+        return True
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int):
+        return status >= 500 or status in (408, 409)
+    if type(exc).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return True
+    msg = str(exc).lower()
+    return any(marker in msg for marker in _TRANSIENT_MARKERS)
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None,
+                  base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap * 4))
+    return delay
+
+
+class TokenBucket:
+    """Thread-safe request pacer (agents run in threads)."""
+
+    def __init__(self, rpm: int, burst: int = RATE_BURST) -> None:
+        self.rate = max(rpm, 1) / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waited_total = 0.0
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self) -> float:
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        waited = now - start
+                        self.waited_total += waited
+                        return waited
+                    sleep_for = (1 - self._tokens) / self.rate
+                else:
+                    sleep_for = self._paused_until - now
+            time.sleep(sleep_for)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.opens_total = 0
+        self._probe_started: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Closed: yes. Half-open: only one probe at a time; the rest fail fast."""
+        with self._lock:
+            state = self.state
+            if state != "half_open":
+                return state == "closed"
+            now = time.monotonic()
+            if self._probe_started is not None and now - self._probe_started < self.reset_seconds:
+                return False
+            self._probe_started = now
+            return True
+
+    def release_probe(self) -> None:
+        """The probe ended without a verdict (e.g. a request error): let the next caller probe."""
+        with self._lock:
+            self._probe_started = None
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("llm_circuit_closed", circuit=self.name)
+            self.failures = 0
+            self.opened_at = None
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_started = None
+            if self.state == "half_open" or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+                self.opens_total += 1
+                logger.warning("llm_circuit_open", circuit=self.name, failures=self.failures)
+
+
+_registry_lock = threading.Lock()
+_buckets: dict[str, TokenBucket] = {}
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_bucket(provider_name: str, model: str) -> TokenBucket:
+    key = f"{provider_name}:{model}"
+    with _registry_lock:
+        if key not in _buckets:
+            rpm = _RPM_OVERRIDES.get(key, _RPM_OVERRIDES.get(provider_name, _DEFAULT_RPM))
+            _buckets[key] = TokenBucket(rpm)
+        return _buckets[key]
+
+
+def get_breaker(provider_name: str, model: str) -> CircuitBreaker:
+    key = f"{provider_name}:{model}"
+    with _registry_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(key)
+        return _breakers[key]
+
+
+# ── History translation ──
+
+def _field(block, name: str, default=None):
+    if isinstance(block, dict):
+        return block.get(name, default)
+    return getattr(block, name, default)
+
+
+def translate_history(messages: list, target: str) -> list:
+    """Convert a conversation between AnthropicProvider and GeminiProvider formats.
+
+    Anthropic: assistant turns hold content blocks (text / tool_use with id).
+    Gemini: "model" turns hold text / function_call dicts and tool results
+    carry ``_function_name``. Tool-call ids are matched to results by position.
+    """
+    out: list = []
+    names: dict[str, str] = {}
+    pending: list[dict] = []
+    for msg in messages:
+        role, content = msg.get("role"), msg.get("content")
+        if role in ("assistant", "model"):
+            blocks = [{"type": "text", "text": content}] if isinstance(content, str) else list(content or [])
+            converted = []
+            pending = []
+            for b in blocks:
+                btype = _field(b, "type")
+                if btype == "text" and _field(b, "text"):
+                    converted.append({"type": "text", "text": _field(b, "text")})
+                elif btype in ("tool_use", "function_call"):
+                    name = _field(b, "name", "")
+                    args = _field(b, "input") if btype == "tool_use" else _field(b, "args")
+                    call_id = _field(b, "id") if btype == "tool_use" else None
+                    if call_id:
+                        names[call_id] = name
+                    if target == "gemini":
+                        converted.append({"type": "function_call", "name": name, "args": dict(args or {})})
+                    else:
+                        block = {"type": "tool_use", "id": call_id, "name": name, "input": dict(args or {})}
+                        converted.append(block)
+                        pending.append(block)
+            out.append({"role": "model" if target == "gemini" else "assistant", "content": converted})
+        elif role == "user" and isinstance(content, list):
+            items = []
+            results = [i for i in content if isinstance(i, dict) and i.get("type") == "tool_result"]
+            for pos, item in enumerate(results):
+                if pos < len(pending) and not pending[pos]["id"]:
+                    pending[pos]["id"] = item.get("tool_use_id") or f"toolu_{uuid.uuid4().hex[:24]}"
+            for item in content:
+                if isinstance(item, dict) and item.get("type") == "tool_result":
+                    if target == "gemini":
+                        item = {**item, "_function_name": item.get("_function_name")
+                                or names.get(item.get("tool_use_id"), "")}
+                    else:
+                        item = {k: v for k, v in item.items() if k != "_function_name"}
+                items.append(item)
+            out.append({"role": "user", "content": items})
+            pending = []
+        else:
+            out.append(msg)
+    for block in pending:
+        if not block["id"]:
+            block["id"] = f"toolu_{uuid.uuid4().hex[:24]}"
+    return out
+
+
+# ── Resilient provider wrapper ──
+
+class ResilientChat:
+    """LLMProvider-compatible wrapper used by runner._run for one agent task.
+
+    After a failover the task stays on the new provider; ``take_failover()``
+    returns the "provider:model" it left so the usage row can record it.
+    """
+
+    def __init__(self, provider, provider_name: str, model: str, alternate_factory=None,
+                 max_attempts: int = MAX_ATTEMPTS) -> None:
+        self.active = provider
+        self.name = provider_name
+        self.model = model or getattr(provider, "model", "") or getattr(provider, "model_name", "")
+        self.max_attempts = max(1, max_attempts)
+        self._alternate_factory = alternate_factory
+        self._alternate = None
+        self._alternate_loaded = False
+        self._failover_from: str | None = None
+
+    def _get_alternate(self):
+        if not self._alternate_loaded:
+            self._alternate_loaded = True
+            if self._alternate_factory is not None:
+                try:
+                    self._alternate = self._alternate_factory(self.name)
+                except Exception as e:
+                    logger.warning("llm_alternate_unavailable", error=str(e))
+        return self._alternate
+
+    def _call(self, provider, name: str, model: str, system: str, messages: list, tools: list):
+        breaker = get_breaker(name, model)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit {breaker.name} open")
+        bucket = get_bucket(name, model)
+        for attempt in range(self.max_attempts):
+            bucket.acquire()
+            try:
+                result = provider.chat(system, messages, tools)
+            except Exception as exc:
+                if not is_retryable_error(exc):
+                    breaker.release_probe()
+                    raise
+                breaker.record_failure()
+                retry_after = retry_after_seconds(exc)
+                if retry_after and is_rate_limit_error(exc):
+                    bucket.pause(retry_after)
+                if not breaker.allow() or attempt == self.max_attempts - 1:
+                    raise
+                delay = backoff_delay(attempt, retry_after)
+                logger.warning("llm_retry", circuit=breaker.name, attempt=attempt + 1,
+                               delay=round(delay, 2), error=str(exc))
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+        raise CircuitOpenError(f"Circuit {breaker.name} open")
+
+    def chat(self, system: str, messages: list, tools: list):
+        """Like provider.chat; on failover ``messages`` is translated in place."""
+        try:
+            return self._call(self.active, self.name, self.model, system, messages, tools)
+        except Exception as exc:
+            if not (isinstance(exc, CircuitOpenError) or is_retryable_error(exc)):
+                raise
+            alternate = self._get_alternate()
+            if alternate is None:
+                raise
+            alt_provider, alt_name, alt_model = alternate
+            translated = translate_history(messages, alt_name)
+            result = self._call(alt_provider, alt_name, alt_model, system, translated, tools)
+            logger.warning("llm_failover", from_provider=f"{self.name}:{self.model}",
+                           to_provider=f"{alt_name}:{alt_model}", error=str(exc))
+            self._failover_from = f"{self.name}:{self.model}"
+            self._alternate = (self.active, self.name, self.model)  # allow failing back later
+            self.active, self.name, self.model = alt_provider, alt_name, alt_model
+            messages[:] = translated
+            return result
+
+    def take_failover(self) -> str | None:
+        value, self._failover_from = self._failover_from, None
+        return value
+
+    def get_last_usage(self) -> dict:
+        if hasattr(self.active, "get_last_usage"):
+            return self.active.get_last_usage()
+        return {}
+
+    def format_assistant_message(self, text, tool_calls) -> dict:
+        return self.active.format_assistant_message(text, tool_calls)
+
+    def format_tool_result(self, tool_call, content: str) -> dict:
+        return self.active.format_tool_result(tool_call, content)
+
+
+def get_resilience_stats() -> dict:
+    with _registry_lock:
+        return {
+            "breakers": {k: {"state": b.state, "failures": b.failures, "opens_total": b.opens_total}
+                         for k, b in _breakers.items()},
+            "buckets": {k: {"rpm": round(b.rate * 60), "waited_s_total": round(b.waited_total, 1)}
+                        for k, b in _buckets.items()},
+        }
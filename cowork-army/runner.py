@@ -16,10 +16,12 @@ from database.connection import get_event_loop
 from tools import read_file, write_file, list_dir, search_files, run_command
 from llm_providers import get_provider, TOOL_DEFS
 from exceptions import NotFoundError
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from cache import app_cache
 from cost_tracking import calculate_cost
 from sse import broadcaster
+from admission import admission, PRIORITY_NORMAL
+from resilience import ResilientChat
+from registry import BASE_AGENTS
 
 logger = structlog.get_logger()
 
@@ -35,15 +37,19 @@ def _sync_db(coro) -> object:
 
 AGENT_TIMEOUT_SECONDS = 300  # 5 minutes
 
+# agent_id → department, used for per-department admission slots
+_AGENT_DEPARTMENTS = {a["id"]: a.get("department", "") for a in BASE_AGENTS}
+
 
 class AgentProc:
-    __slots__ = ("agent_id", "status", "lines", "started_at", "thread", "task_text", "_finished_at")
+    __slots__ = ("agent_id", "status", "lines", "started_at", "thread", "waiter", "task_text", "_finished_at")
     def __init__(self, agent_id):
         self.agent_id = agent_id
         self.status = "idle"
         self.lines: collections.deque = collections.deque(maxlen=200)
         self.started_at = ""
         self.thread: threading.Thread | None = None
+        self.waiter: asyncio.Task | None = None  # admission wrapper task
         self.task_text = ""
         self._finished_at: float | None = None
     def log(self, msg):
@@ -51,7 +57,9 @@ class AgentProc:
         self.lines.append(f"[{ts}] {msg}")
     @property
     def alive(self):
-        return self.thread is not None and self.thread.is_alive()
+        if self.thread is not None:
+            return self.thread.is_alive()
+        return self.waiter is not None and not self.waiter.done()  # queued for admission
     def to_dict(self):
         return {"agent_id": self.agent_id, "status": self.status, "lines": list(self.lines)[-50:],
                 "alive": self.alive, "pid": 0, "started_at": self.started_at}
@@ -60,16 +68,6 @@ class AgentProc:
 PROCS: dict[str, AgentProc] = {}
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=1, max=8),
-    retry=retry_if_exception_type((ConnectionError, TimeoutError, OSError)),
-    reraise=True,
-)
-def _llm_chat_with_retry(provider, sys_prompt, messages, tool_defs):
-    return provider.chat(sys_prompt, messages, tool_defs)
-
-
 def cleanup_finished_agents(ttl_seconds: int = 300) -> None:
     """Remove finished agents from PROCS after TTL expires."""
     now = _time.time()
@@ -108,6 +106,17 @@ def _get_llm_config() -> tuple[str, str, str]:
     return provider, api_key, model
 
 
+def _get_alternate_provider(current: str):
+    """(provider, name, model) for the other configured LLM, or None (failover target)."""
+    alt = "anthropic" if current == "gemini" else "gemini"
+    api_key = _read_env_value("ANTHROPIC_API_KEY" if alt == "anthropic" else "GEMINI_API_KEY")
+    if not api_key:
+        return None
+    model = _read_env_value("ANTHROPIC_MODEL" if alt == "anthropic" else "GEMINI_MODEL") or ""
+    provider = get_provider(alt, api_key, model)
+    return provider, alt, model or getattr(provider, "model", "") or getattr(provider, "model_name", "")
+
+
 def _workspace_context(agent_id: str) -> str:
     cache_key = f"workspace_ctx:{agent_id}"
     cached = app_cache.get(cache_key)
@@ -198,7 +207,8 @@ Isini bitirdiginde sonucu ozetle."""
     proc.status = "working"
 
     try:
-        provider = get_provider(provider_name, api_key, model)
+        provider = ResilientChat(get_provider(provider_name, api_key, model), provider_name, model,
+                                 alternate_factory=_get_alternate_provider)
         messages = [{"role": "user", "content": user_msg}]
         collected_text = ""
 
@@ -206,25 +216,27 @@ Isini bitirdiginde sonucu ozetle."""
             if proc.status == "done":
                 break  # killed externally
 
-            text, tool_calls = _llm_chat_with_retry(provider, sys_prompt, messages, TOOL_DEFS)
+            text, tool_calls = provider.chat(sys_prompt, messages, TOOL_DEFS)
+            failover_from = provider.take_failover()
+            if failover_from:
+                proc.log(f"⚠ Failover: {failover_from} → {provider.name}")
 
             # Record cost after each LLM call
             try:
-                usage = provider.get_last_usage() if hasattr(provider, "get_last_usage") else {}
+                usage = provider.get_last_usage()
                 in_tok = int(usage.get("input_tokens", 0) or 0)
                 out_tok = int(usage.get("output_tokens", 0) or 0)
-                if in_tok > 0 or out_tok > 0:
-                    model_name = os.environ.get("LLM_MODEL",
-                        os.environ.get("ANTHROPIC_MODEL",
-                        os.environ.get("GEMINI_MODEL", "claude-sonnet-4-20250514")))
+                if in_tok > 0 or out_tok > 0 or failover_from:
+                    model_name = provider.model or os.environ.get("LLM_MODEL", "claude-sonnet-4-20250514")
                     cost = calculate_cost(model_name, in_tok, out_tok)
                     _sync_db(db.record_llm_usage(
                         agent_id=proc.agent_id,
-                        provider=os.environ.get("LLM_PROVIDER", "anthropic"),
+                        provider=provider.name,
                         model=model_name,
                         input_tokens=in_tok,
                         output_tokens=out_tok,
                         cost_usd=cost,
+                        failover_from=failover_from,
                     ))
             except Exception as e:
                 logger.warning("cost_tracking_failed", error=str(e))
@@ -307,15 +319,57 @@ def _save_output(agent_id: str, task: str, response: str, proc: AgentProc) -> No
         proc.log(f"  💾 response_{ts}.md")
 
 
+async def _run_admitted(proc: AgentProc, task: str, department: str, provider: str, priority: int) -> None:
+    """Hold an admission slot until the agent thread exits (a timeout only marks it failed)."""
+    try:
+        async with admission.slot(proc.agent_id, department, provider, priority) as waited:
+            if waited >= 1:
+                proc.log(f"⏳ Kuyrukta {waited:.1f}s beklendi")
+            if proc.status == "done":
+                return  # killed while queued
+            loop = asyncio.get_running_loop()
+            finished = asyncio.Event()
+
+            def _target():
+                try:
+                    _run(proc, task)
+                finally:
+                    loop.call_soon_threadsafe(finished.set)
+
+            t = threading.Thread(target=_target, daemon=True)
+            proc.thread = t
+            t.start()
+            try:
+                await asyncio.wait_for(finished.wait(), AGENT_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                proc.status = "error"
+                proc.log(f"⏰ Timeout after {AGENT_TIMEOUT_SECONDS}s")
+                proc._finished_at = _time.time()
+                logger.warning("agent_timeout", agent_id=proc.agent_id, timeout=AGENT_TIMEOUT_SECONDS)
+                # The thread cannot be interrupted; keep the slot until it really
+                # exits so in-flight work never exceeds the admission limits.
+                started = _time.monotonic()
+                await finished.wait()
+                logger.info("agent_timeout_thread_exited", agent_id=proc.agent_id,
+                            overrun=round(_time.monotonic() - started, 1))
+    except RuntimeError as e:
+        proc.status = "error"
+        proc._finished_at = _time.time()
+        proc.log(f"❌ {e}")
+        logger.warning("agent_admission_rejected", agent_id=proc.agent_id, error=str(e))
+
+
 # ── Public API ──
 
-async def spawn_agent(agent_id: str, task: str = "") -> dict:
+async def spawn_agent(agent_id: str, task: str = "", priority: int = PRIORITY_NORMAL) -> dict:
     db = get_db()
     agent = await db.get_agent(agent_id)
     if not agent:
         raise NotFoundError("agent", agent_id)
     if agent_id in PROCS and PROCS[agent_id].alive:
         return {"error": "Already running", **PROCS[agent_id].to_dict()}
+    if admission.is_saturated():
+        return {"error": "Admission queue full", "queue_depth": admission.queue_depth()}
 
     if not task:
         inbox = WORKSPACE / agent_id / "inbox"
@@ -336,25 +390,20 @@ async def spawn_agent(agent_id: str, task: str = "") -> dict:
     proc.log(f"═══ {agent['icon']} {agent['name']} BAŞLATILIYOR ═══")
     proc.log(f"📂 workspace/{agent_id}/")
     proc.log(f"🎯 {agent['domain']}")
-    t = threading.Thread(target=_run, args=(proc, task), daemon=True)
-    proc.thread = t
+    proc.status = "queued"
     PROCS[agent_id] = proc
-    t.start()
-
-    async def _timeout_kill():
-        await asyncio.sleep(AGENT_TIMEOUT_SECONDS)
-        if proc.alive:
-            proc.status = "error"
-            proc.log(f"⏰ Timeout after {AGENT_TIMEOUT_SECONDS}s")
-            proc._finished_at = _time.time()
-            logger.warning("agent_timeout", agent_id=agent_id, timeout=AGENT_TIMEOUT_SECONDS)
-
-    asyncio.create_task(_timeout_kill())
+    department = _AGENT_DEPARTMENTS.get(agent_id) or agent.get("tier", "")
+    proc.waiter = asyncio.create_task(
+        _run_admitted(proc, task, department, _get_llm_config()[0], priority)
+    )
     return proc.to_dict()
 
 
 def kill_agent(agent_id: str) -> dict:
     if agent_id not in PROCS: return {"error": "Not running"}
+    proc = PROCS[agent_id]
+    if proc.thread is None and proc.waiter is not None and not proc.waiter.done():
+        proc.waiter.cancel()  # still queued for admission
     PROCS[agent_id].status = "done"
     PROCS[agent_id].log("⏹ Durduruldu")
     return {"status": "killed", "agent_id": agent_id}
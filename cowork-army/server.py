@@ -112,6 +112,7 @@ async def lifespan(app):
             proc._finished_at = _time.time()
             logger.info("agent_killed_on_shutdown", agent_id=agent_id)
     PROCS.clear()
+    await db.close()  # flush buffered event / usage / task-history writes
     logger.info("server_shutdown_complete")
 
 
@@ -250,6 +251,22 @@ async def api_output(agent_id: str):
 async def api_statuses():
     return await get_statuses()
 
+@app.get("/api/admission")
+async def api_admission():
+    from admission import admission
+    return admission.get_stats()
+
+
+@app.get("/api/resilience")
+async def api_resilience():
+    from resilience import get_resilience_stats
+    return get_resilience_stats()
+
+
+@app.get("/api/db-writes")
+async def api_db_writes():
+    return get_db().get_write_stats()
+
 # ══════════════ TASKS ══════════════
 @app.get("/api/tasks")
 async def api_tasks(agent: str = "", status: str = "", date_from: str = "", date_to: str = ""):
@@ -350,9 +367,10 @@ async def api_auto_status():
     return await autonomous.status()
 
 @app.get("/api/autonomous/events")
-async def api_auto_events(limit: int = 50, since: str = ""):
+async def api_auto_events(limit: int = 50, since: str = "", since_id: int | None = None):
+    """Newest events; with since_id, the events after it oldest first (pass the last id back to resume)."""
     db = get_db()
-    return await db.get_events(limit, since)
+    return await db.get_events(min(limit, 500), since, since_id=since_id)
 
 # ══════════════ SSE EVENTS ══════════════
 @app.get("/api/events/stream")
@@ -374,6 +392,7 @@ async def event_stream(request: Request):
             while True:
                 try:
                     msg = await asyncio.wait_for(queue.get(), timeout=15.0)
+                    broadcaster.delivered(queue, msg)
                     yield {"event": msg["event"], "data": json_module.dumps(msg["data"])}
                 except asyncio.TimeoutError:
                     yield {"event": "heartbeat", "data": json_module.dumps({"ts": 0})}
@@ -385,6 +404,11 @@ async def event_stream(request: Request):
     return EventSourceResponse(generate())
 
 
+@app.get("/api/events/stream/stats")
+async def event_stream_stats():
+    return broadcaster.get_stats()
+
+
 # ══════════════ SETTINGS ══════════════
 @app.get("/api/settings/api-key-status")
 async def api_key_status():
@@ -0,0 +1,27 @@
+"""Parsing of "key=value" override lists in env settings.
+
+Used for AGENT_DEPT_SLOTS ("trade=2,*=3"), AGENT_PROVIDER_SLOTS and
+LLM_RATE_LIMITS ("anthropic=50,gemini=60"); "*" replaces the default.
+"""
+import structlog
+
+logger = structlog.get_logger()
+
+
+def parse_overrides(spec: str, default: int) -> tuple[int, dict[str, int]]:
+    """Parse "trade=2,software=4,*=3" into (default, overrides)."""
+    overrides: dict[str, int] = {}
+    for part in (spec or "").split(","):
+        key, sep, value = part.strip().partition("=")
+        if not sep:
+            continue
+        try:
+            n = int(value)
+        except ValueError:
+            logger.warning("invalid_override_spec", part=part)
+            continue
+        if key.strip() == "*":
+            default = n
+        else:
+            overrides[key.strip()] = n
+    return default, overrides
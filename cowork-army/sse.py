@@ -1,16 +1,44 @@
-"""Server-Sent Events broadcaster for COWORK.ARMY real-time updates."""
+"""Server-Sent Events broadcaster for COWORK.ARMY real-time updates.
+
+Each subscriber owns a bounded asyncio.Queue. broadcast() never waits on a
+subscriber: when a queue is full, state events that a newer one supersedes
+(agent_status per agent, task_update, budget_warning) are coalesced, and if
+that frees nothing the oldest message is dropped. Drops, coalesced events and
+delivery lag are tracked per subscriber.
+"""
 import asyncio
 import json
+import time
 from typing import Any
 import structlog
 
 logger = structlog.get_logger()
 
+# Events whose latest value makes older queued ones redundant
+_COALESCE_KEYS = {
+    "agent_status": lambda data: data.get("agent_id"),
+    "task_update": lambda data: None,
+    "budget_warning": lambda data: None,
+}
+
+
+def _coalesce_key(message: dict) -> tuple | None:
+    key_fn = _COALESCE_KEYS.get(message["event"])
+    if key_fn is None:
+        return None
+    return (message["event"], key_fn(message["data"]))
+
+
+def _new_stats() -> dict:
+    return {"enqueued": 0, "dropped": 0, "coalesced": 0, "max_lag_ms": 0.0}
+
+
 class SSEBroadcaster:
     MAX_CLIENTS = 100
 
     def __init__(self) -> None:
         self._clients: list[asyncio.Queue] = []
+        self._stats: dict[int, dict] = {}
 
     @property
     def client_count(self) -> int:
@@ -21,20 +49,68 @@ class SSEBroadcaster:
             logger.warning("sse_max_clients_reached", max=self.MAX_CLIENTS)
             return False
         self._clients.append(queue)
+        self._stats[id(queue)] = _new_stats()
         logger.info("sse_client_connected", total=self.client_count)
         return True
 
     def unsubscribe(self, queue: asyncio.Queue) -> None:
         if queue in self._clients:
             self._clients.remove(queue)
+        stats = self._stats.pop(id(queue), None)
+        if stats and (stats["dropped"] or stats["coalesced"]):
+            logger.info("sse_slow_client_closed", dropped=stats["dropped"], coalesced=stats["coalesced"])
         logger.info("sse_client_disconnected", total=self.client_count)
 
+    def _make_room(self, queue: asyncio.Queue, message: dict, stats: dict) -> None:
+        """Free one slot in a full queue: coalesce superseded state events, else drop the oldest."""
+        pending = []
+        while not queue.empty():
+            pending.append(queue.get_nowait())
+        latest: dict[tuple, int] = {}
+        for i, queued in enumerate(pending + [message]):
+            key = _coalesce_key(queued)
+            if key is not None:
+                latest[key] = i
+        kept = [m for i, m in enumerate(pending)
+                if (key := _coalesce_key(m)) is None or latest[key] == i]
+        stats["coalesced"] += len(pending) - len(kept)
+        if len(kept) == len(pending):
+            kept.pop(0)
+            stats["dropped"] += 1
+        for queued in kept:
+            queue.put_nowait(queued)
+
     async def broadcast(self, event: str, data: dict[str, Any]) -> None:
-        message = {"event": event, "data": data}
+        message = {"event": event, "data": data, "queued_at": time.monotonic()}
         for queue in list(self._clients):
+            stats = self._stats.setdefault(id(queue), _new_stats())
+            if queue.full():
+                self._make_room(queue, message, stats)
             try:
                 queue.put_nowait(message)
+                stats["enqueued"] += 1
             except asyncio.QueueFull:
-                pass
+                stats["dropped"] += 1
+
+    def delivered(self, queue: asyncio.Queue, message: dict) -> None:
+        """Record that a subscriber's stream picked a message off its queue (lag metric)."""
+        stats = self._stats.get(id(queue))
+        queued_at = message.get("queued_at")
+        if stats is not None and queued_at is not None:
+            lag = (time.monotonic() - queued_at) * 1000
+            stats["max_lag_ms"] = round(max(stats["max_lag_ms"], lag), 1)
+
+    def get_stats(self) -> dict:
+        per_client = [
+            {**self._stats.get(id(q), {}), "queued": q.qsize(), "maxsize": q.maxsize}
+            for q in self._clients
+        ]
+        return {
+            "clients": self.client_count,
+            "queued": sum(c["queued"] for c in per_client),
+            **{key: sum(c.get(key, 0) for c in per_client) for key in ("enqueued", "dropped", "coalesced")},
+            "max_lag_ms": max((c.get("max_lag_ms", 0.0) for c in per_client), default=0.0),
+            "per_client": per_client,
+        }
 
 broadcaster = SSEBroadcaster()
@@ -0,0 +1,49 @@
+import pytest
+import asyncio
+from admission import AdmissionController, PRIORITY_HIGH, PRIORITY_LOW
+from specs import parse_overrides
+
+
+def test_parse_overrides():
+    assert parse_overrides("trade=2,*=3", 6) == (3, {"trade": 2})
+
+
+@pytest.mark.asyncio
+async def test_excess_spawns_wait_in_priority_order():
+    ac = AdmissionController(max_in_flight=1, dept_slots="", provider_slots="", max_queue=10)
+    await ac.acquire("holder")
+    order = []
+
+    async def run(agent_id, priority):
+        await ac.acquire(agent_id, priority=priority)
+        order.append(agent_id)
+
+    tasks = [asyncio.create_task(run("low", PRIORITY_LOW)),
+             asyncio.create_task(run("high", PRIORITY_HIGH))]
+    await asyncio.sleep(0)
+    assert ac.queue_depth() == 2
+    ac.release()
+    await asyncio.sleep(0)
+    ac.release()
+    await asyncio.gather(*tasks)
+    assert order == ["high", "low"]
+
+
+@pytest.mark.asyncio
+async def test_department_slot_limit():
+    ac = AdmissionController(max_in_flight=4, dept_slots="trade=1", provider_slots="", max_queue=10)
+    async with ac.slot("a", department="trade"):
+        blocked = asyncio.create_task(ac.acquire("b", department="trade"))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        await asyncio.wait_for(ac.acquire("c", department="medical"), 1)
+    await asyncio.wait_for(blocked, 1)
+    assert ac.get_stats()["admitted_total"] == 3
+
+
+@pytest.mark.asyncio
+async def test_queue_full_rejected():
+    ac = AdmissionController(max_in_flight=1, dept_slots="", provider_slots="", max_queue=0)
+    with pytest.raises(RuntimeError):
+        await ac.acquire("a")
+    assert ac.get_stats()["rejected_total"] == 1
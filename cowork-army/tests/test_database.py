@@ -232,6 +232,61 @@ class TestEventCRUD:
         count = await db.get_event_count()
         assert count == 0
 
+    @pytest.mark.asyncio
+    async def test_event_count_is_maintained_after_first_count(self, db, mock_session):
+        result_mock = MagicMock()
+        result_mock.scalar.return_value = 10
+        result_mock.rowcount = 4
+        mock_session.execute.return_value = result_mock
+
+        assert await db.get_event_count() == 10
+        await db.add_event("cargo", "one more", "info")
+        await db.purge_old_events(days=7)
+        assert await db.get_event_count() == 7
+        # Only the seeding COUNT and the purge DELETE hit the database
+        assert mock_session.execute.await_count == 2
+        assert await db.get_event_count(refresh=True) == 10
+
+    @pytest.mark.asyncio
+    async def test_buffered_writes_batch_into_one_transaction(self, mock_session):
+        @asynccontextmanager
+        async def fake_sf():
+            yield mock_session
+
+        db = Database(fake_sf, write_buffer=True)
+        await db.add_event("cargo", "one", "info")
+        await db.add_event("cargo", "two", "info")
+        await db.record_task_transition("T-1", "pending", "done")
+        mock_session.add.assert_not_called()
+        mock_session.execute.assert_not_called()
+
+        # LLM usage skips the buffer: the budget check reads it back at once
+        await db.record_llm_usage("cargo", "anthropic", "m", 10, 20, 0.01)
+        mock_session.add.assert_called_once()
+        mock_session.commit.reset_mock()
+
+        assert await db.flush_writes() == 3
+        assert mock_session.execute.await_count == 2  # one INSERT per table
+        mock_session.commit.assert_called_once()
+        events_rows = mock_session.execute.await_args_list[0].args[1]
+        assert [r["message"] for r in events_rows] == ["one", "two"]
+
+        assert await db.add_event("cargo", "critical", "error", sync=True) is None  # mocked id
+        assert mock_session.add.call_count == 2
+        assert db.get_write_stats()["pending"] == 0
+        await db.close()
+
+    @pytest.mark.asyncio
+    async def test_get_events_since_id_is_ascending_cursor(self, db, mock_session):
+        result_mock = MagicMock()
+        result_mock.scalars.return_value.all.return_value = []
+        mock_session.execute.return_value = result_mock
+
+        await db.get_events(limit=20, since_id=42)
+        sql = str(mock_session.execute.await_args.args[0])
+        assert "events.id >" in sql
+        assert "ORDER BY events.id ASC" in sql
+
 
 # ═══════════════════════════════════════════════════════════
 #  SEED BASE AGENTS
@@ -0,0 +1,135 @@
+"""
+Tests for resilience.py — pacing, backoff, circuit breaker, provider failover.
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import resilience
+from resilience import (
+    CircuitBreaker, ResilientChat, TokenBucket, backoff_delay, is_retryable_error,
+    retry_after_seconds, translate_history,
+)
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after="1"):
+        super().__init__("429 rate limit")
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+@pytest.fixture(autouse=True)
+def _fresh_registries():
+    with patch.dict(resilience._breakers, clear=True), patch.dict(resilience._buckets, clear=True), \
+         patch("resilience.time.sleep"):
+        yield
+
+
+class TestClassification:
+    def test_retry_after(self):
+        assert retry_after_seconds(RateLimited("4")) == 4.0
+        assert retry_after_seconds(Exception("Please retry in 12.5s")) == 12.5
+        assert retry_after_seconds(Exception("nope")) is None
+
+    def test_retryable(self):
+        assert is_retryable_error(RateLimited())
+        assert is_retryable_error(ConnectionError())
+        assert not is_retryable_error(ValueError("invalid_request_error"))
+
+    def test_backoff_respects_retry_after(self):
+        assert backoff_delay(0, retry_after=3, base=1, cap=8) >= 3
+        assert backoff_delay(10, base=1, cap=8) <= 8
+
+
+class TestBreakerAndBucket:
+    def test_breaker_opens_after_threshold(self):
+        b = CircuitBreaker("x", threshold=2, reset_seconds=60)
+        b.record_failure()
+        assert b.state == "closed"
+        b.record_failure()
+        assert b.state == "open" and not b.allow()
+
+    def test_half_open_lets_one_probe_through(self):
+        clock = [1000.0]
+        with patch("resilience.time.monotonic", side_effect=lambda: clock[0]):
+            b = CircuitBreaker("x", threshold=1, reset_seconds=30)
+            b.record_failure()
+            clock[0] += 30
+            assert b.allow()
+            assert not b.allow()  # concurrent callers fail fast while the probe runs
+            b.record_failure()
+            assert b.state == "open"
+            clock[0] += 30
+            assert b.allow()
+            b.record_success()
+            assert b.allow() and b.allow()
+
+    def test_bucket_burst_then_paces(self):
+        bucket = TokenBucket(rpm=60, burst=2)
+        assert bucket.acquire() < 0.05
+        assert bucket.acquire() < 0.05
+        with patch("resilience.time.sleep", side_effect=lambda s: bucket.pause(0) or setattr(
+                bucket, "_tokens", 1.0)) as sleep:
+            bucket.acquire()
+        sleep.assert_called_once()
+        assert sleep.call_args[0][0] == pytest.approx(1.0, abs=0.05)
+
+
+class TestTranslateHistory:
+    def test_anthropic_to_gemini_and_back(self):
+        anthropic_hist = [
+            {"role": "user", "content": "Gorevin: x"},
+            {"role": "assistant", "content": [
+                SimpleNamespace(type="text", text="okuyorum"),
+                SimpleNamespace(type="tool_use", id="toolu_1", name="read_file", input={"path": "a"}),
+            ]},
+            {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "toolu_1", "content": "hi"}]},
+        ]
+        gem = translate_history(anthropic_hist, "gemini")
+        assert gem[1]["role"] == "model"
+        assert gem[1]["content"][1] == {"type": "function_call", "name": "read_file", "args": {"path": "a"}}
+        assert gem[2]["content"][0]["_function_name"] == "read_file"
+
+        back = translate_history(gem, "anthropic")
+        assert back[1]["role"] == "assistant"
+        assert back[1]["content"][1]["id"] == "toolu_1"
+        assert "_function_name" not in back[2]["content"][0]
+
+
+class TestResilientChat:
+    def test_retries_then_succeeds(self):
+        p = MagicMock()
+        p.chat.side_effect = [ConnectionError("reset"), ("ok", [])]
+        chat = ResilientChat(p, "anthropic", "claude-x")
+        assert chat.chat("s", [], []) == ("ok", [])
+        assert p.chat.call_count == 2
+
+    def test_failover_translates_history_and_records_origin(self):
+        primary = MagicMock()
+        primary.chat.side_effect = RateLimited("0")
+        alternate = MagicMock()
+        alternate.chat.return_value = ("gemini ok", [])
+        resilience._breakers["anthropic:claude-x"] = CircuitBreaker("anthropic:claude-x", threshold=2)
+
+        chat = ResilientChat(primary, "anthropic", "claude-x", max_attempts=5,
+                             alternate_factory=lambda name: (alternate, "gemini", "gemini-2.5-flash"))
+        messages = [
+            {"role": "user", "content": "x"},
+            {"role": "assistant", "content": [{"type": "text", "text": "t"}]},
+        ]
+        assert chat.chat("s", messages, []) == ("gemini ok", [])
+        assert primary.chat.call_count == 2
+        assert messages[1]["role"] == "model"
+        assert chat.take_failover() == "anthropic:claude-x"
+        assert chat.name == "gemini" and chat.take_failover() is None
+
+    def test_non_retryable_error_not_retried(self):
+        p = MagicMock()
+        p.chat.side_effect = ValueError("bad")
+        chat = ResilientChat(p, "anthropic", "claude-x", alternate_factory=lambda n: None)
+        with pytest.raises(ValueError):
+            chat.chat("s", [], [])
+        assert p.chat.call_count == 1
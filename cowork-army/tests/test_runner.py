@@ -78,6 +78,28 @@ class TestKillAgent:
         del PROCS["kill-test"]
 
 
+class TestAdmittedTimeout:
+    @pytest.mark.asyncio
+    async def test_timeout_holds_slot_until_thread_exits(self):
+        import threading
+        from admission import AdmissionController
+        from runner import _run_admitted
+        ctrl = AdmissionController(max_in_flight=1)
+        release = threading.Event()
+        proc = AgentProc("timeout-test")
+
+        with patch("runner.admission", ctrl), \
+             patch("runner.AGENT_TIMEOUT_SECONDS", 0.05), \
+             patch("runner._run", side_effect=lambda p, t: release.wait(5)):
+            task = asyncio.create_task(_run_admitted(proc, "slow", "", "", 0))
+            await asyncio.sleep(0.2)
+            assert proc.status == "error"
+            assert ctrl.in_flight() == 1  # thread still running
+            release.set()
+            await asyncio.wait_for(task, 2)
+        assert ctrl.in_flight() == 0
+
+
 # ═══════════════════════════════════════════════════════════
 #  TOOL DEFINITIONS (from llm_providers)
 # ═══════════════════════════════════════════════════════════
@@ -321,6 +343,8 @@ class TestToolUseRun:
         with patch("runner.get_db", return_value=mock_db), \
              patch("runner._get_llm_config", return_value=("anthropic", "sk-test", "")), \
              patch("runner.get_provider", return_value=mock_provider), \
+             patch("runner._get_alternate_provider", return_value=None), \
+             patch("resilience.time.sleep"), \
              patch("runner._sync_db", side_effect=_sync_db_for_test):
             _run(proc, "Will fail")
 
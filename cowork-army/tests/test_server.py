@@ -284,6 +284,14 @@ class TestAutonomous:
         assert r.status_code == 200
         assert len(r.json()) == 1
 
+    def test_events_since_id_cursor(self, app_client):
+        c, mock_db, _ = app_client
+        mock_db.get_events.return_value = [{"id": 43, "message": "next", "agent_id": "cargo", "type": "info"}]
+        r = c.get("/api/autonomous/events?since_id=42&limit=10")
+        assert r.status_code == 200
+        assert r.json()[0]["id"] == 43
+        assert mock_db.get_events.call_args.kwargs["since_id"] == 42
+
 
 # ═══════════════════════════════════════════════════════════
 #  SETTINGS
@@ -31,3 +31,28 @@ async def test_max_clients(bc):
         bc.subscribe(asyncio.Queue())
     assert not bc.subscribe(asyncio.Queue())
     assert bc.client_count == 100
+
+@pytest.mark.asyncio
+async def test_full_queue_coalesces_superseded_status(bc):
+    q = asyncio.Queue(maxsize=3)
+    bc.subscribe(q)
+    await bc.broadcast("agent_status", {"agent_id": "a", "status": "working"})
+    await bc.broadcast("log", {"line": 1})
+    await bc.broadcast("agent_status", {"agent_id": "b", "status": "working"})
+    await bc.broadcast("agent_status", {"agent_id": "a", "status": "done"})  # supersedes a/working
+    events = [q.get_nowait() for _ in range(q.qsize())]
+    assert [(e["event"], e["data"].get("agent_id")) for e in events] == [
+        ("log", None), ("agent_status", "b"), ("agent_status", "a")]
+    assert events[-1]["data"]["status"] == "done"
+    assert bc.get_stats()["coalesced"] == 1
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_without_blocking(bc):
+    q = asyncio.Queue(maxsize=2)
+    bc.subscribe(q)
+    for i in range(4):
+        await asyncio.wait_for(bc.broadcast("log", {"line": i}), timeout=0.5)
+    assert [q.get_nowait()["data"]["line"] for _ in range(2)] == [2, 3]
+    stats = bc.get_stats()
+    assert stats["dropped"] == 2
+    assert stats["enqueued"] == 4
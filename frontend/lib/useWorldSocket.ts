@@ -2,7 +2,8 @@
 /**
  * COWORK.ARMY — useWorldSocket
  * WebSocket bağlantısı ve World event yönetimi
- * Desteklenen event tipleri: update, agent_message, external_trigger, cascade_event, cascade_complete
+ * Desteklenen event tipleri: update, agent_message, external_trigger, cascade_event, cascade_complete,
+ * agent_token (LLM çıktısı akışı — agent başına son kısmi yanıt)
  */
 import { useEffect, useRef, useState, useCallback } from "react";
 import type {
@@ -12,6 +13,7 @@ import type {
 } from "./world-types";
 
 const MAX_EVENTS = 100;
+const MAX_STREAM_CHARS = 4000;
 const RECONNECT_DELAY_MS = 3000;
 
 export type ConnectionStatus = "connecting" | "connected" | "disconnected" | "error";
@@ -20,6 +22,7 @@ interface WorldState {
   events: WorldEvent[];
   worldModels: AgentWorldModel[];
   schedulerStats: SchedulerStats;
+  agentStreams: Record<string, string>;
   connectionStatus: ConnectionStatus;
 }
 
@@ -62,6 +65,7 @@ export function useWorldSocket(): WorldState {
     active_tasks: 0,
     active_agents: [],
   });
+  const [agentStreams, setAgentStreams] = useState<Record<string, string>>({});
   const [connectionStatus, setConnectionStatus] =
     useState<ConnectionStatus>("connecting");
 
@@ -97,6 +101,16 @@ export function useWorldSocket(): WorldState {
             return;
           }
 
+          if (data.type === "agent_token") {
+            // Yeni tur → akış sıfırlanır; tool_start satır başı açar
+            setAgentStreams((prev) => {
+              const base = data.seq === 1 ? "" : prev[data.agent_id] ?? "";
+              const delta = data.kind === "tool_start" ? `\n🔧 ${data.delta} ` : data.delta;
+              return { ...prev, [data.agent_id]: (base + delta).slice(-MAX_STREAM_CHARS) };
+            });
+            return;
+          }
+
           // Event tipleri: agent_message, external_trigger, cascade_event, cascade_complete
           if (
             data.type === "agent_message" ||
@@ -147,5 +161,5 @@ export function useWorldSocket(): WorldState {
     };
   }, [connect]);
 
-  return { events, worldModels, schedulerStats, connectionStatus };
+  return { events, worldModels, schedulerStats, agentStreams, connectionStatus };
 }
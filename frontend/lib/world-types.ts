@@ -69,15 +69,49 @@ export interface SchedulerStats {
   active_agents: string[];
 }
 
-export interface WorldUpdatePayload {
+// WorldHub "update" mesajları: bağlanınca bir kez tam durum, sonra yalnızca
+// değişenler. `cursor`: ondan küçük/eşit tüm event id'leri gönderildi.
+
+/** Full state: sent on connect and whenever the client is resynced. */
+export interface WorldFullUpdate {
   type: "update";
+  full: true;
+  seq: number;
+  cursor: number;
   statuses: Record<string, unknown>;
   events: unknown[];
-  new_events: boolean;
+  new_events: false;
   world_models: AgentWorldModel[];
   scheduler_stats: SchedulerStats;
 }
 
+/** Per-tick diff: only the fields that changed since the previous update are present. */
+export interface WorldDiffUpdate {
+  type: "update";
+  full: false;
+  resumed?: false;
+  seq: number;
+  cursor: number;
+  new_events: boolean;
+  statuses?: Record<string, unknown>;  // changed agents only
+  removed?: string[];                  // agent ids no longer reported
+  events?: unknown[];                  // new events only
+  world_models?: AgentWorldModel[];
+  scheduler_stats?: SchedulerStats;
+}
+
+/** Events missed while disconnected (/ws/events?since_id=); carries no cursor. */
+export interface WorldResumedUpdate {
+  type: "update";
+  full: false;
+  resumed: true;
+  seq: number;
+  new_events: true;
+  events: unknown[];
+}
+
+export type WorldUpdatePayload = WorldFullUpdate | WorldDiffUpdate | WorldResumedUpdate;
+
 export const DEPT_CONFIG: Record<Department, {
   label: string;
   color: string;